@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="ChatSession",
+            fields=[
+                ("session_id", models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ("history", models.JSONField(default=list)),
+                ("subject", models.CharField(blank=True, max_length=64, null=True)),
+                ("state", models.JSONField(default=dict)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -1,3 +1,15 @@
 from django.db import models
 
-# Create your models here.
+
+class ChatSession(models.Model):
+    """Server-side chat session (used when RAG_SESSION_BACKEND = "db")."""
+
+    session_id = models.CharField(max_length=64, primary_key=True)
+    history = models.JSONField(default=list)
+    subject = models.CharField(max_length=64, null=True, blank=True)
+    state = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.session_id} ({len(self.history)} turns)"
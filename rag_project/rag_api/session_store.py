@@ -0,0 +1,192 @@
+"""
+session_store.py
+────────────────
+Server-side chat sessions for the /api/query endpoint.
+
+A session holds everything the pipeline needs between turns:
+
+- history:  the conversation so far (role/content dicts)
+- subject:  the subject lock, if the client set one
+- state:    the pipeline's cached per-session state (running summary,
+            retrieved chunks, ...) passed to answer_query(session_state=...)
+
+The client only identifies itself with a session id (the ``uniai_session``
+cookie, an ``X-Session-Id`` header or a ``session_id`` body field) and sends
+the new message. Two backends are available, selected by
+``settings.RAG_SESSION_BACKEND``:
+
+- "memory" (default): per-process dict, fastest, lost on restart.
+- "db":               rows in the ChatSession model (SQLite by default),
+                      shared across worker processes.
+
+Sessions idle for longer than ``settings.RAG_SESSION_TTL_S`` are evicted.
+"""
+
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+
+@dataclass
+class ChatSessionData:
+    session_id: str
+    history: list = field(default_factory=list)
+    subject: str | None = None
+    state: dict = field(default_factory=dict)
+    updated_at: float = field(default_factory=time.time)
+
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(24)
+
+
+def _ttl() -> float:
+    return float(getattr(settings, "RAG_SESSION_TTL_S", 6 * 3600))
+
+
+# ------------------------------------------------------------------
+# BACKENDS
+# ------------------------------------------------------------------
+
+class InMemorySessionStore:
+    """Process-local sessions; expired ones are swept on access."""
+
+    # Sweep at most this often so get() stays O(1) on the hot path
+    SWEEP_INTERVAL_S = 60.0
+
+    def __init__(self, max_sessions: int = 10_000):
+        self._sessions: dict[str, ChatSessionData] = {}
+        self._lock = threading.Lock()
+        self._max_sessions = max_sessions
+        self._last_sweep = 0.0
+
+    def get(self, session_id: str) -> ChatSessionData | None:
+        now = time.time()
+        with self._lock:
+            self._maybe_sweep(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if now - session.updated_at > _ttl():
+                del self._sessions[session_id]
+                return None
+            return session
+
+    def create(self) -> ChatSessionData:
+        session = ChatSessionData(session_id=new_session_id())
+        with self._lock:
+            self._sessions[session.session_id] = session
+            if len(self._sessions) > self._max_sessions:
+                oldest = min(self._sessions.values(), key=lambda s: s.updated_at)
+                del self._sessions[oldest.session_id]
+        return session
+
+    def save(self, session: ChatSessionData) -> None:
+        session.updated_at = time.time()
+        with self._lock:
+            self._sessions[session.session_id] = session
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._sweep(time.time())
+
+    def _maybe_sweep(self, now: float) -> None:
+        if now - self._last_sweep >= self.SWEEP_INTERVAL_S:
+            self._sweep(now)
+
+    def _sweep(self, now: float) -> int:
+        self._last_sweep = now
+        ttl = _ttl()
+        expired = [sid for sid, s in self._sessions.items() if now - s.updated_at > ttl]
+        for sid in expired:
+            del self._sessions[sid]
+        return len(expired)
+
+
+class DatabaseSessionStore:
+    """Sessions persisted in the ChatSession model (Django's default DB)."""
+
+    def _model(self):
+        from .models import ChatSession
+        return ChatSession
+
+    def get(self, session_id: str) -> ChatSessionData | None:
+        ChatSession = self._model()
+        row = ChatSession.objects.filter(session_id=session_id).first()
+        if row is None:
+            return None
+        if timezone.now() - row.updated_at > timedelta(seconds=_ttl()):
+            row.delete()
+            return None
+        return ChatSessionData(
+            session_id=row.session_id,
+            history=row.history,
+            subject=row.subject,
+            state=row.state,
+            updated_at=row.updated_at.timestamp(),
+        )
+
+    def create(self) -> ChatSessionData:
+        session = ChatSessionData(session_id=new_session_id())
+        self.save(session)
+        return session
+
+    def save(self, session: ChatSessionData) -> None:
+        session.updated_at = time.time()
+        self._model().objects.update_or_create(
+            session_id=session.session_id,
+            defaults={
+                "history": session.history,
+                "subject": session.subject,
+                "state": session.state,
+            },
+        )
+
+    def delete(self, session_id: str) -> None:
+        self._model().objects.filter(session_id=session_id).delete()
+
+    def purge_expired(self) -> int:
+        cutoff = timezone.now() - timedelta(seconds=_ttl())
+        deleted, _ = self._model().objects.filter(updated_at__lt=cutoff).delete()
+        return deleted
+
+
+# ------------------------------------------------------------------
+# STORE SELECTION
+# ------------------------------------------------------------------
+
+_BACKENDS = {
+    "memory": InMemorySessionStore,
+    "db": DatabaseSessionStore,
+}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the configured session store (created once per process)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            backend = getattr(settings, "RAG_SESSION_BACKEND", "memory")
+            if backend not in _BACKENDS:
+                raise ValueError(f"Unknown RAG_SESSION_BACKEND: {backend!r}")
+            _store = _BACKENDS[backend]()
+        return _store
+
+
+def reset_store() -> None:
+    """Drop the cached store so the next get_store() re-reads settings."""
+    global _store
+    with _store_lock:
+        _store = None
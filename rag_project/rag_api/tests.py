@@ -1,3 +1,143 @@
-from django.test import TestCase
+import json
+import time
+from unittest.mock import patch
 
-# Create your tests here.
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+
+from .session_store import DatabaseSessionStore, InMemorySessionStore, get_store, reset_store
+from source_code.rag.conversation_memory import _digest
+
+
+class InMemorySessionStoreTests(SimpleTestCase):
+
+    def test_create_get_save(self):
+        store = InMemorySessionStore()
+        session = store.create()
+        session.history.append({"role": "user", "content": "hi"})
+        store.save(session)
+
+        loaded = store.get(session.session_id)
+        self.assertEqual(loaded.history, [{"role": "user", "content": "hi"}])
+
+    @override_settings(RAG_SESSION_TTL_S=10)
+    def test_expired_session_is_evicted(self):
+        store = InMemorySessionStore()
+        session = store.create()
+        session.updated_at = time.time() - 60
+
+        self.assertIsNone(store.get(session.session_id))
+
+    def test_unknown_session(self):
+        self.assertIsNone(InMemorySessionStore().get("missing"))
+
+
+class DatabaseSessionStoreTests(TestCase):
+
+    def test_round_trip(self):
+        store = DatabaseSessionStore()
+        session = store.create()
+        session.subject = "CYBER_SECURITY"
+        session.state["memory"] = {"summary": "s", "summarized_turns": 2}
+        store.save(session)
+
+        loaded = store.get(session.session_id)
+        self.assertEqual(loaded.subject, "CYBER_SECURITY")
+        self.assertEqual(loaded.state["memory"]["summarized_turns"], 2)
+
+        store.delete(session.session_id)
+        self.assertIsNone(store.get(session.session_id))
+
+
+@override_settings(RAG_SESSION_BACKEND="memory")
+class QueryViewSessionTests(SimpleTestCase):
+
+    def setUp(self):
+        reset_store()
+
+    def tearDown(self):
+        reset_store()
+
+    def _post(self, payload):
+        return self.client.post("/api/query", json.dumps(payload), content_type="application/json")
+
+    @patch("rag_api.views.answer_query")
+    def test_history_is_kept_server_side(self, mock_answer):
+        mock_answer.return_value = {"answer": "A1", "mode": "generic", "chunks": []}
+
+        first = self._post({"query": "What is a flip flop?", "subject": "DIGITAL_ELECTRONICS"})
+        self.assertIn("uniai_session", first.cookies)
+
+        mock_answer.return_value = {"answer": "A2", "mode": "generic", "chunks": []}
+        self._post({"query": "explain again"})
+
+        kwargs = mock_answer.call_args.kwargs
+        self.assertEqual(kwargs["session_subject"], "DIGITAL_ELECTRONICS")
+        self.assertEqual(
+            [t["content"] for t in kwargs["history"]],
+            ["What is a flip flop?", "A1"],
+        )
+
+    @patch("rag_api.views.answer_query")
+    def test_summarised_turns_are_dropped_from_the_session(self, mock_answer):
+        def fake_answer(query, history, session_subject, session_state):
+            # What compact_history() records once the first two turns are folded
+            if len(history) >= 4:
+                session_state["memory"] = {
+                    "summary": "earlier turns",
+                    "summarized_turns": 2,
+                    "prefix_digest": _digest(history[:2]),
+                }
+            return {"answer": f"A: {query}", "mode": "generic", "chunks": []}
+        mock_answer.side_effect = fake_answer
+
+        for i in range(3):
+            self._post({"query": f"q{i}"})
+
+        session = get_store().get(self.client.cookies["uniai_session"].value)
+        self.assertEqual([t["content"] for t in session.history], ["q1", "A: q1", "q2", "A: q2"])
+        self.assertEqual(session.state["memory"]["summarized_turns"], 0)
+        self.assertEqual(session.state["memory"]["summary"], "earlier turns")
+
+    @patch("rag_api.views.answer_query")
+    def test_reset_starts_a_new_session(self, mock_answer):
+        mock_answer.return_value = {"answer": "A1", "mode": "generic", "chunks": []}
+        self._post({"query": "What is a flip flop?"})
+
+        self.client.post("/api/session/reset")
+        self._post({"query": "hello"})
+
+        self.assertEqual(mock_answer.call_args.kwargs["history"], [])
+
+    @patch("rag_api.views.answer_query")
+    def test_history_payload_is_served_statelessly(self, mock_answer):
+        mock_answer.return_value = {"answer": "A1", "mode": "generic", "chunks": []}
+        history = [{"role": "user", "content": "q0"}, {"role": "assistant", "content": "a0"}]
+
+        response = self._post({"query": "q1", "history": history, "subject": "DIGITAL_ELECTRONICS"})
+
+        self.assertNotIn("uniai_session", response.cookies)
+        self.assertNotIn("session_id", response.json())
+        self.assertEqual(len(get_store()._sessions), 0)
+        kwargs = mock_answer.call_args.kwargs
+        self.assertEqual(kwargs["history"], history)
+        self.assertEqual(kwargs["session_subject"], "DIGITAL_ELECTRONICS")
+        self.assertIsNone(kwargs["session_state"])
+
+    def test_reset_requires_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        self.assertEqual(client.post("/api/session/reset").status_code, 403)
+
+        client.get("/api/")
+        token = client.cookies["csrftoken"].value
+        response = client.post(
+            "/api/session/reset", content_type="application/json", HTTP_X_CSRFTOKEN=token
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @patch("rag_api.views.answer_query")
+    def test_chat_page_shows_the_session_history(self, mock_answer):
+        mock_answer.return_value = {"answer": "A1", "mode": "generic", "chunks": []}
+        self._post({"query": "What is a flip flop?"})
+
+        page = self.client.get("/api/")
+        self.assertContains(page, '"content": "What is a flip flop?"')
@@ -4,5 +4,6 @@ from . import views
 urlpatterns = [
     path('', views.chat_view, name='chat'),  # Add this - home page
     path('query', views.query_view, name='query'),
+    path('session/reset', views.session_reset_view, name='session_reset'),
     path('health', views.health_view, name='health'),
 ]
\ No newline at end of file
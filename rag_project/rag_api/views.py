@@ -6,6 +6,9 @@ from django.http import JsonResponse
 from django.shortcuts import render
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from django.conf import settings
+
+from .session_store import get_store
 
 # --- Ensure imports work regardless of working directory ---
 import sys
@@ -18,10 +21,12 @@ try:
     from source_code import config
     from source_code.rag.rag_pipeline import answer_query
     from source_code.rag.search import collection_exists
+    from source_code.rag.conversation_memory import retained_history
 except ImportError:
     import config
     from rag.rag_pipeline import answer_query
     from rag.search import collection_exists
+    from rag.conversation_memory import retained_history
 
 
 # ------------------------------------------------------------------
@@ -29,7 +34,52 @@ except ImportError:
 # ------------------------------------------------------------------
 
 def chat_view(request):
-    return render(request, "chat.html")
+    # Show the turns the server still holds for this browser, so a reload
+    # continues the conversation instead of answering from unseen history
+    session_id = request.COOKIES.get(settings.RAG_SESSION_COOKIE)
+    session = get_store().get(session_id) if session_id else None
+    return render(request, "chat.html", {"history": session.history if session else []})
+
+
+# ------------------------------------------------------------------
+# SESSION HELPERS
+# ------------------------------------------------------------------
+
+def _session_id_from_request(request, data: dict) -> str | None:
+    return (
+        request.COOKIES.get(settings.RAG_SESSION_COOKIE)
+        or request.headers.get("X-Session-Id")
+        or data.get("session_id")
+    )
+
+
+def _load_session(request, data: dict):
+    """Return the caller's session, creating a new one if it is unknown or expired."""
+    store = get_store()
+    session_id = _session_id_from_request(request, data)
+    session = store.get(session_id) if session_id else None
+    return session or store.create()
+
+
+def _with_session_cookie(response, session_id: str):
+    response.set_cookie(
+        settings.RAG_SESSION_COOKIE,
+        session_id,
+        max_age=settings.RAG_SESSION_TTL_S,
+        httponly=True,
+        samesite="Lax",
+    )
+    return response
+
+
+def _source_entry(chunk) -> dict:
+    """Frontend citation for a ranked chunk (Chunk object or dict)."""
+    meta = chunk.get("metadata") or {}
+    return {
+        "source": meta.get("source", "unknown"),
+        "unit": meta.get("unit", "?"),
+        "page_start": meta.get("page_start", "?"),
+    }
 
 
 # ------------------------------------------------------------------
@@ -61,42 +111,52 @@ def query_view(request):
                 "answer": f"Your question is too long. Please keep it under {MAX_QUERY_LENGTH} characters."
             })
 
-        history = data.get("history", [])
-
-        # The frontend isn't currently sending a locked session_subject, 
-        # but if it does in the future, we can extract it here.
-
-                                                                            # TEMPORARY!!!!!
-                                                                            # session_subject = "DIGITAL_ELECTRONICS"
-
-        session_subject = data.get("subject", None)
+        # Clients that still send their own history are served statelessly:
+        # no session is created or saved for them.
+        if "history" in data:
+            session = None
+            history = data["history"]
+            session_subject = data.get("subject") or None
+        else:
+            session = _load_session(request, data)
+            history = list(session.history)
+            # Sending "subject" (even null) updates the session's subject lock
+            if "subject" in data:
+                session.subject = data["subject"] or None
+            session_subject = session.subject
 
-        print(f"ROUTING => Provided Subject: {session_subject}")
+        label = f"{session.session_id[:8]}…" if session else "stateless"
+        print(f"ROUTING => Session: {label} Subject: {session_subject}")
 
         # Run the full RAG pipeline
         result = answer_query(
             query=query,
             history=history,
-            session_subject=session_subject
+            session_subject=session_subject,
+            session_state=session.state if session else None,
         )
 
         # Build frontend-compatible sources directly from chunks
-        sources = [
-            {
-                "source": chunk.get("metadata", {}).get("source", "unknown"),
-                "unit": chunk.get("metadata", {}).get("unit", "?"),
-                "page_start": chunk.get("metadata", {}).get("page_start", "?")
-            }
-            for chunk in result.get("chunks", [])[:3]
-        ]
-
-        return JsonResponse({
+        sources = [_source_entry(chunk) for chunk in result.get("chunks", [])[:3]]
+
+        payload = {
             "query": query,
             "expanded_query": result.get("expanded_query", query),
             "answer": result["answer"],
             "mode": result["mode"],
             "sources": sources,
-        })
+        }
+        if session is None:
+            return JsonResponse(payload)
+
+        session.history.append({"role": "user", "content": query})
+        session.history.append({"role": "assistant", "content": result["answer"]})
+        # Older turns live on in the running summary; keep the rest only
+        session.history = retained_history(session.history, session.state)
+        get_store().save(session)
+
+        response = JsonResponse({**payload, "session_id": session.session_id})
+        return _with_session_cookie(response, session.session_id)
 
     except Exception as e:
         import traceback
@@ -104,6 +164,22 @@ def query_view(request):
         return JsonResponse({"error": str(e)}, status=500)
 
 
+@require_http_methods(["POST"])
+def session_reset_view(request):
+    """Forget the caller's history, subject lock and cached pipeline state."""
+    try:
+        data = json.loads(request.body or b"{}")
+    except json.JSONDecodeError:
+        data = {}
+
+    store = get_store()
+    session_id = _session_id_from_request(request, data)
+    if session_id:
+        store.delete(session_id)
+    session = store.create()
+    return _with_session_cookie(JsonResponse({"session_id": session.session_id}), session.session_id)
+
+
 @require_http_methods(["GET"])
 def health_view(request):
     try:
@@ -118,6 +118,16 @@ DATABASES = {
 }
 
 
+# ------------------------------------------------------------------
+# CHAT SESSIONS
+# ------------------------------------------------------------------
+
+# "memory" (per-process) or "db" (ChatSession model in DATABASES["default"])
+RAG_SESSION_BACKEND = os.getenv("RAG_SESSION_BACKEND", "memory")
+RAG_SESSION_TTL_S = int(os.getenv("RAG_SESSION_TTL_S", str(6 * 3600)))
+RAG_SESSION_COOKIE = "uniai_session"
+
+
 # ------------------------------------------------------------------
 # AUTH / PASSWORD VALIDATION
 # ------------------------------------------------------------------
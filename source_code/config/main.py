@@ -13,9 +13,16 @@ from .models import (
     EMBEDDING_CONFIG, 
     ROUTER_CONFIG, 
     VISION_CONFIG,
-    ACTIVE_CHAT_MODEL
+    TEXT_LAYER_CONFIG,
+    VLM_CACHE_CONFIG,
+    VISION_BATCH_CONFIG,
+    IMAGE_PREP_CONFIG,
+    PYQ_UNIT_CONFIG,
+    EXTRACT_JOBS_CONFIG,
+    ACTIVE_CHAT_MODEL,
+    PROVIDER_ROUTING_CONFIG,
 )
-from .rag import RAG_CONFIG, CROSS_ENCODER_CONFIG, MAX_HISTORY_TURNS, KEYWORD_MIN_SCORE, EMBEDDING_ROUTER_THRESHOLD, MIN_INGEST_CONFIDENCE, QUERY_EXPANDER_MAX_KEYWORDS
+from .rag import RAG_CONFIG, CROSS_ENCODER_CONFIG, CONTEXT_PACKING_CONFIG, MEMORY_CONFIG, RETRIEVAL_CACHE_CONFIG, HYBRID_SEARCH_CONFIG, QUANTIZATION_CONFIG, EMBEDDING_DIMS_CONFIG, NEAR_DUPLICATE_CONFIG, DIVERSITY_CONFIG, PARTITION_CONFIG, MAX_HISTORY_TURNS, KEYWORD_MIN_SCORE, KEYWORD_MAP_CONFIG, EMBEDDING_ROUTER_THRESHOLD, MIN_INGEST_CONFIDENCE, STREAM_INGEST_CONFIG, WATCH_CONFIG, QUERY_EXPANDER_MAX_KEYWORDS
 from .paths import *
 
 # The Master Configuration Structure
@@ -32,6 +39,8 @@ CONFIG = {
     "USE_OLLAMA_CLOUD": USE_OLLAMA_CLOUD,
 
     "model": get_active_model_config(),
+    "model_configs": MODEL_CONFIGS,
+    "provider_routing": PROVIDER_ROUTING_CONFIG,
     "providers": {
         "chat": ACTIVE_CHAT_MODEL,
         "embedding": EMBEDDING_CONFIG["provider"],
@@ -40,17 +49,28 @@ CONFIG = {
         "router_model": ROUTER_CONFIG["model"],
         "vision": VISION_CONFIG["provider"],
         "vision_model": VISION_CONFIG["model"],
+        "vision_json_mode": VISION_CONFIG["json_mode"],
     },
     "rag": {
         **RAG_CONFIG,
         "history_limit": MAX_HISTORY_TURNS,
+        "memory": MEMORY_CONFIG,
+        "retrieval_cache": RETRIEVAL_CACHE_CONFIG,
+        "hybrid_search": HYBRID_SEARCH_CONFIG,
+        "partitioning": PARTITION_CONFIG,
+        "quantization": QUANTIZATION_CONFIG,
+        "embedding_dims": EMBEDDING_DIMS_CONFIG,
+        "near_duplicates": NEAR_DUPLICATE_CONFIG,
+        "diversity": DIVERSITY_CONFIG,
         "cross_encoder": CROSS_ENCODER_CONFIG,
+        "context_packing": CONTEXT_PACKING_CONFIG,
         "router_model": ROUTER_CONFIG["model"],
         "router_temperature": ROUTER_CONFIG["temperature"],
         "router_num_predict": ROUTER_CONFIG["num_predict"],
         "keywords": {
             "min_score": KEYWORD_MIN_SCORE,
             "max_expander": QUERY_EXPANDER_MAX_KEYWORDS,
+            "generation": KEYWORD_MAP_CONFIG,
         },
         "embedding_router_threshold": EMBEDDING_ROUTER_THRESHOLD,
     },
@@ -58,15 +78,31 @@ CONFIG = {
         "base_data": BASE_DATA_DIR,
         "chroma": CHROMA_DB_PATH,
         "unit_embeddings": UNIT_EMBEDDINGS_PATH,
+        "lexical_index": LEXICAL_INDEX_DIR,
+        "vlm_cache": VLM_CACHE_PATH,
+        "pyq_unit_cache": PYQ_UNIT_CACHE_PATH,
+        "extract_jobs": EXTRACT_JOBS_PATH,
+        "snapshots": SNAPSHOT_DIR,
         "aliases": ALIASES_FILE_PATH,
         "keywords": KEYWORDS_FILE_PATH,
+        "keyword_unit_cache": KEYWORD_UNIT_CACHE_PATH,
         "collections": {
             "notes": CHROMA_COLLECTION_NAME,
             "syllabus": CHROMA_SYLLABUS_COLLECTION_NAME,
             "pyq": CHROMA_PYQ_COLLECTION_NAME,
         }
     },
+    "extract": {
+        "text_layer": TEXT_LAYER_CONFIG,
+        "vlm_cache": VLM_CACHE_CONFIG,
+        "vision_batch": VISION_BATCH_CONFIG,
+        "image_prep": IMAGE_PREP_CONFIG,
+        "pyq_units": PYQ_UNIT_CONFIG,
+        "jobs": EXTRACT_JOBS_CONFIG,
+    },
     "ingest": {
         "min_confidence": MIN_INGEST_CONFIDENCE,
+        "stream": STREAM_INGEST_CONFIG,
+        "watch": WATCH_CONFIG,
     }
 }
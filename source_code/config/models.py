@@ -18,12 +18,14 @@ MODEL_CONFIGS = {
         "top_p": 0.9,
         "max_tokens": 4096,
         "api_key": GEMINI_API_KEY,
+        "tokenizer": None,  # no local tokenizer — models.count_tokens estimates
     },
     "ollama": {
         "model": "qwen3:8b",
         "temperature": 0.25,
         "top_p": 0.95,
         "num_ctx": 8192,
+        "tokenizer": "Qwen/Qwen3-8B",
     },
     "groq": {
         "model": "qwen/qwen3-32b",
@@ -31,6 +33,7 @@ MODEL_CONFIGS = {
         "top_p": 0.95,
         "max_tokens": 4096,
         "api_key": GROQ_API_KEY,
+        "tokenizer": "Qwen/Qwen3-32B",
     }
 }
 
@@ -41,6 +44,27 @@ def get_active_model_config():
     """Return the currently selected chat model profile."""
     return MODEL_CONFIGS[ACTIVE_CHAT_MODEL]
 
+# ------------------------------------------------------------------
+# Chat Provider Routing (circuit breaker + fallback)
+# ------------------------------------------------------------------
+
+PROVIDER_ROUTING_CONFIG = {
+    "enabled": True,
+    # Tried in order after the active provider. Providers whose profile
+    # has an empty api_key are skipped.
+    "fallback_chain": ["gemini", "groq", "ollama"],
+    "request_timeout_s": 45.0,     # hard ceiling for one answer across all attempts
+    "workers_per_provider": 4,     # pool threads per provider; a saturated provider is skipped
+    "window": 20,                  # rolling calls kept per provider
+    "min_calls": 5,                # samples needed before the error rate can trip
+    "error_rate_threshold": 0.5,   # open the circuit above this failure ratio
+    "consecutive_failures": 3,     # ...or after this many failures in a row
+    "cooldown_s": 30.0,            # open → half-open probe delay
+    "hedge": False,                # send a second request when the first is slow
+    "hedge_min_s": 2.0,            # never hedge earlier than this
+    "hedge_default_s": 8.0,        # hedge delay until a p95 is known
+}
+
 # ------------------------------------------------------------------
 # Embedding Configuration
 # ------------------------------------------------------------------
@@ -69,4 +93,68 @@ VISION_CONFIG = {
     "provider": "ollama", # ollama | huggingface
     "model": "qwen3-vl:235b-cloud",
     "hf_model_id": "Qwen/Qwen3-VL-235B-A22B-Instruct",
+    "json_mode": True,   # provider-side JSON output for JSON prompts (Ollama `format="json"`)
+}
+
+# Pages whose embedded text layer is used instead of the VLM
+# (see extract/page_classifier.py)
+TEXT_LAYER_CONFIG = {
+    "enabled": True,
+    "min_chars": 100,              # fewer non-whitespace chars → send to the VLM
+    "max_image_coverage": 0.35,    # larger share of the page covered by images → VLM
+    "min_printable_ratio": 0.9,    # lower → broken font encoding, VLM
+}
+
+# Several low-density pages per models.vision() call in the notes extractor
+VISION_BATCH_CONFIG = {
+    "enabled": True,
+    "max_pages": 4,               # pages per call
+    "max_bytes": 1_200_000,       # rendered image bytes per call
+    "dense_page_bytes": 350_000,  # a page rendering larger than this is sent alone
+}
+
+# Per-page render scale, margin crop, grayscale and encoding of VLM images
+# (see extract/image_prep.py)
+IMAGE_PREP_CONFIG = {
+    "enabled": True,
+    "format": "jpeg",          # jpeg | webp | png
+    "quality": 80,
+    "target_text_px": 20,      # rendered height of the page's median font
+    "min_scale": 0.75,
+    "max_scale": 2.0,
+    "default_scale": 1.25,     # no text layer and no dominant scan image
+    "max_pixels": 2_500_000,   # per rendered page (after cropping)
+    "blank_level": 245,        # thumbnail pixels lighter than this are margin
+    "margin_pad": 8,           # points kept around the content
+    "color_tolerance": 24,     # max channel spread of a "gray" pixel
+    "max_color_share": 0.01,   # coloured pixel share still rendered as grayscale
+}
+
+# PYQ unit classification (see extract/unit_classifier.py)
+PYQ_UNIT_CONFIG = {
+    "use_embeddings": True,   # embedding pre-classifier against syllabus unit texts
+    "min_similarity": 0.45,   # best unit similarity needed to skip the LLM
+    "min_margin": 0.06,       # ...and its lead over the runner-up
+    "batch_size": 25,         # questions per LLM call
+    "cache": True,            # question text → unit, persisted in CONFIG["paths"]["pyq_unit_cache"]
+}
+
+# Worker pools, per-provider rate limits and retries of the extraction CLIs
+# (see extract/job_runner.py)
+EXTRACT_JOBS_CONFIG = {
+    "file_workers": 2,         # PDFs processed at once
+    "page_workers": 4,         # model calls in flight, across all files
+    "max_attempts": 3,
+    "backoff_seconds": 10,     # wait before retry n is n × backoff_seconds
+    "rate_limits": {           # requests per minute per provider; 0 = unlimited
+        "ollama": 0,
+        "huggingface": 30,
+        "gemini": 15,
+        "groq": 30,
+    },
+}
+
+# Content-addressed cache of models.vision() responses (see response_cache.py)
+VLM_CACHE_CONFIG = {
+    "enabled": True,
 }
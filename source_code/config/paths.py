@@ -18,10 +18,16 @@ BASE_DATA_DIR = os.getenv("BASE_DATA_DIR", str(BASE_DIR / "data" / "year_2"))
 # Database paths
 CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", str(BASE_DIR / "chroma"))
 UNIT_EMBEDDINGS_PATH = str(BASE_DIR / "pipeline" / "embeddings" / "unit_embeddings.pkl")
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", str(BASE_DIR / "data" / "snapshots"))
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", str(BASE_DIR / "data" / "lexical_index"))
+PYQ_UNIT_CACHE_PATH = os.getenv("PYQ_UNIT_CACHE_PATH", str(BASE_DIR / "data" / "pyq_unit_cache.json"))
+VLM_CACHE_PATH = os.getenv("VLM_CACHE_PATH", str(BASE_DIR / "data" / "vlm_cache.sqlite3"))
+EXTRACT_JOBS_PATH = os.getenv("EXTRACT_JOBS_PATH", str(BASE_DIR / "data" / "extract_jobs.sqlite3"))
 
 # Mapping & Meta paths
 ALIASES_FILE_PATH = str(BASE_DIR / "data" / "subject_aliases.json")
 KEYWORDS_FILE_PATH = str(BASE_DIR / "data" / "subject_keywords.json")
+KEYWORD_UNIT_CACHE_PATH = str(BASE_DIR / "data" / "subject_keywords_units.json")
 
 # Collection Names
 CHROMA_COLLECTION_NAME = "multimodal_notes"
@@ -29,17 +29,102 @@ RAG_CONFIG = {
     "rerank_top_n": 7,
 }
 
+# Hybrid retrieval: BM25 lexical ranks fused with dense ranks (RRF)
+HYBRID_SEARCH_CONFIG = {
+    "enabled": True,
+    "rrf_k": 60,         # RRF constant: score = sum(1 / (rrf_k + rank))
+    "lexical_k": 20,     # BM25 hits considered per query before fusion
+    "bm25_k1": 1.5,
+    "bm25_b": 0.75,
+}
+
+# Matryoshka dimensions per use (None = full model dimension). Qwen3-embedding
+# prefixes stay meaningful, so routing and first-stage candidate generation
+# can compare truncated vectors; final scoring (rescoring, cross-encoder)
+# always uses full vectors. Candidate codes must be exported with the same
+# dimension (export_snapshot.py --quantize <mode> --dim <n>).
+EMBEDDING_DIMS_CONFIG = {
+    "router": None,       # embedding_router unit matching
+    "candidates": None,   # quantized first stage in search.py
+}
+
+# Quantized first-stage dense search over exported snapshots
+# (pipeline/export_snapshot.py --quantize). Candidates are re-scored with the
+# full-precision vectors before the cross-encoder; measure recall with
+# tests/retrieval/bench_quantization.py before enabling.
+QUANTIZATION_CONFIG = {
+    "enabled": False,
+    "mode": "int8",        # "int8" (4× smaller), "binary" (32× smaller) or
+                           # "float32" (truncated dims only, see EMBEDDING_DIMS_CONFIG)
+    "oversample": {"float32": 4, "int8": 4, "binary": 16},  # first-stage candidates per result
+}
+
+# Near-duplicate collapse (64-bit SimHash over word shingles, stored at ingest
+# as metadata["simhash"]). Unrelated pages sit ~20+ bits apart; incremental
+# slide reveals and lightly edited copies usually within 8.
+NEAR_DUPLICATE_CONFIG = {
+    "enabled": True,
+    "max_hamming": 8,     # bits of difference that still count as a duplicate
+    "shingle_size": 3,    # words per shingle
+}
+
+# Candidate diversification before the cross-encoder (maximal marginal relevance)
+DIVERSITY_CONFIG = {
+    "enabled": True,
+    "lambda": 0.7,          # 1.0 = plain top-k by first-stage score, 0.0 = pure diversity
+    "per_source_cap": 3,    # max candidates from one source file (0 = no cap)
+}
+
 # Cross-Encoder Reranker settings
 CROSS_ENCODER_CONFIG = {
     "model": "tomaarsen/Qwen3-Reranker-0.6B-seq-cls",
     "min_score": 0.65,
     "candidates": 6,
     "pipeline_top_n": 4, # Top N after cross-reranking
+    "score_cache_size": 4096,  # LRU of (query, chunk id, model) → score; 0 disables
+}
+
+# Context packing (token budgets for the generation prompt)
+CONTEXT_PACKING_CONFIG = {
+    "enabled": True,
+    "context_budget": 2000,    # tokens for all retrieved chunks together
+    "history_budget": 600,     # tokens for the conversation history block
+    "min_chunk_tokens": 48,    # smallest useful slice of a chunk
+    "header_tokens": 24,       # allowance for each "[Source N | ...]" header
+    "dedupe_threshold": 0.6,   # shingle containment above which a chunk is a duplicate
+}
+
+# Per-subject partition collections ("<collection>__<subject>").
+# Ingest writes to both layouts; search routes to the partition when the
+# subject is known and the partition exists, else filters the global one.
+PARTITION_CONFIG = {
+    "enabled": False,
+    "separator": "__",
+}
+
+# Per-session retrieval cache (follow-ups and same-topic turns)
+RETRIEVAL_CACHE_CONFIG = {
+    "enabled": True,
+    "same_topic_threshold": 0.80,  # cosine(query, previous query) to count as same topic
+    "topup_notes_k": 3,            # fresh notes fetched on a same-topic turn
+    "topup_syllabus_k": 2,         # fresh syllabus chunks fetched on a same-topic turn
+    "query_embedding_cache_size": 512,
+    "vector_cache_sessions": 256,  # sessions whose query/candidate vectors stay in process memory
 }
 
 # RAG Pipeline tweaks
 MAX_HISTORY_TURNS = 4
 
+# Conversation memory (rolling summary of older turns)
+MEMORY_CONFIG = {
+    "enabled": True,
+    "verbatim_turns": 2,         # user+assistant pairs kept word-for-word
+    "fold_every": 2,             # summarise once this many turns have aged out
+    "summary_max_tokens": 250,
+    "turn_max_chars": 1500,      # cap on each turn fed to the summariser
+    "max_sessions": 256,         # in-process LRU for callers without session state
+}
+
 # Router logic
 ROUTER_TEMPERATURE = 0.0
 ROUTER_NUM_PREDICT = 50
@@ -48,8 +133,29 @@ ROUTER_NUM_PREDICT = 50
 KEYWORD_MIN_SCORE = 2
 EMBEDDING_ROUTER_THRESHOLD = 0.55
 
+# Keyword map generation (see pipeline/generate_keyword_map.py)
+KEYWORD_MAP_CONFIG = {
+    "page_size": 1000,   # documents per collection.get() page
+    "llm_workers": 4,    # per-unit keyword LLM calls in flight
+}
+
 # Ingestion settings
 MIN_INGEST_CONFIDENCE = 0.3
 
+# Streaming extract → ingest (see pipeline/stream_ingest.py)
+STREAM_INGEST_CONFIG = {
+    "queue_size": 32,               # chunks / records buffered between stages (backpressure)
+    "batch_size": 16,               # records per embedding call + upsert
+    "max_wait_seconds": 2.0,        # flush a partial batch after this long
+    "lexical_refresh_seconds": 120, # BM25 rebuild interval while streaming; 0 = only at the end
+}
+
+# Data-folder watcher (see pipeline/watch_data.py)
+WATCH_CONFIG = {
+    "poll_seconds": 5.0,            # how often the data tree is scanned
+    "debounce_seconds": 10.0,       # wait until nothing has changed for this long before acting
+    "refresh_keywords": True,       # regenerate keyword map + unit embeddings for affected subjects
+}
+
 # Query Expander
 QUERY_EXPANDER_MAX_KEYWORDS = 6
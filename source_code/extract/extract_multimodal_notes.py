@@ -1,7 +1,7 @@
 import os
 import fitz  # PyMuPDF
+import hashlib
 import json
-import time
 from pathlib import Path
 
 # --- Ensure imports work regardless of working directory ---
@@ -12,8 +12,11 @@ if ROOT_DIR not in sys.path:
 
 from source_code.config import CONFIG
 from source_code import models
-from utils import pil_to_base64, pil_to_jpeg_bytes, extract_first_json
-from prompts import NOTES_EXTRACTION
+from utils import extract_first_json, parse_first_json
+from prompts import NOTES_EXTRACTION, notes_batch_extraction
+from extract.page_classifier import classify_page, page_fingerprint, text_layer_metadata
+from extract.image_prep import prepare_pages
+from extract.job_runner import vision_call
 
 # ------------------------------------------------------------------
 # CONFIG
@@ -49,39 +52,181 @@ def infer_metadata_from_path(pdf_path: Path) -> dict:
     }
 
 
-def render_pages_to_images(doc, start_page: int, end_page: int, return_bytes=False, scale=2.0) -> list:
+# ------------------------------------------------------------------
+# PROMPT
+# ------------------------------------------------------------------
+# Moved to prompts.NOTES_EXTRACTION
+
+# ------------------------------------------------------------------
+# VLM CALLS
+# ------------------------------------------------------------------
+
+def render_for_vlm(doc, start_page: int, end_page: int) -> list[bytes]:
     """
-    Render PDF pages to images.
-    scale: DPI multiplier — lower = smaller payload, higher = better OCR quality.
-    Ollama cloud: scale=1.0 + JPEG avoids Cloudflare 524 timeouts; HuggingFace: scale=2.0 PNG.
+    Encoded page images for models.vision(): scale, margin crop and
+    grayscale are chosen per page, encoded straight from the pixmap.
     """
-    import io
-    from PIL import Image
-    images = []
-    for page_num in range(start_page, end_page):
-        page = doc.load_page(page_num)
-        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale))
-        img_bytes = pix.tobytes("png")
-
-        if return_bytes:
-            images.append(img_bytes)
-        else:
-            img = Image.open(io.BytesIO(img_bytes))
-            images.append(img)
+    return prepare_pages(doc, start_page, end_page)
 
-    return images
 
+def call_vision(images: list, prompt: str) -> str | None:
+    """models.vision() rate-limited and retried by extract/job_runner.py; None if all attempts fail."""
+    # Both notes prompts ask for a JSON object
+    return vision_call(images, prompt, json_mode=True)
+
+
+def extract_single(images: list) -> dict | None:
+    """One chunk, one call with NOTES_EXTRACTION. None if the call failed."""
+    raw_response = call_vision(images, NOTES_EXTRACTION)
+    if raw_response is None:
+        return None
+
+    structured_data = extract_first_json(raw_response)
+    if structured_data is None:
+        print(" ⚠ No valid JSON. Saving raw.", end="")
+        structured_data = {"raw_description": raw_response, "full_text": raw_response}
+    return structured_data
+
+
+def plan_batches(rendered, cfg: dict | None = None):
+    """
+    Group rendered chunks into VLM calls.
+
+    Consecutive low-density pages share a call (up to `max_pages` pages and
+    `max_bytes` of image data); a page whose rendering exceeds
+    `dense_page_bytes` always goes alone. Only single-page chunks
+    (CHUNK_SIZE = 1) are batched.
+
+    Args:
+        rendered: Iterable of (start_page, images), in page order.
+
+    Yields:
+        Lists of (start_page, images).
+    """
+    cfg = cfg or CONFIG["extract"]["vision_batch"]
+    max_pages = cfg["max_pages"] if cfg["enabled"] and CHUNK_SIZE == 1 else 1
+    batch, batch_bytes = [], 0
+    for start_page, images in rendered:
+        nbytes = sum(len(img) for img in images)
+        dense = nbytes > cfg["dense_page_bytes"]
+        if batch and (
+            dense
+            or len(batch) >= max_pages
+            or batch_bytes + nbytes > cfg["max_bytes"]
+            or start_page != batch[-1][0] + CHUNK_SIZE
+        ):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append((start_page, images))
+        batch_bytes += nbytes
+        if dense:
+            yield batch
+            batch, batch_bytes = [], 0
+    if batch:
+        yield batch
+
+
+def split_batch_response(parsed, page_numbers: list[int], repaired: bool = False) -> dict[int, dict]:
+    """
+    Per-page results of a notes_batch_extraction() response.
+
+    Entries are matched on their "page" field (falling back to position when
+    it is missing). Entries without a "full_text", or for pages that were
+    not sent, are ignored. When the response was `repaired` (truncated), its
+    last entry may be cut short and is dropped, so that page is retried alone.
+
+    Returns:
+        {1-based page number: extracted_metadata}; pages the model did not
+        cover are absent.
+    """
+    entries = parsed.get("pages") if isinstance(parsed, dict) else None
+    if not isinstance(entries, list):
+        return {}
+    if repaired:
+        entries = entries[:-1]
+
+    covered = {}
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not isinstance(entry.get("full_text"), str):
+            continue
+        entry = dict(entry)
+        page = entry.pop("page", None)
+        try:
+            page = int(page)
+        except (TypeError, ValueError):
+            page = page_numbers[position] if position < len(page_numbers) else None
+        if page in page_numbers and page not in covered:
+            covered[page] = entry
+    return covered
 
-# ------------------------------------------------------------------
-# PROMPT
-# ------------------------------------------------------------------
-# Moved to prompts.NOTES_EXTRACTION
 
 # ------------------------------------------------------------------
 # CORE LOGIC
 # ------------------------------------------------------------------
 
-def process_pdf(pdf_path: Path):
+def chunk_fingerprint(doc, start_page: int, end_page: int) -> str:
+    """page_fingerprint() of the chunk's pages, combined."""
+    fingerprints = [page_fingerprint(doc.load_page(n)) for n in range(start_page, end_page)]
+    return fingerprints[0] if len(fingerprints) == 1 else hashlib.sha1("".join(fingerprints).encode()).hexdigest()
+
+
+def stale_chunks(pdf_path: Path) -> list[Path]:
+    """
+    chunk_N_N.json files of `pdf_path` that no longer match the PDF: their
+    pages changed (page_hash differs or was never recorded) or are gone.
+    Deleting them makes process_pdf() re-extract just those pages.
+    """
+    output_dir = pdf_path.parent / pdf_path.stem
+    if not output_dir.is_dir():
+        return []
+    doc = fitz.open(str(pdf_path))
+    stale = []
+    try:
+        for json_path in sorted(output_dir.glob("chunk_*.json")):
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    chunk = json.load(f)
+                start_page, end_page = chunk["page_start"] - 1, chunk["page_end"]
+                current = end_page <= len(doc) and chunk.get("page_hash") == chunk_fingerprint(doc, start_page, end_page)
+            except (OSError, ValueError, KeyError, TypeError):
+                current = False
+            if not current:
+                stale.append(json_path)
+    finally:
+        doc.close()
+    return stale
+
+
+def _write_chunk(output_dir: Path, metadata_base: dict, start_page: int, end_page: int,
+                 structured_data: dict, processed_by: str, on_chunk=None, page_hash: str | None = None) -> str:
+    """Write chunk_{start}_{end}.json (and hand it to `on_chunk`); returns its full_text."""
+    chunk_data = {
+        **metadata_base,
+        "page_start": start_page + 1,
+        "page_end": end_page,
+        "extracted_metadata": structured_data,
+        "processed_by": processed_by,
+        "chunk_size": end_page - start_page,
+        "page_hash": page_hash,
+    }
+    json_path = output_dir / f"chunk_{start_page + 1}_{end_page}.json"
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(chunk_data, f, indent=2, ensure_ascii=False)
+    if on_chunk is not None:
+        on_chunk(chunk_data)
+    return structured_data.get("full_text", "")
+
+
+def process_pdf(pdf_path: Path, on_chunk=None):
+    """
+    Extract one notes PDF into chunk_N_N.json files.
+
+    Args:
+        pdf_path: The PDF.
+        on_chunk: Optional callable receiving every newly written chunk dict
+                  (pipeline/stream_ingest.py uses it to ingest pages as they
+                  are transcribed). Chunks from earlier runs are not passed.
+    """
     print(f"\n📄 Processing: {pdf_path.name}")
     print(f"   Provider: {CONFIG['providers']['vision']}  |  Model: {CONFIG['model']['model']}")
 
@@ -103,89 +248,95 @@ def process_pdf(pdf_path: Path):
         return
 
     total_pages = len(doc)
-    all_text_parts = []
+    page_texts: dict[int, str] = {}   # start_page → full_text, for the .txt
+    pending: list[int] = []           # start pages that need the VLM
+    text_layer_pages = vision_pages = vision_calls = 0
 
-    for start_page in range(0, total_pages, CHUNK_SIZE):
-        end_page = min(start_page + CHUNK_SIZE, total_pages)
+    def end_of(start_page: int) -> int:
+        return min(start_page + CHUNK_SIZE, total_pages)
 
-        json_filename = f"chunk_{start_page + 1}_{end_page}.json"
-        json_path = output_dir / json_filename
+    # ── 1. Checkpoints and born-digital pages ─────────────────────────────
+    for start_page in range(0, total_pages, CHUNK_SIZE):
+        end_page = end_of(start_page)
+        json_path = output_dir / f"chunk_{start_page + 1}_{end_page}.json"
 
         if json_path.exists():
             try:
                 with open(json_path, "r", encoding="utf-8") as f:
                     existing = json.load(f)
-                ft = existing.get("extracted_metadata", {}).get("full_text", "")
-                if ft:
-                    all_text_parts.append(f"\n--- PAGES {start_page+1}-{end_page} ---\n{ft}")
+                page_texts[start_page] = existing.get("extracted_metadata", {}).get("full_text", "")
             except Exception:
                 pass
             print(f"   -> Chunk {start_page + 1}-{end_page} already processed. Skipping.")
             continue
 
-        print(f"   -> Processing Chunk {start_page + 1}-{end_page}...", end="", flush=True)
-
-        MAX_RETRIES = 3
-        raw_response = None
-        for attempt in range(1, MAX_RETRIES + 1):
-            try:
-                # Delegate vision call to central registry
-                if BACKEND == "ollama":
-                    # Render as PIL then re-encode as JPEG (5-10x smaller than PNG)
-                    images_pil = render_pages_to_images(doc, start_page, end_page, return_bytes=False, scale=1.0)
-                    images = [pil_to_jpeg_bytes(img) for img in images_pil]
-                else: 
-                     # For HuggingFace or others, use default scaling or bytes
-                     images = render_pages_to_images(doc, start_page, end_page, return_bytes=True)
-
-                raw_response = models.vision(
-                    images=images,
-                    prompt=NOTES_EXTRACTION,
-                    provider=CONFIG["providers"]["vision"],
-                    model=CONFIG["providers"]["vision_model"]
-                )
-
-                break  # success — exit retry loop
-
-            except Exception as e:
-                err_str = str(e)
-                if attempt < MAX_RETRIES:
-                    wait = 5 * attempt  # 15s, 30s, 45s
-                    print(f" ⚠ Attempt {attempt} failed: {err_str[:120]}")
-                    print(f"   Retrying in {wait}s...", end="", flush=True)
-                    time.sleep(wait)
-                else:
-                    print(f" ❌ Failed after {MAX_RETRIES} attempts: {err_str[:120]}")
-
-        if raw_response is None:
-            time.sleep(5)
+        # Born-digital pages: use the PDF's own text, skip the VLM
+        decisions = [classify_page(doc.load_page(n)) for n in range(start_page, end_page)]
+        if all(d["use_text_layer"] for d in decisions):
+            full_text = "\n\n".join(d["text"] for d in decisions)
+            page_texts[start_page] = _write_chunk(
+                output_dir, metadata_base, start_page, end_page,
+                text_layer_metadata(full_text), "text_layer", on_chunk,
+                chunk_fingerprint(doc, start_page, end_page),
+            )
+            text_layer_pages += end_page - start_page
+            print(f"   -> Chunk {start_page + 1}-{end_page}: ✅ Text layer.")
             continue
 
-        structured_data = extract_first_json(raw_response)
-        if structured_data is None:
-            print(" ⚠ No valid JSON. Saving raw.")
-            structured_data = {"raw_description": raw_response, "full_text": raw_response}
-
-        full_text = structured_data.get("full_text", "")
-        if full_text:
-            all_text_parts.append(f"\n--- PAGES {start_page+1}-{end_page} ---\n{full_text}")
-
-        chunk_data = {
-            **metadata_base,
-            "page_start": start_page + 1,
-            "page_end": end_page,
-            "extracted_metadata": structured_data,
-            "processed_by": MODEL_NAME,  # Use centralized model name
-            "chunk_size": end_page - start_page,
-        }
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(chunk_data, f, indent=2, ensure_ascii=False)
+        reasons = "; ".join(d["reason"] for d in decisions if not d["use_text_layer"])
+        print(f"   -> Chunk {start_page + 1}-{end_page}: VLM [{reasons}]")
+        pending.append(start_page)
+
+    # ── 2. VLM pages, several low-density pages per call ──────────────────
+    rendered = ((s, render_for_vlm(doc, s, end_of(s))) for s in pending)
+    for batch in plan_batches(rendered):
+        first, last = batch[0][0] + 1, end_of(batch[-1][0])
+        print(f"   -> Processing Pages {first}-{last} ({len(batch)} chunk(s), 1 call)...", end="", flush=True)
+        vision_calls += 1
+
+        if len(batch) == 1:
+            results = {batch[0][0]: extract_single(batch[0][1])}
+        else:
+            page_numbers = [s + 1 for s, _ in batch]
+            raw_response = call_vision(
+                [img for _, images in batch for img in images],
+                notes_batch_extraction(page_numbers),
+            )
+            parsed, repaired = parse_first_json(raw_response or "")
+            covered = split_batch_response(parsed, page_numbers, repaired)
+            results = {}
+            for start_page, images in batch:
+                if start_page + 1 in covered:
+                    results[start_page] = covered[start_page + 1]
+                    continue
+                # The model skipped or merged this page: ask for it alone
+                print(f"\n      ↻ Page {start_page + 1} missing from the batch, retrying alone...", end="", flush=True)
+                vision_calls += 1
+                results[start_page] = extract_single(images)
+
+        for start_page, structured_data in results.items():
+            if structured_data is None:
+                continue
+            page_texts[start_page] = _write_chunk(
+                output_dir, metadata_base, start_page, end_of(start_page),
+                structured_data, MODEL_NAME,  # Use centralized model name
+                on_chunk, chunk_fingerprint(doc, start_page, end_of(start_page)),
+            )
+            vision_pages += end_of(start_page) - start_page
 
         print(" ✅ Done.")
-        time.sleep(1)
 
     doc.close()
-
+    if text_layer_pages or vision_pages:
+        print(
+            f"   📊 {text_layer_pages} page(s) from the text layer, "
+            f"{vision_pages} from the VLM in {vision_calls} call(s)"
+        )
+
+    all_text_parts = [
+        f"\n--- PAGES {s + 1}-{end_of(s)} ---\n{page_texts[s]}"
+        for s in sorted(page_texts) if page_texts[s]
+    ]
     if all_text_parts:
         with open(txt_path, "w", encoding="utf-8") as f:
             f.write(f"# OCR: {pdf_path.name}\n")
@@ -193,14 +344,14 @@ def process_pdf(pdf_path: Path):
         print(f"   📝 Saved full text -> {txt_path.name}")
 
 
-def process_all_folders(base_path_str: str):
+def process_all_folders(base_path_str: str, on_chunk=None):
     root_path = Path(base_path_str)
 
     pdfs = [p for p in sorted(root_path.rglob("*.pdf")) if "notes" in p.parts]
     print(f"Found {len(pdfs)} notes PDFs in {base_path_str}")
 
     for pdf in pdfs:
-        process_pdf(pdf)
+        process_pdf(pdf, on_chunk=on_chunk)
 
     print("\n--- All notes PDFs processed successfully ---")
 
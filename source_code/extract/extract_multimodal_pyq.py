@@ -2,7 +2,6 @@ import os
 import re
 import json
 import fitz
-import time
 from pathlib import Path
 
 import sys
@@ -12,12 +11,11 @@ if ROOT_DIR not in sys.path:
 
 from source_code.config import CONFIG
 from source_code import models
-from utils import (
-    pil_to_base64,
-    pil_to_jpeg_bytes,
-    extract_first_json,
-)
-from prompts import pyq_unit_classification
+from utils import extract_first_json
+from extract.page_classifier import classify_page
+from extract.image_prep import prepare_page
+from extract.unit_classifier import classify_questions
+from extract.job_runner import PDF_LOCK, get_runner, vision_call
 
 # ------------------------------------------------------------------
 # CONFIG
@@ -37,6 +35,21 @@ def get_syllabus_topics(subject: str) -> str:
     if not syllabus_dir.exists():
         return "Unit 1: Basic Concepts\nUnit 2: Intermediate\nUnit 3: Advanced\nUnit 4: Applications\nUnit 5: Case Studies"
 
+    # Current syllabus extractor output: one syllabus_unit_N.json per unit
+    unit_lines = {}
+    for json_file in syllabus_dir.rglob("syllabus_unit_*.json"):
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            n = int(data.get("unit") or 0)
+            topics = data.get("topics") or []
+            if n and topics:
+                unit_lines[n] = f"Unit {n}: " + ", ".join(str(t) for t in topics)
+        except (OSError, ValueError, TypeError):
+            pass
+    if unit_lines:
+        return "\n".join(unit_lines[n] for n in sorted(unit_lines))
+
     for json_file in syllabus_dir.rglob("chunk_*.json"):
         try:
             with open(json_file, 'r', encoding='utf-8') as f:
@@ -51,59 +64,36 @@ def get_syllabus_topics(subject: str) -> str:
 
 def load_pdf(pdf_path: Path):
     from prompts import PYQ_VLM_TRANSCRIPTION
-    doc = fitz.open(str(pdf_path))
-    text = ""
-    # Ollama cloud: 1.0 avoids Cloudflare 524 timeouts; HuggingFace: 1.5 for better OCR
-    _scale = 1.0 if BACKEND == "ollama" else 1.5
-    for page_num in range(len(doc)):
-        page = doc.load_page(page_num)
-        pix = page.get_pixmap(matrix=fitz.Matrix(_scale, _scale))
-
-        MAX_RETRIES = 3
-        raw_response = None
-        for attempt in range(1, MAX_RETRIES + 1):
-            try:
-                # Use centralized models.vision() for all providers
-                if BACKEND == "huggingface":
-                    from PIL import Image
-                    import io
-                    img = Image.open(io.BytesIO(pix.tobytes("png")))
-                    print(f"   -> Call HF Vision API (Page {page_num+1})...", end="", flush=True)
-                    raw_response = models.vision(
-                        images=[img],
-                        prompt=PYQ_VLM_TRANSCRIPTION,
-                        provider=CONFIG["providers"]["vision"],
-                        model=CONFIG["providers"]["vision_model"]
-                    )
-                    print(" done.")
-                else:
-                    # Convert to PIL then JPEG (5-10x smaller than raw PNG bytes)
-                    from PIL import Image as _PIL
-                    import io as _io
-                    img = _PIL.open(_io.BytesIO(pix.tobytes("png")))
-                    print(f"   -> Call Ollama Vision API (Page {page_num+1})...", end="", flush=True)
-                    raw_response = models.vision(
-                        images=[pil_to_jpeg_bytes(img)],
-                        prompt=PYQ_VLM_TRANSCRIPTION,
-                        provider=CONFIG["providers"]["vision"],
-                        model=CONFIG["providers"]["vision_model"]
-                    )
-                    print(" done.")
-                break
-            except Exception as e:
-                err_str = str(e)
-                if attempt < MAX_RETRIES:
-                    wait = 15 * attempt
-                    print(f" ⚠ Attempt {attempt} failed for page {page_num+1}: {err_str[:120]}")
-                    print(f"   Retrying in {wait}s...", end="", flush=True)
-                    time.sleep(wait)
-                else:
-                    print(f" ❌ Failed after {MAX_RETRIES} attempts for page {page_num+1}: {err_str[:120]}")
+    page_texts = {}
+    tasks = {}
+    # PyMuPDF is not thread-safe: other file workers wait while this PDF renders
+    with PDF_LOCK:
+        doc = fitz.open(str(pdf_path))
+        for page_num in range(len(doc)):
+            page = doc.load_page(page_num)
+
+            # Printed papers usually carry a text layer: no need to OCR them
+            decision = classify_page(page)
+            if decision["use_text_layer"]:
+                print(f"   -> Page {page_num+1}: text layer ({decision['chars']} chars).")
+                page_texts[page_num] = decision["text"]
+                continue
+
+            # Scale / crop / grayscale chosen per page, encoded straight to JPEG
+            image = prepare_page(page)
+            tasks[page_num] = lambda image=image, n=page_num: vision_call(
+                [image], PYQ_VLM_TRANSCRIPTION, label=f"{pdf_path.name} page {n+1}",
+            )
+        doc.close()
 
-        if raw_response is not None:
-            text += raw_response + "\n"
-    doc.close()
-    return text
+    # Scanned pages: transcribed concurrently, resumable via the job queue
+    if tasks:
+        print(f"   -> Call {BACKEND} Vision API ({len(tasks)} page(s))...")
+        for page_num, response in get_runner().map_pages("pyq", pdf_path, tasks).items():
+            if response is not None:
+                page_texts[page_num] = response
+
+    return "".join(page_texts[n] + "\n" for n in sorted(page_texts))
 
 
 def normalize_text(text: str) -> str:
@@ -199,35 +189,6 @@ def detect_metadata(text: str, pdf_path: Path):
     return subject, subject_code, year, program
 
 
-def get_unit_classification(question_text: str, syllabus_text: str) -> int:
-    prompt = pyq_unit_classification(question_text, syllabus_text)
-    MAX_RETRIES = 3
-    for attempt in range(1, MAX_RETRIES + 1):
-        try:
-            response = models.chat(
-                prompt=prompt,
-                model=CONFIG["model"]["model"],
-                provider=CONFIG["providers"]["chat"]
-            )
-            raw_output = response.strip()
-            match = re.search(r'(\d)', raw_output)
-            if match:
-                unit = int(match.group(1))
-                if 1 <= unit <= 5:
-                    return unit
-            return 1
-        except Exception as e:
-            err_str = str(e)
-            if attempt < MAX_RETRIES:
-                wait = 15 * attempt
-                print(f" ⚠ Classification attempt {attempt} failed: {err_str[:120]}")
-                print(f"   Retrying in {wait}s...", end="", flush=True)
-                time.sleep(wait)
-            else:
-                print(f" ❌ Classification failed after {MAX_RETRIES} attempts: {err_str[:120]}")
-    return 1
-
-
 def section_slug(section_label: str) -> str:
     """Convert 'SECTION B' -> 'sec_b', 'Part C' -> 'part_c' for use in IDs."""
     s = section_label.strip().lower()
@@ -298,19 +259,13 @@ def process_pyq(pdf_path: Path):
                 if len(q_text) <= 5:
                     continue
 
-                unit = get_unit_classification(q_text, syllabus_topics)
-
-                # Include section slug in ID to prevent cross-section collisions
-                slug = section_slug(current_section)
-                q_id = f"{subject.lower()}_{year}_{pdf_path.stem}_{slug}_u{unit}_{q_num.lower()}"
-
                 questions_data.append({
-                    "question_id": q_id,
+                    "question_id": None,
                     "program": program,
                     "subject": subject,
                     "subject_code": subject_code,
                     "year": year,
-                    "unit": unit,
+                    "unit": None,
                     "marks": marks,
                     "question_text": q_text,
                     "section": current_section,
@@ -320,6 +275,16 @@ def process_pyq(pdf_path: Path):
                     "source_pdf": pdf_path.name
                 })
 
+    # Units for the whole paper at once: cache → embeddings → batched LLM
+    units = classify_questions(
+        [q["question_text"] for q in questions_data], subject, syllabus_topics,
+    )
+    for q, unit in zip(questions_data, units):
+        q["unit"] = unit
+        # Include section slug in ID to prevent cross-section collisions
+        slug = section_slug(q["section"])
+        q["question_id"] = f"{subject.lower()}_{year}_{pdf_path.stem}_{slug}_u{unit}_{q['question_number'].lower()}"
+
     # Save Output
     if questions_data:
         output_dir.mkdir(exist_ok=True)
@@ -330,7 +295,7 @@ def process_pyq(pdf_path: Path):
         print(f" ⚠ No questions found in {pdf_path.name}")
 
 
-def process_pyq_folders(base_path_str: str):
+def process_pyq_folders(base_path_str: str, file_workers: int | None = None):
     root_path = Path(base_path_str)
 
     pdfs = [
@@ -340,8 +305,8 @@ def process_pyq_folders(base_path_str: str):
 
     print(f"Found {len(pdfs)} PYQ PDFs in {base_path_str}")
 
-    for pdf in pdfs:
-        process_pyq(pdf)
+    # Several papers at once; their pages share the page pool and rate limits
+    get_runner(file_workers).run_files(pdfs, process_pyq)
 
     print("\n--- All PYQs processed successfully ---")
 
@@ -350,5 +315,6 @@ if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Extract multimodal pyqs from PDFs.")
     parser.add_argument("--path", default=BASE_PATH, help="Target directory for pyq PDFs")
+    parser.add_argument("--workers", type=int, default=None, help="PDFs processed at once (default: CONFIG['extract']['jobs']['file_workers'])")
     args = parser.parse_args()
-    process_pyq_folders(args.path)
\ No newline at end of file
+    process_pyq_folders(args.path, file_workers=args.workers)
\ No newline at end of file
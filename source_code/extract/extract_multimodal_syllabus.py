@@ -26,18 +26,15 @@ Each file follows the schema:
 }
 
 Usage:
-  python extract_multimodal_syllabus.py [--path PATH] [--pdf PDF] [--force]
+  python extract_multimodal_syllabus.py [--path PATH] [--pdf PDF] [--force] [--workers N]
 """
 
 import os
 import sys
 import json
-import time
-import io
 from pathlib import Path
 
 import fitz          # PyMuPDF
-from PIL import Image
 
 # ── ensure source_code/ is on the path ────────────────────────────────────────
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -46,12 +43,11 @@ if ROOT_DIR not in sys.path:
 
 from source_code.config import CONFIG
 from source_code import models
-from utils import (
-    pil_to_base64,
-    pil_to_jpeg_bytes,
-    extract_first_json,
-)
-from prompts import SYLLABUS_EXTRACTION
+from utils import extract_first_json
+from prompts import SYLLABUS_EXTRACTION, syllabus_text_extraction
+from extract.page_classifier import classify_page
+from extract.image_prep import prepare_page
+from extract.job_runner import PDF_LOCK, chat_call, get_runner, job_id, vision_call
 
 # ──────────────────────────────────────────────────────────────────────────────
 # BACKEND SETUP
@@ -61,22 +57,6 @@ BASE_PATH = CONFIG["paths"]["base_data"]
 BACKEND = CONFIG["providers"]["vision"].lower()
 MODEL_NAME = CONFIG["providers"]["vision_model"]
 
-# ──────────────────────────────────────────────────────────────────────────────
-# HELPERS
-# ──────────────────────────────────────────────────────────────────────────────
-
-def render_pdf_to_images(pdf_path: Path, scale: float = 2.0) -> list:
-    """Render every page of the PDF to a PIL Image."""
-    doc = fitz.open(str(pdf_path))
-    images = []
-    for page in doc:
-        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale))
-        img = Image.open(io.BytesIO(pix.tobytes("png")))
-        images.append(img)
-    doc.close()
-    return images
-
-
 # ──────────────────────────────────────────────────────────────────────────────
 # VLM PROMPT
 # ──────────────────────────────────────────────────────────────────────────────
@@ -134,33 +114,22 @@ Rules:
 # VLM CALL
 # ──────────────────────────────────────────────────────────────────────────────
 
-def call_vlm(images: list, max_retries: int = 3) -> dict | None:
+def call_vlm(images: list, label: str = "Syllabus VLM call") -> dict | None:
     """
-    Send syllabus images to the configured VLM backend using centralized models.vision().
+    Send syllabus images to the configured VLM backend using centralized models.vision()
+    (rate-limited and retried by extract/job_runner.py).
     Returns parsed JSON dict or None on failure.
     """
-    for attempt in range(1, max_retries + 1):
-        try:
-            raw = models.vision(
-                images=images,
-                prompt=SYLLABUS_EXTRACTION,
-                provider=CONFIG["providers"]["vision"],
-                model=CONFIG["providers"]["vision_model"]
-            )
-            
-            parsed = extract_first_json(raw)
-            if parsed:
-                return parsed
-        except Exception as exc:
-            err = str(exc)[:120]
-            if attempt < max_retries:
-                wait = 15 * attempt
-                print(f"   ⚠ Attempt {attempt} failed: {err} — retrying in {wait}s...")
-                time.sleep(wait)
-            else:
-                print(f"   ❌ All {max_retries} attempts failed: {err}")
+    return vision_call(images, SYLLABUS_EXTRACTION, label=label, parse=extract_first_json, json_mode=True)
 
-    return None
+
+def call_text_llm(page_text: str, label: str = "Syllabus text call") -> dict | None:
+    """
+    Same extraction as call_vlm(), for a page read from its PDF text layer:
+    the text goes to the chat model, no image is rendered or uploaded.
+    Returns parsed JSON dict or None on failure.
+    """
+    return chat_call(syllabus_text_extraction(page_text), label=label, parse=extract_first_json)
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -288,20 +257,38 @@ def process_syllabus(pdf_path: Path, force: bool = False):
         print("   ✅ All 7 chunk files already exist — skipping.")
         return
 
-    # ── Render PDF to images ──
-    # Ollama cloud: 1.0 avoids Cloudflare 524 timeouts; HuggingFace: 2.0 for better OCR
-    _render_scale = 1.0 if BACKEND == "ollama" else 2.0
-    print("   Rendering pages...", end="", flush=True)
-    try:
-        images = render_pdf_to_images(pdf_path, scale=_render_scale)
-    except Exception as exc:
-        print(f"\n   ❌ Could not render PDF: {exc}")
-        return
-    print(f" {len(images)} page(s).")
+    # ── Open PDF and plan each page: text layer → chat model, scans → VLM ──
+    print("   Opening PDF...", end="", flush=True)
+    tasks = {}
+    # PyMuPDF is not thread-safe: other file workers wait while this PDF renders
+    with PDF_LOCK:
+        try:
+            doc = fitz.open(str(pdf_path))
+        except Exception as exc:
+            print(f"\n   ❌ Could not open PDF: {exc}")
+            return
+        page_count = len(doc)
+        print(f" {page_count} page(s).")
+
+        for i, page in enumerate(doc):
+            label = f"{pdf_path.name} page {i+1}"
+            decision = classify_page(page)
+            if decision["use_text_layer"]:
+                print(f"      -> Page {i+1}/{page_count} (text layer)")
+                tasks[i] = lambda text=decision["text"], label=label: call_text_llm(text, label)
+            else:
+                print(f"      -> Page {i+1}/{page_count} (VLM)")
+                # Scale / crop / grayscale chosen per page (extract/image_prep.py)
+                tasks[i] = lambda image=prepare_page(page), label=label: call_vlm([image], label)
+        doc.close()
+
+    # ── Extract the pages concurrently (resumable via the job queue) ──
+    print("   Extracting...", flush=True)
+    runner = get_runner()
+    if force:
+        runner.queue.forget(job_id("syllabus", pdf_path))
+    results = runner.map_pages("syllabus", pdf_path, tasks)
 
-    # ── Call VLM ──
-    print("   Calling VLM (page by page)...", flush=True)
-    
     syllabus_version = "unknown"
     subject_name     = subject
     units            = []
@@ -310,14 +297,11 @@ def process_syllabus(pdf_path: Path, force: bool = False):
     reference_books  = []
 
     success = False
-    for i, img in enumerate(images):
-        print(f"      -> Page {i+1}/{len(images)}... ", end="", flush=True)
-        parsed = call_vlm([img])
+    for i, parsed in results.items():
         if not parsed:
-            print("❌ Failed or no data.")
+            print(f"      -> Page {i+1}: ❌ Failed or no data.")
             continue
-            
-        print("✅ Parsed.")
+
         success = True
 
         if parsed.get("syllabus_version") and parsed.get("syllabus_version") != "unknown":
@@ -334,7 +318,7 @@ def process_syllabus(pdf_path: Path, force: bool = False):
             if rb not in reference_books: reference_books.append(rb)
 
     if not success:
-        print("\n   ❌ VLM extraction failed for all pages. Skipping this syllabus.")
+        print("\n   ❌ Extraction failed for all pages. Skipping this syllabus.")
         return
 
     model_id = MODEL_NAME  # Use centralized model name
@@ -382,7 +366,7 @@ def process_syllabus(pdf_path: Path, force: bool = False):
     print(f"\n   📦 Done — {written} chunk(s) written to {output_dir}")
 
 
-def process_all_syllabuses(base_path_str: str, force: bool = False):
+def process_all_syllabuses(base_path_str: str, force: bool = False, file_workers: int | None = None):
     """
     Scan the data directory tree for all files named *syllabus*.pdf
     (inside a 'syllabus' folder) and process each one.
@@ -396,8 +380,8 @@ def process_all_syllabuses(base_path_str: str, force: bool = False):
 
     print(f"Found {len(pdfs)} syllabus PDF(s) under {base_path_str}")
 
-    for pdf in pdfs:
-        process_syllabus(pdf, force=force)
+    # Several syllabi at once; their pages share the page pool and rate limits
+    get_runner(file_workers).run_files(pdfs, lambda pdf: process_syllabus(pdf, force=force))
 
     print("\n--- All syllabuses processed ---")
 
@@ -427,6 +411,12 @@ if __name__ == "__main__":
         default=None,
         help="Process a single PDF file instead of scanning the whole tree.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="PDFs processed at once (default: CONFIG['extract']['jobs']['file_workers'])",
+    )
     args = parser.parse_args()
 
     if args.pdf:
@@ -436,4 +426,4 @@ if __name__ == "__main__":
             sys.exit(1)
         process_syllabus(pdf_file, force=args.force)
     else:
-        process_all_syllabuses(args.path, force=args.force)
+        process_all_syllabuses(args.path, force=args.force, file_workers=args.workers)
@@ -0,0 +1,136 @@
+"""
+image_prep.py
+─────────────
+Renders PDF pages into compact VLM payloads.
+
+The extractors used to render every page at a fixed scale (1.0 / 1.5 / 2.0
+depending on script and backend), encode it to PNG, decode it into PIL and
+re-encode to JPEG. prepare_page() instead chooses, per page:
+
+  scale      from the text size (median font size of the text layer, so
+             body text lands at about `target_text_px` pixels high) or, for
+             scans, from the resolution of the embedded page image — never
+             upsampling past what the scan contains; clamped to
+             [min_scale, max_scale] and to `max_pixels`
+  crop       blank margins, found on a small thumbnail, are clipped off
+  colour     pages without meaningful colour are rendered in grayscale
+             (one channel instead of three)
+
+and encodes straight from the pixmap (JPEG via PyMuPDF, or WebP via PIL
+from the raw samples) without a PNG round-trip. Settings come from
+CONFIG["extract"]["image_prep"]; with "enabled" off every page is rendered
+whole, in colour, at `default_scale`.
+"""
+
+import io
+import statistics
+
+import fitz
+import numpy as np
+
+from source_code.config import CONFIG
+
+_THUMB_SCALE = 0.25
+
+
+def _font_scale(page, cfg: dict) -> float | None:
+    """Scale that renders the page's typical font at target_text_px."""
+    sizes = []
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                text = span["text"].strip()
+                if text:
+                    sizes.extend([span["size"]] * len(text))
+    if len(sizes) < 20:
+        return None
+    return cfg["target_text_px"] / statistics.median(sizes)
+
+
+def _native_scale(page) -> float | None:
+    """Resolution (pixels per point) of the largest image on the page."""
+    best, best_area = None, 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"])
+        if bbox.is_empty or not info.get("width"):
+            continue
+        if abs(bbox) > best_area:
+            best_area = abs(bbox)
+            best = info["width"] / bbox.width
+    # Only trust it for images that dominate the page (i.e. scans)
+    if best is None or best_area < 0.5 * abs(page.rect):
+        return None
+    return best
+
+
+def _thumbnail(page) -> np.ndarray:
+    pix = page.get_pixmap(matrix=fitz.Matrix(_THUMB_SCALE, _THUMB_SCALE), colorspace=fitz.csRGB, alpha=False)
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, 3)
+
+
+def _content_clip(page, thumb: np.ndarray, cfg: dict) -> fitz.Rect:
+    """Page area without blank margins (whole page if it is blank)."""
+    ink = thumb.min(axis=2) < cfg["blank_level"]
+    rows, cols = np.flatnonzero(ink.any(axis=1)), np.flatnonzero(ink.any(axis=0))
+    if not len(rows):
+        return page.rect
+    pad = cfg["margin_pad"]
+    r = page.rect
+    clip = fitz.Rect(
+        r.x0 + cols[0] / _THUMB_SCALE - pad, r.y0 + rows[0] / _THUMB_SCALE - pad,
+        r.x0 + (cols[-1] + 1) / _THUMB_SCALE + pad, r.y0 + (rows[-1] + 1) / _THUMB_SCALE + pad,
+    )
+    return clip & r
+
+
+def _is_grayscale(thumb: np.ndarray, cfg: dict) -> bool:
+    """True when (almost) no pixel has a visible colour cast."""
+    spread = thumb.max(axis=2).astype(np.int16) - thumb.min(axis=2)
+    return float((spread > cfg["color_tolerance"]).mean()) <= cfg["max_color_share"]
+
+
+def plan_page(page, cfg: dict | None = None) -> dict:
+    """
+    Rendering decision for one page.
+
+    Returns:
+        {"scale": float, "clip": fitz.Rect, "grayscale": bool}
+    """
+    cfg = cfg or CONFIG["extract"]["image_prep"]
+    if not cfg["enabled"]:
+        return {"scale": cfg["default_scale"], "clip": page.rect, "grayscale": False}
+
+    scale = _font_scale(page, cfg) or _native_scale(page) or cfg["default_scale"]
+    scale = min(max(scale, cfg["min_scale"]), cfg["max_scale"])
+
+    thumb = _thumbnail(page)
+    clip = _content_clip(page, thumb, cfg)
+    if clip.width * clip.height * scale * scale > cfg["max_pixels"]:
+        scale = (cfg["max_pixels"] / (clip.width * clip.height)) ** 0.5
+
+    return {"scale": round(scale, 3), "clip": clip, "grayscale": _is_grayscale(thumb, cfg)}
+
+
+def prepare_page(page, cfg: dict | None = None) -> bytes:
+    """Render one PyMuPDF page to encoded image bytes for models.vision()."""
+    cfg = cfg or CONFIG["extract"]["image_prep"]
+    plan = plan_page(page, cfg)
+    pix = page.get_pixmap(
+        matrix=fitz.Matrix(plan["scale"], plan["scale"]),
+        clip=plan["clip"],
+        colorspace=fitz.csGRAY if plan["grayscale"] else fitz.csRGB,
+        alpha=False,
+    )
+    if cfg["format"] == "webp":
+        from PIL import Image
+        mode = "L" if pix.n == 1 else "RGB"
+        buf = io.BytesIO()
+        Image.frombytes(mode, (pix.width, pix.height), pix.samples).save(buf, format="WEBP", quality=cfg["quality"])
+        return buf.getvalue()
+    if cfg["format"] == "png":
+        return pix.tobytes("png")
+    return pix.tobytes("jpg", jpg_quality=cfg["quality"])
+
+
+def prepare_pages(doc, start_page: int, end_page: int, cfg: dict | None = None) -> list[bytes]:
+    return [prepare_page(doc.load_page(n), cfg) for n in range(start_page, end_page)]
@@ -0,0 +1,378 @@
+"""
+job_runner.py
+─────────────
+Shared execution layer of the extraction CLIs: worker pools, per-provider
+rate limits, retries and a resumable page-job queue.
+
+  with_retries()      one retry loop for every model call (`max_attempts`,
+                      linear backoff); "⚠ ..." error strings returned by
+                      models.chat() / models.vision() count as failures
+  vision_call()       models.vision() / models.chat_or_raise() behind the
+  chat_call()         provider's rate limit and with_retries()
+  RateLimiter         requests per minute per provider, shared by all threads
+  JobQueue            SQLite table (CONFIG["paths"]["extract_jobs"]) with the
+                      status and result of every page job, so an interrupted
+                      run resumes where it stopped
+  JobRunner           map_pages() fans the model calls of one PDF out over
+                      the page pool, skipping pages the queue already has;
+                      run_files() processes several PDFs at once and reports
+                      throughput
+
+Jobs are keyed by kind ("pyq", "syllabus"), resolved PDF path, size and
+modification time: an edited PDF starts over. PyMuPDF is not thread-safe, so
+file workers hold PDF_LOCK while they open, classify or render pages; only the
+model calls run concurrently.
+
+Settings: CONFIG["extract"]["jobs"].
+
+    python source_code/extract/job_runner.py           # job status summary
+    python source_code/extract/job_runner.py --clear
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from source_code import models
+from source_code.config import CONFIG
+
+PDF_LOCK = threading.RLock()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    job      TEXT NOT NULL,
+    page     INTEGER NOT NULL,
+    status   TEXT NOT NULL,             -- running | done | failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result   TEXT,                      -- JSON of the task's return value
+    error    TEXT,
+    seconds  REAL,
+    updated  REAL NOT NULL,
+    PRIMARY KEY (job, page)
+)
+"""
+
+
+# ---------------------------------------------------------------------------
+# Rate limiting and retries
+# ---------------------------------------------------------------------------
+
+class RateLimiter:
+    """Spaces calls to each provider by 60 / requests_per_minute seconds."""
+
+    def __init__(self, limits: dict[str, float]):
+        self.limits = limits
+        self._lock = threading.Lock()
+        self._next: dict[str, float] = {}
+
+    def acquire(self, provider: str) -> None:
+        rpm = self.limits.get(provider) or 0
+        if rpm <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(provider, 0.0))
+            self._next[provider] = slot + 60.0 / rpm
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_limiter: RateLimiter | None = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> RateLimiter:
+    global _limiter
+    with _limiter_lock:
+        limits = CONFIG["extract"]["jobs"]["rate_limits"]
+        if _limiter is None or _limiter.limits != limits:
+            _limiter = RateLimiter(dict(limits))
+        return _limiter
+
+
+def with_retries(fn: Callable[[int], Any], label: str = "Call", parse: Callable[[Any], Any] | None = None):
+    """
+    Call fn(attempt) until it succeeds.
+
+    A call fails when it raises, returns a "⚠ ..." error string, or when
+    `parse` (applied to its return value) gives None.
+
+    Returns:
+        The (parsed) result, or None after `max_attempts` failures.
+    """
+    cfg = CONFIG["extract"]["jobs"]
+    max_attempts = max(1, cfg["max_attempts"])
+    for attempt in range(1, max_attempts + 1):
+        try:
+            result = fn(attempt)
+            if isinstance(result, str) and result.startswith("⚠"):
+                raise RuntimeError(result)
+            if parse is not None:
+                result = parse(result)
+                if result is None:
+                    raise ValueError("unparseable response")
+            return result
+        except Exception as e:
+            err_str = str(e)
+            if attempt < max_attempts:
+                wait = cfg["backoff_seconds"] * attempt
+                print(f" ⚠ {label} attempt {attempt} failed: {err_str[:120]} — retrying in {wait}s")
+                time.sleep(wait)
+            else:
+                print(f" ❌ {label} failed after {max_attempts} attempts: {err_str[:120]}")
+    return None
+
+
+def vision_call(images: list, prompt: str, label: str = "Vision call", parse=None, json_mode: bool = False):
+    """models.vision() with the vision provider's rate limit and retries."""
+    provider = CONFIG["providers"]["vision"]
+
+    def call(attempt):
+        get_limiter().acquire(provider)
+        extra = {"json_mode": True} if json_mode else {}
+        # A retry must reach the model, not the response cache
+        if attempt > 1:
+            extra["use_cache"] = False
+        return models.vision(
+            images=images,
+            prompt=prompt,
+            provider=provider,
+            model=CONFIG["providers"]["vision_model"],
+            **extra,
+        )
+
+    return with_retries(call, label, parse)
+
+
+def chat_call(prompt: str, label: str = "Chat call", parse=None, **kwargs):
+    """models.chat_or_raise() with the chat provider's rate limit and retries."""
+    provider = kwargs.pop("provider", None) or CONFIG["providers"]["chat"]
+
+    def call(attempt):
+        get_limiter().acquire(provider)
+        return models.chat_or_raise(prompt=prompt, provider=provider, **kwargs)
+
+    return with_retries(call, label, parse)
+
+
+# ---------------------------------------------------------------------------
+# Job queue
+# ---------------------------------------------------------------------------
+
+def job_id(kind: str, pdf_path: Path) -> str:
+    path = Path(pdf_path).resolve()
+    st = path.stat()
+    return f"{kind}:{path}:{st.st_size}:{int(st.st_mtime)}"
+
+
+class JobQueue:
+    """Per-page job status and results in SQLite, safe to share between threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def results(self, job: str) -> dict[int, Any]:
+        """{page: result} of the job's finished pages."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page, result FROM pages WHERE job = ? AND status = 'done'", (job,)
+            ).fetchall()
+        return {page: json.loads(result) for page, result in rows}
+
+    def _upsert(self, job: str, page: int, status: str, **fields) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pages (job, page, status, attempts, updated) VALUES (?, ?, ?, 0, ?) "
+                "ON CONFLICT(job, page) DO UPDATE SET status = excluded.status, updated = excluded.updated",
+                (job, page, status, time.time()),
+            )
+            for column, value in fields.items():
+                self._conn.execute(f"UPDATE pages SET {column} = ? WHERE job = ? AND page = ?", (value, job, page))
+            self._conn.commit()
+
+    def start(self, job: str, page: int) -> None:
+        self._upsert(job, page, "running", error=None)
+        with self._lock:
+            self._conn.execute("UPDATE pages SET attempts = attempts + 1 WHERE job = ? AND page = ?", (job, page))
+            self._conn.commit()
+
+    def finish(self, job: str, page: int, result: Any, seconds: float) -> None:
+        self._upsert(job, page, "done", result=json.dumps(result, ensure_ascii=False), seconds=seconds)
+
+    def fail(self, job: str, page: int, error: str) -> None:
+        self._upsert(job, page, "failed", error=error[:500])
+
+    def forget(self, job: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM pages WHERE job = ?", (job,))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM pages GROUP BY status").fetchall()
+            jobs = self._conn.execute("SELECT COUNT(DISTINCT job) FROM pages").fetchone()[0]
+        return {"jobs": jobs, "path": self.path, **{status: count for status, count in rows}}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+class JobRunner:
+    """Page pool (model calls) and file pool (PDFs) sharing one JobQueue."""
+
+    def __init__(self, queue: JobQueue, page_workers: int | None = None, file_workers: int | None = None):
+        cfg = CONFIG["extract"]["jobs"]
+        self.queue = queue
+        self.page_workers = max(1, page_workers or cfg["page_workers"])
+        self.file_workers = max(1, file_workers or cfg["file_workers"])
+        self._pages = ThreadPoolExecutor(self.page_workers, thread_name_prefix="extract-page")
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = {"pages": 0, "resumed": 0, "failed": 0, "files": 0, "started": time.monotonic()}
+
+    def _count(self, **deltas) -> None:
+        with self._lock:
+            for key, n in deltas.items():
+                self.stats[key] += n
+
+    def map_pages(self, kind: str, pdf_path: Path, tasks: dict[int, Callable[[], Any]]) -> dict[int, Any]:
+        """
+        Run one task per page on the page pool.
+
+        Args:
+            kind:     Job family ("pyq", "syllabus").
+            pdf_path: The PDF the pages belong to (part of the job key).
+            tasks:    {page number: zero-argument callable}; a task returns
+                      a JSON-serialisable result, or None when it failed.
+
+        Returns:
+            {page: result} for every page in `tasks` (None for failed pages).
+            Pages finished by an earlier run are taken from the queue.
+        """
+        job = job_id(kind, pdf_path)
+        results = {page: r for page, r in self.queue.results(job).items() if page in tasks}
+        if results:
+            print(f"   ↻ {len(results)} page(s) resumed from the job queue.")
+
+        def run(page: int, task: Callable[[], Any]):
+            self.queue.start(job, page)
+            t0 = time.monotonic()
+            try:
+                result = task()
+            except Exception as e:
+                result, error = None, str(e)
+            else:
+                error = "no result"
+            if result is None:
+                self.queue.fail(job, page, error)
+            else:
+                self.queue.finish(job, page, result, time.monotonic() - t0)
+            return result
+
+        futures = {
+            page: self._pages.submit(run, page, task)
+            for page, task in sorted(tasks.items()) if page not in results
+        }
+        for page, future in futures.items():
+            results[page] = future.result()
+
+        failed = sum(1 for page in futures if results[page] is None)
+        self._count(pages=len(futures) - failed, resumed=len(tasks) - len(futures), failed=failed)
+        return {page: results[page] for page in sorted(tasks)}
+
+    def run_files(self, files: list[Path], fn: Callable[[Path], Any]) -> None:
+        """Call fn(path) for every file on the file pool and report throughput."""
+        self.reset_stats()
+
+        def run(path: Path):
+            try:
+                fn(path)
+            except Exception as e:
+                print(f"❌ {Path(path).name}: {e}")
+            self._count(files=1)
+
+        if self.file_workers == 1:
+            for path in files:
+                run(path)
+        else:
+            with ThreadPoolExecutor(self.file_workers, thread_name_prefix="extract-file") as pool:
+                list(pool.map(run, files))
+        print(self.report())
+
+    def report(self) -> str:
+        s = self.stats
+        elapsed = max(time.monotonic() - s["started"], 1e-6)
+        return (
+            f"⏱  {s['files']} file(s), {s['pages']} page(s) by the model in {elapsed:.1f}s "
+            f"({s['pages'] * 60 / elapsed:.1f} pages/min), {s['resumed']} resumed, {s['failed']} failed"
+        )
+
+    def shutdown(self) -> None:
+        self._pages.shutdown(wait=True)
+
+
+_runner: JobRunner | None = None
+_runner_lock = threading.Lock()
+
+
+def get_runner(file_workers: int | None = None) -> JobRunner:
+    """The process-wide runner (recreated when the queue path or workers change)."""
+    global _runner
+    with _runner_lock:
+        path = CONFIG["paths"]["extract_jobs"]
+        if (
+            _runner is None
+            or _runner.queue.path != path
+            or (file_workers and _runner.file_workers != file_workers)
+        ):
+            if _runner is not None:
+                _runner.shutdown()
+            _runner = JobRunner(JobQueue(path), file_workers=file_workers)
+        return _runner
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or clear the extraction job queue.")
+    parser.add_argument("--clear", action="store_true", help="forget every recorded page job")
+    args = parser.parse_args()
+
+    queue = JobQueue(CONFIG["paths"]["extract_jobs"])
+    if args.clear:
+        queue.clear()
+        print(f"Cleared {queue.path}")
+    stats = queue.stats()
+    print(
+        f"{stats['jobs']} job(s): {stats.get('done', 0)} page(s) done, "
+        f"{stats.get('failed', 0)} failed, {stats.get('running', 0)} interrupted  ({stats['path']})"
+    )
@@ -0,0 +1,124 @@
+"""
+page_classifier.py
+──────────────────
+Decides per PDF page whether its embedded text layer is good enough, so only
+scanned / handwritten pages are rasterised and sent to models.vision().
+
+Printed slides and born-digital notes already carry the exact text; OCR-ing
+them with a VLM is slow, costs an API call per page and can only lose
+accuracy. A page is read from its text layer when it has:
+
+  - at least `min_chars` non-whitespace characters,
+  - no OCR font (scanners add an invisible "GlyphLessFont" layer over the
+    page image — that text is someone else's OCR, not the document's),
+  - mostly printable characters (broken font encodings yield U+FFFD /
+    private-use glyphs),
+  - images covering at most `max_image_coverage` of the page (a page that
+    is mostly picture is a scan, a photo of handwriting, or a diagram the
+    VLM should describe).
+
+Thresholds come from CONFIG["extract"]["text_layer"].
+"""
+
+import hashlib
+import unicodedata
+
+from source_code.config import CONFIG
+
+# Fonts that scanners / OCR tools use for invisible text over a page image
+OCR_FONTS = ("glyphless", "ocr")
+
+
+def _image_coverage(page) -> float:
+    """Fraction of the page area covered by images (overlaps counted once per image)."""
+    page_rect = page.rect
+    page_area = abs(page_rect) or 1.0
+    covered = 0.0
+    for info in page.get_image_info():
+        bbox = page_rect & info["bbox"]   # clip to the page
+        covered += abs(bbox)
+    return min(covered / page_area, 1.0)
+
+
+def _printable_ratio(text: str) -> float:
+    chars = [ch for ch in text if not ch.isspace()]
+    if not chars:
+        return 0.0
+    bad = sum(
+        1 for ch in chars
+        if ch == "�" or unicodedata.category(ch) in ("Co", "Cn", "Cc")
+    )
+    return 1.0 - bad / len(chars)
+
+
+def classify_page(page, cfg: dict | None = None) -> dict:
+    """
+    Classify one PyMuPDF page.
+
+    Returns:
+        {"use_text_layer": bool, "reason": str, "text": str, "chars": int,
+         "image_coverage": float, "fonts": [font names]}
+        "text" is the page's text layer (empty when it is not used).
+    """
+    cfg = cfg or CONFIG["extract"]["text_layer"]
+    text = page.get_text("text", sort=True).strip()
+    chars = sum(1 for ch in text if not ch.isspace())
+    fonts = sorted({font[3] for font in page.get_fonts()})
+    coverage = _image_coverage(page)
+
+    result = {
+        "use_text_layer": False,
+        "reason": "",
+        "text": "",
+        "chars": chars,
+        "image_coverage": round(coverage, 3),
+        "fonts": fonts,
+    }
+
+    if not cfg["enabled"]:
+        result["reason"] = "text layer disabled"
+    elif chars < cfg["min_chars"]:
+        result["reason"] = f"only {chars} characters of text"
+    elif any(marker in name.lower() for name in fonts for marker in OCR_FONTS):
+        result["reason"] = "text layer is a scanner's OCR"
+    elif _printable_ratio(text) < cfg["min_printable_ratio"]:
+        result["reason"] = "text layer is garbled"
+    elif coverage > cfg["max_image_coverage"]:
+        result["reason"] = f"images cover {coverage:.0%} of the page"
+    else:
+        result["use_text_layer"] = True
+        result["reason"] = "born-digital text"
+        result["text"] = text
+    return result
+
+
+def text_layer_metadata(text: str) -> dict:
+    """
+    extracted_metadata for a text-layer page, in the NOTES_EXTRACTION shape
+    the ingest scripts read (title, topics, confidence, ...).
+    """
+    title = next((line.strip() for line in text.splitlines() if line.strip()), "")
+    return {
+        "full_text": text,
+        "title": title[:120],
+        "unit": None,
+        "document_type": "printed_notes",
+        "topics": [],
+        "key_concepts": [],
+        "diagrams_present": False,
+        "content_quality": "clear",
+        "confidence": 1.0,
+        "extraction_method": "text_layer",
+    }
+
+
+def page_fingerprint(page) -> str:
+    """
+    Content hash of one page: its content stream(s) plus the raw streams of
+    the images it draws, so an edited page changes while an unchanged page
+    keeps its hash when other pages of the PDF are edited, added or removed.
+    """
+    h = hashlib.sha1(page.read_contents())
+    for xref, *_ in page.get_images(full=True):
+        h.update(page.parent.xref_stream_raw(xref) or b"")
+    return h.hexdigest()
@@ -0,0 +1,253 @@
+"""
+unit_classifier.py
+──────────────────
+Assigns syllabus units to the questions of a PYQ paper, a whole paper at a
+time instead of one chat call (with the full syllabus) per question line.
+
+For each question, in order:
+
+  1. cache       question text → unit, persisted as JSON in
+                 CONFIG["paths"]["pyq_unit_cache"] (keyed by subject, a hash
+                 of the syllabus and the normalised question), so
+                 re-extracting a paper, or the same question in another
+                 year's paper, costs nothing — until the syllabus changes
+  2. embeddings  cosine similarity between the question and each syllabus
+                 unit's topic text; a clear winner (best ≥ min_similarity
+                 and best − runner-up ≥ min_margin) is accepted without the
+                 LLM
+  3. LLM         the remaining, ambiguous questions go to the chat model in
+                 batches of `batch_size`, with the syllabus once per batch,
+                 answered as a JSON object {"question number": unit}
+  4. fallback    a question the LLM did not answer gets the embedding best
+                 guess, else unit 1 (the old default)
+
+Settings: CONFIG["extract"]["pyq_units"].
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+from source_code.config import CONFIG
+from source_code.extract.job_runner import chat_call
+from source_code.pipeline.embeddings import local_embedding
+from source_code.prompts import pyq_unit_classification_batch
+from source_code.utils import extract_first_json
+
+_UNIT_LINE = re.compile(r"^\s*Unit\s+(\d+)\s*:\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+_MIN_UNIT_WORDS = 4   # the generic fallback syllabus ("Unit 1: Basics") is not worth embedding
+
+
+def parse_syllabus_units(syllabus_text: str) -> dict[int, str]:
+    """{unit number: topic text} from "Unit N: ..." lines."""
+    return {int(n): text.strip() for n, text in _UNIT_LINE.findall(syllabus_text or "")}
+
+
+def _normalise(question: str) -> str:
+    return re.sub(r"\s+", " ", question.strip().lower())
+
+
+def syllabus_digest(syllabus_text: str) -> str:
+    """Hash of the syllabus the units refer to; renumbered or edited units invalidate the cache."""
+    return hashlib.sha1(_normalise(syllabus_text or "").encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+class UnitCache:
+    """Question → unit map stored as one JSON file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: dict[str, int] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"[unit_classifier] Ignoring unreadable cache {path}: {e}")
+
+    @staticmethod
+    def key(subject: str, syllabus: str, question: str) -> str:
+        """`syllabus` is syllabus_digest() of the syllabus text the unit was chosen against."""
+        return hashlib.sha1(f"{subject.lower()}\n{syllabus}\n{_normalise(question)}".encode("utf-8")).hexdigest()
+
+    def get(self, subject: str, syllabus: str, question: str) -> int | None:
+        with self._lock:
+            return self._data.get(self.key(subject, syllabus, question))
+
+    def put_many(self, subject: str, syllabus: str, units: dict[str, int]) -> None:
+        """Store {question: unit} and write the file once."""
+        if not units:
+            return
+        with self._lock:
+            for question, unit in units.items():
+                self._data[self.key(subject, syllabus, question)] = unit
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._data, f)
+            os.replace(tmp, self.path)
+
+
+# ---------------------------------------------------------------------------
+# Embedding pre-classifier
+# ---------------------------------------------------------------------------
+
+def embedding_guesses(questions: list[str], units: dict[int, str]) -> list[tuple[int | None, float, float]]:
+    """
+    Best unit per question by embedding similarity.
+
+    Returns:
+        [(unit, best similarity, margin over the runner-up)] per question;
+        (None, 0.0, 0.0) for every question when the syllabus is unusable.
+    """
+    usable = {n: t for n, t in units.items() if len(t.split()) >= _MIN_UNIT_WORDS}
+    if len(usable) < 2 or not questions:
+        return [(None, 0.0, 0.0)] * len(questions)
+
+    numbers = sorted(usable)
+    vectors = np.asarray(local_embedding.embed([usable[n] for n in numbers] + list(questions)), dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    unit_vecs, question_vecs = vectors[:len(numbers)], vectors[len(numbers):]
+
+    sims = question_vecs @ unit_vecs.T
+    order = np.argsort(-sims, axis=1)
+    guesses = []
+    for row, ranked in zip(sims, order):
+        best, second = float(row[ranked[0]]), float(row[ranked[1]])
+        guesses.append((numbers[ranked[0]], best, best - second))
+    return guesses
+
+
+# ---------------------------------------------------------------------------
+# Batched LLM classification
+# ---------------------------------------------------------------------------
+
+def parse_batch_response(raw: str, count: int, valid_units: set[int]) -> dict[int, int]:
+    """{question index (0-based): unit} from a {"1": 3, ...} answer."""
+    parsed = extract_first_json(raw or "")
+    if not isinstance(parsed, dict):
+        return {}
+    result = {}
+    for key, value in parsed.items():
+        try:
+            index, unit = int(key) - 1, int(value)
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < count and unit in valid_units:
+            result[index] = unit
+    return result
+
+
+def llm_classify(questions: list[str], syllabus_text: str, valid_units: set[int]) -> dict[int, int]:
+    """
+    Classify `questions` with one chat call per batch.
+
+    Returns:
+        {question index: unit} for the questions the model answered.
+    """
+    batch_size = max(1, CONFIG["extract"]["pyq_units"]["batch_size"])
+    result: dict[int, int] = {}
+    for offset in range(0, len(questions), batch_size):
+        batch = questions[offset:offset + batch_size]
+        # Rate-limited and retried by extract/job_runner.py; an answer without
+        # a single usable unit counts as a failed attempt
+        answered = chat_call(
+            pyq_unit_classification_batch(batch, syllabus_text),
+            label="Classification",
+            parse=lambda raw, n=len(batch): parse_batch_response(raw, n, valid_units) or None,
+            model=CONFIG["model"]["model"],
+        )
+        result.update({offset + i: unit for i, unit in (answered or {}).items()})
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+_cache: UnitCache | None = None
+
+
+def get_cache() -> UnitCache | None:
+    global _cache
+    if not CONFIG["extract"]["pyq_units"]["cache"]:
+        return None
+    if _cache is None or _cache.path != CONFIG["paths"]["pyq_unit_cache"]:
+        _cache = UnitCache(CONFIG["paths"]["pyq_unit_cache"])
+    return _cache
+
+
+def classify_questions(questions: list[str], subject: str, syllabus_text: str) -> list[int]:
+    """
+    Unit (1-5, or the syllabus' own unit numbers) for every question of a paper.
+
+    Args:
+        questions:     Cleaned question texts.
+        subject:       Subject of the paper (part of the cache key).
+        syllabus_text: "Unit N: topics" lines, as sent to the LLM (hashed
+                       into the cache key).
+    """
+    if not questions:
+        return []
+    cfg = CONFIG["extract"]["pyq_units"]
+    units = parse_syllabus_units(syllabus_text)
+    valid_units = set(units) or set(range(1, 6))
+    cache = get_cache()
+    syllabus = syllabus_digest(syllabus_text)
+
+    result: list[int | None] = [None] * len(questions)
+    method: list[str | None] = [None] * len(questions)
+
+    # 1. Cache
+    if cache is not None:
+        for i, q in enumerate(questions):
+            unit = cache.get(subject, syllabus, q)
+            if unit in valid_units:
+                result[i], method[i] = unit, "cache"
+
+    # 2. Embedding pre-classifier
+    todo = [i for i, unit in enumerate(result) if unit is None]
+    guesses: dict[int, int | None] = {}
+    if todo and cfg["use_embeddings"]:
+        try:
+            scored = embedding_guesses([questions[i] for i in todo], units)
+        except Exception as e:
+            print(f" ⚠ Embedding pre-classifier unavailable: {str(e)[:120]}")
+            scored = [(None, 0.0, 0.0)] * len(todo)
+        for i, (unit, best, margin) in zip(todo, scored):
+            guesses[i] = unit
+            if unit is not None and best >= cfg["min_similarity"] and margin >= cfg["min_margin"]:
+                result[i], method[i] = unit, "embedding"
+
+    # 3. Batched LLM for the ambiguous rest
+    todo = [i for i, unit in enumerate(result) if unit is None]
+    if todo:
+        answered = llm_classify([questions[i] for i in todo], syllabus_text, valid_units)
+        for j, i in enumerate(todo):
+            if j in answered:
+                result[i], method[i] = answered[j], "llm"
+
+    # 4. Fallback (not cached: the LLM may answer next time)
+    for i, unit in enumerate(result):
+        if unit is None:
+            result[i], method[i] = guesses.get(i) or 1, "fallback"
+
+    if cache is not None:
+        cache.put_many(subject, syllabus, {
+            questions[i]: result[i] for i in range(len(questions)) if method[i] in ("embedding", "llm")
+        })
+
+    print(
+        f"   🏷  Units: {method.count('cache')} cached, {method.count('embedding')} by embedding, "
+        f"{method.count('llm')} by LLM, {method.count('fallback')} fallback"
+    )
+    return result
@@ -9,7 +9,9 @@ if ROOT_DIR not in sys.path:
     sys.path.append(ROOT_DIR)
 
 from source_code.config import CONFIG
-from utils import get_embedding, get_chroma_collection
+from utils import get_embedding, get_chroma_collection, upsert_with_partition, unit_number
+from rag.lexical_index import build_for_collection
+from rag.near_duplicates import simhash_hex
 
 # ------------------------------------------------------------------
 # CONFIG
@@ -153,97 +155,134 @@ def build_embedding_text(data: dict) -> str:
     return prefix or data.get("description", "")
 
 
+# ------------------------------------------------------------------
+# RECORDS
+# ------------------------------------------------------------------
+
+def prepare_chunk(data: dict) -> dict | None:
+    """
+    Filter one chunk JSON and build what gets stored for it.
+
+    Returns:
+        {"id", "subject", "document", "metadata"}, or None when the chunk is
+        skipped (question paper, low confidence, garbage, no text).
+    """
+    meta = data.get("extracted_metadata", {})
+
+    # Skip question papers (handled elsewhere)
+    if meta.get("document_type") == "question_paper":
+        return None
+
+    # Skip low confidence
+    confidence = meta.get("confidence", 1.0)
+    if confidence < CONFIG["ingest"]["min_confidence"]:
+        return None
+
+    # Skip garbage / promotional chunks
+    if is_garbage_chunk(meta, data):
+        return None
+
+    embedding_text = build_embedding_text(data)
+    if not embedding_text.strip():
+        return None
+
+    file_name = data.get("source_pdf", "unknown")
+    page_start = data.get("page_start", 0)
+    page_end = data.get("page_end", 0)
+    subject = data.get("subject", "unknown").upper()
+    normalized_unit = normalize_unit(data.get("unit"))
+
+    return {
+        "id": f"{subject}_{file_name}_p{page_start}-{page_end}",
+        "subject": subject,
+        "document": embedding_text,
+        "metadata": {
+            "source": file_name,
+            "page_start": page_start,
+            "page_end": page_end,
+            "unit": normalized_unit,
+            "unit_num": unit_number(normalized_unit),
+            "subject": subject,
+            "title": meta.get("title", "unknown"),
+            "document_type": meta.get("document_type", "unknown"),
+            "confidence": confidence,
+            "simhash": simhash_hex(embedding_text),
+        },
+    }
+
+
 # ------------------------------------------------------------------
 # MAIN INGESTION
 # ------------------------------------------------------------------
 
-def ingest_descriptions():
+def ingest_descriptions(json_files: list[Path] | None = None, force: bool = False):
+    """
+    Ingest notes chunk JSONs.
+
+    Args:
+        json_files: Chunk files to ingest (default: every chunk_*.json under base_data).
+        force:      Re-embed and overwrite documents that already exist.
+    """
     print("--- Multimodal Ingestion Start ---")
     print(f"Target Collection: {CONFIG['paths']['collections']['notes']}")
 
     collection = get_chroma_collection()
 
-    root_path = Path(BASE_PATH)
-    json_files = sorted(root_path.rglob("chunk_*.json"))
+    if json_files is None:
+        json_files = sorted(Path(BASE_PATH).rglob("chunk_*.json"))
 
     print(f"Found {len(json_files)} chunk JSONs to ingest.")
 
     ingested = 0
     skipped = 0
+    partitions: set[str] = set()
 
     for json_file in json_files:
         try:
             with open(json_file, "r", encoding="utf-8") as f:
                 data = json.load(f)
 
-            meta = data.get("extracted_metadata", {})
-
-            # Skip question papers (handled elsewhere)
-            if meta.get("document_type") == "question_paper":
-                skipped += 1
-                continue
-
-            # Skip low confidence
-            confidence = meta.get("confidence", 1.0)
-            if confidence < CONFIG["ingest"]["min_confidence"]:
-                skipped += 1
-                continue
-
-            # Skip garbage / promotional chunks
-            if is_garbage_chunk(meta, data):
+            record = prepare_chunk(data)
+            if record is None:
                 skipped += 1
                 continue
-
-            embedding_text = build_embedding_text(data)
-            if not embedding_text.strip():
-                skipped += 1
-                continue
-
-            file_name = data.get("source_pdf", "unknown")
-            page_start = data.get("page_start", 0)
-            page_end = data.get("page_end", 0)
-            subject = data.get("subject", "unknown").upper()
-
-            doc_id = f"{subject}_{file_name}_p{page_start}-{page_end}"
+            doc_id = record["id"]
 
             # Skip if already exists
-            existing = collection.get(ids=[doc_id])
+            existing = None if force else collection.get(ids=[doc_id])
             if existing and existing["ids"]:
                 skipped += 1
                 continue
 
-            vector = get_embedding(embedding_text[:4000])
-
-            raw_unit = data.get("unit")
-            normalized_unit = normalize_unit(raw_unit)
+            vector = get_embedding(record["document"][:4000])
 
-            collection.upsert(
+            partition = upsert_with_partition(
+                collection,
+                record["subject"],
                 ids=[doc_id],
                 embeddings=[vector],
-                documents=[embedding_text],
-                metadatas=[{
-                    "source": file_name,
-                    "page_start": page_start,
-                    "page_end": page_end,
-                    "unit": normalized_unit,
-                    "subject": subject,
-                    "title": meta.get("title", "unknown"),
-                    "document_type": meta.get("document_type", "unknown"),
-                    "confidence": confidence,
-                }]
+                documents=[record["document"]],
+                metadatas=[record["metadata"]],
             )
+            if partition:
+                partitions.add(partition)
 
-            if normalized_unit == "unknown":
+            if record["metadata"]["unit"] == "unknown":
                 print(f"⚠ Unknown unit for {doc_id}")
 
             ingested += 1
-            print(f"   ✅ {doc_id} — {meta.get('title', 'untitled')}")
+            print(f"   ✅ {doc_id} — {record['metadata']['title']}")
 
         except Exception as e:
             print(f"   ❌ Failed: {json_file.name}: {e}")
 
     print(f"\n✅ Ingestion Complete. Ingested: {ingested}, Skipped: {skipped}")
 
+    # Keep the BM25 indexes used by hybrid retrieval in sync with the collections
+    build_for_collection(collection)
+    for name in sorted(partitions):
+        build_for_collection(get_chroma_collection(name))
+
 
 if __name__ == "__main__":
     ingest_descriptions()
\ No newline at end of file
@@ -8,7 +8,9 @@ if ROOT_DIR not in sys.path:
     sys.path.append(ROOT_DIR)
 
 from source_code.config import CONFIG
-from utils import get_embedding, get_chroma_collection
+from utils import get_embedding, get_chroma_collection, upsert_with_partition, unit_number
+from rag.lexical_index import build_for_collection
+from rag.near_duplicates import simhash_hex
 
 # ------------------------------------------------------------------
 # CONFIG
@@ -49,7 +51,14 @@ def build_pyq_embedding_text(q: dict) -> str:
 # MAIN INGESTION
 # ------------------------------------------------------------------
 
-def ingest_pyqs():
+def ingest_pyqs(json_files: list[Path] | None = None, force: bool = False):
+    """
+    Ingest processed PYQ JSONs.
+
+    Args:
+        json_files: *_processed.json files to ingest (default: all under base_data).
+        force:      Re-embed and overwrite questions that already exist.
+    """
     print("--- PYQ Ingestion Start ---")
     print(f"Target Collection : {CONFIG['paths']['collections']['pyq']}")
     print(f"Scanning           : {CONFIG['paths']['base_data']}")
@@ -57,12 +66,14 @@ def ingest_pyqs():
     collection = get_chroma_collection(CONFIG['paths']['collections']['pyq'])
     root_path  = Path(CONFIG['paths']['base_data'])
     # the processed jsons are put in pyqs_processed subfolders
-    json_files = sorted(root_path.rglob("pyqs_processed/*_processed.json"))
+    if json_files is None:
+        json_files = sorted(root_path.rglob("pyqs_processed/*_processed.json"))
 
     print(f"Found {len(json_files)} PYQ JSON files to ingest.")
 
     ingested = 0
     skipped = 0
+    partitions: set[str] = set()
 
     for json_file in json_files:
         try:
@@ -76,7 +87,7 @@ def ingest_pyqs():
                     continue
                 
                 # Check existance
-                existing = collection.get(ids=[doc_id])
+                existing = None if force else collection.get(ids=[doc_id])
                 if existing and existing["ids"]:
                     skipped += 1
                     continue
@@ -88,20 +99,28 @@ def ingest_pyqs():
                     
                 vector = get_embedding(embedding_text[:4000])
                 
-                # Push into chromadb
-                collection.upsert(
+                subject = q_data.get("subject", "unknown").upper()
+
+                # Push into chromadb (and the subject partition, if enabled)
+                partition = upsert_with_partition(
+                    collection,
+                    subject,
                     ids=[doc_id],
                     embeddings=[vector],
                     documents=[embedding_text],
                     metadatas=[{
                         "source": q_data.get("source_pdf", "unknown"),
                         "unit": str(q_data.get("unit", "unknown")),
-                        "subject": q_data.get("subject", "unknown").upper(),
+                        "unit_num": unit_number(q_data.get("unit")),
+                        "subject": subject,
                         "document_type": "pyq",
                         "year": q_data.get("year", 2023),
-                        "marks": q_data.get("marks") if q_data.get("marks") is not None else 0
+                        "marks": q_data.get("marks") if q_data.get("marks") is not None else 0,
+                        "simhash": simhash_hex(embedding_text),
                     }]
                 )
+                if partition:
+                    partitions.add(partition)
                 ingested += 1
             print(f"   ✅ Processed file: {json_file.name}")
         except Exception as e:
@@ -109,5 +128,10 @@ def ingest_pyqs():
 
     print(f"\n✅ Ingestion Complete. Ingested: {ingested} questions, Skipped: {skipped} questions")
 
+    # Keep the BM25 indexes used by hybrid retrieval in sync with the collections
+    build_for_collection(collection)
+    for name in sorted(partitions):
+        build_for_collection(get_chroma_collection(name))
+
 if __name__ == "__main__":
     ingest_pyqs()
\ No newline at end of file
@@ -29,7 +29,9 @@ if ROOT_DIR not in sys.path:
     sys.path.append(ROOT_DIR)
 
 from source_code.config import CONFIG
-from utils import get_embedding, get_chroma_collection
+from utils import get_embedding, get_chroma_collection, upsert_with_partition, unit_number
+from rag.lexical_index import build_for_collection
+from rag.near_duplicates import simhash_hex
 
 # ──────────────────────────────────────────────────────────────────────────────
 # HELPERS
@@ -73,7 +75,14 @@ def build_syllabus_embedding_text(data: dict) -> str:
 # MAIN INGESTION
 # ──────────────────────────────────────────────────────────────────────────────
 
-def ingest_syllabuses():
+def ingest_syllabuses(json_files: list[Path] | None = None, force: bool = False):
+    """
+    Ingest syllabus chunk JSONs.
+
+    Args:
+        json_files: syllabus_*.json files to ingest (default: all under base_data).
+        force:      Re-embed and overwrite chunks that already exist.
+    """
     print("--- Syllabus Ingestion Start ---")
     print(f"Target Collection : {CONFIG['paths']['collections']['syllabus']}")
     print(f"Scanning           : {CONFIG['paths']['base_data']}")
@@ -81,10 +90,12 @@ def ingest_syllabuses():
     collection = get_chroma_collection(CONFIG['paths']['collections']['syllabus'])
     root_path  = Path(CONFIG['paths']['base_data'])
 
-    json_files = sorted(root_path.rglob("syllabus_*.json"))
+    if json_files is None:
+        json_files = sorted(root_path.rglob("syllabus_*.json"))
     print(f"Found {len(json_files)} syllabus chunk JSON(s).\n")
 
     ingested = skipped = errors = 0
+    partitions: set[str] = set()
 
     for json_file in json_files:
         try:
@@ -109,14 +120,16 @@ def ingest_syllabuses():
             subject    = data.get("subject", "unknown").upper()
             doc_id     = f"syllabus_{subject}_{source_pdf}_{chunk_type}"
 
-            existing = collection.get(ids=[doc_id])
+            existing = None if force else collection.get(ids=[doc_id])
             if existing and existing["ids"]:
                 print(f"   -> {doc_id}: already ingested, skipping.")
                 skipped += 1
                 continue
 
             vector = get_embedding(embedding_text[:4000])
-            collection.upsert(
+            partition = upsert_with_partition(
+                collection,
+                subject,
                 ids=[doc_id],
                 embeddings=[vector],
                 documents=[embedding_text],
@@ -126,6 +139,7 @@ def ingest_syllabuses():
                     "page_start":       0,
                     "page_end":         0,
                     "unit":             str(data.get("unit") or ""),
+                    "unit_num":         unit_number(data.get("unit")),
                     "subject":          subject,
                     "title":            data.get("unit_title", chunk_type),
                     "document_type":    "syllabus",
@@ -133,8 +147,11 @@ def ingest_syllabuses():
                     "syllabus_version": data.get("syllabus_version", "unknown"),
                     "chunk_type":       chunk_type,
                     "confidence":       1.0,
+                    "simhash":          simhash_hex(embedding_text),
                 }],
             )
+            if partition:
+                partitions.add(partition)
             ingested += 1
             print(f"   ✅ {doc_id}")
 
@@ -148,6 +165,11 @@ def ingest_syllabuses():
     if errors:
         print(f"   Errors   : {errors}")
 
+    # Keep the BM25 indexes used by hybrid retrieval in sync with the collections
+    build_for_collection(collection)
+    for name in sorted(partitions):
+        build_for_collection(get_chroma_collection(name))
+
 
 if __name__ == "__main__":
     ingest_syllabuses()
\ No newline at end of file
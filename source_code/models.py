@@ -3,6 +3,7 @@ import sys
 import time
 from typing import List, Dict, Any, Optional
 from .config import CONFIG
+from . import response_cache
 
 # --- Provider Imports (Lazy loaded via clients) ---
 import ollama
@@ -67,6 +68,10 @@ def chat(
 ) -> str:
     """
     Unified chat interface. Handles different providers and message formats.
+
+    Provider failures are returned as a "⚠ <Provider> Error: ..." string so
+    that simple scripts never crash; use chat_or_raise() when the caller needs
+    to react to the failure (e.g. provider_router fallbacks).
     
     Args:
         prompt: Simple user prompt string.
@@ -77,7 +82,50 @@ def chat(
         **kwargs: Additional parameters like temperature, num_ctx, etc.
     """
     provider = provider or CONFIG["providers"]["chat"]
-    model_config = CONFIG["model"]
+    if provider not in _CHAT_PROVIDER_LABELS:
+        return f"⚠ Unsupported provider: {provider}"
+
+    try:
+        return chat_or_raise(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            messages=messages,
+            model=model,
+            provider=provider,
+            **kwargs
+        )
+    except Exception as e:
+        return f"⚠ {_CHAT_PROVIDER_LABELS[provider]} Error: {e}"
+
+
+_CHAT_PROVIDER_LABELS = {
+    "gemini": "Gemini",
+    "ollama": "Ollama",
+    "groq": "Groq",
+}
+
+
+def chat_or_raise(
+    prompt: Optional[str] = None,
+    system_prompt: Optional[str] = None,
+    messages: Optional[List[Dict[str, str]]] = None,
+    model: Optional[str] = None,
+    provider: Optional[str] = None,
+    **kwargs
+) -> str:
+    """
+    Same contract as chat(), but provider errors propagate as exceptions.
+
+    Model defaults (name, temperature, top_p, ...) come from the profile of the
+    provider actually being called, so a fallback to another provider never
+    sends it the active provider's model name.
+
+    Raises:
+        ValueError: If the provider is not supported.
+        Exception:  Whatever the provider SDK raised.
+    """
+    provider = provider or CONFIG["providers"]["chat"]
+    model_config = CONFIG["model_configs"].get(provider, CONFIG["model"])
     model_name = model or model_config["model"]
     
     # Standardize messages
@@ -103,16 +151,13 @@ def chat(
         if "top_p" in model_config:
             config_args["top_p"] = model_config["top_p"]
 
-        try:
-            final_prompt = prompt or (messages[-1]["content"] if messages else "")
-            response = client.models.generate_content(
-                model=model_name,
-                contents=final_prompt,
-                config=config_args
-            )
-            return response.text
-        except Exception as e:
-            return f"⚠ Gemini Error: {e}"
+        final_prompt = prompt or (messages[-1]["content"] if messages else "")
+        response = client.models.generate_content(
+            model=model_name,
+            contents=final_prompt,
+            config=config_args
+        )
+        return response.text
 
     # --- OLLAMA ---
     elif provider == "ollama":
@@ -130,15 +175,12 @@ def chat(
         if "top_p" in model_config:
             options["top_p"] = model_config["top_p"]
         
-        try:
-            response = client.chat(
-                model=model_name,
-                messages=full_messages,
-                options=options,
-            )
-            return response["message"]["content"]
-        except Exception as e:
-            return f"⚠ Ollama Error: {e}"
+        response = client.chat(
+            model=model_name,
+            messages=full_messages,
+            options=options,
+        )
+        return response["message"]["content"]
 
     # --- GROQ ---
     elif provider == "groq":
@@ -149,19 +191,59 @@ def chat(
             full_messages.append({"role": "system", "content": system_prompt})
         full_messages.extend(messages)
         
-        try:
-            completion = client.chat.completions.create(
-                model=model,
-                messages=full_messages,
-                temperature=kwargs.get("temperature", 0.6),
-                max_tokens=kwargs.get("max_tokens", 4096),
-            )
-            return completion.choices[0].message.content
-        except Exception as e:
-            return f"⚠ Groq Error: {e}"
+        completion = client.chat.completions.create(
+            model=model_name,
+            messages=full_messages,
+            temperature=kwargs.get("temperature", model_config.get("temperature", 0.6)),
+            max_tokens=kwargs.get("max_tokens", model_config.get("max_tokens", 4096)),
+        )
+        return completion.choices[0].message.content
 
-    else:
-        return f"⚠ Unsupported provider: {provider}"
+    raise ValueError(f"Unsupported provider: {provider}")
+
+# ---------------------------------------------------------------------------
+# Token Counting
+# ---------------------------------------------------------------------------
+
+_tokenizers = {}
+_tokenizer_lock = threading.Lock()
+
+# Rough chars-per-token ratio for English/code, used when no tokenizer is set
+_CHARS_PER_TOKEN = 4
+
+
+def _get_tokenizer(tokenizer_id: str):
+    """Load (once) the HuggingFace tokenizer for a chat profile, or None."""
+    if tokenizer_id in _tokenizers:
+        return _tokenizers[tokenizer_id]
+
+    with _tokenizer_lock:
+        if tokenizer_id not in _tokenizers:
+            try:
+                _tokenizers[tokenizer_id] = AutoTokenizer.from_pretrained(tokenizer_id)
+            except Exception as e:
+                print(f"[models.count_tokens] Could not load {tokenizer_id}, estimating instead: {e}")
+                _tokenizers[tokenizer_id] = None
+    return _tokenizers[tokenizer_id]
+
+
+def count_tokens(text: str, provider: Optional[str] = None) -> int:
+    """
+    Count tokens in `text` with the tokenizer of the given (or active) chat model.
+
+    Profiles without a local tokenizer (e.g. Gemini) fall back to a
+    character-based estimate, which is close enough for budgeting.
+    """
+    if not text:
+        return 0
+    provider = provider or CONFIG["providers"]["chat"]
+    profile = CONFIG["model_configs"].get(provider, CONFIG["model"])
+    tokenizer_id = profile.get("tokenizer")
+
+    tokenizer = _get_tokenizer(tokenizer_id) if tokenizer_id else None
+    if tokenizer is None:
+        return max(1, len(text) // _CHARS_PER_TOKEN)
+    return len(tokenizer.encode(text, add_special_tokens=False))
 
 # ---------------------------------------------------------------------------
 # Embedding API
@@ -261,17 +343,51 @@ def rerank(query: str, documents: List[str], model: Optional[str] = None) -> Lis
 # Vision / VLM API
 # ---------------------------------------------------------------------------
 
-def vision(images: Any, prompt: str, model: Optional[str] = None, provider: Optional[str] = None) -> str:
+def vision(
+    images: Any,
+    prompt: str,
+    model: Optional[str] = None,
+    provider: Optional[str] = None,
+    use_cache: bool = True,
+    json_mode: bool = False,
+) -> str:
     """
     Analyze one or more images using a Vision-Language Model.
-    
+
+    Responses are cached by content (image hashes, prompt hash, model; see
+    response_cache.py), so re-extracting a page — after a rerun, a moved PDF
+    or from a duplicate file — never calls the model again. Error strings
+    are not cached.
+
     Args:
         images: Single image path, list of paths, or list of image bytes.
         prompt: The text instructions for the model.
+        use_cache: Set False to force a fresh model call.
+        json_mode: The prompt asks for a JSON object; providers that support
+                   it (Ollama) are told to emit JSON only. Ignored elsewhere
+                   and when CONFIG["providers"]["vision_json_mode"] is off.
     """
     provider = provider or CONFIG["providers"]["vision"]
     model = model or CONFIG["providers"]["vision_model"]
-    
+    json_mode = json_mode and CONFIG["providers"]["vision_json_mode"]
+    if isinstance(images, (str, bytes)):
+        images = [images]
+
+    cache = response_cache.get_cache() if use_cache else None
+    if cache is not None:
+        # Constrained and free-form answers are cached separately
+        key = response_cache.vision_key(images, prompt, f"{model}:json" if json_mode else model)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    response = _vision_uncached(images, prompt, model, provider, json_mode)
+    if cache is not None and response and not response.startswith("⚠"):
+        cache.put(key, response, model, prompt)
+    return response
+
+
+def _vision_uncached(images: list, prompt: str, model: str, provider: str, json_mode: bool = False) -> str:
     if provider == "ollama":
         client = get_ollama_client()
         try:
@@ -289,7 +405,8 @@ def vision(images: Any, prompt: str, model: Optional[str] = None, provider: Opti
             response = client.generate(
                 model=model,
                 prompt=prompt,
-                images=image_payload
+                images=image_payload,
+                **({"format": "json"} if json_mode else {}),
             )
             return response["response"]
         except Exception as e:
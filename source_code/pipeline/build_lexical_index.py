@@ -0,0 +1,42 @@
+"""
+build_lexical_index.py
+──────────────────────
+Builds the BM25 lexical indexes used by hybrid retrieval (rag/search.py)
+from the documents already stored in ChromaDB.
+
+The ingest scripts call this for their collection when they finish; run it
+by hand after restoring or editing a Chroma database:
+
+    python source_code/pipeline/build_lexical_index.py            # all collections
+    python source_code/pipeline/build_lexical_index.py notes pyq  # selected aliases
+"""
+
+import os
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from source_code.config import CONFIG
+from utils import get_chroma_collection
+from rag.lexical_index import build_for_collection
+
+
+def build(aliases: list[str] | None = None) -> None:
+    """
+    Rebuild the lexical index for each collection alias ("notes", "syllabus", "pyq").
+    """
+    names = CONFIG["paths"]["collections"]
+    for alias in aliases or list(names):
+        if alias not in names:
+            print(f"⚠ Unknown collection alias: {alias}")
+            continue
+        try:
+            build_for_collection(get_chroma_collection(names[alias]))
+        except Exception as exc:
+            print(f"❌ Lexical index for {alias} failed: {exc}")
+
+
+if __name__ == "__main__":
+    build(sys.argv[1:] or None)
@@ -0,0 +1,92 @@
+"""
+build_partitions.py
+───────────────────
+Backfills the per-subject partition collections ("<collection>__<subject>")
+from the global collections, copying the stored embeddings (no re-embedding).
+
+New ingests write both layouts when CONFIG["rag"]["partitioning"]["enabled"]
+is set; run this once when switching partitioning on for an existing
+database, or after restoring one:
+
+    python source_code/pipeline/build_partitions.py              # all collections
+    python source_code/pipeline/build_partitions.py notes pyq    # selected aliases
+"""
+
+import os
+import sys
+from collections import defaultdict
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from source_code.config import CONFIG
+from utils import get_chroma_collection, mark_ingested, partition_collection_name
+from rag.lexical_index import build_for_collection
+
+BATCH_SIZE = 500
+
+
+def partition_collection(alias: str) -> dict[str, int]:
+    """
+    Copy every document of a global collection into its subject partition.
+
+    Args:
+        alias: "notes", "syllabus" or "pyq".
+
+    Returns:
+        {partition name: documents copied}
+    """
+    source = get_chroma_collection(CONFIG["paths"]["collections"][alias])
+    counts: dict[str, int] = defaultdict(int)
+
+    offset = 0
+    while True:
+        page = source.get(
+            include=["documents", "metadatas", "embeddings"],
+            limit=BATCH_SIZE,
+            offset=offset,
+        )
+        if not page["ids"]:
+            break
+        offset += len(page["ids"])
+
+        # Group the page by subject so each partition gets one upsert
+        groups: dict[str, dict[str, list]] = defaultdict(lambda: defaultdict(list))
+        for doc_id, doc, meta, emb in zip(page["ids"], page["documents"], page["metadatas"], page["embeddings"]):
+            subject = (meta or {}).get("subject", "")
+            if not subject or subject == "UNKNOWN":
+                continue
+            group = groups[partition_collection_name(source.name, subject)]
+            group["ids"].append(doc_id)
+            group["documents"].append(doc)
+            group["metadatas"].append(meta)
+            group["embeddings"].append(list(emb))
+
+        for name, records in groups.items():
+            get_chroma_collection(name).upsert(**records)
+            counts[name] += len(records["ids"])
+
+    for name in sorted(counts):
+        print(f"   ✅ {name}: {counts[name]} documents")
+        mark_ingested(get_chroma_collection(name))
+        build_for_collection(get_chroma_collection(name))
+    return dict(counts)
+
+
+def main(aliases: list[str] | None = None) -> None:
+    names = CONFIG["paths"]["collections"]
+    for alias in aliases or list(names):
+        if alias not in names:
+            print(f"⚠ Unknown collection alias: {alias}")
+            continue
+        print(f"--- Partitioning {names[alias]} ---")
+        partition_collection(alias)
+
+    if not CONFIG["rag"]["partitioning"]["enabled"]:
+        print("\nNote: partitioning is disabled in config/rag.py (PARTITION_CONFIG); "
+              "search keeps using the global collections until it is enabled.")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or None)
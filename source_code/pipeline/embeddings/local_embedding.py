@@ -1,6 +1,9 @@
 import ollama
 import os
+import math
 import sys
+import threading
+from collections import OrderedDict
 
 # --- Ensure imports work regardless of working directory ---
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -16,3 +19,42 @@ def embed(texts: list[str]) -> list[list[float]]:
     Generate vector embeddings for a list of strings using the models registry.
     """
     return models.embed(texts, provider=CONFIG["providers"].get("embedding", "ollama"))
+
+
+def truncate_embedding(vector: list[float], dim: int | None) -> list[float]:
+    """
+    Matryoshka truncation: keep the leading `dim` components and re-normalise.
+
+    Qwen3-embedding is trained so that a prefix of the vector is itself a
+    usable embedding. `dim=None` (or a dim at least the vector's length)
+    returns the vector unchanged.
+    """
+    if not dim or dim >= len(vector):
+        return vector
+    head = vector[:dim]
+    norm = math.sqrt(sum(x * x for x in head)) or 1.0
+    return [x / norm for x in head]
+
+
+# Query embeddings are recomputed for the same text several times per turn
+# (embedding router, each collection search) and across turns; keep an LRU.
+_query_cache: OrderedDict[str, list[float]] = OrderedDict()
+_query_cache_lock = threading.Lock()
+
+
+def embed_query(text: str) -> list[float]:
+    """
+    Embed a single query string, memoised in a small in-process LRU.
+    """
+    with _query_cache_lock:
+        if text in _query_cache:
+            _query_cache.move_to_end(text)
+            return _query_cache[text]
+
+    vector = embed([text])[0]
+
+    with _query_cache_lock:
+        _query_cache[text] = vector
+        while len(_query_cache) > CONFIG["rag"]["retrieval_cache"]["query_embedding_cache_size"]:
+            _query_cache.popitem(last=False)
+    return vector
@@ -0,0 +1,177 @@
+"""
+export_snapshot.py
+──────────────────
+Exports ChromaDB collections to flat, memory-mappable snapshots for exact
+search, recall measurement and bulk analytics without opening Chroma.
+
+Each collection becomes a directory under CONFIG["paths"]["snapshots"]:
+
+    <collection>/
+      embeddings.npy    float32 [N, D], contiguous (np.load(mmap_mode="r"))
+      norms.npy         float32 [N], L2 norm of every row
+      metadata.jsonl    one {"id", "metadata"} object per row, same order
+      documents.jsonl   one {"id", "document"} object per row, same order
+      manifest.json     collection name, count, dimension, export time,
+                        embedding model, unit schema version, ingest marker
+
+rag/flat_index.py loads these for exact kNN. With --quantize the compressed
+first-stage codes for rag/quantized_index.py are written as well; --dim
+builds them from a Matryoshka prefix of that length instead of the full vector.
+
+    python source_code/pipeline/export_snapshot.py              # all collections
+    python source_code/pipeline/export_snapshot.py notes pyq    # selected aliases
+    python source_code/pipeline/export_snapshot.py --quantize int8
+    python source_code/pipeline/export_snapshot.py --quantize float32 --dim 256
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from source_code.config import CONFIG
+from utils import INGEST_MARKER_KEY, UNIT_SCHEMA_KEY, collection_metadata, get_chroma_collection
+from rag.quantized_index import MODES, quantize_snapshot
+
+BATCH_SIZE = 1000
+SNAPSHOT_FORMAT = 1
+
+
+def snapshot_dir(collection_name: str) -> str:
+    return os.path.join(CONFIG["paths"]["snapshots"], collection_name)
+
+
+def _truncate_rows(path: str, rows: int, batch_size: int = BATCH_SIZE) -> None:
+    """Shrink a pre-allocated [N, D] .npy file to its first `rows` rows, one batch in memory at a time."""
+    src = np.load(path, mmap_mode="r")
+    tmp = f"{path}.part.npy"
+    dst = np.lib.format.open_memmap(tmp, mode="w+", dtype=src.dtype, shape=(rows, src.shape[1]))
+    for start in range(0, rows, batch_size):
+        dst[start:start + batch_size] = src[start:start + batch_size]
+    dst.flush()
+    del dst, src
+    os.replace(tmp, path)
+
+
+def export_collection(collection, out_dir: str | None = None, batch_size: int = BATCH_SIZE) -> dict:
+    """
+    Write one collection's snapshot.
+
+    The embeddings file is pre-allocated with np.lib.format.open_memmap and
+    filled page by page, so memory use stays at one batch regardless of the
+    collection size. Files are written to a temporary directory and swapped
+    in at the end, so readers never see a half-written snapshot.
+
+    Args:
+        collection: A chromadb.Collection.
+        out_dir:    Target directory (defaults to snapshot_dir(collection.name)).
+        batch_size: Page size for reading from Chroma.
+
+    Returns:
+        The manifest dict.
+    """
+    out_dir = out_dir or snapshot_dir(collection.name)
+    tmp_dir = f"{out_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    # Read before the rows: a write during the export leaves the snapshot stale
+    live_metadata = collection_metadata(collection)
+    total = collection.count()
+    embeddings = None
+    norms = np.zeros(total, dtype=np.float32)
+    row = 0
+
+    with open(os.path.join(tmp_dir, "metadata.jsonl"), "w", encoding="utf-8") as meta_f, \
+         open(os.path.join(tmp_dir, "documents.jsonl"), "w", encoding="utf-8") as doc_f:
+        offset = 0
+        while row < total:
+            page = collection.get(
+                include=["embeddings", "metadatas", "documents"],
+                limit=batch_size,
+                offset=offset,
+            )
+            if not page["ids"]:
+                break
+            offset += len(page["ids"])
+
+            vecs = np.asarray(page["embeddings"], dtype=np.float32)
+            if embeddings is None:
+                embeddings = np.lib.format.open_memmap(
+                    os.path.join(tmp_dir, "embeddings.npy"),
+                    mode="w+", dtype=np.float32, shape=(total, vecs.shape[1]),
+                )
+            n = min(len(vecs), total - row)
+            embeddings[row:row + n] = vecs[:n]
+            norms[row:row + n] = np.linalg.norm(vecs[:n], axis=1)
+
+            for doc_id, meta, doc in zip(page["ids"][:n], page["metadatas"][:n], page["documents"][:n]):
+                meta_f.write(json.dumps({"id": doc_id, "metadata": meta or {}}, ensure_ascii=False) + "\n")
+                doc_f.write(json.dumps({"id": doc_id, "document": doc or ""}, ensure_ascii=False) + "\n")
+            row += n
+
+    dim = 0
+    if embeddings is not None:
+        dim = embeddings.shape[1]
+        embeddings.flush()
+        del embeddings
+        if row < total:
+            # Fewer rows came back than count() promised (deleted mid-export):
+            # drop the zero-filled tail so rows still line up with ids and norms
+            _truncate_rows(os.path.join(tmp_dir, "embeddings.npy"), row, batch_size)
+    else:
+        np.save(os.path.join(tmp_dir, "embeddings.npy"), np.zeros((0, 0), dtype=np.float32))
+    np.save(os.path.join(tmp_dir, "norms.npy"), norms[:row])
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "collection": collection.name,
+        "count": row,
+        "dim": dim,
+        "dtype": "float32",
+        "exported_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "embedding_model": CONFIG["providers"]["embedding_model"],
+        UNIT_SCHEMA_KEY: live_metadata.get(UNIT_SCHEMA_KEY, 1),
+        INGEST_MARKER_KEY: live_metadata.get(INGEST_MARKER_KEY),
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return manifest
+
+
+def main(
+    aliases: list[str] | None = None,
+    quantize: list[str] | None = None,
+    dims: list[int] | None = None,
+) -> None:
+    names = CONFIG["paths"]["collections"]
+    for alias in aliases or list(names):
+        if alias not in names:
+            print(f"⚠ Unknown collection alias: {alias}")
+            continue
+        manifest = export_collection(get_chroma_collection(names[alias]))
+        path = snapshot_dir(manifest["collection"])
+        print(f"   ✅ {manifest['collection']}: {manifest['count']} × {manifest['dim']} → {path}")
+        for mode in quantize or []:
+            for dim in dims or [None]:
+                print(f"      {mode} codes → {quantize_snapshot(path, mode, dim)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("aliases", nargs="*", help="collection aliases (default: all)")
+    parser.add_argument("--quantize", action="append", choices=MODES, help="also write compressed codes (repeatable)")
+    parser.add_argument("--dim", action="append", type=int, help="Matryoshka prefix length for the codes (repeatable)")
+    args = parser.parse_args()
+    main(args.aliases or None, args.quantize, args.dim)
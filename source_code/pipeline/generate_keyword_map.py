@@ -1,8 +1,10 @@
 import os
 import sys
 import json
+import hashlib
 import re
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import chromadb
 import ollama
 
@@ -21,6 +23,7 @@ import prompts
 CHROMA_PATH = CONFIG["paths"]["chroma"]
 MODEL       = CONFIG["providers"]["router"]
 OUTPUT_FILE = os.path.join(ROOT_DIR, "data", "subject_keywords.json")
+UNIT_CACHE_FILE = CONFIG["paths"]["keyword_unit_cache"]
 
 COLLECTIONS = {
     "notes":    CONFIG["paths"]["collections"]["notes"],
@@ -117,22 +120,101 @@ def save_checkpoint(final_map: dict):
         json.dump(final_map, f, indent=4)
 
 
+def load_unit_cache() -> dict:
+    """subject → {unit key: {"hash", "keywords"}} from the last run (see unit_jobs)."""
+    if os.path.exists(UNIT_CACHE_FILE):
+        try:
+            with open(UNIT_CACHE_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError):
+            print("Unit cache unreadable. Every unit will be regenerated.")
+    return {}
+
+
+def save_unit_cache(unit_cache: dict):
+    os.makedirs(os.path.dirname(UNIT_CACHE_FILE), exist_ok=True)
+    with open(UNIT_CACHE_FILE, "w", encoding="utf-8") as f:
+        json.dump(unit_cache, f)
+
+
 # -----------------------------------------------------------------
 # Metadata gathering
 # -----------------------------------------------------------------
 
-def fetch_collection(
+def iter_collection(
     client: chromadb.PersistentClient,
     collection_name: str,
     include: list[str],
-) -> dict:
-    """Return collection.get() result or empty stub on failure."""
+    where: dict | None = None,
+    page_size: int | None = None,
+):
+    """
+    Yield collection.get() results one page (`page_size` documents) at a
+    time, optionally filtered by `where`. Yields nothing if the collection
+    cannot be opened.
+    """
+    page_size = page_size or CONFIG["rag"]["keywords"]["generation"]["page_size"]
     try:
         collection = client.get_collection(collection_name)
-        return collection.get(include=include) or {}
     except Exception as e:
         print(f"  [WARN] Could not open collection '{collection_name}': {e}")
-        return {}
+        return
+    offset = 0
+    while True:
+        page = collection.get(where=where, include=include, limit=page_size, offset=offset) or {}
+        count = len(page.get("ids") or [])
+        if count:
+            yield page
+        if count < page_size:
+            return
+        offset += count
+
+
+def _merge_groups(total: dict, part: dict) -> None:
+    """Merge subject → set / subject → unit → set groupings in place."""
+    for subject, value in part.items():
+        if isinstance(value, set):
+            total.setdefault(subject, set()).update(value)
+        else:
+            for unit_label, items in value.items():
+                total.setdefault(subject, {}).setdefault(unit_label, set()).update(items)
+
+
+def fetch_grouped(client, alias: str, subjects: list[str] | None = None) -> dict:
+    """
+    Page through one collection and group it with the matching collect_*().
+
+    Args:
+        alias:    "notes", "syllabus" or "pyq".
+        subjects: Only these subjects (a `where` filter on metadata), or all.
+    """
+    include = ["metadatas"] if alias == "notes" else ["metadatas", "documents"]
+    where = None
+    if subjects is not None:
+        where = {"subject": subjects[0]} if len(subjects) == 1 else {"subject": {"$in": list(subjects)}}
+
+    grouped: dict = {}
+    documents = 0
+    for page in iter_collection(client, COLLECTIONS[alias], include, where=where):
+        metadatas = page.get("metadatas") or []
+        documents += len(metadatas)
+        if alias == "notes":
+            part = collect_notes_syllabus(metadatas)
+        elif alias == "syllabus":
+            part = collect_syllabus(metadatas, page.get("documents") or [])
+        else:
+            part = collect_pyq(metadatas, page.get("documents") or [])
+        _merge_groups(grouped, part)
+    print(f"  {alias:<9}: {documents} documents")
+    return grouped
+
+
+def _unit_label(meta: dict) -> str:
+    """Unit label for grouping: the migrated unit_num if present, else parsed."""
+    if "unit_num" in meta:
+        return str(meta["unit_num"]) if meta["unit_num"] else "unknown"
+    raw_unit = str(meta.get("unit", "")).strip()
+    return re.sub(r'(?i)^unit\s*', '', raw_unit).strip() or "unknown"
 
 
 def collect_notes_syllabus(metadatas: list[dict]) -> dict[str, dict[str, set]]:
@@ -143,8 +225,7 @@ def collect_notes_syllabus(metadatas: list[dict]) -> dict[str, dict[str, set]]:
         if not subject or subject.lower() in ("", "unknown", "none"):
             continue
 
-        raw_unit   = str(meta.get("unit", "")).strip()
-        unit_label = re.sub(r'(?i)^unit\s*', '', raw_unit).strip() or "unknown"
+        unit_label = _unit_label(meta)
 
         title = meta.get("title", "").strip()
         if title and title.lower() not in ("unknown", "none", ""):
@@ -168,8 +249,7 @@ def collect_syllabus(metadatas: list[dict], documents: list[str]) -> dict[str, d
         if not subject or subject.lower() in ("", "unknown", "none"):
             continue
 
-        raw_unit   = str(meta.get("unit", "")).strip()
-        unit_label = re.sub(r'(?i)^unit\s*', '', raw_unit).strip() or "unknown"
+        unit_label = _unit_label(meta)
 
         # Extract the Topics section from the embedded document text
         # Format: "Subject: X | Unit: Y | Title: Z | Topics: t1, t2 ...\n\n<full_text>"
@@ -229,9 +309,14 @@ def extract_keywords_for_unit(
     items: set,
     unit: str | None,
     max_items: int,
-) -> list[str]:
-    """Extract keywords for one unit (or full subject if unit=None)."""
-    capped    = list(items)[:max_items]
+) -> tuple[list[str], bool]:
+    """
+    Extract keywords for one unit (or full subject if unit=None).
+
+    Returns:
+        (keywords, ok); when the LLM fails the raw items stand in and ok is False.
+    """
+    capped    = sorted(items)[:max_items]   # sorted: same inputs → same prompt
     items_str = ", ".join(capped)
     prompt    = prompts.keyword_extraction(subject=subject, items_list=items_str, unit=unit)
 
@@ -242,43 +327,118 @@ def extract_keywords_for_unit(
             think=False,
             options={"num_predict": 150, "temperature": 0.1},
         )
-        return clean_llm_output(response.message.content.strip())
+        return clean_llm_output(response.message.content.strip()), True
     except Exception as e:
         print(f"    [ERROR] LLM failed: {e} — using raw items as fallback")
-        return clean_llm_output(", ".join(str(i) for i in capped))
+        return clean_llm_output(", ".join(str(i) for i in capped)), False
 
 
 def dedupe(lst: list[str]) -> list[str]:
     return list(dict.fromkeys(lst))
 
 
+# -----------------------------------------------------------------
+# Per-unit jobs
+# -----------------------------------------------------------------
+
+def unit_jobs(subject: str, notes_grouped: dict, syllabus_grouped: dict, pyq_grouped: dict) -> dict[str, dict]:
+    """
+    One LLM job per (section, unit) of a subject, keyed "notes:3",
+    "syllabus:3", "pyq". Each job carries a hash of its prompt, so an
+    unchanged unit can reuse last run's keywords.
+    """
+    jobs = {}
+    for section, grouped in (("notes", notes_grouped), ("syllabus", syllabus_grouped)):
+        for unit_label, items in sorted(grouped.get(subject, {}).items()):
+            jobs[f"{section}:{unit_label}"] = {
+                "section": section, "unit": unit_label, "items": items, "max_items": MAX_ITEMS_PER_UNIT,
+            }
+    if subject in pyq_grouped:
+        jobs["pyq"] = {"section": "pyq", "unit": None, "items": pyq_grouped[subject], "max_items": MAX_ITEMS_PER_SUBJECT}
+
+    for job in jobs.values():
+        # The exact prompt extract_keywords_for_unit() would send, plus the model
+        items_str = ", ".join(sorted(job["items"])[:job["max_items"]])
+        prompt = prompts.keyword_extraction(subject=subject, items_list=items_str, unit=job["unit"])
+        job["hash"] = hashlib.sha1(f"{MODEL}\n{prompt}".encode("utf-8")).hexdigest()
+    return jobs
+
+
+def run_unit_jobs(
+    ollama_client, subject: str, jobs: dict[str, dict], cached: dict, executor,
+) -> tuple[dict, int, set[str]]:
+    """
+    Keywords for every job: from `cached` when its hash still matches, else
+    from the LLM (jobs run concurrently on `executor`).
+
+    Returns:
+        ({job key: {"hash", "keywords"}}, number of LLM calls made, keys
+        whose LLM call failed and hold the raw-item fallback)
+    """
+    results = {
+        key: cached[key] for key, job in jobs.items()
+        if key in cached and cached[key].get("hash") == job["hash"]
+    }
+    futures = {
+        key: executor.submit(
+            extract_keywords_for_unit, ollama_client, subject, job["items"],
+            unit=job["unit"], max_items=job["max_items"],
+        )
+        for key, job in jobs.items() if key not in results
+    }
+    failed = set()
+    for key, future in futures.items():
+        keywords, ok = future.result()
+        results[key] = {"hash": jobs[key]["hash"], "keywords": dedupe(keywords)}
+        if not ok:
+            failed.add(key)
+    return results, len(futures), failed
+
+
+def build_subject_entry(results: dict[str, dict]) -> dict:
+    """Assemble a subject's keyword map entry from its per-unit keywords."""
+    entry: dict = {}
+    for section in ("notes", "syllabus"):
+        raw_unit_kws = {
+            key.split(":", 1)[1]: result["keywords"]
+            for key, result in sorted(results.items()) if key.startswith(f"{section}:")
+        }
+        if raw_unit_kws:
+            entry[section] = split_core_and_specific(raw_unit_kws)
+    if "pyq" in results:
+        entry["pyq"] = results["pyq"]["keywords"]
+    return entry
+
+
 # -----------------------------------------------------------------
 # Main
 # -----------------------------------------------------------------
 
-def generate_keyword_map():
+def generate_keyword_map(subjects: list[str] | None = None, incremental: bool = False):
+    """
+    Build (or resume) data/subject_keywords.json.
+
+    Collections are read page by page (filtered to `subjects` when given).
+    Each unit's input items are hashed and stored in the unit cache
+    (CONFIG["paths"]["keyword_unit_cache"]); only units whose inputs
+    changed go to the LLM, several at once (CONFIG["rag"]["keywords"]["generation"]).
+
+    Args:
+        subjects:    Regenerate only these subjects (upper-case, as stored in
+                     metadata), replacing their checkpointed entries; the
+                     other subjects are kept as they are.
+        incremental: Regenerate every subject instead of skipping those
+                     already in the checkpoint.
+    """
     print(f"Connecting to ChromaDB at {CHROMA_PATH}...")
     client = chromadb.PersistentClient(path=CHROMA_PATH)
+    wanted = sorted({s.upper() for s in subjects}) if subjects is not None else None
 
     # Fetch metadata AND documents for syllabus and PYQ (to get actual topic/question text)
-    print("\nFetching metadata from all collections...")
-    notes_result    = fetch_collection(client, COLLECTIONS["notes"],    include=["metadatas"])
-    syllabus_result = fetch_collection(client, COLLECTIONS["syllabus"], include=["metadatas", "documents"])
-    pyq_result      = fetch_collection(client, COLLECTIONS["pyq"],      include=["metadatas", "documents"])
-
-    notes_meta    = notes_result.get("metadatas") or []
-    syllabus_meta = syllabus_result.get("metadatas") or []
-    syllabus_docs = syllabus_result.get("documents") or []
-    pyq_meta      = pyq_result.get("metadatas") or []
-    pyq_docs      = pyq_result.get("documents") or []
-
-    print(f"  notes    : {len(notes_meta)} documents")
-    print(f"  syllabus : {len(syllabus_meta)} documents")
-    print(f"  pyq      : {len(pyq_meta)} documents")
-
-    notes_grouped    = collect_notes_syllabus(notes_meta)
-    syllabus_grouped = collect_syllabus(syllabus_meta, syllabus_docs)
-    pyq_grouped      = collect_pyq(pyq_meta, pyq_docs)
+    print(f"\nFetching metadata from {'all subjects' if wanted is None else ', '.join(wanted) or 'no subjects'}...")
+    notes_grouped    = fetch_grouped(client, "notes",    wanted)
+    syllabus_grouped = fetch_grouped(client, "syllabus", wanted)
+    pyq_grouped      = fetch_grouped(client, "pyq",      wanted)
 
     all_subjects = sorted(
         set(notes_grouped) | set(syllabus_grouped) | set(pyq_grouped)
@@ -287,60 +447,48 @@ def generate_keyword_map():
 
     ollama_client = ollama.Client(host=CONFIG["OLLAMA_LOCAL_URL"], timeout=90)
     final_map     = load_checkpoint()
-
-    for subject in all_subjects:
-        if subject in final_map:
-            print(f"Skipping '{subject}' (already in checkpoint).")
-            continue
-
-        print(f"\n── Subject: {subject} ──────────────────────────────────")
-        subject_entry: dict = {}
-
-        # ── Notes: per-unit → core split ─────────────────────────
-        if subject in notes_grouped:
-            units = notes_grouped[subject]
-            print(f"  notes: {len(units)} unit(s)")
-            raw_unit_kws: dict[str, list[str]] = {}
-            for unit_label, titles in sorted(units.items()):
-                print(f"    unit {unit_label}: {len(titles)} titles")
-                kws = extract_keywords_for_unit(
-                    ollama_client, subject, titles, unit=unit_label, max_items=MAX_ITEMS_PER_UNIT
-                )
-                raw_unit_kws[unit_label] = dedupe(kws)
-                print(f"      → {len(raw_unit_kws[unit_label])}: {raw_unit_kws[unit_label][:4]}...")
-            subject_entry["notes"] = split_core_and_specific(raw_unit_kws)
-            print(f"    core ({len(subject_entry['notes']['core'])}): {subject_entry['notes']['core'][:5]}")
-
-        # ── Syllabus: per-unit → core split ──────────────────────
-        if subject in syllabus_grouped:
-            units = syllabus_grouped[subject]
-            print(f"  syllabus: {len(units)} unit(s)")
-            raw_unit_kws = {}
-            for unit_label, titles in sorted(units.items()):
-                print(f"    unit {unit_label}: {len(titles)} titles")
-                kws = extract_keywords_for_unit(
-                    ollama_client, subject, titles, unit=unit_label, max_items=MAX_ITEMS_PER_UNIT
-                )
-                raw_unit_kws[unit_label] = dedupe(kws)
-                print(f"      → {len(raw_unit_kws[unit_label])}: {raw_unit_kws[unit_label][:4]}...")
-            subject_entry["syllabus"] = split_core_and_specific(raw_unit_kws)
-            print(f"    core ({len(subject_entry['syllabus']['core'])}): {subject_entry['syllabus']['core'][:5]}")
-
-        # ── PYQ: flat subject-level keywords ─────────────────────
-        if subject in pyq_grouped:
-            items = pyq_grouped[subject]
-            print(f"  pyq: {len(items)} question snippets")
-            kws = extract_keywords_for_unit(
-                ollama_client, subject, items, unit=None, max_items=MAX_ITEMS_PER_SUBJECT
-            )
-            subject_entry["pyq"] = dedupe(kws)
-            print(f"    → {len(subject_entry['pyq'])}: {subject_entry['pyq'][:4]}...")
-
-        final_map[subject] = subject_entry
-        save_checkpoint(final_map)
+    unit_cache    = load_unit_cache()
+
+    if wanted is not None:
+        for subject in wanted:
+            final_map.pop(subject, None)
+        save_checkpoint(final_map)   # subjects no longer in any collection are dropped too
+
+    llm_calls = reused = 0
+    workers = max(1, CONFIG["rag"]["keywords"]["generation"]["llm_workers"])
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for subject in all_subjects:
+            if subject in final_map and not incremental:
+                print(f"Skipping '{subject}' (already in checkpoint).")
+                continue
+
+            print(f"\n── Subject: {subject} ──────────────────────────────────")
+            jobs = unit_jobs(subject, notes_grouped, syllabus_grouped, pyq_grouped)
+            results, calls, failed = run_unit_jobs(ollama_client, subject, jobs, unit_cache.get(subject, {}), executor)
+            llm_calls += calls
+            reused += len(jobs) - calls
+
+            for key, job in jobs.items():
+                kws = results[key]["keywords"]
+                print(f"    {key}: {len(job['items'])} items → {len(kws)}: {kws[:4]}...")
+            print(f"  {len(jobs)} unit(s): {calls} regenerated, {len(jobs) - calls} unchanged, {len(failed)} failed")
+
+            final_map[subject] = build_subject_entry(results)
+            # Fallback keywords are not cached, so the next run asks the LLM again
+            unit_cache[subject] = {key: r for key, r in results.items() if key not in failed}
+            save_checkpoint(final_map)
+            save_unit_cache(unit_cache)
 
     print(f"\n✅ Keyword map complete. {len(final_map)} subjects saved to {OUTPUT_FILE}")
+    print(f"   LLM calls: {llm_calls}, units reused: {reused}")
 
 
 if __name__ == "__main__":
-    generate_keyword_map()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate the subject keyword map used by the hybrid router.")
+    parser.add_argument("--subjects", nargs="+", default=None, help="Regenerate only these subjects")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Revisit every subject; only units whose inputs changed call the LLM")
+    args = parser.parse_args()
+    generate_keyword_map(subjects=args.subjects, incremental=args.incremental)
@@ -42,19 +42,32 @@ def build_unit_texts():
                
     return unit_texts
 
-def main():
+def main(subjects=None):
+    """
+    Embed every unit's keyword text into CONFIG["paths"]["unit_embeddings"].
+    With `subjects`, only those subjects' units are re-embedded and merged
+    into the existing file (their old entries are replaced).
+    """
     print("Building unit texts from keywords...")
     unit_texts = build_unit_texts()
+
+    out_path = CONFIG["paths"]["unit_embeddings"]
+    embeddings = {}
+    if subjects is not None:
+        prefixes = tuple(f"{s}_" for s in subjects)
+        unit_texts = {k: v for k, v in unit_texts.items() if k.startswith(prefixes)}
+        if os.path.exists(out_path):
+            with open(out_path, "rb") as f:
+                embeddings = {k: v for k, v in pickle.load(f).items() if not k.startswith(prefixes)}
     
     print(f"Generating embeddings for {len(unit_texts)} units...")
     keys = list(unit_texts.keys())
     texts = [unit_texts[k] for k in keys]
     
-    vectors = embed(texts)
+    vectors = embed(texts) if texts else []
     
-    embeddings = {k: v for k, v in zip(keys, vectors)}
+    embeddings.update({k: v for k, v in zip(keys, vectors)})
     
-    out_path = CONFIG["paths"]["unit_embeddings"]
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
     
     with open(out_path, "wb") as f:
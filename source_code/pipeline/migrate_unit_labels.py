@@ -0,0 +1,109 @@
+"""
+migrate_unit_labels.py
+──────────────────────
+One-time migration of unit metadata to the canonical schema.
+
+Older ingests stored "unit" as "unit3", "Unit 3", "03" … so every filtered
+search had to match both forms with an $or clause, and the reranker and
+keyword-map builder re-normalised strings at runtime. This rewrites every
+document in the three collections (and their subject partitions) to:
+
+    "unit":     "3"        (or "unknown")
+    "unit_num": 3          (0 when unknown)
+
+and then records ``unit_schema_version = 2`` in each collection's metadata.
+search.py emits a plain ``{"unit_num": n}`` filter for marked collections.
+The BM25 indexes are rebuilt so lexical filtering sees the new field.
+
+Idempotent — re-running only touches documents that still differ.
+
+    python source_code/pipeline/migrate_unit_labels.py [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+import chromadb
+from source_code.config import CONFIG
+from utils import UNIT_SCHEMA_KEY, UNIT_SCHEMA_VERSION, unit_number, update_collection_metadata
+from rag.lexical_index import build_for_collection
+
+BATCH_SIZE = 500
+
+
+def canonical_unit_fields(meta: dict) -> dict:
+    n = unit_number(meta.get("unit"))
+    return {"unit": str(n) if n else "unknown", "unit_num": n}
+
+
+def mark_schema(collection: chromadb.Collection) -> None:
+    """Record the unit schema version in the collection metadata."""
+    update_collection_metadata(collection, **{UNIT_SCHEMA_KEY: UNIT_SCHEMA_VERSION})
+
+
+def migrate_collection(collection: chromadb.Collection, dry_run: bool = False) -> int:
+    """
+    Rewrite unit metadata of every document that is not canonical yet.
+
+    Returns:
+        Number of documents updated (or that would be, with dry_run).
+    """
+    updated = 0
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=BATCH_SIZE, offset=offset)
+        if not page["ids"]:
+            break
+        offset += len(page["ids"])
+
+        ids, metadatas = [], []
+        for doc_id, meta in zip(page["ids"], page["metadatas"]):
+            meta = meta or {}
+            fields = canonical_unit_fields(meta)
+            if all(meta.get(k) == v for k, v in fields.items()):
+                continue
+            ids.append(doc_id)
+            metadatas.append({**meta, **fields})
+
+        if ids and not dry_run:
+            collection.update(ids=ids, metadatas=metadatas)
+        updated += len(ids)
+
+    if not dry_run:
+        mark_schema(collection)
+        build_for_collection(collection)
+    return updated
+
+
+def collections_to_migrate(client: chromadb.ClientAPI) -> list[str]:
+    """The three global collections plus any subject partitions of them."""
+    bases = list(CONFIG["paths"]["collections"].values())
+    sep = CONFIG["rag"]["partitioning"]["separator"]
+    names = []
+    for col in client.list_collections():
+        name = col if isinstance(col, str) else col.name
+        if name in bases or any(name.startswith(f"{base}{sep}") for base in bases):
+            names.append(name)
+    return sorted(names)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="count documents without writing")
+    args = parser.parse_args()
+
+    client = chromadb.PersistentClient(path=CONFIG["paths"]["chroma"])
+    for name in collections_to_migrate(client):
+        collection = client.get_collection(name)
+        count = migrate_collection(collection, dry_run=args.dry_run)
+        verb = "would update" if args.dry_run else "updated"
+        print(f"   ✅ {name}: {verb} {count} document(s)")
+
+
+if __name__ == "__main__":
+    main()
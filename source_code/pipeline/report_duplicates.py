@@ -0,0 +1,117 @@
+"""
+report_duplicates.py
+────────────────────
+Reports near-duplicate chunks in each collection using the SimHash
+signatures from rag/near_duplicates.py.
+
+Documents ingested before signatures were stored are hashed on the fly;
+--backfill also writes the missing metadata["simhash"] values back so query
+time never has to hash them.
+
+    python source_code/pipeline/report_duplicates.py                 # all collections
+    python source_code/pipeline/report_duplicates.py notes --show 5  # 5 largest groups
+    python source_code/pipeline/report_duplicates.py --backfill
+"""
+
+import argparse
+import os
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from source_code.config import CONFIG
+from utils import get_chroma_collection
+from rag.near_duplicates import duplicate_groups, simhash
+
+BATCH_SIZE = 500
+
+
+def collection_signatures(collection, backfill: bool = False, batch_size: int = BATCH_SIZE) -> tuple[dict, dict, int]:
+    """
+    Read every document's signature (computing missing ones).
+
+    Returns:
+        (id → signature, id → metadata, number of signatures backfilled)
+    """
+    signatures, metadatas = {}, {}
+    backfilled = 0
+    offset = 0
+    while True:
+        page = collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+        if not page["ids"]:
+            break
+        offset += len(page["ids"])
+
+        missing_ids, missing_metas = [], []
+        for doc_id, doc, meta in zip(page["ids"], page["documents"], page["metadatas"]):
+            meta = meta or {}
+            stored = meta.get("simhash")
+            sig = int(stored, 16) if stored else simhash(doc or "")
+            if not stored:
+                missing_ids.append(doc_id)
+                missing_metas.append({**meta, "simhash": f"{sig:016x}"})
+            signatures[doc_id] = sig
+            metadatas[doc_id] = meta
+
+        if backfill and missing_ids:
+            collection.update(ids=missing_ids, metadatas=missing_metas)
+            backfilled += len(missing_ids)
+    return signatures, metadatas, backfilled
+
+
+def report(collection, backfill: bool = False) -> dict:
+    """
+    Count near-duplicate groups in a collection.
+
+    Returns:
+        {"collection", "documents", "groups", "duplicates", "backfilled",
+         "largest": [[(id, source, page_start), ...], ...]}
+        where "duplicates" counts every document beyond the first of its group.
+    """
+    signatures, metadatas, backfilled = collection_signatures(collection, backfill)
+    groups = duplicate_groups(signatures)
+    return {
+        "collection": collection.name,
+        "documents": len(signatures),
+        "groups": len(groups),
+        "duplicates": sum(len(g) - 1 for g in groups),
+        "backfilled": backfilled,
+        "largest": [
+            [(doc_id, metadatas[doc_id].get("source", "?"), metadatas[doc_id].get("page_start", "?")) for doc_id in g]
+            for g in groups
+        ],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("aliases", nargs="*", help="collection aliases (default: all)")
+    parser.add_argument("--backfill", action="store_true", help="store missing signatures in metadata")
+    parser.add_argument("--show", type=int, default=3, help="print this many of the largest groups")
+    args = parser.parse_args()
+
+    names = CONFIG["paths"]["collections"]
+    print(f"max_hamming={CONFIG['rag']['near_duplicates']['max_hamming']}")
+    for alias in args.aliases or list(names):
+        if alias not in names:
+            print(f"⚠ Unknown collection alias: {alias}")
+            continue
+        result = report(get_chroma_collection(names[alias]), backfill=args.backfill)
+        share = result["duplicates"] / result["documents"] if result["documents"] else 0.0
+        print(
+            f"\n   {result['collection']}: {result['documents']} documents, "
+            f"{result['duplicates']} near-duplicate(s) ({share:.1%}) in {result['groups']} group(s)"
+            + (f", {result['backfilled']} signature(s) backfilled" if result["backfilled"] else "")
+        )
+        for group in result["largest"][:args.show]:
+            print(f"     • {len(group)} copies:")
+            for doc_id, source, page in group[:5]:
+                print(f"         {source} p.{page}  ({doc_id})")
+            if len(group) > 5:
+                print(f"         … {len(group) - 5} more")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+stream_ingest.py
+────────────────
+Streaming extract → ingest for lecture notes.
+
+The batch workflow runs extract_multimodal_notes.py over everything, then
+ingest_multimodal.py re-reads every chunk_*.json; nothing is searchable until
+the whole extraction has finished. Here each chunk the notes extractor writes
+is handed over at once and flows through three stages:
+
+    extractor ──▶ [chunks] ──▶ filter + embedding text ──▶ [records] ──▶ embed + upsert
+                  bounded        (prepare_chunk)            bounded       (batched)
+
+Both queues are bounded (`queue_size`): when embedding or Chroma falls
+behind, the extractor blocks on submit() instead of piling up pages in
+memory. The writer embeds up to `batch_size` records per models.embed() call
+and flushes a partial batch after `max_wait_seconds`, so a page is queryable
+by dense retrieval seconds after it is transcribed. The BM25 indexes used by
+hybrid retrieval are rebuilt every `lexical_refresh_seconds` (0 = only when
+the stream closes) and always at the end.
+
+Chunks extracted by earlier runs are not re-sent; ingest them once with
+ingest_multimodal.py. Settings: CONFIG["ingest"]["stream"].
+
+    python source_code/pipeline/stream_ingest.py               # all notes PDFs
+    python source_code/pipeline/stream_ingest.py --path <dir>
+"""
+
+import os
+import queue
+import sys
+import threading
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from source_code import models
+from source_code.config import CONFIG
+from utils import get_chroma_collection, upsert_with_partition
+from rag.lexical_index import build_for_collection
+from ingest.ingest_multimodal import prepare_chunk
+
+_DONE = object()   # end-of-stream marker passed down the queues
+
+
+class StreamIngest:
+    """
+    Background filter → embed → upsert pipeline for notes chunks.
+
+    Usage:
+        with StreamIngest() as stream:
+            process_all_folders(path, on_chunk=stream.submit)
+    """
+
+    def __init__(self, collection=None, cfg: dict | None = None):
+        self.cfg = cfg or CONFIG["ingest"]["stream"]
+        self.collection = collection if collection is not None else get_chroma_collection()
+        self._chunks: queue.Queue = queue.Queue(maxsize=self.cfg["queue_size"])
+        self._records: queue.Queue = queue.Queue(maxsize=self.cfg["queue_size"])
+        self._partitions: set[str] = set()
+        self._lock = threading.Lock()
+        self.stats = {
+            "submitted": 0, "skipped": 0, "ingested": 0, "failed": 0,
+            "batches": 0, "lexical_failed": 0, "max_latency": 0.0,
+        }
+        self._latency_total = 0.0
+        self._last_lexical = time.monotonic()
+        self._dirty = False
+        self._threads = [
+            threading.Thread(target=self._prepare_loop, name="stream-prepare", daemon=True),
+            threading.Thread(target=self._write_loop, name="stream-write", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    # ── Producer side ─────────────────────────────────────────────────────
+
+    def submit(self, chunk: dict) -> None:
+        """
+        Queue one chunk dict (as written to chunk_N_N.json); blocks while the
+        pipeline is full. Raises RuntimeError once a worker thread has died,
+        instead of blocking forever on a queue nobody drains.
+        """
+        self._put((time.monotonic(), chunk))
+        with self._lock:
+            self.stats["submitted"] += 1
+
+    def _put(self, item) -> None:
+        while True:
+            dead = [t.name for t in self._threads if not t.is_alive()]
+            if dead:
+                raise RuntimeError(f"stream ingest stopped: {', '.join(dead)} thread(s) died")
+            try:
+                self._chunks.put(item, timeout=1.0)
+                return
+            except queue.Full:
+                continue
+
+    def close(self) -> dict:
+        """Drain both stages, refresh the lexical indexes and return the stats."""
+        self._put(_DONE)
+        for t in self._threads:
+            t.join()
+        self._refresh_lexical()
+        return self.stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        print(self.report())
+        return False
+
+    # ── Stage 2: garbage filter + embedding text ──────────────────────────
+
+    def _prepare_loop(self) -> None:
+        while True:
+            item = self._chunks.get()
+            if item is _DONE:
+                self._records.put(_DONE)
+                return
+            submitted_at, chunk = item
+            try:
+                record = prepare_chunk(chunk)
+            except Exception as e:
+                print(f"   ❌ [stream] Could not prepare chunk: {e}")
+                record = None
+            if record is None:
+                with self._lock:
+                    self.stats["skipped"] += 1
+                continue
+            self._records.put((submitted_at, record))
+
+    # ── Stage 3: batched embedding + upsert ───────────────────────────────
+
+    def _write_loop(self) -> None:
+        batch: list[tuple[float, dict]] = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._records.get(timeout=timeout)
+            except queue.Empty:
+                item = None   # max_wait reached: flush the partial batch
+
+            if item is _DONE:
+                self._flush(batch)
+                return
+            if item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.cfg["max_wait_seconds"]
+            if batch and (item is None or len(batch) >= self.cfg["batch_size"]):
+                self._flush(batch)
+                batch, deadline = [], None
+
+            refresh = self.cfg["lexical_refresh_seconds"]
+            if refresh and self._dirty and time.monotonic() - self._last_lexical >= refresh:
+                self._refresh_lexical()
+
+    def _flush(self, batch: list[tuple[float, dict]]) -> None:
+        if not batch:
+            return
+        # A page re-extracted within one batch: keep its latest version
+        records = list({record["id"]: record for _, record in batch}.values())
+        try:
+            vectors = models.embed([r["document"][:4000] for r in records])
+            if len(vectors) != len(records):
+                raise RuntimeError(f"got {len(vectors)} embedding(s) for {len(records)} chunk(s)")
+
+            by_subject: dict[str, list[int]] = {}
+            for i, r in enumerate(records):
+                by_subject.setdefault(r["subject"], []).append(i)
+            for subject, idx in by_subject.items():
+                partition = upsert_with_partition(
+                    self.collection,
+                    subject,
+                    ids=[records[i]["id"] for i in idx],
+                    embeddings=[vectors[i] for i in idx],
+                    documents=[records[i]["document"] for i in idx],
+                    metadatas=[records[i]["metadata"] for i in idx],
+                )
+                if partition:
+                    self._partitions.add(partition)
+        except Exception as e:
+            print(f"   ❌ [stream] Batch of {len(records)} failed: {e}")
+            with self._lock:
+                self.stats["failed"] += len(records)
+            return
+
+        now = time.monotonic()
+        latencies = [now - submitted_at for submitted_at, _ in batch]
+        with self._lock:
+            self.stats["ingested"] += len(records)
+            self.stats["batches"] += 1
+            self.stats["max_latency"] = max(self.stats["max_latency"], *latencies)
+            self._latency_total += sum(latencies)
+        self._dirty = True
+        print(f"   🔎 [stream] {len(records)} chunk(s) searchable: " + ", ".join(r["id"] for r in records))
+
+    def _refresh_lexical(self) -> None:
+        """
+        Rebuild the BM25 indexes of the collections written since the last
+        refresh. A failed rebuild is counted and retried at the next refresh.
+        """
+        if not self._dirty:
+            return
+        self._last_lexical = time.monotonic()
+        try:
+            build_for_collection(self.collection)
+            for name in sorted(self._partitions):
+                build_for_collection(get_chroma_collection(name))
+        except Exception as e:
+            print(f"   ❌ [stream] Lexical index refresh failed: {e}")
+            with self._lock:
+                self.stats["lexical_failed"] += 1
+            return
+        self._dirty = False
+
+    def report(self) -> str:
+        s = self.stats
+        avg = self._latency_total / s["ingested"] if s["ingested"] else 0.0
+        return (
+            f"📦 Stream ingest: {s['ingested']} ingested in {s['batches']} batch(es), "
+            f"{s['skipped']} skipped, {s['failed']} failed, {s['lexical_failed']} lexical refresh(es) failed; "
+            f"extract→searchable {avg:.1f}s avg, {s['max_latency']:.1f}s max"
+        )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from extract.extract_multimodal_notes import process_all_folders
+
+    parser = argparse.ArgumentParser(description="Extract notes PDFs and ingest each chunk as soon as it is written.")
+    parser.add_argument("--path", default=CONFIG["paths"]["base_data"], help="Target directory for notes PDFs")
+    args = parser.parse_args()
+
+    with StreamIngest() as stream:
+        process_all_folders(args.path, on_chunk=stream.submit)
@@ -0,0 +1,376 @@
+"""
+watch_data.py
+─────────────
+Long-running watcher that keeps ChromaDB in sync with the data folder.
+
+Every `poll_seconds` the tree under CONFIG["paths"]["base_data"] is scanned
+for PDFs and extraction outputs (chunk_*.json, *_processed.json,
+syllabus_*.json). A burst of changes (a folder being copied in, a PDF being
+saved twice) is debounced: nothing happens until the tree has been stable
+for `debounce_seconds`. Then only what changed is redone:
+
+  notes PDF added/changed   chunks whose page_hash no longer matches the PDF
+                            are deleted (file + Chroma document) and
+                            re-extracted; the new chunks are streamed into
+                            Chroma as they are written (stream_ingest.py)
+  PYQ / syllabus PDF        the paper's outputs and documents are replaced;
+                            unchanged pages come back from the VLM response
+                            cache and the extraction job queue
+  JSON edited by hand       re-ingested, overwriting the old documents
+  PDF / JSON removed        its outputs and documents are deleted
+
+Afterwards the keyword map and unit embeddings are regenerated for the
+affected subjects only. Files present when the watcher starts are taken as
+already ingested (run the batch scripts once for an existing tree); the
+watcher's own writes are not reported back to it. A file whose update fails
+is logged and left out of the new baseline, so the next poll retries it.
+
+Plain polling (no watchdog dependency), so it also works on network and
+mounted drives. Settings: CONFIG["ingest"]["watch"].
+
+    python source_code/pipeline/watch_data.py
+    python source_code/pipeline/watch_data.py --path <dir>
+"""
+
+import os
+import re
+import shutil
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from source_code.config import CONFIG
+from utils import get_chroma_collection, delete_with_partition
+from extract.extract_multimodal_notes import infer_metadata_from_path, process_pdf, stale_chunks
+from extract.extract_multimodal_pyq import process_pyq
+from extract.extract_multimodal_syllabus import process_syllabus
+from ingest.ingest_multimodal import ingest_descriptions
+from ingest.ingest_multimodal_pyq import ingest_pyqs
+from ingest.ingest_multimodal_syllabus import ingest_syllabuses
+from pipeline.stream_ingest import StreamIngest
+from pipeline.generate_keyword_map import generate_keyword_map
+from pipeline import generate_unit_embeddings
+
+_CHUNK_NAME = re.compile(r"^chunk_(\d+)_(\d+)\.json$")
+
+# What a path is, as far as the watcher is concerned
+NOTES_PDF, PYQ_PDF, SYLLABUS_PDF = "notes_pdf", "pyq_pdf", "syllabus_pdf"
+NOTES_JSON, PYQ_JSON, SYLLABUS_JSON = "notes_json", "pyq_json", "syllabus_json"
+
+
+def classify_path(path: Path) -> str | None:
+    """Kind of a data file (see the constants above), or None if it is not watched."""
+    name = path.name
+    if path.suffix.lower() == ".pdf":
+        if "pyqs_processed" in path.parts:
+            return None
+        if "pyqs" in path.parts:
+            return PYQ_PDF
+        if "syllabus" in name.lower() or "syllabus" in path.parent.name.lower():
+            return SYLLABUS_PDF
+        if "notes" in path.parts:
+            return NOTES_PDF
+        return None
+    if _CHUNK_NAME.match(name):
+        return NOTES_JSON
+    if path.parent.name == "pyqs_processed" and name.endswith("_processed.json"):
+        return PYQ_JSON
+    if name.startswith("syllabus_") and name.endswith(".json"):
+        return SYLLABUS_JSON
+    return None
+
+
+def path_subject(path: Path) -> str:
+    """Subject as stored in metadata (upper-case), from the .../year_2/<SUBJECT>/... layout."""
+    return infer_metadata_from_path(path)["subject"].upper()
+
+
+def snapshot(root: Path) -> dict[str, tuple[int, int]]:
+    """{path: (size, mtime_ns)} of every watched file under `root`."""
+    state = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = Path(dirpath) / name
+            if classify_path(path) is None:
+                continue
+            try:
+                st = path.stat()
+            except OSError:   # removed while scanning
+                continue
+            state[str(path)] = (st.st_size, st.st_mtime_ns)
+    return state
+
+
+def diff(old: dict, new: dict) -> tuple[list[Path], list[Path]]:
+    """(added or changed, removed) paths between two snapshots."""
+    changed = [Path(p) for p, sig in sorted(new.items()) if old.get(p) != sig]
+    removed = [Path(p) for p in sorted(set(old) - set(new))]
+    return changed, removed
+
+
+class DataWatcher:
+    """
+    Polls `root` and re-extracts / re-ingests what changed.
+
+    Usage:
+        DataWatcher().run()
+    """
+
+    def __init__(self, root: str | None = None, cfg: dict | None = None):
+        self.root = Path(root or CONFIG["paths"]["base_data"])
+        self.cfg = cfg or CONFIG["ingest"]["watch"]
+        self.known = snapshot(self.root)
+
+    # ── Polling ───────────────────────────────────────────────────────────
+
+    def run(self) -> None:
+        print(f"👀 Watching {self.root} ({len(self.known)} file(s)); Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(self.cfg["poll_seconds"])
+                try:
+                    self.poll_once()
+                except Exception as e:   # e.g. the tree vanished mid-scan; try again next poll
+                    print(f"   ❌ Poll failed: {e}")
+        except KeyboardInterrupt:
+            print("\nStopped.")
+
+    def poll_once(self) -> set[str]:
+        """Handle whatever changed since the last poll; returns the affected subjects."""
+        current = snapshot(self.root)
+        if current == self.known:
+            return set()
+        current = self.wait_until_stable(current)
+        changed, removed = diff(self.known, current)
+        subjects, failed = set(), set(changed + removed)
+        try:
+            subjects, failed = self.handle(changed, removed)
+        finally:
+            # Re-baseline, so the chunks and JSONs written above are not seen as
+            # new changes — except the files that failed, which are retried
+            self.known = self.rebaseline(failed)
+        if subjects and self.cfg["refresh_keywords"]:
+            try:
+                self.refresh_keywords(subjects)
+            except Exception as e:
+                print(f"   ❌ Keyword refresh failed for {', '.join(sorted(subjects))}: {e}")
+        return subjects
+
+    def rebaseline(self, failed: set[Path]) -> dict:
+        """Snapshot of the tree with the failed paths kept at their old state, so diff() reports them again."""
+        state = snapshot(self.root)
+        for path in map(str, failed):
+            if path in self.known:
+                state[path] = self.known[path]
+            else:
+                state.pop(path, None)
+        return state
+
+    def wait_until_stable(self, current: dict) -> dict:
+        """Debounce: keep rescanning until nothing has changed for `debounce_seconds`."""
+        stable_since = time.monotonic()
+        while time.monotonic() - stable_since < self.cfg["debounce_seconds"]:
+            time.sleep(min(self.cfg["poll_seconds"], self.cfg["debounce_seconds"]))
+            latest = snapshot(self.root)
+            if latest != current:
+                current, stable_since = latest, time.monotonic()
+        return current
+
+    # ── Dispatch ──────────────────────────────────────────────────────────
+
+    def handle(self, changed: list[Path], removed: list[Path]) -> tuple[set[str], set[Path]]:
+        """
+        Apply one debounced batch of changes. A file whose update raises is
+        logged and skipped; the rest of the batch still goes through.
+
+        Returns:
+            (affected subjects, paths that failed)
+        """
+        subjects: set[str] = set()
+        failed: set[Path] = set()
+        kinds = {p: classify_path(p) for p in changed + removed}
+        print(f"\n🔄 {len(changed)} changed, {len(removed)} removed file(s)")
+
+        def attempt(paths: list[Path], action) -> None:
+            try:
+                subjects.update(action())
+            except Exception as e:
+                print(f"   ❌ {', '.join(p.name for p in paths)}: {e}")
+                failed.update(paths)
+
+        # Removals first, so a renamed PDF does not leave its old documents behind
+        for path in removed:
+            attempt([path], lambda: self.remove(path, kinds[path]))
+
+        pdfs = [p for p in changed if kinds[p].endswith("_pdf")]
+        notes_pdfs = [p for p in pdfs if kinds[p] == NOTES_PDF]
+        if notes_pdfs:
+            def update_notes():
+                with StreamIngest() as stream:
+                    for pdf in notes_pdfs:
+                        attempt([pdf], lambda: self.update_notes_pdf(pdf, stream.submit))
+                return set()
+            attempt(notes_pdfs, update_notes)
+        for pdf in pdfs:
+            if kinds[pdf] == PYQ_PDF:
+                attempt([pdf], lambda: self.update_pyq_pdf(pdf))
+            elif kinds[pdf] == SYLLABUS_PDF:
+                attempt([pdf], lambda: self.update_syllabus_pdf(pdf))
+
+        # JSONs changed on their own (hand edits, outputs copied in) — not
+        # the ones just rewritten for a changed PDF
+        outputs = {p for pdf in pdfs for p in self.outputs_of(pdf, kinds[pdf])}
+        edited = {kind: [p for p in changed if kinds[p] == kind and p not in outputs]
+                  for kind in (NOTES_JSON, PYQ_JSON, SYLLABUS_JSON)}
+
+        def reingest(paths: list[Path], ingest) -> set[str]:
+            ingest(json_files=paths, force=True)
+            return {path_subject(p) for p in paths}
+
+        def reingest_pyqs(paths: list[Path]) -> set[str]:
+            for path in paths:
+                self.delete_pyq_documents(path)
+            return reingest(paths, ingest_pyqs)
+
+        if edited[NOTES_JSON]:
+            attempt(edited[NOTES_JSON], lambda: reingest(edited[NOTES_JSON], ingest_descriptions))
+        if edited[PYQ_JSON]:
+            attempt(edited[PYQ_JSON], lambda: reingest_pyqs(edited[PYQ_JSON]))
+        if edited[SYLLABUS_JSON]:
+            attempt(edited[SYLLABUS_JSON], lambda: reingest(edited[SYLLABUS_JSON], ingest_syllabuses))
+
+        return subjects - {"UNKNOWN"}, failed
+
+    @staticmethod
+    def outputs_of(pdf: Path, kind: str) -> list[Path]:
+        """Extraction outputs written for `pdf`."""
+        if kind == NOTES_PDF:
+            return sorted((pdf.parent / pdf.stem).glob("chunk_*.json"))
+        if kind == PYQ_PDF:
+            return [pdf.parent / "pyqs_processed" / f"{pdf.stem}_processed.json"]
+        if kind == SYLLABUS_PDF:
+            return sorted(pdf.parent.glob("syllabus_*.json"))
+        return []
+
+    # ── Notes ─────────────────────────────────────────────────────────────
+
+    def update_notes_pdf(self, pdf: Path, on_chunk) -> set[str]:
+        """Drop the chunks whose pages changed, then extract (and stream) just those."""
+        stale = stale_chunks(pdf)
+        for chunk_path in stale:
+            self.delete_notes_chunk(chunk_path)
+            chunk_path.unlink(missing_ok=True)
+        if stale:
+            print(f"   ♻ {pdf.name}: {len(stale)} changed chunk(s) to re-extract")
+        process_pdf(pdf, on_chunk=on_chunk)
+        return {path_subject(pdf)}
+
+    def delete_notes_chunk(self, chunk_path: Path) -> None:
+        """Delete the Chroma document of a chunk_N_N.json (which may already be gone)."""
+        m = _CHUNK_NAME.match(chunk_path.name)
+        subject = path_subject(chunk_path)
+        delete_with_partition(
+            get_chroma_collection(CONFIG["paths"]["collections"]["notes"]),
+            subject,
+            {"subject": subject, "source": f"{chunk_path.parent.name}.pdf", "page_start": int(m.group(1))},
+        )
+
+    # ── PYQs ──────────────────────────────────────────────────────────────
+
+    def update_pyq_pdf(self, pdf: Path) -> set[str]:
+        out_file = self.outputs_of(pdf, PYQ_PDF)[0]
+        self.delete_pyq_documents(out_file)
+        out_file.unlink(missing_ok=True)
+        process_pyq(pdf)
+        if out_file.exists():
+            ingest_pyqs(json_files=[out_file], force=True)
+        return {path_subject(pdf)}
+
+    def delete_pyq_documents(self, out_file: Path) -> None:
+        """Delete every question ingested from the paper behind a *_processed.json."""
+        source = f"{out_file.name[:-len('_processed.json')]}.pdf"
+        subject = path_subject(out_file)
+        delete_with_partition(
+            get_chroma_collection(CONFIG["paths"]["collections"]["pyq"]),
+            subject,
+            {"subject": subject, "source": source},
+        )
+
+    # ── Syllabus ──────────────────────────────────────────────────────────
+
+    def update_syllabus_pdf(self, pdf: Path) -> set[str]:
+        subject = path_subject(pdf)
+        delete_with_partition(
+            get_chroma_collection(CONFIG["paths"]["collections"]["syllabus"]),
+            subject,
+            {"subject": subject, "source": pdf.name},
+        )
+        process_syllabus(pdf, force=True)
+        written = self.outputs_of(pdf, SYLLABUS_PDF)
+        if written:
+            ingest_syllabuses(json_files=written, force=True)
+        return {subject}
+
+    # ── Removals ──────────────────────────────────────────────────────────
+
+    def remove(self, path: Path, kind: str) -> set[str]:
+        subject = path_subject(path)
+        print(f"   🗑 {path.name} removed")
+        if kind == NOTES_PDF:
+            delete_with_partition(
+                get_chroma_collection(CONFIG["paths"]["collections"]["notes"]),
+                subject,
+                {"subject": subject, "source": path.name},
+            )
+            shutil.rmtree(path.parent / path.stem, ignore_errors=True)
+        elif kind == NOTES_JSON:
+            self.delete_notes_chunk(path)
+        elif kind == PYQ_PDF:
+            out_file = self.outputs_of(path, PYQ_PDF)[0]
+            self.delete_pyq_documents(out_file)
+            out_file.unlink(missing_ok=True)
+        elif kind == PYQ_JSON:
+            self.delete_pyq_documents(path)
+        elif kind == SYLLABUS_PDF:
+            delete_with_partition(
+                get_chroma_collection(CONFIG["paths"]["collections"]["syllabus"]),
+                subject,
+                {"subject": subject, "source": path.name},
+            )
+            for out_file in self.outputs_of(path, SYLLABUS_PDF):
+                out_file.unlink(missing_ok=True)
+        elif kind == SYLLABUS_JSON:
+            delete_with_partition(
+                get_chroma_collection(CONFIG["paths"]["collections"]["syllabus"]),
+                subject,
+                {"subject": subject, "chunk_type": _syllabus_chunk_type(path)},
+            )
+        return {subject}
+
+    # ── Keyword map ───────────────────────────────────────────────────────
+
+    @staticmethod
+    def refresh_keywords(subjects: set[str]) -> None:
+        print(f"\n🔑 Refreshing keyword map + unit embeddings for: {', '.join(sorted(subjects))}")
+        generate_keyword_map(subjects=sorted(subjects))
+        generate_unit_embeddings.main(subjects=sorted(subjects))
+
+
+def _syllabus_chunk_type(path: Path) -> str:
+    """chunk_type stored for a syllabus_*.json (see extract_multimodal_syllabus.py)."""
+    stem = path.stem[len("syllabus_"):]
+    return {"co": "course_outcomes", "books": "books_references"}.get(stem, stem)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Watch the data folder and ingest changes incrementally.")
+    parser.add_argument("--path", default=CONFIG["paths"]["base_data"], help="Data directory to watch")
+    args = parser.parse_args()
+
+    DataWatcher(args.path).run()
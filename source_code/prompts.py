@@ -62,6 +62,31 @@ Return ONLY a valid JSON object (no markdown fences, no extra text):
 """
 
 
+def notes_batch_extraction(page_numbers: list[int]) -> str:
+    """
+    NOTES_EXTRACTION for several pages in one VLM call: one result object
+    per page, tagged with its page number so the response can be split back
+    into per-page chunk files.
+
+    Args:
+        page_numbers: 1-based PDF page numbers, in the order of the images.
+    """
+    pages = ", ".join(str(n) for n in page_numbers)
+    return f"""\
+You will receive {len(page_numbers)} images. Each image is ONE PDF page; in order they are \
+pages {pages}. Process EVERY page separately with the instructions below — never merge \
+two pages into one result.
+
+Return ONLY a JSON object of this form (no markdown fences, no extra text):
+
+{{"pages": [{{"page": <page number>, ...the per-page fields...}}, ...]}}
+
+with exactly one entry per page, in the same order. The "Output Format" below describes \
+the fields of ONE entry.
+
+""" + NOTES_EXTRACTION
+
+
 SYLLABUS_EXTRACTION = """\
 You are a precise syllabus extraction system for university course documents.
 
@@ -114,6 +139,28 @@ and leave reference_books empty.
 """
 
 
+def syllabus_text_extraction(page_text: str) -> str:
+    """
+    SYLLABUS_EXTRACTION for a page whose PDF text layer was extracted instead
+    of rendered (see extract/page_classifier.py). Table cells arrive as plain
+    lines in reading order.
+
+    Args:
+        page_text: Text layer of one syllabus page.
+    """
+    return (
+        SYLLABUS_EXTRACTION
+        .replace("You will receive image(s) of", "You will receive the extracted text of")
+        .replace("not visible in the image", "not present in the text")
+        + f"""
+Syllabus page text:
+\"\"\"
+{page_text}
+\"\"\"
+"""
+    )
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 # 2. RAG CHAT PROMPTS
 # ══════════════════════════════════════════════════════════════════════════════
@@ -184,6 +231,34 @@ Rules:
 
     return "\n\n".join(sections)
 
+def conversation_summary(previous_summary: str, turns: str, max_words: int = 180) -> str:
+    """
+    Prompt for folding older chat turns into the running session summary.
+
+    Args:
+        previous_summary: The summary so far ("" for the first fold).
+        turns:            The aged-out turns, formatted "ROLE: content".
+        max_words:        Soft length cap for the new summary.
+    """
+    previous = previous_summary.strip() or "(none yet)"
+    return f"""\
+You maintain a running memory of a tutoring session between a student and uniAI,
+a syllabus-aware exam assistant.
+
+Current summary:
+{previous}
+
+New conversation turns to merge into the summary:
+{turns}
+
+Write the updated summary in at most {max_words} words. Keep:
+- the subjects, units and topics the student asked about, in order
+- definitions, formulas or key points the assistant gave that later questions may refer to
+- any preferences the student stated (answer length, exam marks, language)
+Drop greetings, formatting and repeated content. Output only the summary text.\
+"""
+
+
 def topic_list(subject: str, unit: str) -> str:
     """Prompt for listing topics in a unit — used when the query is a unit overview."""
     return (
@@ -285,6 +360,30 @@ Analyze the key concepts in the question and match them to the topics covered in
 Only output the unit number as an integer (e.g., 1, 3, 5). No other text or explanation.
 """
 
+def pyq_unit_classification_batch(questions: list[str], syllabus_units: str) -> str:
+    """
+    Classify all questions of a paper in one call (see extract/unit_classifier.py).
+
+    Args:
+        questions:      Question texts; they are numbered from 1 in the prompt.
+        syllabus_units: Formatted string of syllabus units (Unit X: topic1, topic2 ...).
+    """
+    numbered = "\n".join(f"{i}. {q}" for i, q in enumerate(questions, 1))
+    return f"""\
+You are an expert academic classifier.
+Given the following syllabus units for a course:
+{syllabus_units}
+
+And the following numbered exam questions:
+{numbered}
+
+Classify EACH question into the most appropriate unit number (1-5).
+Analyze the key concepts in each question and match them to the topics covered in each unit.
+Return ONLY a JSON object mapping every question number to its unit number, e.g.
+{{"1": 3, "2": 1, "3": 5}}
+No other text or explanation.
+"""
+
 PYQ_VLM_TRANSCRIPTION = """\
 Read the text from this image block. It is part of a university exam question paper.
 Transcribe it faithfully:
@@ -0,0 +1,395 @@
+"""
+provider_router.py
+──────────────────
+Latency- and failure-aware routing across the chat providers in models.py.
+
+models.chat() talks to exactly one provider and turns any failure into a
+"⚠ ... Error" string after waiting out the SDK timeout. This module sits in
+front of models.chat_or_raise() and keeps answer latency bounded while an
+upstream provider is slow or down:
+
+1. **Rolling health**: every call records its latency and outcome in a
+   per-provider window (p95 latency + error rate).
+2. **Circuit breaker**: a provider whose error rate or consecutive failures
+   cross the configured limits is "open" and skipped until a cooldown has
+   passed; then a single half-open probe decides whether it closes again.
+3. **Fallback**: failures move on to the next configured provider
+   (e.g. gemini → groq → ollama).
+4. **Hedging** (optional): if the first provider has not answered within its
+   p95 budget, a second request is sent to the next provider and whichever
+   succeeds first wins.
+
+All knobs live in CONFIG["provider_routing"].
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+from source_code import models
+from source_code.config import CONFIG
+
+
+class ProviderUnavailable(RuntimeError):
+    """Raised when no chat provider produced an answer before the deadline."""
+
+
+# ---------------------------------------------------------------------------
+# Per-provider health
+# ---------------------------------------------------------------------------
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderHealth:
+    """
+    Rolling latency/error window and circuit-breaker state for one provider.
+
+    All methods are thread-safe; hedged and abandoned calls report back from
+    worker threads.
+    """
+
+    def __init__(self, name: str, window: int):
+        self.name = name
+        self._samples: deque = deque(maxlen=window)  # (latency_s, ok)
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+        self.in_flight = 0   # calls holding one of this provider's pool workers
+
+    # -- bookkeeping ------------------------------------------------------
+
+    def record(self, latency: float, ok: bool) -> None:
+        cfg = CONFIG["provider_routing"]
+        with self._lock:
+            self._samples.append((latency, ok))
+            if ok:
+                self.consecutive_failures = 0
+                if self.state != CLOSED:
+                    # Successful probe — start over with a clean window
+                    self._samples.clear()
+                    self._samples.append((latency, ok))
+                self.state = CLOSED
+            else:
+                self.consecutive_failures += 1
+                if self.state == HALF_OPEN or self._should_trip(cfg):
+                    self.state = OPEN
+                    self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def _should_trip(self, cfg: dict) -> bool:
+        if self.consecutive_failures >= cfg["consecutive_failures"]:
+            return True
+        if len(self._samples) < cfg["min_calls"]:
+            return False
+        return self._error_rate() >= cfg["error_rate_threshold"]
+
+    def _error_rate(self) -> float:
+        if not self._samples:
+            return 0.0
+        failures = sum(1 for _, ok in self._samples if not ok)
+        return failures / len(self._samples)
+
+    def release_probe(self) -> None:
+        """Free the half-open slot of a probe whose result will be ignored."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def acquire_worker(self) -> bool:
+        """
+        Reserve one of the provider's `workers_per_provider` pool workers.
+
+        Hung calls keep their worker until the SDK timeout even after the
+        request gave up on them; once they hold them all, the provider is
+        skipped instead of queueing new requests behind them.
+        """
+        with self._lock:
+            if self.in_flight >= CONFIG["provider_routing"]["workers_per_provider"]:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release_worker(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    # -- queries ----------------------------------------------------------
+
+    def allow_request(self) -> bool:
+        """
+        Return True if a request may be sent now.
+
+        An open circuit lets exactly one probe through once the cooldown has
+        elapsed (half-open); everything else is rejected until it reports.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            cooldown = CONFIG["provider_routing"]["cooldown_s"]
+            if self.state == OPEN and time.monotonic() - self.opened_at >= cooldown:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def p95(self) -> Optional[float]:
+        """95th percentile latency of recent successful calls, if known."""
+        with self._lock:
+            latencies = [lat for lat, ok in self._samples if ok]
+        if len(latencies) < CONFIG["provider_routing"]["min_calls"]:
+            return None
+        return _p95(latencies)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = [lat for lat, ok in self._samples if ok]
+            p95 = _p95(latencies) if latencies else None
+            return {
+                "state": self.state,
+                "calls": len(self._samples),
+                "error_rate": round(self._error_rate(), 3),
+                "consecutive_failures": self.consecutive_failures,
+                "p95_s": round(p95, 3) if p95 is not None else None,
+            }
+
+
+def _p95(latencies: list[float]) -> float:
+    ordered = sorted(latencies)
+    idx = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+_health: Dict[str, ProviderHealth] = {}
+_health_lock = threading.Lock()
+
+# Worker threads outlive abandoned (timed-out / hedged-away) calls, so each
+# provider gets its own small pool: a hung provider can only exhaust its own
+# workers, never those of the fallbacks.
+_executors: Dict[str, ThreadPoolExecutor] = {}
+
+
+def get_health(provider: str) -> ProviderHealth:
+    """Return (creating if needed) the health tracker for a provider."""
+    with _health_lock:
+        if provider not in _health:
+            _health[provider] = ProviderHealth(provider, CONFIG["provider_routing"]["window"])
+        return _health[provider]
+
+
+def get_executor(provider: str) -> ThreadPoolExecutor:
+    """Return (creating if needed) the worker pool of a provider."""
+    with _health_lock:
+        if provider not in _executors:
+            _executors[provider] = ThreadPoolExecutor(
+                max_workers=CONFIG["provider_routing"]["workers_per_provider"],
+                thread_name_prefix=f"provider_router_{provider}",
+            )
+        return _executors[provider]
+
+
+def stats() -> dict:
+    """Snapshot of every provider's circuit state, for logs or health checks."""
+    with _health_lock:
+        providers = list(_health.values())
+    return {h.name: h.snapshot() for h in providers}
+
+
+def reset() -> None:
+    """Forget all recorded health (used by tests and after config changes)."""
+    with _health_lock:
+        _health.clear()
+
+
+# ---------------------------------------------------------------------------
+# Provider chain
+# ---------------------------------------------------------------------------
+
+def _is_configured(provider: str) -> bool:
+    """A cloud provider without an API key can never succeed — skip it."""
+    profile = CONFIG["model_configs"].get(provider)
+    if profile is None:
+        return False
+    return "api_key" not in profile or bool(profile["api_key"])
+
+
+def provider_chain(primary: Optional[str] = None) -> List[str]:
+    """
+    Ordered list of providers to try: the primary first, then the configured
+    fallbacks, without duplicates or unconfigured cloud providers.
+    """
+    primary = primary or CONFIG["providers"]["chat"]
+    chain = [primary] + list(CONFIG["provider_routing"]["fallback_chain"])
+    ordered = list(dict.fromkeys(chain))
+    return [p for p in ordered if p == primary or _is_configured(p)]
+
+
+def _hedge_delay(provider: str) -> float:
+    cfg = CONFIG["provider_routing"]
+    p95 = get_health(provider).p95()
+    if p95 is None:
+        return cfg["hedge_default_s"]
+    return max(cfg["hedge_min_s"], p95)
+
+
+class _Attempt:
+    """
+    One in-flight provider call; abandoned attempts stop reporting.
+
+    `submitted` drives hedging (what the user waits for); `started` is set
+    once a pool worker picks the call up, so time queued behind other
+    requests is never charged to the provider's latency window or breaker.
+    """
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.submitted = time.monotonic()
+        self.started: Optional[float] = None
+        self.abandoned = False
+
+
+def _run(attempt: _Attempt, call_kwargs: dict) -> str:
+    health = get_health(attempt.provider)
+    try:
+        return _call(attempt, health, call_kwargs)
+    finally:
+        health.release_worker()
+
+
+def _call(attempt: _Attempt, health: ProviderHealth, call_kwargs: dict) -> str:
+    if attempt.abandoned:
+        # Gave up on while still queued: never reached the provider
+        health.release_probe()
+        raise ProviderUnavailable(f"{attempt.provider}: abandoned before start")
+    attempt.started = time.monotonic()
+    try:
+        # Each provider uses its own model profile — never forward a model
+        # name that belongs to the primary provider.
+        text = models.chat_or_raise(provider=attempt.provider, **call_kwargs)
+    except Exception:
+        if attempt.abandoned:
+            health.release_probe()
+        else:
+            health.record(time.monotonic() - attempt.started, ok=False)
+        raise
+    if attempt.abandoned:
+        health.release_probe()
+    else:
+        health.record(time.monotonic() - attempt.started, ok=True)
+    return text
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def chat(
+    prompt: Optional[str] = None,
+    system_prompt: Optional[str] = None,
+    messages: Optional[List[Dict[str, str]]] = None,
+    provider: Optional[str] = None,
+    **kwargs
+) -> str:
+    """
+    Generate a chat completion with circuit breaking, fallback and hedging.
+
+    Accepts the same arguments as models.chat() (minus `model`, which is
+    resolved per provider).
+
+    Args:
+        prompt:        Simple user prompt string.
+        system_prompt: Optional system-level instructions.
+        messages:      OpenAI-style list of message dicts.
+        provider:      Primary provider; defaults to the active chat provider.
+        **kwargs:      Generation parameters forwarded to every provider.
+
+    Returns:
+        The first successful completion.
+
+    Raises:
+        ProviderUnavailable: If every provider failed, was open, or the
+                             request deadline expired.
+    """
+    cfg = CONFIG["provider_routing"]
+    call_kwargs = {"prompt": prompt, "system_prompt": system_prompt, "messages": messages, **kwargs}
+
+    if not cfg["enabled"]:
+        return models.chat_or_raise(provider=provider, **call_kwargs)
+
+    queue = provider_chain(provider)
+    deadline = time.monotonic() + cfg["request_timeout_s"]
+    pending: dict = {}   # future → _Attempt
+    errors: list[str] = []
+
+    def launch() -> bool:
+        while queue:
+            name = queue.pop(0)
+            health = get_health(name)
+            if not health.acquire_worker():
+                errors.append(f"{name}: all workers busy")
+                continue
+            if not health.allow_request():
+                health.release_worker()
+                errors.append(f"{name}: circuit open")
+                continue
+            attempt = _Attempt(name)
+            pending[get_executor(name).submit(_run, attempt, call_kwargs)] = attempt
+            return True
+        return False
+
+    launch()
+    while pending:
+        now = time.monotonic()
+        remaining = deadline - now
+        if remaining <= 0:
+            break
+
+        timeout = remaining
+        hedge_at = None
+        if cfg["hedge"] and len(pending) == 1 and queue:
+            first = next(iter(pending.values()))
+            hedge_at = first.submitted + _hedge_delay(first.provider)
+            timeout = max(0.0, min(remaining, hedge_at - now))
+
+        done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+        if not done:
+            if hedge_at is not None and time.monotonic() >= hedge_at:
+                slow = next(iter(pending.values()))
+                print(f"[provider_router] {slow.provider} slower than its p95 budget — hedging")
+                launch()
+            continue
+
+        for fut in done:
+            attempt = pending.pop(fut)
+            try:
+                text = fut.result()
+            except Exception as exc:
+                errors.append(f"{attempt.provider}: {exc}")
+                print(f"[provider_router] {attempt.provider} failed: {str(exc)[:120]}")
+                continue
+            # Losing hedges keep running in the pool; do not let them
+            # skew the latency window.
+            for other in pending.values():
+                other.abandoned = True
+            if attempt.provider != (provider or CONFIG["providers"]["chat"]):
+                print(f"[provider_router] answered by fallback provider '{attempt.provider}'")
+            return text
+
+        if not pending:
+            launch()
+
+    # Deadline hit (or everything failed): count stragglers as timeouts.
+    for attempt in pending.values():
+        attempt.abandoned = True
+        if attempt.started is not None:   # still queued: not the provider's fault
+            get_health(attempt.provider).record(time.monotonic() - attempt.started, ok=False)
+        errors.append(f"{attempt.provider}: timed out")
+
+    raise ProviderUnavailable("; ".join(errors) or "no chat provider available")
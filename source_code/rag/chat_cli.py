@@ -92,6 +92,7 @@ def _handle_command(
     query: str,
     session_subject: str | None,
     history: list[dict],
+    session_state: dict | None = None,
 ) -> tuple[str | None, bool]:
     """
     Parse and execute a user command (starting with '/').
@@ -100,6 +101,7 @@ def _handle_command(
         query:           The raw command string.
         session_subject: The current subject lock (if any).
         history:         The conversation history.
+        session_state:   Cached per-session pipeline state (summary etc.).
 
     Returns:
         A tuple of (new_session_subject, should_continue_loop).
@@ -138,6 +140,8 @@ def _handle_command(
 
     if cmd == "/clear":
         history.clear()
+        if session_state is not None:
+            session_state.clear()
         print("  ✅ Conversation history cleared.")
         return session_subject, False
 
@@ -157,6 +161,7 @@ def chat():
     _print_header()
 
     history: list[dict] = []
+    session_state: dict = {}
     session_subject: str | None = None
     first_query = True
 
@@ -176,7 +181,7 @@ def chat():
 
         # Handle /commands
         if query.startswith("/"):
-            session_subject, _ = _handle_command(query, session_subject, history)
+            session_subject, _ = _handle_command(query, session_subject, history, session_state)
             continue
 
         # Auto-detect subject on the first real query if not locked
@@ -188,6 +193,7 @@ def chat():
             query=query,
             history=history,
             session_subject=session_subject,
+            session_state=session_state,
         )
 
         # Lock subject for session after first successful detection
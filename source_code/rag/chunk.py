@@ -0,0 +1,95 @@
+"""
+chunk.py
+────────
+The retrieval result type shared by search, reranking, caching and context
+building.
+
+A Chunk is a slotted dataclass: one fixed-layout object per hit instead of a
+dict, carrying the Chroma id and every score in place. Rerankers set
+``final_score`` on the object rather than copying it into a new dict, and
+caches/dedup key on ``id``.
+
+It keeps the read/write mapping protocol of the dicts it replaced
+(``chunk["text"]``, ``chunk.get("final_score", 0)``, ``"fused_score" in
+chunk``, ``{**chunk}``), so code that also handles plain dicts — tests,
+snapshot search results, session state — works unchanged. Optional scores
+that were never set behave like missing keys.
+
+Session state must stay JSON-serialisable: store ``to_dict()`` and rebuild
+with ``Chunk.from_dict()``.
+"""
+
+from dataclasses import dataclass, fields, replace
+
+
+@dataclass(slots=True)
+class Chunk:
+    id:          str
+    text:        str
+    metadata:    dict
+    distance:    float                 # cosine distance (lower = more similar)
+    similarity:  float                 # 1 - distance (higher = more similar)
+    collection:  str                   # alias of the collection it came from
+    embedding:   list[float] | None = None
+    fused_score: float | None = None   # RRF score (hybrid retrieval)
+    final_score: float | None = None   # reranker score
+
+    # -- mapping protocol -----------------------------------------------------
+
+    def __getitem__(self, key: str):
+        if key not in _FIELDS:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is None and key in _OPTIONAL:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value) -> None:
+        if key not in _FIELDS:
+            raise KeyError(f"Chunk has no field '{key}'")
+        setattr(self, key, value)
+
+    def __contains__(self, key: object) -> bool:
+        return key in _FIELDS and (key not in _OPTIONAL or getattr(self, key) is not None)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> list[str]:
+        return [k for k in _FIELDS if k in self]
+
+    def items(self) -> list[tuple]:
+        return [(k, getattr(self, k)) for k in self.keys()]
+
+    # -- conversion -----------------------------------------------------------
+
+    def to_dict(self, embedding: bool = True) -> dict:
+        """Plain dict of the set fields (optionally without the embedding)."""
+        return {k: v for k, v in self.items() if embedding or k != "embedding"}
+
+    @classmethod
+    def from_dict(cls, data: dict, **overrides) -> "Chunk":
+        """Build from a chunk dict (unknown keys ignored), with field overrides."""
+        values = {k: data[k] for k in _FIELDS if k in data}
+        values.update(overrides)
+        values.setdefault("id", "")
+        values.setdefault("metadata", {})
+        values.setdefault("collection", "")
+        return cls(**values)
+
+    def copy(self, **changes) -> "Chunk":
+        return replace(self, **changes)
+
+
+_FIELDS = tuple(f.name for f in fields(Chunk))
+_OPTIONAL = frozenset({"embedding", "fused_score", "final_score"})
+
+
+def as_dict(chunk, embedding: bool = True) -> dict:
+    """Plain-dict form of a Chunk or chunk dict (for session state / JSON)."""
+    if not isinstance(chunk, dict):
+        return chunk.to_dict(embedding)
+    return {k: v for k, v in chunk.items() if embedding or k != "embedding"}
@@ -7,8 +7,212 @@ ready for LLM consumption.
 This module acts as the 'Prompt Engineering' layer, ensuring that
 metadata is preserved and presented in a way that helps the LLM
 cite sources accurately.
+
+It also keeps the prompt inside a token budget (CONFIG["rag"]["context_packing"]):
+pack_chunks() drops near-duplicate chunks, splits the budget across chunks by
+rerank score and trims each chunk to its most query-relevant sentences, and
+build_history_block() keeps only as much recent history as fits.
 """
 
+import math
+import re
+
+from source_code import models
+from source_code.config import CONFIG
+
+
+# ---------------------------------------------------------------------------
+# Token-budgeted packing
+# ---------------------------------------------------------------------------
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+_STOP_WORDS = {
+    "the", "and", "for", "are", "what", "which", "with", "from", "that", "this",
+    "explain", "define", "describe", "discuss", "write", "short", "note", "notes",
+    "about", "how", "why", "its", "their", "into", "between", "give",
+}
+
+
+def _words(text: str) -> list[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def _shingles(text: str, n: int = 3) -> set[tuple]:
+    words = _words(text)
+    if len(words) < n:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def _is_duplicate(shingles: set, kept: list[set], threshold: float) -> bool:
+    """True if `shingles` is mostly contained in (or contains) an already kept chunk."""
+    if not shingles:
+        return False
+    for other in kept:
+        if not other:
+            continue
+        overlap = len(shingles & other) / min(len(shingles), len(other))
+        if overlap >= threshold:
+            return True
+    return False
+
+
+def _chunk_score(chunk: dict) -> float:
+    return max(float(chunk.get("final_score", chunk.get("similarity", 0)) or 0), 1e-3)
+
+
+def _allocate(needs: list[int], weights: list[float], budget: int) -> list[int]:
+    """
+    Split `budget` across chunks in proportion to `weights`.
+
+    Chunks that need less than their share get exactly what they need and the
+    surplus is redistributed among the rest (water-filling).
+    """
+    alloc = [0] * len(needs)
+    open_idx = list(range(len(needs)))
+    remaining = budget
+
+    while open_idx and remaining > 0:
+        total_w = sum(weights[i] for i in open_idx)
+        shares = {i: remaining * weights[i] / total_w for i in open_idx}
+        satisfied = [i for i in open_idx if needs[i] <= shares[i]]
+        if not satisfied:
+            for i in open_idx:
+                alloc[i] = int(shares[i])
+            break
+        for i in satisfied:
+            alloc[i] = needs[i]
+            remaining -= needs[i]
+            open_idx.remove(i)
+
+    return alloc
+
+
+def _trim_to_budget(text: str, query_terms: set[str], budget: int) -> str:
+    """
+    Keep the sentences of `text` most relevant to the query, within `budget`
+    tokens, in their original order. The first line (the metadata prefix
+    "Subject: … | Topics: …") gets a small bonus so chunks keep their label.
+    """
+    sentences = [s.strip() for s in _SENTENCE_SPLIT_RE.split(text) if s and s.strip()]
+    if not sentences:
+        return ""
+
+    scored = []
+    for idx, sent in enumerate(sentences):
+        words = set(_words(sent))
+        overlap = len(words & query_terms)
+        score = overlap / math.sqrt(len(words) + 1)
+        if idx == 0:
+            score += 0.5
+        scored.append((score, idx, sent))
+
+    selected: list[tuple[int, str]] = []
+    used = 0
+    for score, idx, sent in sorted(scored, key=lambda t: (-t[0], t[1])):
+        cost = models.count_tokens(sent)
+        if used + cost > budget:
+            continue
+        selected.append((idx, sent))
+        used += cost
+
+    selected.sort()
+    parts = []
+    prev = -1
+    for idx, sent in selected:
+        if prev != -1 and idx != prev + 1:
+            parts.append("…")
+        parts.append(sent)
+        prev = idx
+    return "\n".join(parts)
+
+
+def pack_chunks(
+    chunks: list[dict],
+    query: str,
+    budget: int | None = None,
+) -> tuple[list[dict], dict]:
+    """
+    Fit ranked chunks into a token budget before they are formatted.
+
+    Steps:
+      1. Drop chunks whose word shingles largely overlap a higher-ranked chunk.
+      2. If everything fits, keep chunks verbatim.
+      3. Otherwise split the budget by rerank score and trim each chunk to its
+         most query-relevant sentences. Chunks whose share falls below
+         `min_chunk_tokens` are dropped.
+
+    Args:
+        chunks: Ranked chunk dicts (best first) with "text" and a score.
+        query:  The (expanded) student query used for sentence relevance.
+        budget: Token budget; defaults to the configured `context_budget`.
+
+    Returns:
+        (packed_chunks, stats) where stats has tokens_before, tokens_after,
+        tokens_saved and duplicates_dropped.
+    """
+    cfg = CONFIG["rag"]["context_packing"]
+    budget = cfg["context_budget"] if budget is None else budget
+    header = cfg["header_tokens"]
+
+    stats = {"tokens_before": 0, "tokens_after": 0, "tokens_saved": 0, "duplicates_dropped": 0}
+    if not chunks:
+        return [], stats
+
+    token_counts = [models.count_tokens(c["text"]) + header for c in chunks]
+    stats["tokens_before"] = sum(token_counts)
+
+    if not cfg["enabled"]:
+        stats["tokens_after"] = stats["tokens_before"]
+        return list(chunks), stats
+
+    # 1. Dedupe
+    kept, kept_tokens, kept_shingles = [], [], []
+    for chunk, n_tokens in zip(chunks, token_counts):
+        sh = _shingles(chunk["text"])
+        if _is_duplicate(sh, kept_shingles, cfg["dedupe_threshold"]):
+            stats["duplicates_dropped"] += 1
+            continue
+        kept.append(chunk)
+        kept_tokens.append(n_tokens)
+        kept_shingles.append(sh)
+
+    # 2. Everything fits
+    if sum(kept_tokens) <= budget:
+        stats["tokens_after"] = sum(kept_tokens)
+        stats["tokens_saved"] = stats["tokens_before"] - stats["tokens_after"]
+        return kept, stats
+
+    # 3. Score-weighted allocation + sentence trimming
+    alloc = _allocate(kept_tokens, [_chunk_score(c) for c in kept], budget)
+    query_terms = {w for w in _words(query) if len(w) > 2 and w not in _STOP_WORDS}
+
+    packed = []
+    for chunk, n_tokens, share in zip(kept, kept_tokens, alloc):
+        text_budget = share - header
+        if share >= n_tokens:
+            packed.append(chunk)
+            stats["tokens_after"] += n_tokens
+            continue
+        if text_budget < cfg["min_chunk_tokens"]:
+            continue
+        trimmed = _trim_to_budget(chunk["text"], query_terms, text_budget)
+        if not trimmed:
+            continue
+        # Copy only the trimmed chunks; the ranked list keeps the full text
+        packed.append({**chunk, "text": trimmed} if isinstance(chunk, dict) else chunk.copy(text=trimmed))
+        stats["tokens_after"] += models.count_tokens(trimmed) + header
+
+    stats["tokens_saved"] = stats["tokens_before"] - stats["tokens_after"]
+    return packed, stats
+
+
+# ---------------------------------------------------------------------------
+# Formatting
+# ---------------------------------------------------------------------------
+
 
 def build_context(chunks: list[dict]) -> str:
     """
@@ -50,27 +254,82 @@ def build_context(chunks: list[dict]) -> str:
     return "\n\n---\n\n".join(parts)
 
 
-def build_history_block(history: list[dict]) -> str:
+def build_history_block(
+    history: list[dict],
+    summary: str = "",
+    budget: int | None = None,
+) -> str:
     """
-    Format the recent conversation history into a compact text block.
+    Format the conversation memory into a compact text block.
+
+    The running summary of older turns (see conversation_memory) comes first,
+    then the recent verbatim turns. The budget goes to the most recent
+    exchange (the last user + assistant turns) first, so it always survives;
+    the summary gets what is left, then older turns newest-first. A turn or
+    summary larger than the remaining budget is cut to fit.
 
     Args:
-        history: List of {"role": "user"|"assistant", "content": "..."} dictionaries.
+        history: Recent {"role": "user"|"assistant", "content": "..."} turns.
+        summary: Running summary of the turns before `history`.
+        budget:  Token budget; defaults to the configured `history_budget`.
 
     Returns:
-        A string representing the previous conversation turns.
+        A string representing the previous conversation.
     """
-    if not history:
+    summary = (summary or "").strip()
+    if not history and not summary:
         return ""
 
-    lines = ["Previous conversation:"]
-    for turn in history:
-        role = turn.get("role", "user").upper()
+    cfg = CONFIG["rag"]["context_packing"]
+    if budget is None:
+        budget = cfg["history_budget"] if cfg["enabled"] else None
+
+    turns = []
+    for turn in reversed(history):
         content = turn.get("content", "").strip()
         if content:
-            lines.append(f"{role}: {content}")
+            turns.append(f"{turn.get('role', 'user').upper()}: {content}")
+    last_exchange, older = turns[:2], turns[2:]
+
+    remaining = budget
+    lines: list[str] = []   # newest first
+
+    def fit(text: str) -> str | None:
+        """`text`, cut to the remaining budget; None once it is spent."""
+        nonlocal remaining
+        if remaining is None:
+            return text
+        cost = models.count_tokens(text)
+        if cost <= remaining:
+            remaining -= cost
+            return text
+        if remaining >= cfg["min_chunk_tokens"]:
+            # Approximate cut by characters, proportional to tokens left
+            keep_chars = int(len(text) * remaining / cost)
+            remaining = 0
+            return text[:keep_chars].rstrip() + " …"
+        remaining = 0
+        return None
+
+    for line in last_exchange:
+        kept = fit(line)
+        if kept is None:
+            break
+        lines.append(kept)
+    if summary:
+        summary = fit(summary) or ""
+    for line in older:
+        kept = fit(line)
+        if kept is None:
+            break
+        lines.append(kept)
 
-    return "\n".join(lines)
+    sections = []
+    if summary:
+        sections.append(f"Summary of the earlier conversation:\n{summary}")
+    if lines:
+        sections.append("\n".join(["Previous conversation:"] + lines[::-1]))
+    return "\n\n".join(sections)
 
 
 def format_sources_for_display(chunks: list[dict]) -> list[str]:
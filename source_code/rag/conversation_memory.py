@@ -0,0 +1,223 @@
+"""
+conversation_memory.py
+──────────────────────
+Incremental summarization memory for long tutoring sessions.
+
+Replaying the whole history every turn makes prompt size grow with the
+session. Instead, turns that fall out of the verbatim window are folded
+into a running summary once (one LLM call per `fold_every` aged-out turns)
+and the summary is cached in the session state. Each prompt then carries:
+
+    summary of everything older  +  the last `verbatim_turns` exchanges
+
+so per-turn prompt size stays flat however long the session gets.
+
+State lives in a plain dict (``session_state["memory"]``) so any session
+store can persist it. Callers without session state (stateless API clients
+that resend their history) get an in-process LRU keyed by the digest of the
+turns already folded, so two conversations only share an entry when their
+summarised history is identical (and so is the summary).
+"""
+
+import hashlib
+import os
+import sys
+from collections import OrderedDict
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from source_code.config import CONFIG
+from source_code import provider_router
+import prompts
+
+# Memory states for callers that do not keep their own, keyed by prefix_digest
+_fallback_states: OrderedDict[str, dict] = OrderedDict()
+
+
+def _update(h, turn: dict) -> None:
+    h.update(turn.get("role", "").encode())
+    h.update(b"\0")
+    h.update(turn.get("content", "").encode())
+    h.update(b"\1")
+
+
+def _digest(turns: list[dict]) -> str:
+    h = hashlib.sha1()
+    for turn in turns:
+        _update(h, turn)
+    return h.hexdigest()
+
+
+def _prefix_digests(turns: list[dict]) -> list[str]:
+    """_digest(turns[:n]) for n = 1 … len(turns), in one pass."""
+    h = hashlib.sha1()
+    digests = []
+    for turn in turns:
+        _update(h, turn)
+        digests.append(h.copy().hexdigest())
+    return digests
+
+
+def _format_turns(turns: list[dict], max_chars: int) -> str:
+    lines = []
+    for turn in turns:
+        content = turn.get("content", "").strip()
+        if not content:
+            continue
+        if len(content) > max_chars:
+            content = content[:max_chars].rstrip() + " …"
+        lines.append(f"{turn.get('role', 'user').upper()}: {content}")
+    return "\n".join(lines)
+
+
+class ConversationMemory:
+    """
+    Running summary of the turns older than the verbatim window.
+
+    Attributes:
+        summary:          Compacted text of history[:summarized_turns].
+        summarized_turns: How many leading turns the summary covers.
+        prefix_digest:    Hash of those turns, used to notice that the caller
+                          sent a different (e.g. cleared or edited) history.
+    """
+
+    def __init__(self, state: dict):
+        self._state = state
+        self.summary: str = state.get("summary", "")
+        self.summarized_turns: int = state.get("summarized_turns", 0)
+        self.prefix_digest: str = state.get("prefix_digest", "")
+
+    def _save(self) -> None:
+        self._state.update({
+            "summary": self.summary,
+            "summarized_turns": self.summarized_turns,
+            "prefix_digest": self.prefix_digest,
+        })
+
+    def _reset(self) -> None:
+        self.summary = ""
+        self.summarized_turns = 0
+        self.prefix_digest = ""
+
+    def compact(self, history: list[dict]) -> tuple[str, list[dict]]:
+        """
+        Fold aged-out turns into the summary and return what to prompt with.
+
+        Args:
+            history: The full conversation so far (oldest first).
+
+        Returns:
+            (summary, recent_turns) — the running summary ("" if none yet)
+            and the turns not covered by it.
+        """
+        cfg = CONFIG["rag"]["memory"]
+
+        # History no longer starts with what we summarised → start over
+        if self.summarized_turns:
+            prefix = history[:self.summarized_turns]
+            if len(prefix) < self.summarized_turns or _digest(prefix) != self.prefix_digest:
+                self._reset()
+
+        cutoff = max(0, len(history) - cfg["verbatim_turns"] * 2)
+        if cutoff - self.summarized_turns >= cfg["fold_every"]:
+            aged_out = history[self.summarized_turns:cutoff]
+            new_summary = self._fold(aged_out)
+            if new_summary is not None:
+                self.summary = new_summary
+                self.summarized_turns = cutoff
+                self.prefix_digest = _digest(history[:cutoff])
+
+        self._save()
+        return self.summary, history[self.summarized_turns:]
+
+    def _fold(self, turns: list[dict]) -> str | None:
+        """Merge `turns` into the summary with one LLM call; None on failure."""
+        cfg = CONFIG["rag"]["memory"]
+        prompt = prompts.conversation_summary(
+            previous_summary=self.summary,
+            turns=_format_turns(turns, cfg["turn_max_chars"]),
+            max_words=int(cfg["summary_max_tokens"] * 0.7),
+        )
+        try:
+            text = provider_router.chat(
+                prompt=prompt,
+                temperature=0.0,
+                max_tokens=cfg["summary_max_tokens"],
+            )
+        except provider_router.ProviderUnavailable as exc:
+            # Keep the turns verbatim this time; we will retry next turn.
+            print(f"[conversation_memory] summary skipped: {exc}")
+            return None
+        return (text or "").strip() or None
+
+
+def _fallback_state(history: list[dict]) -> dict:
+    """
+    Memory state for a caller that keeps none: a copy of the entry whose
+    folded prefix is the longest prefix of `history`, else a fresh one.
+    """
+    digests = _prefix_digests(history)
+    for n in range(len(history), 0, -1):
+        state = _fallback_states.get(digests[n - 1])
+        if state is not None and state.get("summarized_turns") == n:
+            _fallback_states.move_to_end(digests[n - 1])
+            return dict(state)
+    return {}
+
+
+def _remember_fallback(state: dict) -> None:
+    """Store a folded memory state under its prefix digest (LRU)."""
+    if not state.get("summarized_turns"):
+        return
+    _fallback_states[state["prefix_digest"]] = dict(state)
+    _fallback_states.move_to_end(state["prefix_digest"])
+    while len(_fallback_states) > CONFIG["rag"]["memory"]["max_sessions"]:
+        _fallback_states.popitem(last=False)
+
+
+def compact_history(
+    history: list[dict],
+    session_state: dict | None = None,
+) -> tuple[str, list[dict]]:
+    """
+    Return (summary, recent_turns) for the prompt.
+
+    Args:
+        history:       Full conversation history (oldest first).
+        session_state: Mutable per-session dict; the memory is cached under
+                       its "memory" key. If omitted, an in-process LRU is used.
+    """
+    if not history:
+        return "", []
+    if session_state is None:
+        state = _fallback_state(history)
+        result = ConversationMemory(state).compact(history)
+        _remember_fallback(state)
+        return result
+    memory = ConversationMemory(session_state.setdefault("memory", {}))
+    return memory.compact(history)
+
+
+def retained_history(history: list[dict], session_state: dict) -> list[dict]:
+    """
+    The part of a server-kept history that is still needed, so stored
+    sessions stay bounded: the verbatim window plus turns not yet folded.
+
+    Turns already covered by the running summary are dropped and the memory
+    state is rebased onto what remains (the summary itself is kept). With
+    memory disabled, the last `history_limit` exchanges are kept instead.
+
+    Args:
+        history:       The session's full history (oldest first).
+        session_state: The dict passed to compact_history() for this session.
+    """
+    if not CONFIG["rag"]["memory"]["enabled"]:
+        return history[-(CONFIG["rag"]["history_limit"] * 2):]
+    memory = session_state.get("memory") or {}
+    folded = memory.get("summarized_turns", 0)
+    if not folded or _digest(history[:folded]) != memory.get("prefix_digest"):
+        return history
+    memory.update({"summarized_turns": 0, "prefix_digest": ""})
+    return history[folded:]
@@ -12,10 +12,29 @@ Model Details:
 - Model: Qwen3-Reranker-0.6B-seq-cls
 - Input: '<Instruct>: {task} \n<Query>: {query} \n<Document>: {text}'
 - Output: Relevance score (Logit → Sigmoid → 0-1)
+
+Candidate selection:
+After near-duplicates are collapsed, the `candidates` chunks sent to the
+model are chosen by maximal marginal relevance with a per-source cap
+(rag/diversify.py), so one long PDF cannot fill the whole rerank budget.
+
+Score cache:
+Scores are memoised in a bounded in-process LRU keyed by
+(normalised query hash, chunk id, chunk text hash, reranker model id); the
+text hash keeps a chunk re-extracted under the same id from getting its old
+score back. Rephrased follow-ups,
+popular questions and threshold sweeps hit the same pairs repeatedly; only
+the misses of a call are sent to the model, in one batch. cache_stats()
+reports the hit rate.
 """
 
+import hashlib
 import os
+import re
 import sys
+import threading
+from collections import OrderedDict
+
 from source_code import models
 from source_code.config import CONFIG
 
@@ -24,10 +43,85 @@ if ROOT_DIR not in sys.path:
     sys.path.append(ROOT_DIR)
 
 import config
+from rag.retrieval_cache import chunk_key
+from rag.near_duplicates import collapse_near_duplicates
+from rag.diversify import mmr_select
 
 # Reranking is now handled centrally in models.py
 
 
+# ---------------------------------------------------------------------------
+# Score cache
+# ---------------------------------------------------------------------------
+
+_score_cache: OrderedDict[tuple[str, str, str, str], float] = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_counts = {"hits": 0, "misses": 0}
+
+
+def _query_hash(query: str) -> str:
+    """Hash of the query with case, whitespace and trailing punctuation normalised."""
+    normalised = re.sub(r"\s+", " ", query.strip().lower()).rstrip(" ?.!")
+    return hashlib.sha1(normalised.encode("utf-8")).hexdigest()
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _cached_scores(query: str, chunks: list[dict]) -> list[float]:
+    """
+    Cross-encoder scores for `chunks`, scoring only the cache misses (in one
+    batch) and storing them.
+    """
+    size = CONFIG["rag"]["cross_encoder"]["score_cache_size"]
+    model_id = CONFIG["rag"]["cross_encoder"]["model"]
+    q_hash = _query_hash(query)
+    keys = [(q_hash, chunk_key(c), _text_hash(c.get("text", "")), model_id) for c in chunks]
+
+    scores: list[float | None] = [None] * len(chunks)
+    if size > 0:
+        with _cache_lock:
+            for i, key in enumerate(keys):
+                if key in _score_cache:
+                    _score_cache.move_to_end(key)
+                    scores[i] = _score_cache[key]
+
+    missing = [i for i, score in enumerate(scores) if score is None]
+    if missing:
+        fresh = models.rerank(query, [chunks[i]["text"] for i in missing], model=model_id)
+        for i, score in zip(missing, fresh):
+            scores[i] = score
+
+    with _cache_lock:
+        _cache_counts["hits"] += len(chunks) - len(missing)
+        _cache_counts["misses"] += len(missing)
+        if size > 0:
+            for i in missing:
+                _score_cache[keys[i]] = scores[i]
+            while len(_score_cache) > size:
+                _score_cache.popitem(last=False)
+    return scores
+
+
+def cache_stats() -> dict:
+    """Hits, misses, hit rate and current size of the score cache."""
+    with _cache_lock:
+        lookups = _cache_counts["hits"] + _cache_counts["misses"]
+        return {
+            **_cache_counts,
+            "hit_rate": round(_cache_counts["hits"] / lookups, 4) if lookups else 0.0,
+            "size": len(_score_cache),
+        }
+
+
+def clear_score_cache(reset_stats: bool = True) -> None:
+    with _cache_lock:
+        _score_cache.clear()
+        if reset_stats:
+            _cache_counts["hits"] = _cache_counts["misses"] = 0
+
+
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
@@ -62,21 +156,37 @@ def rerank_cross_encoder(
     if not chunks:
         return []
 
-    # 1. Pre-sort by cosine similarity, keep top candidates
-    sorted_chunks = sorted(chunks, key=lambda c: c.get("similarity", 0), reverse=True)
-    candidate_chunks = sorted_chunks[:candidates]
-
-    # 2. Score each chunk using the models registry
-    documents = [c["text"] for c in candidate_chunks]
-    scores = models.rerank(query, documents)
-
-    # 4. Attach scores and sort
-    scored = []
+    # 1. Pre-sort by first-stage rank, keep top candidates. Hybrid search
+    #    attaches an RRF "fused_score"; it is only comparable when every
+    #    chunk has one, otherwise fall back to cosine similarity.
+    if all("fused_score" in c for c in chunks):
+        first_stage = lambda c: c["fused_score"]
+    else:
+        first_stage = lambda c: c.get("similarity", 0)
+    sorted_chunks = sorted(chunks, key=first_stage, reverse=True)
+
+    # Near-duplicates (repeated slides, the same page from two files) would
+    # use up the candidate budget; keep only the best-ranked copy.
+    if CONFIG["rag"]["near_duplicates"]["enabled"]:
+        sorted_chunks, dropped = collapse_near_duplicates(sorted_chunks)
+        if dropped:
+            print(f"[cross_encoder] collapsed {dropped} near-duplicate candidate(s)")
+
+    # Pick a varied candidate set (MMR over the stored vectors, capped per
+    # source file) instead of the plain top-k, at the same rerank cost.
+    if CONFIG["rag"]["diversity"]["enabled"] and len(sorted_chunks) > candidates:
+        candidate_chunks = mmr_select(
+            sorted_chunks, [first_stage(c) for c in sorted_chunks], candidates,
+        )
+    else:
+        candidate_chunks = sorted_chunks[:candidates]
+
+    # 2. Score each chunk (cache misses only) using the models registry
+    scores = _cached_scores(query, candidate_chunks)
+
+    # 3. Attach scores in place and sort
     for chunk, score in zip(candidate_chunks, scores):
-        scored.append({
-            **chunk,
-            "final_score": round(score, 4),
-        })
+        chunk["final_score"] = round(score, 4)
 
-    scored.sort(key=lambda c: c["final_score"], reverse=True)
-    return scored[:top_n]
+    candidate_chunks.sort(key=lambda c: c["final_score"], reverse=True)
+    return candidate_chunks[:top_n]
@@ -0,0 +1,120 @@
+"""
+diversify.py
+────────────
+Maximal-marginal-relevance (MMR) selection of the cross-encoder's candidates.
+
+Taking the top `candidates` by first-stage score often hands the reranker
+six pages of the same PDF. mmr_select() instead picks candidates one at a
+time, trading first-stage relevance against similarity to what has already
+been picked:
+
+    mmr(c) = λ · relevance(c) − (1 − λ) · max cos(c, picked)
+
+using the chunk vectors Chroma already returned (no extra embedding calls),
+and allows at most `per_source_cap` candidates from one source file. The
+cross-encoder then scores the same number of chunks, but a more varied set.
+
+Relevance is the first-stage score rescaled to [0, 1] over the pool, so λ
+means the same for cosine similarities and RRF scores. Chunks without an
+embedding contribute no redundancy penalty; chunks without a source are
+never capped.
+"""
+
+import numpy as np
+
+from source_code.config import CONFIG
+
+
+def source_key(chunk) -> tuple | None:
+    """(collection, source file) of a chunk, or None when the source is unknown."""
+    source = (chunk.get("metadata") or {}).get("source")
+    return (chunk.get("collection", ""), source) if source else None
+
+
+def _unit_vectors(chunks: list) -> tuple[np.ndarray, np.ndarray]:
+    """Normalised embedding rows and a mask of the chunks that have one."""
+    embeddings = [chunk.get("embedding") for chunk in chunks]
+    dims = {len(e) for e in embeddings if e is not None and len(e)}
+    if len(dims) != 1:
+        # None (or mixed dimensions): fall back to relevance + source cap only
+        return np.zeros((len(chunks), 1), dtype=np.float32), np.zeros(len(chunks), dtype=bool)
+
+    dim = dims.pop()
+    matrix = np.zeros((len(chunks), dim), dtype=np.float32)
+    has = np.zeros(len(chunks), dtype=bool)
+    for i, e in enumerate(embeddings):
+        if e is not None and len(e) == dim:
+            matrix[i] = e
+            has[i] = True
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    has &= norms[:, 0] > 0
+    matrix /= np.where(norms > 0, norms, 1.0)
+    return matrix, has
+
+
+def mmr_select(
+    chunks: list,
+    relevance: list[float],
+    k: int,
+    lambda_mult: float | None = None,
+    per_source_cap: int | None = None,
+) -> list:
+    """
+    Pick `k` chunks by maximal marginal relevance under a per-source cap.
+
+    Args:
+        chunks:         Candidate pool (any order).
+        relevance:      First-stage score of each chunk (higher = better).
+        k:              Number of chunks to pick.
+        lambda_mult:    1.0 = pure relevance, 0.0 = pure diversity.
+        per_source_cap: Max picks per source file (0/None = no cap).
+
+    Returns:
+        The picked chunks in selection order. When the cap leaves fewer than
+        `k` eligible chunks, the remaining slots are filled by MMR from the
+        capped ones, so the reranker budget is never left unused.
+    """
+    cfg = CONFIG["rag"]["diversity"]
+    if lambda_mult is None:
+        lambda_mult = cfg["lambda"]
+    if per_source_cap is None:
+        per_source_cap = cfg["per_source_cap"]
+
+    n = len(chunks)
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    rel = np.asarray(relevance, dtype=np.float32)
+    span = float(rel.max() - rel.min())
+    rel = (rel - rel.min()) / span if span > 0 else np.ones(n, dtype=np.float32)
+
+    vectors, has_vec = _unit_vectors(chunks)
+    sims = vectors @ vectors.T
+    sims[~has_vec, :] = 0.0
+    sims[:, ~has_vec] = 0.0
+
+    sources = [source_key(c) for c in chunks]
+    per_source: dict[tuple, int] = {}
+    redundancy = np.zeros(n, dtype=np.float32)   # max similarity to the picked set
+    available = np.ones(n, dtype=bool)
+    picked: list[int] = []
+
+    while len(picked) < k:
+        scores = lambda_mult * rel - (1.0 - lambda_mult) * redundancy
+        eligible = available.copy()
+        if per_source_cap:
+            for i in np.flatnonzero(eligible):
+                if sources[i] is not None and per_source.get(sources[i], 0) >= per_source_cap:
+                    eligible[i] = False
+        if not eligible.any():
+            eligible = available          # every remaining chunk is capped
+        best = int(np.flatnonzero(eligible)[np.argmax(scores[eligible])])
+
+        picked.append(best)
+        available[best] = False
+        if sources[best] is not None:
+            per_source[sources[best]] = per_source.get(sources[best], 0) + 1
+        np.maximum(redundancy, sims[best], out=redundancy)
+
+    return [chunks[i] for i in picked]
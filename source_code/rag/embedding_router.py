@@ -7,11 +7,17 @@ reference embeddings for each unit.
 
 Reference embeddings are generated during the 'Generation of unit embeddings'
 maintenance task and stored in a pickle file (unit_embeddings.pkl).
+
+Matching can use a Matryoshka prefix of the vectors
+(CONFIG["rag"]["embedding_dims"]["router"]): the stored full vectors are
+truncated, re-normalised and stacked into one matrix per dimension on first
+use, and the query is truncated the same way.
 """
 
 import os
 import sys
 import pickle
+import threading
 import numpy as np
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -19,7 +25,7 @@ if ROOT_DIR not in sys.path:
     sys.path.append(ROOT_DIR)
 
 from source_code.config import CONFIG
-from pipeline.embeddings.local_embedding import embed
+from pipeline.embeddings.local_embedding import embed_query, truncate_embedding
 
 # Load embeddings at import time
 _unit_embeddings = {}
@@ -31,6 +37,28 @@ if os.path.exists(CONFIG["paths"]["unit_embeddings"]):
     except Exception as e:
         print(f"[embedding_router] Could not load embeddings: {e}")
 
+_unit_keys = list(_unit_embeddings)
+_unit_matrices: dict[int | None, np.ndarray] = {}   # router dim → [units, dim], rows normalised
+_matrix_lock = threading.Lock()
+
+
+def stored_dimension() -> int:
+    """Dimension of the stored unit embeddings (0 if none are loaded)."""
+    return len(next(iter(_unit_embeddings.values()))) if _unit_embeddings else 0
+
+
+def _unit_matrix(dim: int | None) -> np.ndarray:
+    """Normalised matrix of unit vectors cut to `dim` (None = full)."""
+    with _matrix_lock:
+        if dim not in _unit_matrices:
+            rows = [truncate_embedding(list(_unit_embeddings[k]), dim) for k in _unit_keys]
+            matrix = np.asarray(rows, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            _unit_matrices[dim] = matrix / norms
+        return _unit_matrices[dim]
+
+
 def cosine_similarity(v1: np.ndarray, v2: np.ndarray) -> float:
     """
     Compute the cosine similarity between two vectors.
@@ -64,20 +92,28 @@ def route(query: str) -> tuple[str | None, str | None, float]:
         return None, None, 0.0
         
     try:
-        query_vec = embed([query])[0]
+        query_vec = embed_query(query)
     except Exception as e:
         print(f"[embedding_router] LLM embed error: {e}")
         return None, None, 0.0
         
-    best_score = -1.0
-    best_match = None
-    
-    for key, vec in _unit_embeddings.items():
-        sim = cosine_similarity(query_vec, vec)
-        if sim > best_score:
-            best_score = sim
-            best_match = key
-            
+    # Query and stored vectors must come from the same model before any
+    # truncation, otherwise the prefixes are not comparable.
+    if len(query_vec) != stored_dimension():
+        print(
+            f"[embedding_router] query dimension {len(query_vec)} != stored unit dimension "
+            f"{stored_dimension()}; regenerate unit_embeddings.pkl with the current embedding model"
+        )
+        return None, None, 0.0
+
+    dim = CONFIG["rag"]["embedding_dims"]["router"]
+    q = np.asarray(truncate_embedding(query_vec, dim), dtype=np.float32)
+    q /= float(np.linalg.norm(q)) or 1.0
+    sims = _unit_matrix(dim) @ q
+    best = int(np.argmax(sims))
+    best_score = float(sims[best])
+    best_match = _unit_keys[best]
+
     if best_score > CONFIG["rag"]["embedding_router_threshold"] and best_match:
         # key format: SUBJECT_UNIT, e.g., CYBER_SECURITY_3
         parts = best_match.rsplit("_", 1)
@@ -0,0 +1,159 @@
+"""
+flat_index.py
+─────────────
+Exact (brute-force) kNN over a snapshot written by pipeline/export_snapshot.py.
+
+The embeddings are memory-mapped, so opening a snapshot is instant and only
+the pages actually touched are read. Filters use the same ChromaDB ``where``
+semantics as search._build_where() (via metadata_filter.matches_where), so
+results are directly comparable with live retrieval — this is the ground
+truth for recall measurements and a fast path for bulk analytics.
+
+    index = FlatIndex.load(snapshot_dir("multimodal_notes"))
+    hits  = index.search(query_vector, k=8, where={"subject": "COA"})
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from rag.metadata_filter import matches_where
+
+
+class FlatIndex:
+    """
+    Memory-mapped float32 matrix plus row-aligned ids and metadata.
+
+    Attributes:
+        ids:        Chroma document ids, one per row.
+        metadatas:  Metadata dicts, one per row.
+        embeddings: float32 [N, D] memmap.
+        norms:      float32 [N] row norms.
+        manifest:   The snapshot manifest.
+    """
+
+    def __init__(self, path: str, ids, metadatas, embeddings, norms, manifest):
+        self.path = path
+        self.ids: list[str] = ids
+        self.metadatas: list[dict] = metadatas
+        self.embeddings: np.ndarray = embeddings
+        self.norms: np.ndarray = norms
+        self.manifest: dict = manifest
+        self._doc_offsets: np.ndarray | None = None
+        self._mask_cache: dict[str, np.ndarray] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "FlatIndex":
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        ids, metadatas = [], []
+        with open(os.path.join(path, "metadata.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                rec = json.loads(line)
+                ids.append(rec["id"])
+                metadatas.append(rec["metadata"])
+        embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        norms = np.load(os.path.join(path, "norms.npy"))
+        return cls(path, ids, metadatas, embeddings, norms, manifest)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return int(self.manifest.get("dim", self.embeddings.shape[1] if self.embeddings.ndim == 2 else 0))
+
+    @property
+    def collection(self) -> str:
+        return self.manifest.get("collection", "")
+
+    def document(self, row: int) -> str:
+        """
+        Document text for a row. Only the line offsets of documents.jsonl are
+        kept in memory (built on first use); each text is read on demand.
+        """
+        docs_path = os.path.join(self.path, "documents.jsonl")
+        if self._doc_offsets is None:
+            offsets, pos = [], 0
+            with open(docs_path, "rb") as f:
+                for line in f:
+                    offsets.append(pos)
+                    pos += len(line)
+            self._doc_offsets = np.asarray(offsets, dtype=np.int64)
+        with open(docs_path, "rb") as f:
+            f.seek(int(self._doc_offsets[row]))
+            return json.loads(f.readline())["document"]
+
+    # -- filtering ------------------------------------------------------------
+
+    def mask(self, where: dict | None) -> np.ndarray | None:
+        """Boolean row mask for a where-clause (cached per clause); None = all rows."""
+        if not where:
+            return None
+        key = json.dumps(where, sort_keys=True)
+        if key not in self._mask_cache:
+            self._mask_cache[key] = np.fromiter(
+                (matches_where(m, where) for m in self.metadatas), dtype=bool, count=len(self.metadatas),
+            )
+        return self._mask_cache[key]
+
+    # -- search ---------------------------------------------------------------
+
+    def similarities(self, query_vector, rows: np.ndarray | None = None) -> np.ndarray:
+        """Cosine similarity of the query to every row (or the given rows)."""
+        q = np.asarray(query_vector, dtype=np.float32)
+        if q.shape[0] != self.dim:
+            raise ValueError(
+                f"Query dimension {q.shape[0]} does not match snapshot dimension {self.dim} "
+                f"({self.collection})"
+            )
+        matrix = self.embeddings if rows is None else self.embeddings[rows]
+        norms = self.norms if rows is None else self.norms[rows]
+        denom = norms * (float(np.linalg.norm(q)) or 1.0)
+        denom[denom == 0] = 1.0
+        return (matrix @ q) / denom
+
+    def search(self, query_vector, k: int, where: dict | None = None) -> list[dict]:
+        """
+        Exact top-k by cosine similarity.
+
+        Args:
+            query_vector: Query embedding (same dimension as the snapshot).
+            k:            Number of results.
+            where:        ChromaDB-style metadata filter.
+
+        Returns:
+            Chunk dicts (id, text, metadata, distance, similarity, collection),
+            best first.
+        """
+        mask = self.mask(where)
+        rows = np.flatnonzero(mask) if mask is not None else None
+        if rows is not None and rows.size == 0:
+            return []
+
+        sims = self.similarities(query_vector, rows)
+        k = min(k, sims.shape[0])
+        if k <= 0:
+            return []
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+
+        out = []
+        for i in top:
+            row = int(rows[i]) if rows is not None else int(i)
+            sim = float(sims[i])
+            out.append({
+                "id": self.ids[row],
+                "text": self.document(row),
+                "metadata": self.metadatas[row],
+                "distance": round(1.0 - sim, 6),
+                "similarity": round(sim, 4),
+                "collection": self.collection,
+            })
+        return out
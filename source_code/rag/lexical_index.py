@@ -0,0 +1,200 @@
+"""
+lexical_index.py
+────────────────
+BM25 inverted index over the documents of a ChromaDB collection.
+
+Dense retrieval alone misses exact technical terms ("quine mccluskey",
+"BCS302", "JK flip flop") whenever the embedding does not separate them
+well. This index gives search.py a lexical ranking to fuse with the dense
+one (reciprocal rank fusion), so rare terms are recalled without raising k.
+
+The index is built at ingest time from the documents already stored in
+Chroma (see pipeline/build_lexical_index.py), written to
+``CONFIG["paths"]["lexical_index"]/<collection>.json`` and loaded lazily on
+first search. A rebuilt file is picked up automatically (mtime check).
+"""
+
+import json
+import math
+import os
+import re
+import sys
+import threading
+from collections import Counter, defaultdict
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from source_code.config import CONFIG
+from rag.metadata_filter import matches_where
+
+# Words that carry no retrieval signal in study material
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "define", "describe",
+    "do", "does", "explain", "for", "from", "give", "how", "in", "is", "it", "its",
+    "me", "of", "on", "or", "the", "this", "to", "what", "when", "which", "why",
+    "with", "write",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-case alphanumeric tokens; course codes like 'bcs302' stay whole."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOP_WORDS]
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+class BM25Index:
+    """
+    In-memory BM25 (Okapi) index.
+
+    Attributes:
+        ids:       Chroma document ids, position = internal doc number.
+        documents: Document texts (returned for lexical-only hits).
+        metadatas: Metadata dicts (used for where-filtering).
+        postings:  term → list of [doc number, term frequency].
+    """
+
+    def __init__(self, ids, documents, metadatas, postings, doc_lens):
+        self.ids: list[str] = ids
+        self.documents: list[str] = documents
+        self.metadatas: list[dict] = metadatas
+        self.postings: dict[str, list[list[int]]] = postings
+        self.doc_lens: list[int] = doc_lens
+        self.avgdl = (sum(doc_lens) / len(doc_lens)) if doc_lens else 0.0
+        n = len(ids)
+        self.idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in postings.items()
+        }
+
+    @classmethod
+    def build(cls, ids: list[str], documents: list[str], metadatas: list[dict]) -> "BM25Index":
+        postings: dict[str, list[list[int]]] = defaultdict(list)
+        doc_lens = []
+        for doc_no, text in enumerate(documents):
+            tokens = tokenize(text or "")
+            doc_lens.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings[term].append([doc_no, tf])
+        return cls(list(ids), list(documents), [m or {} for m in metadatas], dict(postings), doc_lens)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, k: int, where: dict | None = None) -> list[tuple[int, float]]:
+        """
+        Rank documents for `query`.
+
+        Args:
+            query: Raw query text.
+            k:     Maximum number of hits.
+            where: ChromaDB-style metadata filter applied before ranking.
+
+        Returns:
+            List of (doc number, BM25 score), best first.
+        """
+        cfg = CONFIG["rag"]["hybrid_search"]
+        k1, b = cfg["bm25_k1"], cfg["bm25_b"]
+
+        scores: dict[int, float] = defaultdict(float)
+        allowed: dict[int, bool] = {}
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for doc_no, tf in plist:
+                ok = allowed.get(doc_no)
+                if ok is None:
+                    ok = allowed[doc_no] = matches_where(self.metadatas[doc_no], where)
+                if not ok:
+                    continue
+                norm = k1 * (1 - b + b * self.doc_lens[doc_no] / (self.avgdl or 1.0))
+                scores[doc_no] += idf * tf * (k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:k]
+
+    # -- persistence ----------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "ids": self.ids,
+                "documents": self.documents,
+                "metadatas": self.metadatas,
+                "postings": self.postings,
+                "doc_lens": self.doc_lens,
+            }, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["ids"], data["documents"], data["metadatas"], data["postings"], data["doc_lens"])
+
+
+# ---------------------------------------------------------------------------
+# Lazy per-collection loading
+# ---------------------------------------------------------------------------
+
+_indexes: dict[str, tuple[float, BM25Index]] = {}   # collection → (mtime, index)
+_lock = threading.Lock()
+
+
+def index_path(collection_name: str) -> str:
+    return os.path.join(CONFIG["paths"]["lexical_index"], f"{collection_name}.json")
+
+
+def get_index(collection_name: str) -> BM25Index | None:
+    """Return the on-disk index for a collection, or None if not built yet."""
+    path = index_path(collection_name)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    with _lock:
+        cached = _indexes.get(collection_name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            index = BM25Index.load(path)
+        except Exception as exc:
+            print(f"[lexical_index] could not load {path}: {exc}")
+            return None
+        _indexes[collection_name] = (mtime, index)
+        return index
+
+
+def build_for_collection(collection, batch_size: int = 1000) -> BM25Index:
+    """
+    Build and save the index for a Chroma collection from its stored documents.
+
+    Args:
+        collection: A chromadb.Collection.
+        batch_size: Page size for reading documents out of Chroma.
+    """
+    ids, documents, metadatas = [], [], []
+    offset = 0
+    while True:
+        page = collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+        if not page["ids"]:
+            break
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+        offset += len(page["ids"])
+
+    index = BM25Index.build(ids, documents, metadatas)
+    index.save(index_path(collection.name))
+    print(f"[lexical_index] {collection.name}: {len(index)} documents, {len(index.postings)} terms")
+    return index
@@ -0,0 +1,69 @@
+"""
+metadata_filter.py
+──────────────────
+Evaluates ChromaDB-style ``where`` clauses against a plain metadata dict.
+
+Retrieval paths that do not go through ``collection.query()`` (the BM25
+lexical index, offline indexes) must apply exactly the same subject/unit
+filters that search._build_where() produces for Chroma. Supported operators:
+
+  {"field": value}                 equality shorthand
+  {"field": {"$eq"|"$ne": v}}
+  {"field": {"$in"|"$nin": [..]}}
+  {"field": {"$gt"|"$gte"|"$lt"|"$lte": v}}
+  {"$and": [...]}, {"$or": [...]}
+"""
+
+from typing import Any
+
+
+def _compare(op: str, actual: Any, expected: Any) -> bool:
+    if op == "$eq":
+        return actual == expected
+    if op == "$ne":
+        return actual != expected
+    if op == "$in":
+        return actual in expected
+    if op == "$nin":
+        return actual not in expected
+    if actual is None:
+        return False
+    try:
+        if op == "$gt":
+            return actual > expected
+        if op == "$gte":
+            return actual >= expected
+        if op == "$lt":
+            return actual < expected
+        if op == "$lte":
+            return actual <= expected
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported where operator: {op}")
+
+
+def matches_where(metadata: dict, where: dict | None) -> bool:
+    """
+    Return True if `metadata` satisfies the ChromaDB `where` clause.
+
+    Args:
+        metadata: A chunk's metadata dict.
+        where:    A filter as built by search._build_where(), or None.
+    """
+    if not where:
+        return True
+
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, sub) for sub in cond):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, sub) for sub in cond):
+                return False
+        elif isinstance(cond, dict):
+            actual = metadata.get(key)
+            if not all(_compare(op, actual, expected) for op, expected in cond.items()):
+                return False
+        elif metadata.get(key) != cond:
+            return False
+    return True
@@ -0,0 +1,148 @@
+"""
+near_duplicates.py
+──────────────────
+SimHash signatures for detecting near-identical chunks.
+
+Notes are extracted one page per chunk, so slide decks produce runs of
+almost identical pages (repeated headers, incremental bullet reveals), and
+the same passage can be ingested from more than one file. Such duplicates
+waste the cross-encoder's small candidate budget and the context window.
+
+A 64-bit SimHash is computed from word 3-shingles of the stored document
+text. Two chunks are near-duplicates when their signatures differ in at most
+CONFIG["rag"]["near_duplicates"]["max_hamming"] bits.
+
+- Ingest stores the signature as a hex string in metadata["simhash"]
+  (Chroma metadata cannot hold unsigned 64-bit ints).
+- rerank_cross_encoder() collapses near-duplicates from the first-stage
+  ranking before it cuts the candidate list, keeping the better-ranked copy.
+  Chunks ingested before signatures existed are hashed on the fly.
+- pipeline/report_duplicates.py counts duplicates per collection (and can
+  backfill missing signatures).
+"""
+
+import hashlib
+import re
+from collections import defaultdict
+
+import numpy as np
+
+from source_code.config import CONFIG
+
+BITS = 64
+_MASK = (1 << BITS) - 1
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def simhash(text: str, shingle_size: int | None = None) -> int:
+    """
+    64-bit SimHash of the word shingles of `text` (0 for empty text).
+
+    Every shingle votes on each bit of its 64-bit blake2b hash; the signature
+    keeps the bits set in a majority of shingles. Similar texts share most shingles and hence
+    most bits.
+    """
+    n = shingle_size or CONFIG["rag"]["near_duplicates"]["shingle_size"]
+    words = _WORD_RE.findall((text or "").lower())
+    if not words:
+        return 0
+    shingles = {" ".join(words[i:i + n]) for i in range(max(1, len(words) - n + 1))}
+
+    digests = b"".join(
+        hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest() for s in shingles
+    )
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(len(shingles), BITS)
+    majority = bits.sum(axis=0, dtype=np.int32) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(majority).tobytes(), "big")
+
+
+def simhash_hex(text: str) -> str:
+    """Signature as 16 hex digits, the form stored in chunk metadata."""
+    return f"{simhash(text):016x}"
+
+
+def hamming(a: int, b: int) -> int:
+    return ((a ^ b) & _MASK).bit_count()
+
+
+def signature(chunk) -> int:
+    """Stored signature of a chunk, or one computed from its text."""
+    stored = (chunk.get("metadata") or {}).get("simhash")
+    if stored:
+        try:
+            return int(stored, 16)
+        except (TypeError, ValueError):
+            pass
+    return simhash(chunk.get("text", ""))
+
+
+def collapse_near_duplicates(chunks: list, max_hamming: int | None = None) -> tuple[list, int]:
+    """
+    Drop chunks that are near-duplicates of an earlier chunk in the list.
+
+    The list must already be in preference order (best first); the first
+    copy of every near-duplicate group is kept.
+
+    Returns:
+        (kept chunks, number dropped)
+    """
+    if max_hamming is None:
+        max_hamming = CONFIG["rag"]["near_duplicates"]["max_hamming"]
+    kept, kept_sigs = [], []
+    for chunk in chunks:
+        sig = signature(chunk)
+        if sig and any(hamming(sig, other) <= max_hamming for other in kept_sigs):
+            continue
+        kept.append(chunk)
+        kept_sigs.append(sig)
+    return kept, len(chunks) - len(kept)
+
+
+def _bands(max_hamming: int) -> list[tuple[int, int]]:
+    """Split the 64 bits into max_hamming + 1 (shift, mask) bands."""
+    n = max_hamming + 1
+    widths = [BITS // n + (1 if i < BITS % n else 0) for i in range(n)]
+    bands, shift = [], 0
+    for w in widths:
+        bands.append((shift, (1 << w) - 1))
+        shift += w
+    return bands
+
+
+def duplicate_groups(signatures: dict[str, int], max_hamming: int | None = None) -> list[list[str]]:
+    """
+    Group ids whose signatures are within `max_hamming` bits of each other.
+
+    Splitting the signature into max_hamming + 1 bands guarantees that any
+    such pair agrees exactly on at least one band (pigeonhole), so only ids
+    sharing a band value are compared. Groups are connected components.
+
+    Returns:
+        Groups with at least two ids, largest first.
+    """
+    if max_hamming is None:
+        max_hamming = CONFIG["rag"]["near_duplicates"]["max_hamming"]
+
+    parent = {doc_id: doc_id for doc_id in signatures}
+
+    def find(x: str) -> str:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for band, (shift, mask) in enumerate(_bands(max_hamming)):
+        buckets: dict[int, list[str]] = defaultdict(list)
+        for doc_id, sig in signatures.items():
+            if sig:
+                buckets[(sig >> shift) & mask].append(doc_id)
+        for ids in buckets.values():
+            for i, a in enumerate(ids):
+                for b in ids[i + 1:]:
+                    if find(a) != find(b) and hamming(signatures[a], signatures[b]) <= max_hamming:
+                        parent[find(b)] = find(a)
+
+    groups: dict[str, list[str]] = defaultdict(list)
+    for doc_id in signatures:
+        groups[find(doc_id)].append(doc_id)
+    return sorted((g for g in groups.values() if len(g) > 1), key=len, reverse=True)
@@ -0,0 +1,369 @@
+"""
+quantized_index.py
+──────────────────
+Compressed first-stage vector search over a flat snapshot, followed by
+full-precision rescoring.
+
+The float32 matrix of a snapshot (pipeline/export_snapshot.py) is 4·D bytes
+per chunk. This module stores a compressed copy next to it:
+
+  int8    embeddings.int8.npy   [N, D] int8, rows L2-normalised and scaled
+          int8_scale.npy        [D] float32 per-dimension scale      (4× smaller)
+  binary  embeddings.binary.npy [N, D/8] uint8, sign bits packed     (32× smaller)
+
+Qwen3-embedding is Matryoshka-trained, so the leading d components of a
+vector (re-normalised) are a usable d-dimensional embedding. Codes can be
+built from such a prefix — ``embeddings.<mode>.d<d>.npy`` — including plain
+``float32`` codes, which is the truncated-dimension index on its own:
+
+  float32 embeddings.float32.d256.npy  [N, 256] float32             (D/256× smaller)
+
+A query scores every (filtered) row against the compressed codes only, keeps
+the best ``k × oversample`` candidates, then re-scores those few rows with
+the full-precision vectors from the memory-mapped float32 file (only those
+pages are read) and returns the exact top-k. The float matrix therefore
+never has to be resident in RAM; the codes are.
+
+    python source_code/pipeline/export_snapshot.py --quantize int8 [--dim 256]
+    index = QuantizedIndex.load(snapshot_dir("multimodal_notes"), "int8", dim=256)
+    hits  = index.search(query_vector, k=8, where={"subject": "COA"})
+
+search.py uses this for the dense stage when
+CONFIG["rag"]["quantization"]["enabled"] and codes for the configured mode and
+CONFIG["rag"]["embedding_dims"]["candidates"] exist.
+"""
+
+import os
+import sys
+import threading
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from source_code.config import CONFIG
+from rag.flat_index import FlatIndex
+from utils import INGEST_MARKER_KEY, UNIT_SCHEMA_KEY, collection_metadata
+
+MODES = ("float32", "int8", "binary")
+BLOCK_ROWS = 8192   # rows decoded per step, bounds the temporary float buffer
+
+# Number of set bits for every byte value (binary Hamming distance)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _suffix(dim: int | None) -> str:
+    return f".d{dim}" if dim else ""
+
+
+def codes_path(snapshot_path: str, mode: str, dim: int | None = None) -> str:
+    return os.path.join(snapshot_path, f"embeddings.{mode}{_suffix(dim)}.npy")
+
+
+def _scale_path(snapshot_path: str, dim: int | None = None) -> str:
+    return os.path.join(snapshot_path, f"int8_scale{_suffix(dim)}.npy")
+
+
+def _check_mode(mode: str, dim: int | None, full_dim: int) -> None:
+    if mode not in MODES:
+        raise ValueError(f"Unknown quantization mode '{mode}' (expected one of {MODES})")
+    if dim is not None and not 0 < dim <= full_dim:
+        raise ValueError(f"Code dimension {dim} is outside 1..{full_dim}")
+    if mode == "float32" and dim is None:
+        raise ValueError("float32 codes need a truncated dimension (dim < snapshot dimension)")
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+def _normalised_blocks(flat: FlatIndex, block_rows: int, dim: int):
+    for start in range(0, len(flat), block_rows):
+        stop = min(start + block_rows, len(flat))
+        block = np.asarray(flat.embeddings[start:stop, :dim], dtype=np.float32)
+        norms = np.linalg.norm(block, axis=1)
+        norms[norms == 0] = 1.0
+        yield start, stop, block / norms[:, None]
+
+
+def quantize_snapshot(snapshot_path: str, mode: str, dim: int | None = None, block_rows: int = BLOCK_ROWS) -> str:
+    """
+    Write the compressed codes for a snapshot.
+
+    Rows (or their leading `dim` components) are L2-normalised first, so code
+    dot products rank by cosine. int8 uses a symmetric per-dimension scale
+    (max |x_d| / 127); binary keeps one sign bit per dimension; float32 keeps
+    the truncated prefix as is.
+
+    Args:
+        snapshot_path: Snapshot directory.
+        mode:          "float32", "int8" or "binary".
+        dim:           Matryoshka prefix length (None = full dimension).
+        block_rows:    Rows processed per step (memory stays at one block).
+
+    Returns:
+        Path of the written codes file.
+    """
+    flat = FlatIndex.load(snapshot_path)
+    if dim is not None and dim >= flat.dim:
+        dim = None if mode != "float32" else dim
+    _check_mode(mode, dim, flat.dim)
+
+    n, code_dim = len(flat), dim or flat.dim
+    out = codes_path(snapshot_path, mode, dim)
+    tmp = f"{out}.tmp.npy"
+
+    if mode == "float32":
+        codes = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(n, code_dim))
+        for start, stop, block in _normalised_blocks(flat, block_rows, code_dim):
+            codes[start:stop] = block
+    elif mode == "int8":
+        max_abs = np.zeros(code_dim, dtype=np.float32)
+        for _, _, block in _normalised_blocks(flat, block_rows, code_dim):
+            np.maximum(max_abs, np.abs(block).max(axis=0), out=max_abs)
+        scale = np.where(max_abs == 0, 1.0, max_abs / 127.0).astype(np.float32)
+        codes = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.int8, shape=(n, code_dim))
+        for start, stop, block in _normalised_blocks(flat, block_rows, code_dim):
+            codes[start:stop] = np.clip(np.rint(block / scale), -127, 127).astype(np.int8)
+        np.save(_scale_path(snapshot_path, dim), scale)
+    else:
+        codes = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.uint8, shape=(n, (code_dim + 7) // 8))
+        for start, stop, block in _normalised_blocks(flat, block_rows, code_dim):
+            codes[start:stop] = np.packbits(block > 0, axis=1)
+
+    codes.flush()
+    del codes
+    os.replace(tmp, out)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Searching
+# ---------------------------------------------------------------------------
+
+class QuantizedIndex:
+    """
+    Compressed codes for the first stage, the FlatIndex for rescoring.
+
+    Attributes:
+        flat:     The full-precision snapshot (memory-mapped).
+        mode:     "float32", "int8" or "binary".
+        code_dim: Dimensions used by the first stage (Matryoshka prefix).
+        codes:    [N, d] float32/int8 or [N, d/8] uint8, loaded into RAM.
+        scale:    [d] per-dimension int8 scale (None otherwise).
+    """
+
+    def __init__(
+        self,
+        flat: FlatIndex,
+        mode: str,
+        codes: np.ndarray,
+        scale: np.ndarray | None = None,
+        dim: int | None = None,
+    ):
+        _check_mode(mode, dim, flat.dim)
+        self.code_dim = dim or flat.dim
+        expected_cols = (self.code_dim + 7) // 8 if mode == "binary" else self.code_dim
+        if codes.shape[0] != len(flat) or (codes.ndim == 2 and codes.shape[1] != expected_cols):
+            raise ValueError(
+                f"{mode} codes have shape {codes.shape} but the snapshot needs "
+                f"({len(flat)}, {expected_cols}) ({flat.collection}); "
+                f"re-run export_snapshot.py --quantize {mode}" + (f" --dim {dim}" if dim else "")
+            )
+        self.flat = flat
+        self.mode = mode
+        self.codes = codes
+        self.scale = scale
+
+    @classmethod
+    def load(cls, snapshot_path: str, mode: str, dim: int | None = None) -> "QuantizedIndex":
+        flat = FlatIndex.load(snapshot_path)
+        if dim is not None and dim >= flat.dim and mode != "float32":
+            dim = None
+        _check_mode(mode, dim, flat.dim)
+        codes = np.load(codes_path(snapshot_path, mode, dim))
+        scale = np.load(_scale_path(snapshot_path, dim)) if mode == "int8" else None
+        return cls(flat, mode, codes, scale, dim)
+
+    def __len__(self) -> int:
+        return len(self.flat)
+
+    @property
+    def nbytes(self) -> int:
+        """Resident size of the first-stage codes."""
+        return int(self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0))
+
+    def approximate_scores(self, query_vector, rows: np.ndarray | None = None) -> np.ndarray:
+        """
+        First-stage scores (higher = closer) for every row, or the given rows.
+
+        The query is cut to the code dimension first, so it must have the
+        snapshot's full dimension (ValueError otherwise).
+
+        float32: dot product with the truncated, normalised rows (∝ cosine).
+        int8:    dot product of the scaled query with the codes (∝ cosine).
+        binary:  d − 2·Hamming(sign(q), codes).
+        """
+        q = np.asarray(query_vector, dtype=np.float32)
+        if q.shape[0] != self.flat.dim:
+            raise ValueError(
+                f"Query dimension {q.shape[0]} does not match snapshot dimension {self.flat.dim} "
+                f"({self.flat.collection})"
+            )
+        q = q[:self.code_dim]
+        codes = self.codes if rows is None else self.codes[rows]
+        scores = np.empty(codes.shape[0], dtype=np.float32)
+
+        if self.mode == "float32":
+            for start in range(0, codes.shape[0], BLOCK_ROWS):
+                block = codes[start:start + BLOCK_ROWS]
+                scores[start:start + len(block)] = block @ q
+        elif self.mode == "int8":
+            q_scaled = q * self.scale
+            for start in range(0, codes.shape[0], BLOCK_ROWS):
+                block = codes[start:start + BLOCK_ROWS]
+                scores[start:start + len(block)] = block.astype(np.float32) @ q_scaled
+        else:
+            q_bits = np.packbits(q > 0)
+            for start in range(0, codes.shape[0], BLOCK_ROWS):
+                block = codes[start:start + BLOCK_ROWS]
+                hamming = _POPCOUNT[np.bitwise_xor(block, q_bits)].sum(axis=1, dtype=np.int32)
+                scores[start:start + len(block)] = self.code_dim - 2 * hamming
+        return scores
+
+    def search(
+        self,
+        query_vector,
+        k: int,
+        where: dict | None = None,
+        oversample: int | None = None,
+    ) -> list[dict]:
+        """
+        Approximate first stage, exact rescoring of the survivors.
+
+        Args:
+            query_vector: Query embedding (same dimension as the snapshot).
+            k:            Number of results.
+            where:        ChromaDB-style metadata filter.
+            oversample:   Candidates kept per result before rescoring
+                          (defaults to CONFIG["rag"]["quantization"]["oversample"][mode]).
+
+        Returns:
+            Chunk dicts (id, text, metadata, distance, similarity, collection),
+            best first by full-precision cosine similarity; None when `where`
+            matches no row of the snapshot (let Chroma answer instead).
+        """
+        if oversample is None:
+            oversample = CONFIG["rag"]["quantization"]["oversample"][self.mode]
+
+        mask = self.flat.mask(where)
+        rows = np.flatnonzero(mask) if mask is not None else np.arange(len(self.flat))
+        if rows.size == 0:
+            return None
+        if k <= 0:
+            return []
+
+        approx = self.approximate_scores(query_vector, rows if mask is not None else None)
+        n_candidates = min(rows.size, max(k, k * oversample))
+        top = np.argpartition(-approx, n_candidates - 1)[:n_candidates]
+        candidates = np.sort(rows[top])   # ascending rows → sequential memmap reads
+
+        sims = self.flat.similarities(query_vector, candidates)
+        k = min(k, candidates.size)
+        best = np.argpartition(-sims, k - 1)[:k]
+        best = best[np.argsort(-sims[best])]
+
+        out = []
+        for i in best:
+            row = int(candidates[i])
+            sim = float(sims[i])
+            out.append({
+                "id": self.flat.ids[row],
+                "text": self.flat.document(row),
+                "metadata": self.flat.metadatas[row],
+                "distance": round(1.0 - sim, 6),
+                "similarity": round(sim, 4),
+                "collection": self.flat.collection,
+                "embedding": [float(x) for x in self.flat.embeddings[row]],
+            })
+        return out
+
+
+# ---------------------------------------------------------------------------
+# Lazy per-collection loading
+# ---------------------------------------------------------------------------
+
+_indexes: dict[str, tuple[float, QuantizedIndex]] = {}   # collection → (mtime, index)
+_lock = threading.Lock()
+_warned: set[tuple[str, str]] = set()
+
+
+def stale_reason(index: QuantizedIndex, collection) -> str | None:
+    """
+    Why a snapshot no longer matches the live collection (unit schema
+    migrated, documents written since the export — including in-place
+    re-ingests that keep ids and count — or added/deleted), or None.
+    """
+    manifest = index.flat.manifest
+    live = collection_metadata(collection)
+    snapshot_schema = manifest.get(UNIT_SCHEMA_KEY, 1)
+    live_schema = live.get(UNIT_SCHEMA_KEY, 1)
+    if snapshot_schema != live_schema:
+        return f"unit schema v{snapshot_schema}, collection is v{live_schema}"
+    if manifest.get(INGEST_MARKER_KEY) != live.get(INGEST_MARKER_KEY):
+        return "documents were re-ingested since the export"
+    live_count = collection.count()
+    if manifest.get("count") != live_count:
+        return f"{manifest.get('count')} documents, collection has {live_count}"
+    return None
+
+
+def get_index(collection) -> QuantizedIndex | None:
+    """
+    Return the index for a Chroma collection in the configured mode and
+    candidate dimension, or None if those codes have not been built or the
+    snapshot is stale (search then falls back to Chroma).
+    """
+    collection_name = collection.name
+    index = _load_index(collection_name)
+    if index is None:
+        return None
+    reason = stale_reason(index, collection)
+    if reason:
+        if (collection_name, reason) not in _warned:
+            _warned.add((collection_name, reason))
+            print(f"[quantized_index] {collection_name} snapshot is stale ({reason}); re-export it")
+        return None
+    return index
+
+
+def _load_index(collection_name: str) -> QuantizedIndex | None:
+    mode = CONFIG["rag"]["quantization"]["mode"]
+    dim = CONFIG["rag"]["embedding_dims"]["candidates"]
+    path = os.path.join(CONFIG["paths"]["snapshots"], collection_name)
+    try:
+        mtime = os.path.getmtime(codes_path(path, mode, dim))
+    except OSError:
+        return None
+
+    key = f"{collection_name}:{mode}:{dim}"
+    with _lock:
+        cached = _indexes.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            index = QuantizedIndex.load(path, mode, dim)
+        except Exception as exc:
+            print(f"[quantized_index] could not load {path} ({mode}, dim={dim}): {exc}")
+            return None
+        model = index.flat.manifest.get("embedding_model")
+        if model and model != CONFIG["providers"]["embedding_model"]:
+            print(
+                f"[quantized_index] {collection_name} snapshot was embedded with {model}, "
+                f"not {CONFIG['providers']['embedding_model']}; re-export it"
+            )
+            return None
+        _indexes[key] = (mtime, index)
+        return index
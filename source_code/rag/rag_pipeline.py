@@ -23,14 +23,17 @@ if ROOT_DIR not in sys.path:
     sys.path.append(ROOT_DIR)
 
 from source_code.config import CONFIG
-from source_code import models
+from source_code import provider_router
 
 from rag.hybrid_router import route as hybrid_route
 from rag.search import retrieve_notes, retrieve_syllabus
 # from rag.reranker import rerank              # heuristic — kept as fallback
 from rag.cross_encoder import rerank_cross_encoder
-from rag.context_builder import build_context, build_history_block
+from rag.context_builder import build_context, build_history_block, format_sources_for_display, pack_chunks
 from rag.query_expander import expand_query
+from rag.conversation_memory import compact_history
+from rag.retrieval_cache import RetrievalCache, merge_chunks
+from pipeline.embeddings.local_embedding import embed_query
 import prompts
 
 # ---------------------------------------------------------------------------
@@ -48,6 +51,10 @@ FOLLOWUP_PATTERNS = [
     r"\bexplain that again\b",
 ]
 
+UNAVAILABLE_MESSAGE = (
+    "⚠ The answer service is temporarily unavailable. Please try again in a moment."
+)
+
 GENERIC_PATTERNS = [
     r"\bwrite code\b",
     r"\bimplement\b",
@@ -115,6 +122,9 @@ def _trim_history(history: list[dict]) -> list[dict]:
     """
     Keep only the most recent turns in the conversation history to save tokens.
 
+    Used when conversation memory is disabled; otherwise older turns are
+    summarised by conversation_memory.compact_history().
+
     Args:
         history: The full conversation history.
 
@@ -130,18 +140,22 @@ def _trim_history(history: list[dict]) -> list[dict]:
 
 def _generate(prompt: str) -> str:
     """
-    Execute the generation step by calling the centralized models registry.
+    Execute the generation step through the provider router, which falls back
+    to the next healthy chat provider when the active one is slow or failing.
 
     Args:
         prompt: The fully constructed system and user prompt.
 
     Returns:
-        The generated text response.
+        The generated text response, or a short apology if every provider
+        is unavailable.
     """
-    return models.chat(
-        prompt=prompt,
-        temperature=CONFIG["model"].get("temperature", 0.3),
-    )
+    try:
+        # No explicit temperature: each provider uses its own profile default.
+        return provider_router.chat(prompt=prompt)
+    except provider_router.ProviderUnavailable as exc:
+        print(f"[rag_pipeline] generation failed: {exc}")
+        return UNAVAILABLE_MESSAGE
 
 
 # ---------------------------------------------------------------------------
@@ -152,6 +166,7 @@ def answer_query(
     query: str,
     history: list[dict] | None = None,
     session_subject: str | None = None,
+    session_state: dict | None = None,
 ) -> dict:
     """
     The main entry point for the RAG system to process a query and return an answer.
@@ -160,6 +175,8 @@ def answer_query(
         query:           The student's question.
         history:         A list of previous turns (role, content).
         session_subject: An optional subject lock for the current session.
+        session_state:   Mutable per-session dict for cached state (e.g. the
+                         running conversation summary). Optional.
 
     Returns:
         A dictionary containing:
@@ -168,8 +185,12 @@ def answer_query(
           - mode: The intent mode (syllabus vs. generic).
           - sources: Human-readable source citations.
           - chunks: The raw ranked chunks used in the context.
+          - context_stats: Token counts before/after context packing.
     """
-    history = _trim_history(history or [])
+    if CONFIG["rag"]["memory"]["enabled"]:
+        summary, history = compact_history(history or [], session_state)
+    else:
+        summary, history = "", _trim_history(history or [])
 
     expanded_query = expand_query(query)
 
@@ -181,12 +202,19 @@ def answer_query(
     # ── 3. Detect mode ────────────────────────────────────────────────────
     mode = _detect_mode(expanded_query)
 
-    # ── 4. Handle followup — skip retrieval ───────────────────────────────
-    if _is_followup(expanded_query) and history:
-        history_block = build_history_block(history)
+    cache_cfg = CONFIG["rag"]["retrieval_cache"]
+    cache = RetrievalCache(session_state if cache_cfg["enabled"] else None)
+
+    # ── 4. Handle followup — reuse last turn's chunks, skip retrieval ────
+    if _is_followup(expanded_query) and (history or summary):
+        ranked = cache.ranked
+        if ranked:
+            print(f"[rag_pipeline] follow-up: reusing {len(ranked)} cached chunk(s)")
+        packed, context_stats = pack_chunks(ranked, expanded_query)
+        history_block = build_history_block(history, summary=summary)
         prompt = prompts.rag_answer(
             query=expanded_query,
-            notes_context="",
+            notes_context=build_context(packed) if packed else "",
             history_block=history_block,
             mode=mode,
             subject=subject,
@@ -197,18 +225,38 @@ def answer_query(
             "subject": subject,
             "unit": unit,
             "mode": mode,
-            "sources": [],
-            "chunks": [],
+            # [Source N] in the answer refers to the packed list, not `ranked`
+            "sources": format_sources_for_display(packed),
+            "chunks": packed,
             "expanded_query": expanded_query,
+            "context_stats": context_stats,
         }
 
-    # ── 5. Retrieve ───────────────────────────────────────────────────────
-    note_chunks = retrieve_notes(expanded_query, subject=subject, unit=unit, k=CONFIG["rag"]["notes_k"])
+    # ── 5. Retrieve (full search, or top-up on a same-topic turn) ─────────
+    query_vector = embed_query(expanded_query)
+
+    if cache.is_same_topic(query_vector, subject, unit):
+        notes_k, syllabus_k = cache_cfg["topup_notes_k"], cache_cfg["topup_syllabus_k"]
+        cached = cache.rescored_candidates(query_vector)
+    else:
+        notes_k, syllabus_k = CONFIG["rag"]["notes_k"], CONFIG["rag"]["syllabus_k"]
+        cached = []
+
+    note_chunks = retrieve_notes(
+        expanded_query, subject=subject, unit=unit, k=notes_k, query_vector=query_vector,
+    )
 
     # Always retrieve syllabus chunks to give the cross-encoder more candidates
-    syllabus_chunks = retrieve_syllabus(expanded_query, subject=subject, unit=unit, k=CONFIG["rag"]["syllabus_k"])
+    syllabus_chunks = retrieve_syllabus(
+        expanded_query, subject=subject, unit=unit, k=syllabus_k, query_vector=query_vector,
+    )
 
-    all_chunks = note_chunks + syllabus_chunks
+    all_chunks = merge_chunks(note_chunks + syllabus_chunks, cached)
+    if cached:
+        print(
+            f"[rag_pipeline] same-topic turn: {len(cached)} cached + "
+            f"{len(note_chunks) + len(syllabus_chunks)} top-up candidate(s)"
+        )
 
     # ── 6. Cross-encoder rerank ───────────────────────────────────────────
     ranked = rerank_cross_encoder(
@@ -224,9 +272,19 @@ def answer_query(
         mode = "generic"
         ranked = []
 
-    # ── 7. Build context ──────────────────────────────────────────────────
-    notes_context = build_context(ranked)
-    history_block = build_history_block(history)
+    cache.store(query_vector, subject, unit, candidates=all_chunks, ranked=ranked)
+
+    # ── 7. Build context (token-budgeted) ─────────────────────────────────
+    packed, context_stats = pack_chunks(ranked, expanded_query)
+    if context_stats["tokens_saved"]:
+        print(
+            f"[rag_pipeline] context packed: {context_stats['tokens_before']} → "
+            f"{context_stats['tokens_after']} tokens "
+            f"(saved {context_stats['tokens_saved']}, "
+            f"{context_stats['duplicates_dropped']} duplicate chunk(s) dropped)"
+        )
+    notes_context = build_context(packed)
+    history_block = build_history_block(history, summary=summary)
 
     # ── 8. Build prompt ───────────────────────────────────────────────────
     prompt = prompts.rag_answer(
@@ -238,7 +296,6 @@ def answer_query(
     )
 
     # ── 9. Generate ───────────────────────────────────────────────────────
-    from rag.context_builder import format_sources_for_display
     answer = _generate(prompt)
 
     return {
@@ -246,7 +303,9 @@ def answer_query(
         "subject": subject,
         "unit": unit,
         "mode": mode,
-        "sources": format_sources_for_display(ranked),
-        "chunks": ranked,
+        # [Source N] in the answer refers to the packed list, not `ranked`
+        "sources": format_sources_for_display(packed),
+        "chunks": packed,
         "expanded_query": expanded_query,
+        "context_stats": context_stats,
     }
@@ -42,8 +42,6 @@ def rerank(
     if top_n is None:
         top_n = CONFIG["rag"]["rerank_top_n"]
 
-    scored = []
-
     for chunk in chunks:
         meta = chunk.get("metadata", {})
 
@@ -57,9 +55,12 @@ def rerank(
         # Unit match boost
         unit_mult = 1.0
         if predicted_unit:
-            chunk_unit = str(meta.get("unit", "")).lower().strip()
-            # Match "3", "unit3", or "unit 3" against predicted "3"
-            normalized = chunk_unit.replace("unit", "").strip()
+            if "unit_num" in meta:
+                # Migrated metadata: canonical integer, no string parsing
+                normalized = str(meta["unit_num"])
+            else:
+                # Match "3", "unit3", or "unit 3" against predicted "3"
+                normalized = str(meta.get("unit", "")).lower().replace("unit", "").strip()
             if normalized == str(predicted_unit):
                 unit_mult = 1.15  # Hardcoded value (was config.RERANK_UNIT_MATCH_BOOST)
 
@@ -69,7 +70,7 @@ def rerank(
 
         final_score = base_sim * confidence_mult * unit_mult * type_mult
 
-        scored.append({**chunk, "final_score": round(final_score, 4)})
+        chunk["final_score"] = round(final_score, 4)
 
-    scored.sort(key=lambda c: c["final_score"], reverse=True)
+    scored = sorted(chunks, key=lambda c: c["final_score"], reverse=True)
     return scored[:top_n]
@@ -0,0 +1,199 @@
+"""
+retrieval_cache.py
+──────────────────
+Per-session cache of the last turn's retrieval results.
+
+Two kinds of turns can avoid a full search + rerank:
+
+- **Follow-ups** ("explain that again", "summarize") reuse the previous
+  turn's ranked chunks as-is, so the answer stays grounded at zero
+  retrieval cost.
+- **Same-topic turns** (query embedding close to the previous one, same
+  subject/unit) re-score the cached candidates against the new query using
+  their stored embeddings and only fetch a small top-up from ChromaDB.
+
+State lives in ``session_state["retrieval"]`` as plain lists/dicts so any
+session store can persist it:
+
+    {
+      "vectors_key": str,                # entry in the process-local vector LRU
+      "subject": str | None,
+      "unit": str | None,
+      "candidates": [chunk dict, ...],   # everything retrieved, without embeddings
+      "ranked": [chunk dict, ...],       # reranked top-n, without embeddings
+    }
+
+The query vector and the candidates' embeddings (thousands of floats each)
+are kept out of the session: the session store would rewrite them on every
+turn. They live in a bounded in-process LRU (`vector_cache_sessions`
+entries); when an entry has been evicted, or another process serves the
+session, the next turn simply runs a full search.
+
+Chunks are stored with Chunk.to_dict() and handed back as Chunk objects.
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from source_code.config import CONFIG
+from rag.chunk import Chunk, as_dict
+
+
+def _vec(v) -> np.ndarray:
+    return np.asarray(v, dtype=np.float32)
+
+
+def _cosine(a, b) -> float:
+    a, b = _vec(a), _vec(b)
+    denom = float(np.linalg.norm(a) * np.linalg.norm(b))
+    if denom == 0.0:
+        return 0.0
+    return float(np.dot(a, b) / denom)
+
+
+def chunk_key(chunk: dict) -> str:
+    """
+    Stable identity for a chunk across searches: collection + Chroma id, or
+    collection + text hash for chunks without an id.
+    """
+    if chunk.get("id"):
+        return f"{chunk.get('collection', '')}:{chunk['id']}"
+    h = hashlib.sha1(chunk.get("text", "").encode("utf-8")).hexdigest()[:16]
+    return f"{chunk.get('collection', '')}:{h}"
+
+
+# vectors_key → {"query_vector": array, "embeddings": {chunk_key: array}}
+_vectors: OrderedDict[str, dict] = OrderedDict()
+_vectors_lock = threading.Lock()
+
+
+def _get_vectors(key: str | None) -> dict | None:
+    if key is None:
+        return None
+    with _vectors_lock:
+        entry = _vectors.get(key)
+        if entry is not None:
+            _vectors.move_to_end(key)
+        return entry
+
+
+def _put_vectors(key: str, entry: dict) -> None:
+    size = CONFIG["rag"]["retrieval_cache"]["vector_cache_sessions"]
+    with _vectors_lock:
+        _vectors[key] = entry
+        _vectors.move_to_end(key)
+        while len(_vectors) > size:
+            _vectors.popitem(last=False)
+
+
+class RetrievalCache:
+    """Wrapper around ``session_state["retrieval"]``."""
+
+    def __init__(self, session_state: dict | None):
+        self._enabled = session_state is not None
+        self._state = session_state.setdefault("retrieval", {}) if self._enabled else {}
+
+    # -- lookups ------------------------------------------------------------
+
+    @property
+    def ranked(self) -> list[Chunk]:
+        return [Chunk.from_dict(c) for c in self._state.get("ranked", [])]
+
+    def is_same_topic(self, query_vector, subject: str | None, unit: str | None) -> bool:
+        """True if the new query continues the cached turn's topic."""
+        vectors = _get_vectors(self._state.get("vectors_key"))
+        if vectors is None or not self._state.get("candidates"):
+            return False
+        if (subject, unit) != (self._state.get("subject"), self._state.get("unit")):
+            return False
+        threshold = CONFIG["rag"]["retrieval_cache"]["same_topic_threshold"]
+        return _cosine(vectors["query_vector"], query_vector) >= threshold
+
+    def rescored_candidates(self, query_vector) -> list[Chunk]:
+        """
+        Cached candidates with similarity recomputed against a new query.
+
+        Chunks that fall below the retrieval threshold are dropped, exactly as
+        a fresh search would have done.
+        """
+        vectors = _get_vectors(self._state.get("vectors_key"))
+        if vectors is None:
+            return []
+        threshold = CONFIG["rag"]["similarity_threshold"]
+        out = []
+        for chunk in self._state.get("candidates", []):
+            embedding = vectors["embeddings"].get(chunk_key(chunk))
+            if embedding is None:
+                continue
+            sim = _cosine(query_vector, embedding)
+            if sim < threshold:
+                continue
+            # Scores from the previous query's rankings do not carry over
+            out.append(Chunk.from_dict(
+                chunk,
+                embedding=[float(x) for x in embedding],
+                similarity=round(sim, 4),
+                distance=round(1.0 - sim, 6),
+                fused_score=None,
+                final_score=None,
+            ))
+        return out
+
+    # -- updates ------------------------------------------------------------
+
+    def store(
+        self,
+        query_vector,
+        subject: str | None,
+        unit: str | None,
+        candidates: list[dict],
+        ranked: list[dict],
+    ) -> None:
+        # Same-topic turns add top-ups to the cached pool; keep it bounded
+        # at the size of a full search.
+        limit = CONFIG["rag"]["notes_k"] + CONFIG["rag"]["syllabus_k"]
+        candidates = sorted(candidates, key=lambda c: c.get("similarity", 0), reverse=True)[:limit]
+
+        if not self._enabled:
+            return
+        # One LRU entry per session: reuse its key, replacing the vectors
+        key = self._state.get("vectors_key") or uuid.uuid4().hex
+        _put_vectors(key, {
+            "query_vector": _vec(query_vector),
+            "embeddings": {
+                chunk_key(c): _vec(c["embedding"]) for c in candidates if c.get("embedding") is not None
+            },
+        })
+
+        self._state.clear()
+        self._state.update({
+            "vectors_key": key,
+            "subject": subject,
+            "unit": unit,
+            "candidates": [as_dict(c, embedding=False) for c in candidates],
+            "ranked": [as_dict(c, embedding=False) for c in ranked],
+        })
+
+
+def merge_chunks(*groups: list[dict]) -> list[dict]:
+    """Concatenate chunk lists, keeping the first copy of each chunk."""
+    seen: set[str] = set()
+    merged = []
+    for group in groups:
+        for chunk in group:
+            key = chunk_key(chunk)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(chunk)
+    return merged
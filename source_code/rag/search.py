@@ -13,46 +13,75 @@ Public API
   retrieve_syllabus(query, subject, unit, k, threshold) → list[Chunk]
   retrieve_pyq(query, subject, unit, k, threshold)      → list[Chunk]
 
-Each function returns a list of Chunk dicts:
-  {
-    "text":       str,
-    "metadata":   dict,   # raw ChromaDB metadata
-    "distance":   float,  # cosine distance (lower = more similar)
-    "similarity": float,  # 1 - distance (higher = more similar)
-    "collection": str,    # which collection this came from
-  }
+Each function returns a list of Chunk objects (rag/chunk.py, a slotted
+dataclass that also supports dict-style access):
+  Chunk(
+    id:          str,    # ChromaDB document id
+    text:        str,
+    metadata:    dict,   # raw ChromaDB metadata
+    distance:    float,  # cosine distance (lower = more similar)
+    similarity:  float,  # 1 - distance (higher = more similar)
+    collection:  str,    # which collection this came from
+    embedding:   list,   # stored chunk vector (used by the retrieval cache)
+    fused_score: float,  # set by hybrid fusion, else None
+    final_score: float,  # set by the reranker, else None
+  )
+
+Pass `query_vector=` to reuse an embedding the caller already has; otherwise
+the query is embedded through the embed_query() LRU.
+
+Subject partitions
+------------------
+With CONFIG["rag"]["partitioning"]["enabled"], a query whose subject is known
+goes straight to that subject's partition collection ("<collection>__<subject>",
+written by the ingest scripts) without a subject clause in the where-filter.
+Unknown subjects, or partitions that have not been built, fall back to the
+filtered global collection.
+
+Hybrid retrieval
+----------------
+When a BM25 index exists for the collection (built at ingest time, see
+rag/lexical_index.py) the dense ranking is fused with the lexical ranking by
+reciprocal rank fusion under the same where-filter. The fused list is still
+cut to k, so the cross-encoder sees the same number of candidates. Fused
+chunks carry an extra "fused_score"; lexical-only hits get their cosine
+similarity from the stored embedding and bypass the dense threshold.
+
+Quantized first stage
+---------------------
+With CONFIG["rag"]["quantization"]["enabled"] and a quantized snapshot of
+the collection on disk (pipeline/export_snapshot.py --quantize int8|binary),
+the dense ranking comes from rag/quantized_index.py instead of Chroma: the
+compressed codes pick k × oversample candidates, which are re-scored with
+full-precision vectors, so the cross-encoder still sees exact similarities.
+Collections without a quantized snapshot (e.g. partitions) use Chroma.
 
 Unit normalisation
 ------------------
 Both ingestion pipelines now write plain numeric strings ("1", "2" …).
 Older ingest runs may have written "unit1". The _unit_filter() helper
 builds a ChromaDB $or clause that matches both forms so old data works
-transparently.
+transparently. Collections migrated by pipeline/migrate_unit_labels.py
+(collection metadata unit_schema_version >= 2) carry an integer "unit_num"
+and get a plain equality filter instead.
 """
 
 import os
 import re
 import sys
-from typing import TypedDict
+import time
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT_DIR not in sys.path:
     sys.path.append(ROOT_DIR)
 
 import chromadb
+import numpy as np
 from source_code.config import CONFIG
-from pipeline.embeddings.local_embedding import embed
-
-# ---------------------------------------------------------------------------
-# Types
-# ---------------------------------------------------------------------------
-
-class Chunk(TypedDict):
-    text:       str
-    metadata:   dict
-    distance:   float
-    similarity: float
-    collection: str
+from pipeline.embeddings.local_embedding import embed_query
+from rag import lexical_index, quantized_index
+from rag.chunk import Chunk
+from utils import UNIT_SCHEMA_KEY, UNIT_SCHEMA_VERSION, partition_collection_name
 
 
 # ---------------------------------------------------------------------------
@@ -103,6 +132,33 @@ def _get(alias: str) -> chromadb.Collection:
     return _collections[alias]
 
 
+# Partition handles by name; a None value records a missing partition and
+# when it was last checked, so we re-check occasionally after a rebuild.
+_partitions: dict[str, chromadb.Collection | float] = {}
+_PARTITION_RECHECK_S = 60.0
+
+
+def _get_partition(alias: str, subject: str) -> chromadb.Collection | None:
+    """
+    Return the subject's partition of a collection, or None if it has not
+    been built (or partitioning is disabled).
+    """
+    if not CONFIG["rag"]["partitioning"]["enabled"]:
+        return None
+    name = partition_collection_name(_COLLECTION_NAMES[alias], subject)
+    cached = _partitions.get(name)
+    if isinstance(cached, chromadb.Collection):
+        return cached
+    if cached is not None and time.monotonic() - cached < _PARTITION_RECHECK_S:
+        return None
+    try:
+        _partitions[name] = _client.get_collection(name)
+    except Exception:
+        _partitions[name] = time.monotonic()
+        return None
+    return _partitions[name]
+
+
 def collection_exists(alias: str) -> bool:
     """
     Check if a specific search collection is available in ChromaDB.
@@ -146,16 +202,26 @@ def normalize_unit(raw: str | int | None) -> str | None:
     return None
 
 
-def _unit_filter(unit: str) -> dict:
+def _has_unit_schema(collection: chromadb.Collection) -> bool:
+    """True if the collection was migrated to the integer unit_num field."""
+    version = (collection.metadata or {}).get(UNIT_SCHEMA_KEY, 1)
+    return version >= UNIT_SCHEMA_VERSION
+
+
+def _unit_filter(unit: str, canonical: bool = False) -> dict:
     """
-    Build a flexible ChromaDB filter for unit numbers.
+    Build a ChromaDB filter for unit numbers.
 
-    This creates an $or clause to support both the current ("1")
-    and legacy ("unit1") storage formats.
+    Migrated collections match the integer "unit_num" field directly;
+    otherwise an $or clause supports both the current ("1") and legacy
+    ("unit1") storage formats.
 
     Args:
-        unit: The normalized numeric unit string.
+        unit:      The normalized numeric unit string.
+        canonical: True if the collection has the unit_num field.
     """
+    if canonical:
+        return {"unit_num": int(unit)}
     return {
         "$or": [
             {"unit": unit},
@@ -172,6 +238,7 @@ def _build_where(
     subject: str | None = None,
     unit: str | None = None,
     extra: list[dict] | None = None,
+    canonical_units: bool = False,
 ) -> dict | None:
     """
     Construct a nested ChromaDB 'where' clause for metadata filtering.
@@ -180,6 +247,7 @@ def _build_where(
         subject: Optional subject name to filter by.
         unit:    Optional unit number to filter by.
         extra:   A list of additional ChromaDB filter dictionaries.
+        canonical_units: Filter on the migrated integer unit_num field.
 
     Returns:
         A combined ChromaDB filter dict, or None if no filters are provided.
@@ -192,7 +260,7 @@ def _build_where(
     if unit:
         n = normalize_unit(unit)
         if n:
-            filters.append(_unit_filter(n))
+            filters.append(_unit_filter(n, canonical_units))
 
     if extra:
         filters.extend(extra)
@@ -208,12 +276,21 @@ def _build_where(
 # Core retrieval helper
 # ---------------------------------------------------------------------------
 
+def _as_list(vector) -> list[float] | None:
+    """Chroma returns numpy rows; tolist() converts in C instead of per element."""
+    if vector is None:
+        return None
+    return vector.tolist() if hasattr(vector, "tolist") else list(vector)
+
+
 def _query_collection(
     alias: str,
     query: str,
     where: dict | None,
     k: int,
     threshold: float,
+    query_vector: list[float] | None = None,
+    collection: chromadb.Collection | None = None,
 ) -> list[Chunk]:
     """
     Internal helper to execute a vector similarity search.
@@ -227,17 +304,44 @@ def _query_collection(
         where:     The pre-constructed metadata filter.
         k:         Number of results to fetch.
         threshold: Minimum similarity score (0.0 to 1.0) to keep a result.
+        query_vector: Pre-computed embedding of `query`, if available.
+        collection: Collection to search instead of the alias's global one
+                    (a subject partition).
 
     Returns:
-        A list of Chunk objects sorted by similarity.
+        A list of Chunk objects sorted by similarity (by fused score when a
+        lexical index is available).
     """
-    collection = _get(alias)
-    query_vector = embed([query])[0]
+    if collection is None:
+        collection = _get(alias)
+    if query_vector is None:
+        query_vector = embed_query(query)
 
+    # cosine space: distance = 1 − similarity → keep if distance ≤ max_distance
+    max_dist = 1.0 - threshold
+
+    dense = _query_quantized(alias, collection, query_vector, where, k, max_dist)
+    if dense is None:
+        dense = _query_chroma(alias, collection, query_vector, where, k, max_dist)
+
+    if not CONFIG["rag"]["hybrid_search"]["enabled"]:
+        return dense
+    return _fuse_lexical(alias, collection, query, query_vector, where, k, dense)
+
+
+def _query_chroma(
+    alias: str,
+    collection: chromadb.Collection,
+    query_vector: list[float],
+    where: dict | None,
+    k: int,
+    max_dist: float,
+) -> list[Chunk]:
+    """Dense top-k from the Chroma HNSW index."""
     params: dict = {
         "query_embeddings": [query_vector],
         "n_results": k,
-        "include": ["documents", "metadatas", "distances"],
+        "include": ["documents", "metadatas", "distances", "embeddings"],
     }
     if where is not None:
         params["where"] = where
@@ -251,26 +355,186 @@ def _query_collection(
     if not results or not results.get("documents"):
         return []
 
+    ids   = results["ids"][0]
     docs  = results["documents"][0]
     metas = results["metadatas"][0]
     dists = results["distances"][0]
-
-    # cosine space: distance = 1 − similarity → keep if distance ≤ max_distance
-    max_dist = 1.0 - threshold
+    embs  = results["embeddings"][0] if results.get("embeddings") is not None else [None] * len(docs)
 
     return [
         Chunk(
+            id=doc_id,
             text=doc,
             metadata=meta,
             distance=round(dist, 6),
             similarity=round(1.0 - dist, 4),
             collection=alias,
+            embedding=_as_list(emb),
         )
-        for doc, meta, dist in zip(docs, metas, dists)
+        for doc_id, doc, meta, dist, emb in zip(ids, docs, metas, dists, embs)
         if dist <= max_dist
     ]
 
 
+def _query_quantized(
+    alias: str,
+    collection: chromadb.Collection,
+    query_vector: list[float],
+    where: dict | None,
+    k: int,
+    max_dist: float,
+) -> list[Chunk] | None:
+    """
+    Dense top-k from the quantized snapshot (first stage on compressed codes,
+    full-precision rescoring). Returns None when quantization is disabled,
+    no up-to-date snapshot exists or the filter matches none of its rows, so
+    the caller falls back to Chroma.
+    """
+    if not CONFIG["rag"]["quantization"]["enabled"]:
+        return None
+    index = quantized_index.get_index(collection)
+    if index is None:
+        return None
+    try:
+        hits = index.search(query_vector, k, where)
+    except ValueError as exc:
+        # e.g. the snapshot was exported with a different embedding model
+        print(f"[search] {alias} quantized search unavailable: {exc}")
+        return None
+    if hits is None:   # filter matches nothing in the snapshot
+        return None
+    return [Chunk.from_dict(hit, collection=alias) for hit in hits if hit["distance"] <= max_dist]
+
+
+def _search(
+    alias: str,
+    query: str,
+    subject: str | None,
+    unit: str | None,
+    extra: list[dict] | None,
+    k: int,
+    threshold: float,
+    query_vector: list[float] | None,
+) -> list[Chunk]:
+    """
+    Route a search to the subject partition when one exists, otherwise to the
+    global collection with a subject filter.
+    """
+    partition = _get_partition(alias, subject.upper()) if subject else None
+    collection = partition if partition is not None else _get(alias)
+    where = _build_where(
+        subject=subject if partition is None else None,
+        unit=unit,
+        extra=extra,
+        canonical_units=_has_unit_schema(collection),
+    )
+    return _query_collection(alias, query, where, k, threshold, query_vector, collection)
+
+
+# ---------------------------------------------------------------------------
+# Hybrid (BM25 + dense) fusion
+# ---------------------------------------------------------------------------
+
+def _cosine(a, b) -> float:
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    denom = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(np.dot(a, b) / denom) if denom else 0.0
+
+
+def _fuse_lexical(
+    alias: str,
+    collection: chromadb.Collection,
+    query: str,
+    query_vector: list[float],
+    where: dict | None,
+    k: int,
+    dense: list[Chunk],
+) -> list[Chunk]:
+    """
+    Fuse dense hits with BM25 hits by reciprocal rank fusion.
+
+    Args:
+        alias:        Collection alias.
+        collection:   The Chroma collection (used to fetch lexical-only hits).
+        query:        Query text for BM25.
+        query_vector: Query embedding, for the similarity of lexical-only hits.
+        where:        The same metadata filter the dense query used.
+        k:            Number of fused results to return.
+        dense:        Dense hits, best first.
+
+    Returns:
+        Up to k chunks ordered by fused score (dense list unchanged if the
+        collection has no lexical index yet).
+    """
+    index = lexical_index.get_index(collection.name)
+    if index is None:
+        return dense
+
+    cfg = CONFIG["rag"]["hybrid_search"]
+    lexical = index.search(query, cfg["lexical_k"], where)
+    if not lexical:
+        return dense
+
+    rrf_k = cfg["rrf_k"]
+    fused: dict[str, float] = {}
+    for rank, chunk in enumerate(dense):
+        fused[chunk["id"]] = fused.get(chunk["id"], 0.0) + 1.0 / (rrf_k + rank + 1)
+    lexical_ids = []
+    for rank, (doc_no, _score) in enumerate(lexical):
+        doc_id = index.ids[doc_no]
+        lexical_ids.append(doc_id)
+        fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+
+    top_ids = sorted(fused, key=fused.get, reverse=True)[:k]
+
+    by_id = {c["id"]: c for c in dense}
+    missing = [doc_id for doc_id in top_ids if doc_id not in by_id]
+    if missing:
+        by_id.update(_fetch_lexical_hits(alias, collection, missing, query_vector))
+
+    out: list[Chunk] = []
+    for doc_id in top_ids:
+        chunk = by_id.get(doc_id)
+        if chunk is None:
+            continue
+        chunk.fused_score = round(fused[doc_id], 6)
+        out.append(chunk)
+    return out
+
+
+def _fetch_lexical_hits(
+    alias: str,
+    collection: chromadb.Collection,
+    ids: list[str],
+    query_vector: list[float],
+) -> dict[str, Chunk]:
+    """Load lexical-only hits from Chroma and score them against the query vector."""
+    try:
+        got = collection.get(ids=ids, include=["documents", "metadatas", "embeddings"])
+    except Exception as exc:
+        print(f"[search] {alias} lexical fetch failed: {exc}")
+        return {}
+
+    embs = got.get("embeddings")
+    if embs is None:
+        embs = [None] * len(got["ids"])
+
+    hits: dict[str, Chunk] = {}
+    for doc_id, doc, meta, emb in zip(got["ids"], got["documents"], got["metadatas"], embs):
+        sim = _cosine(query_vector, emb) if emb is not None else 0.0
+        hits[doc_id] = Chunk(
+            id=doc_id,
+            text=doc,
+            metadata=meta,
+            distance=round(1.0 - sim, 6),
+            similarity=round(sim, 4),
+            collection=alias,
+            embedding=_as_list(emb),
+        )
+    return hits
+
+
 # ---------------------------------------------------------------------------
 # Public retrieval functions
 # ---------------------------------------------------------------------------
@@ -281,6 +545,7 @@ def retrieve_notes(
     unit: str | None = None,
     k: int = None,
     threshold: float | None = None,
+    query_vector: list[float] | None = None,
 ) -> list[Chunk]:
     """
     Fetch relevant lecture note chunks while explicitly excluding syllabus metadata.
@@ -291,6 +556,7 @@ def retrieve_notes(
         unit:      Unit filter.
         k:         Max results (overrides config if provided).
         threshold: Score threshold (overrides config if provided).
+        query_vector: Pre-computed query embedding (skips re-embedding).
 
     Returns:
         List of candidate chunks from lecture notes.
@@ -300,12 +566,11 @@ def retrieve_notes(
     if threshold is None:
         threshold = CONFIG["rag"]["similarity_threshold"]
 
-    where = _build_where(
-        subject=subject,
-        unit=unit,
+    return _search(
+        "notes", query, subject, unit,
         extra=[{"document_type": {"$ne": "syllabus"}}],
+        k=k, threshold=threshold, query_vector=query_vector,
     )
-    return _query_collection("notes", query, where, k, threshold)
 
 
 def retrieve_syllabus(
@@ -314,6 +579,7 @@ def retrieve_syllabus(
     unit: str | None = None,
     k: int = None,
     threshold: float | None = None,
+    query_vector: list[float] | None = None,
 ) -> list[Chunk]:
     """
     Retrieve syllabus topics and learning outcomes.
@@ -327,6 +593,7 @@ def retrieve_syllabus(
         unit:      Unit filter.
         k:         Max results.
         threshold: Score threshold.
+        query_vector: Pre-computed query embedding (skips re-embedding).
 
     Returns:
         List of syllabus-specific chunks.
@@ -336,8 +603,10 @@ def retrieve_syllabus(
     if threshold is None:
         threshold = CONFIG["rag"]["similarity_threshold"]
 
-    where = _build_where(subject=subject, unit=unit)
-    return _query_collection("syllabus", query, where, k, threshold)
+    return _search(
+        "syllabus", query, subject, unit, extra=None,
+        k=k, threshold=threshold, query_vector=query_vector,
+    )
 
 
 def retrieve_pyq(
@@ -348,6 +617,7 @@ def retrieve_pyq(
     threshold: float = None,
     marks: int | None = None,
     year: int | None = None,
+    query_vector: list[float] | None = None,
 ) -> list[Chunk]:
     """
     Retrieve historical exam questions from the PYQ collection.
@@ -363,6 +633,7 @@ def retrieve_pyq(
         threshold: Score threshold.
         marks:     Filter for question mark value (e.g., 2, 5, 10).
         year:      Filter for a specific exam year.
+        query_vector: Pre-computed query embedding (skips re-embedding).
 
     Returns:
         List of matching past-year questions.
@@ -378,8 +649,10 @@ def retrieve_pyq(
     if year is not None:
         extra.append({"year": year})
 
-    where = _build_where(subject=subject, unit=unit, extra=extra or None)
-    return _query_collection("pyq", query, where, k, threshold)
+    return _search(
+        "pyq", query, subject, unit, extra=extra or None,
+        k=k, threshold=threshold, query_vector=query_vector,
+    )
 
 
 def retrieve_all(
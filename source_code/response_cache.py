@@ -0,0 +1,154 @@
+"""
+response_cache.py
+─────────────────
+Content-addressed cache of vision-model responses, consulted by
+models.vision() for every extractor.
+
+The extractors' own checkpoints are keyed on output file names
+(chunk_{start}_{end}.json, *_processed.json): moving a PDF, renaming a folder
+or changing CHUNK_SIZE re-sends every page to the VLM. This cache is keyed
+on what the model actually sees instead:
+
+    sha256(model, sha256(prompt), sha256(image 1), sha256(image 2), ...)
+
+so a rerun, a moved file or the same handout in two folders is paid for
+once. Error strings ("⚠ Vision Error: ...") are never stored.
+
+Responses live in one SQLite file (CONFIG["paths"]["vlm_cache"], WAL mode, so
+several extractor processes can share it). Disable with
+CONFIG["extract"]["vlm_cache"]["enabled"] = False.
+
+    python source_code/response_cache.py            # entries, hits, size
+    python source_code/response_cache.py --clear
+"""
+
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+
+from source_code.config import CONFIG
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key         TEXT PRIMARY KEY,
+    model       TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    response    TEXT NOT NULL,
+    created     REAL NOT NULL,
+    hits        INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def image_digest(image) -> str:
+    """
+    Hash of one image as accepted by models.vision(): raw bytes, a file path,
+    or a PIL image (hashed over mode, size and pixels, so re-encoding the same
+    render does not change the key).
+    """
+    if isinstance(image, (bytes, bytearray)):
+        return _sha256(bytes(image))
+    if isinstance(image, str):
+        if os.path.exists(image):
+            with open(image, "rb") as f:
+                return _sha256(f.read())
+        return _sha256(image.encode("utf-8"))   # e.g. a base64 payload
+    if hasattr(image, "tobytes") and hasattr(image, "mode"):
+        header = f"{image.mode}:{image.size}".encode("utf-8")
+        return _sha256(header + image.tobytes())
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    return _sha256(buf.getvalue())
+
+
+def vision_key(images: list, prompt: str, model: str) -> str:
+    """Cache key of a vision call (order of the images matters)."""
+    parts = [model, _sha256(prompt.encode("utf-8"))] + [image_digest(img) for img in images]
+    return _sha256("\n".join(parts).encode("utf-8"))
+
+
+class ResponseCache:
+    """SQLite-backed key → response store, safe to share between threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET hits = hits + 1 WHERE key = ?", (key,))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, response: str, model: str, prompt: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, prompt_hash, response, created) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, _sha256(prompt.encode("utf-8")), response, time.time()),
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, hits, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(LENGTH(response)), 0) FROM responses"
+            ).fetchone()
+        return {"entries": entries, "hits": hits, "response_bytes": size, "path": self.path}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_cache: ResponseCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache | None:
+    """The process-wide cache, or None when disabled."""
+    global _cache
+    if not CONFIG["extract"]["vlm_cache"]["enabled"]:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache.path != CONFIG["paths"]["vlm_cache"]:
+            _cache = ResponseCache(CONFIG["paths"]["vlm_cache"])
+        return _cache
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or clear the VLM response cache.")
+    parser.add_argument("--clear", action="store_true", help="delete every cached response")
+    args = parser.parse_args()
+
+    cache = ResponseCache(CONFIG["paths"]["vlm_cache"])
+    if args.clear:
+        cache.clear()
+        print(f"Cleared {cache.path}")
+    stats = cache.stats()
+    print(
+        f"{stats['entries']} response(s), {stats['hits']} hit(s), "
+        f"{stats['response_bytes'] / 1024:.1f}KB  ({stats['path']})"
+    )
@@ -28,6 +28,7 @@ if ROOT_DIR not in sys.path:
 
 import config
 from rag.rag_pipeline import answer_query
+from rag.cross_encoder import cache_stats
 
 # ------------------------------------------------------------
 # Configuration
@@ -183,7 +184,14 @@ def sweep():
 
         stats = compute_stats(results)
         stats["elapsed_s"] = round(elapsed, 1)
+        # Cumulative: later thresholds re-score the same (query, chunk) pairs
+        stats["rerank_cache"] = cache_stats()
         all_stats[threshold] = stats
+        print(
+            f"  Rerank cache: {stats['rerank_cache']['hits']} hits / "
+            f"{stats['rerank_cache']['misses']} misses "
+            f"(hit rate {stats['rerank_cache']['hit_rate']:.1%})"
+        )
 
     # ---- Summary table ----
     print(f"\n{'='*70}")
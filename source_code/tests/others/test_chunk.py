@@ -0,0 +1,72 @@
+import json
+import os
+import sys
+import unittest
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+source_root = os.path.join(project_root, "source_code")
+if source_root not in sys.path:
+    sys.path.append(source_root)
+
+from rag.chunk import Chunk, as_dict
+from source_code.rag.retrieval_cache import RetrievalCache, chunk_key, merge_chunks
+
+
+def _chunk(i, **extra):
+    return Chunk(
+        id=f"doc{i}", text=f"text {i}", metadata={"unit": "1"},
+        distance=0.2, similarity=0.8, collection="notes", embedding=[1.0, 0.0], **extra,
+    )
+
+
+class TestChunk(unittest.TestCase):
+
+    def test_slotted(self):
+        c = _chunk(0)
+        self.assertFalse(hasattr(c, "__dict__"))
+        with self.assertRaises(AttributeError):
+            c.extra = 1
+
+    def test_dict_protocol(self):
+        c = _chunk(0)
+        self.assertEqual(c["text"], "text 0")
+        self.assertNotIn("final_score", c)
+        self.assertEqual(c.get("final_score", c.get("similarity")), 0.8)
+        with self.assertRaises(KeyError):
+            c["fused_score"]
+        c["final_score"] = 0.7
+        self.assertIn("final_score", c)
+        self.assertEqual({**c}["final_score"], 0.7)
+        with self.assertRaises(KeyError):
+            c["unknown"] = 1
+
+    def test_round_trip(self):
+        c = _chunk(0, fused_score=0.03)
+        data = json.loads(json.dumps(as_dict(c)))
+        self.assertEqual(Chunk.from_dict(data), c)
+        self.assertNotIn("embedding", c.to_dict(embedding=False))
+        self.assertNotIn("final_score", data)
+
+    def test_keys_on_id(self):
+        a, b = _chunk(0), _chunk(0)
+        b.text = "same id, different text"
+        self.assertEqual(chunk_key(a), chunk_key(b))
+        self.assertEqual(len(merge_chunks([a], [b, _chunk(1)])), 2)
+
+    def test_retrieval_cache_state_is_plain(self):
+        state = {}
+        cache = RetrievalCache(state)
+        ranked = [_chunk(0, final_score=0.9)]
+        cache.store([1.0, 0.0], "COA", "1", candidates=[_chunk(0), _chunk(1)], ranked=ranked)
+        json.dumps(state)   # session stores serialise this
+        self.assertIsInstance(cache.ranked[0], Chunk)
+        self.assertEqual(cache.ranked[0].final_score, 0.9)
+        rescored = cache.rescored_candidates([1.0, 0.0])
+        self.assertTrue(all(c.final_score is None for c in rescored))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code.config import CONFIG
+from source_code.rag.context_builder import pack_chunks, build_history_block
+
+
+def _word_tokens(text, provider=None):
+    """Deterministic stand-in tokenizer: one token per whitespace word."""
+    return len(text.split())
+
+
+def _chunk(text, score):
+    return {"text": text, "metadata": {"source": "x.pdf"}, "final_score": score}
+
+
+FILLER = " ".join(f"Filler sentence number {i} talks about unrelated things." for i in range(40))
+OTHER = " ".join(f"Cache line {i} maps into set {i % 7} using direct mapping." for i in range(40))
+
+
+@patch('source_code.models.count_tokens', side_effect=_word_tokens)
+class TestContextPacking(unittest.TestCase):
+
+    def test_small_context_is_untouched(self, _):
+        chunks = [_chunk("A flip flop stores one bit.", 0.9)]
+        packed, stats = pack_chunks(chunks, "what is a flip flop", budget=500)
+        self.assertEqual(packed[0]["text"], chunks[0]["text"])
+        self.assertEqual(stats["tokens_saved"], 0)
+
+    def test_duplicates_are_dropped(self, _):
+        text = "The JK flip flop removes the invalid state of the SR flip flop by toggling."
+        chunks = [_chunk(text, 0.9), _chunk(text + " Extra words.", 0.8)]
+        packed, stats = pack_chunks(chunks, "jk flip flop", budget=500)
+        self.assertEqual(len(packed), 1)
+        self.assertEqual(stats["duplicates_dropped"], 1)
+
+    def test_budget_respected_and_relevant_sentence_kept(self, _):
+        relevant = "A Karnaugh map groups adjacent minterms to simplify boolean expressions."
+        chunks = [
+            _chunk(FILLER + " " + relevant + " " + FILLER, 0.9),
+            _chunk(OTHER, 0.3),
+        ]
+        budget = 200
+        packed, stats = pack_chunks(chunks, "karnaugh map minterms", budget=budget)
+
+        self.assertLessEqual(stats["tokens_after"], budget)
+        self.assertGreater(stats["tokens_saved"], 0)
+        self.assertIn(relevant, packed[0]["text"])
+
+    def test_higher_score_gets_larger_share(self, _):
+        chunks = [
+            _chunk(FILLER, 0.7),
+            _chunk(OTHER, 0.3),
+        ]
+        packed, _ = pack_chunks(chunks, "filler", budget=400)
+        self.assertEqual(len(packed), 2)
+        lengths = [len(c["text"].split()) for c in packed]
+        self.assertGreater(lengths[0], lengths[-1])
+
+    def test_history_keeps_newest_turns(self, _):
+        history = [
+            {"role": "user", "content": "old question " * 50},
+            {"role": "assistant", "content": "old answer " * 50},
+            {"role": "user", "content": "latest question"},
+            {"role": "assistant", "content": "latest answer"},
+        ]
+        with patch.dict(CONFIG["rag"]["context_packing"], {"min_chunk_tokens": 1000}):
+            block = build_history_block(history, budget=20)
+        self.assertIn("latest answer", block)
+        self.assertNotIn("old question", block)
+
+    def test_history_keeps_last_exchange_over_long_summary(self, _):
+        history = [
+            {"role": "user", "content": "latest question"},
+            {"role": "assistant", "content": "latest answer"},
+        ]
+        with patch.dict(CONFIG["rag"]["context_packing"], {"min_chunk_tokens": 5}):
+            block = build_history_block(history, summary="earlier topic " * 50, budget=20)
+        self.assertIn("USER: latest question", block)
+        self.assertIn("ASSISTANT: latest answer", block)
+        self.assertIn("earlier topic", block)
+        self.assertLess(block.count("earlier topic"), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code.config import CONFIG
+from source_code.rag import conversation_memory
+from source_code.rag.conversation_memory import compact_history, retained_history
+
+MEMORY_OVERRIDES = {"enabled": True, "verbatim_turns": 2, "fold_every": 2}
+
+
+def _conversation(n_pairs):
+    history = []
+    for i in range(n_pairs):
+        history.append({"role": "user", "content": f"question {i}"})
+        history.append({"role": "assistant", "content": f"answer {i} " * 100})
+    return history
+
+
+@patch.dict(CONFIG["rag"]["memory"], MEMORY_OVERRIDES)
+class TestConversationMemory(unittest.TestCase):
+
+    @patch('source_code.provider_router.chat', return_value="student asked about questions")
+    def test_short_history_is_not_summarised(self, mock_chat):
+        summary, recent = compact_history(_conversation(2), {})
+        self.assertEqual(summary, "")
+        self.assertEqual(len(recent), 4)
+        mock_chat.assert_not_called()
+
+    @patch('source_code.provider_router.chat', return_value="running summary")
+    def test_verbatim_tail_stays_flat(self, mock_chat):
+        state = {}
+        history = []
+        for i in range(10):
+            history += _conversation(1)
+            summary, recent = compact_history(history, state)
+            self.assertLessEqual(len(recent), 2 * 2 + MEMORY_OVERRIDES["fold_every"])
+        self.assertEqual(summary, "running summary")
+        self.assertEqual(state["memory"]["summarized_turns"], len(history) - len(recent))
+
+    @patch('source_code.provider_router.chat', return_value="running summary")
+    def test_summary_is_cached_between_calls(self, mock_chat):
+        state = {}
+        history = _conversation(3)
+        compact_history(history, state)
+        compact_history(history, state)
+        self.assertEqual(mock_chat.call_count, 1)
+
+    @patch('source_code.provider_router.chat', return_value="running summary")
+    def test_changed_history_resets_summary(self, mock_chat):
+        state = {}
+        compact_history(_conversation(3), state)
+
+        other = [{"role": "user", "content": "fresh start"}]
+        summary, recent = compact_history(other, state)
+        self.assertEqual(summary, "")
+        self.assertEqual(recent, other)
+
+
+    @patch('source_code.provider_router.chat', return_value="running summary")
+    def test_stateless_callers_with_same_opening_do_not_share_summaries(self, mock_chat):
+        conversation_memory._fallback_states.clear()
+        a = [{"role": "user", "content": "hi"}] + _conversation(3)
+        b = [{"role": "user", "content": "hi"}] + _conversation(3)[::-1]
+        compact_history(a)
+        compact_history(b)
+        self.assertEqual(mock_chat.call_count, 2)
+
+        # Each conversation picks up its own summary on the next turn
+        compact_history(a + _conversation(1)[:1])
+        compact_history(b + _conversation(1)[:1])
+        self.assertEqual(mock_chat.call_count, 2)
+
+
+    @patch('source_code.provider_router.chat', return_value="running summary")
+    def test_retained_history_drops_folded_turns_and_keeps_summary(self, mock_chat):
+        state = {}
+        history = _conversation(4)
+        compact_history(history, state)
+        kept = retained_history(history, state)
+        self.assertEqual(len(kept), len(history) - 4)
+
+        # The rebased state keeps folding on top of the same summary
+        summary, recent = compact_history(kept, state)
+        self.assertEqual(summary, "running summary")
+        self.assertEqual(recent, kept)
+        self.assertEqual(mock_chat.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
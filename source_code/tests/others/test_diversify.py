@@ -0,0 +1,68 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code.rag import cross_encoder
+from source_code.rag.chunk import Chunk
+from source_code.rag.diversify import mmr_select
+
+
+def _chunk(i, source, embedding, similarity):
+    return Chunk(
+        id=f"c{i}", text=f"text {i}", metadata={"source": source}, distance=1 - similarity,
+        similarity=similarity, collection="notes", embedding=embedding,
+    )
+
+
+class TestMMRSelect(unittest.TestCase):
+
+    def test_lambda_one_is_top_k(self):
+        chunks = [_chunk(i, f"s{i}.pdf", [1.0, 0.0], 0.9 - i * 0.1) for i in range(5)]
+        picked = mmr_select(chunks, [c.similarity for c in chunks], 3, lambda_mult=1.0, per_source_cap=0)
+        self.assertEqual([c.id for c in picked], ["c0", "c1", "c2"])
+
+    def test_redundant_vectors_are_skipped(self):
+        chunks = [
+            _chunk(0, "a.pdf", [1.0, 0.0], 0.90),
+            _chunk(1, "b.pdf", [0.99, 0.05], 0.89),
+            _chunk(2, "c.pdf", [0.0, 1.0], 0.80),
+        ]
+        picked = mmr_select(chunks, [c.similarity for c in chunks], 2, lambda_mult=0.5, per_source_cap=0)
+        self.assertEqual([c.id for c in picked], ["c0", "c2"])
+
+    def test_per_source_cap(self):
+        chunks = [_chunk(i, "deck.pdf", None, 0.9 - i * 0.01) for i in range(5)]
+        chunks.append(_chunk(5, "book.pdf", None, 0.5))
+        picked = mmr_select(chunks, [c.similarity for c in chunks], 3, lambda_mult=1.0, per_source_cap=2)
+        self.assertEqual([c.id for c in picked], ["c0", "c1", "c5"])
+
+    def test_cap_relaxed_when_pool_is_one_source(self):
+        chunks = [_chunk(i, "deck.pdf", None, 0.9 - i * 0.01) for i in range(4)]
+        picked = mmr_select(chunks, [c.similarity for c in chunks], 3, per_source_cap=1)
+        self.assertEqual(len(picked), 3)
+
+
+class TestRerankCandidates(unittest.TestCase):
+
+    def test_one_source_cannot_fill_the_budget(self):
+        chunks = [_chunk(i, "deck.pdf", [1.0, i * 0.01], 0.9 - i * 0.01) for i in range(6)]
+        chunks += [_chunk(6, "book.pdf", [0.2, 1.0], 0.6), _chunk(7, "lab.pdf", [-0.3, 1.0], 0.55)]
+        cross_encoder.clear_score_cache()
+        with patch.object(cross_encoder.models, "rerank", side_effect=lambda q, docs, model=None: [0.7] * len(docs)) as rerank:
+            cross_encoder.rerank_cross_encoder("query", chunks, top_n=4, candidates=4)
+        scored = rerank.call_args[0][1]
+        self.assertEqual(len(scored), 4)
+        # Default per_source_cap=3 leaves one slot for the best other source
+        self.assertEqual(sum(t in {f"text {i}" for i in range(6)} for t in scored), 3)
+        self.assertIn("text 6", scored)
+        cross_encoder.clear_score_cache()
+
+
+if __name__ == '__main__':
+    unittest.main()
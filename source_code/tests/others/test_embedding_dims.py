@@ -0,0 +1,69 @@
+import math
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code.config import CONFIG
+from source_code.pipeline.embeddings.local_embedding import truncate_embedding
+from source_code.rag import embedding_router
+
+
+class TestTruncateEmbedding(unittest.TestCase):
+
+    def test_prefix_is_renormalised(self):
+        out = truncate_embedding([3.0, 4.0, 12.0], 2)
+        self.assertEqual(len(out), 2)
+        self.assertAlmostEqual(math.hypot(*out), 1.0)
+        self.assertAlmostEqual(out[0], 0.6)
+
+    def test_full_dimension_unchanged(self):
+        vec = [1.0, 2.0, 3.0]
+        self.assertIs(truncate_embedding(vec, None), vec)
+        self.assertIs(truncate_embedding(vec, 8), vec)
+
+
+class TestRouterDimensions(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.units = {f"COA_{i}": rng.normal(size=64).tolist() for i in range(1, 6)}
+        self._patches = [
+            patch.object(embedding_router, "_unit_embeddings", self.units),
+            patch.object(embedding_router, "_unit_keys", list(self.units)),
+            patch.object(embedding_router, "_unit_matrices", {}),
+            patch.dict(CONFIG["rag"], {"embedding_router_threshold": 0.5}),
+        ]
+        for p in self._patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self._patches):
+            p.stop()
+
+    def _route(self, query_vec, dim):
+        with patch.object(embedding_router, "embed_query", return_value=query_vec), \
+             patch.dict(CONFIG["rag"]["embedding_dims"], {"router": dim}):
+            return embedding_router.route("query")
+
+    def test_full_and_truncated_agree_on_near_duplicate(self):
+        query = (np.asarray(self.units["COA_3"]) + 0.05).tolist()
+        self.assertEqual(self._route(query, None)[:2], ("COA", "3"))
+        subject, unit, score = self._route(query, 32)
+        self.assertEqual((subject, unit), ("COA", "3"))
+        self.assertLessEqual(score, 1.0 + 1e-6)
+        self.assertIn(32, embedding_router._unit_matrices)
+
+    def test_dimension_mismatch_does_not_route(self):
+        self.assertEqual(self._route([0.1] * 32, None), (None, None, 0.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import sys
+import unittest
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code.utils import extract_first_json, parse_first_json
+
+
+class TestExtractFirstJson(unittest.TestCase):
+
+    def test_braces_inside_strings(self):
+        raw = 'Here you go: {"full_text": "int main() { return 0; }", "topics": ["C"]} Hope that helps {'
+        self.assertEqual(extract_first_json(raw), {"full_text": "int main() { return 0; }", "topics": ["C"]})
+
+    def test_escaped_quotes(self):
+        self.assertEqual(extract_first_json('{"a": "say \\"{\\" twice"}'), {"a": 'say "{" twice'})
+
+    def test_fenced_and_prose_braces(self):
+        raw = 'Use {braces} for sets.\n```json\n{"ok": true}\n```'
+        self.assertEqual(extract_first_json(raw), {"ok": True})
+
+    def test_trailing_commas(self):
+        self.assertEqual(extract_first_json('{"topics": ["a", "b",],}'), {"topics": ["a", "b"]})
+
+    def test_truncated_string_is_closed(self):
+        raw = '{"full_text": "if (x) { y(); }", "topics": ["sets", "gra'
+        self.assertEqual(extract_first_json(raw), {"full_text": "if (x) { y(); }", "topics": ["sets", "gra"]})
+
+    def test_truncated_value_cut_to_last_member(self):
+        raw = '{"pages": [{"page": 1, "full_text": "a"}, {"page": 2, "full_text": "b", "confidence": 0.'
+        self.assertEqual(
+            extract_first_json(raw),
+            {"pages": [{"page": 1, "full_text": "a"}, {"page": 2, "full_text": "b"}]},
+        )
+
+    def test_repair_is_reported(self):
+        self.assertEqual(parse_first_json('x {"a": 1} y'), ({"a": 1}, False))
+        self.assertEqual(parse_first_json('{"a": "unterminated'), ({"a": "unterminated"}, True))
+        self.assertEqual(parse_first_json(""), (None, False))
+
+    def test_repair_can_be_disabled(self):
+        self.assertIsNone(extract_first_json('{"a": "unterminated', repair=False))
+        self.assertEqual(extract_first_json('{"a": 1} {"b": 2}', repair=False), {"a": 1})
+
+    def test_no_object(self):
+        for raw in ("", "no json here", "[1, 2]", "{not json at all"):
+            self.assertIsNone(extract_first_json(raw))
+
+
+if __name__ == '__main__':
+    unittest.main()
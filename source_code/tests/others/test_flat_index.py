@@ -0,0 +1,93 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import chromadb
+
+from source_code.pipeline.export_snapshot import export_collection
+from source_code.rag.flat_index import FlatIndex
+
+
+class TestFlatIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(7)
+        cls.vectors = rng.normal(size=(40, 8)).astype(np.float32)
+        cls.metas = [
+            {"subject": "COA" if i % 2 else "PYTHON", "unit_num": i % 4 + 1, "document_type": "notes"}
+            for i in range(40)
+        ]
+        client = chromadb.EphemeralClient()
+        collection = client.get_or_create_collection("flat_index_test", metadata={"hnsw:space": "cosine"})
+        collection.add(
+            ids=[f"doc{i}" for i in range(40)],
+            embeddings=cls.vectors.tolist(),
+            documents=[f"text {i}" for i in range(40)],
+            metadatas=cls.metas,
+        )
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls._tmp.name, "flat_index_test")
+        cls.manifest = export_collection(collection, cls.path, batch_size=16)
+        cls.index = FlatIndex.load(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def _brute_force(self, q, k, keep=lambda m: True):
+        sims = self.vectors @ q / (np.linalg.norm(self.vectors, axis=1) * np.linalg.norm(q))
+        rows = [i for i in np.argsort(-sims) if keep(self.metas[i])]
+        return [f"doc{i}" for i in rows[:k]]
+
+    def test_manifest(self):
+        self.assertEqual(self.manifest["count"], 40)
+        self.assertEqual(self.manifest["dim"], 8)
+        self.assertEqual(len(self.index), 40)
+
+    def test_exact_search_matches_brute_force(self):
+        q = self.vectors[3] + 0.1
+        hits = self.index.search(q, k=5)
+        self.assertEqual([h["id"] for h in hits], self._brute_force(q, 5))
+        self.assertTrue(hits[0]["text"].startswith("text "))
+
+    def test_where_filter(self):
+        q = self.vectors[10]
+        where = {"$and": [{"subject": "COA"}, {"unit_num": 2}]}
+        hits = self.index.search(q, k=3, where=where)
+        expected = self._brute_force(q, 3, lambda m: m["subject"] == "COA" and m["unit_num"] == 2)
+        self.assertEqual([h["id"] for h in hits], expected)
+
+    def test_dimension_mismatch_raises(self):
+        with self.assertRaises(ValueError):
+            self.index.search(np.ones(4), k=1)
+
+    def test_short_read_truncates_embeddings(self):
+        collection = MagicMock()
+        collection.name = "short_read"
+        collection.metadata = {}
+        collection.count.return_value = 5   # two documents deleted mid-export
+        collection.get.side_effect = [
+            {"ids": ["a", "b", "c"], "embeddings": self.vectors[:3].tolist(),
+             "metadatas": [{}] * 3, "documents": ["x"] * 3},
+            {"ids": [], "embeddings": [], "metadatas": [], "documents": []},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = export_collection(collection, os.path.join(tmp, "short_read"), batch_size=3)
+            embeddings = np.load(os.path.join(tmp, "short_read", "embeddings.npy"))
+        self.assertEqual(manifest["count"], 3)
+        self.assertEqual(embeddings.shape, (3, 8))
+        np.testing.assert_array_equal(embeddings, self.vectors[:3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import sys
+import unittest
+
+import fitz
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code.config import CONFIG
+from source_code.extract.image_prep import plan_page, prepare_page
+
+_LINES = "Virtual memory maps pages to frames\n" * 12
+
+
+class TestImagePrep(unittest.TestCase):
+
+    def setUp(self):
+        self.doc = fitz.open()
+        self.cfg = dict(CONFIG["extract"]["image_prep"])
+
+    def tearDown(self):
+        self.doc.close()
+
+    def _text_page(self, fontsize, color=(0, 0, 0)):
+        page = self.doc.new_page()
+        page.insert_text((72, 72), _LINES, fontsize=fontsize, color=color)
+        return page
+
+    def test_scale_follows_font_size(self):
+        small = plan_page(self._text_page(8), self.cfg)["scale"]
+        large = plan_page(self._text_page(24), self.cfg)["scale"]
+        self.assertGreater(small, large)
+        self.assertLessEqual(small, self.cfg["max_scale"])
+        self.assertGreaterEqual(large, self.cfg["min_scale"])
+
+    def test_scan_is_not_upsampled(self):
+        page = self.doc.new_page()
+        pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 306, 396), False)   # 0.5 px per point
+        pix.clear_with(128)
+        page.insert_image(page.rect, pixmap=pix)
+        self.assertEqual(plan_page(page, self.cfg)["scale"], self.cfg["min_scale"])
+
+    def test_margins_cropped(self):
+        page = self._text_page(12)
+        clip = plan_page(page, self.cfg)["clip"]
+        self.assertLess(clip.width * clip.height, 0.6 * abs(page.rect))
+        self.assertTrue(page.rect.contains(clip))
+
+    def test_grayscale_detection(self):
+        self.assertTrue(plan_page(self._text_page(12), self.cfg)["grayscale"])
+        page = self.doc.new_page()
+        page.draw_rect(fitz.Rect(50, 50, 400, 400), color=(1, 0, 0), fill=(1, 0, 0))
+        self.assertFalse(plan_page(page, self.cfg)["grayscale"])
+
+    def test_encoded_without_png(self):
+        data = prepare_page(self._text_page(12), self.cfg)
+        self.assertTrue(data.startswith(b"\xff\xd8"))   # JPEG
+        webp = prepare_page(self._text_page(12), {**self.cfg, "format": "webp"})
+        self.assertEqual(webp[8:12], b"WEBP")
+
+    def test_smaller_than_fixed_scale_png(self):
+        page = self._text_page(12)
+        fixed = page.get_pixmap(matrix=fitz.Matrix(2, 2)).tobytes("png")
+        self.assertLess(len(prepare_page(page, self.cfg)), len(fixed))
+
+    def test_disabled_renders_whole_page(self):
+        page = self._text_page(12)
+        plan = plan_page(page, {**self.cfg, "enabled": False})
+        self.assertEqual(plan["clip"], page.rect)
+        self.assertEqual(plan["scale"], self.cfg["default_scale"])
+        self.assertFalse(plan["grayscale"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code.config import CONFIG
+from source_code.extract import job_runner
+
+
+class TestRetries(unittest.TestCase):
+
+    def setUp(self):
+        self._sleep = patch.object(job_runner.time, "sleep")
+        self.sleep = self._sleep.start()
+
+    def tearDown(self):
+        self._sleep.stop()
+
+    def test_error_strings_are_failures(self):
+        answers = iter(["⚠ Vision Error: 524", "ok"])
+        self.assertEqual(job_runner.with_retries(lambda attempt: next(answers)), "ok")
+        self.assertEqual(self.sleep.call_count, 1)
+
+    def test_gives_up_after_max_attempts(self):
+        calls = []
+
+        def fail(attempt):
+            calls.append(attempt)
+            raise RuntimeError("down")
+
+        with patch.dict(CONFIG["extract"]["jobs"], {"max_attempts": 2}):
+            self.assertIsNone(job_runner.with_retries(fail))
+        self.assertEqual(calls, [1, 2])
+
+    def test_unparseable_answer_is_retried_past_the_cache(self):
+        seen = []
+
+        def fake_vision(images, prompt, provider=None, model=None, use_cache=True, **kwargs):
+            seen.append(use_cache)
+            return "not json" if len(seen) == 1 else '{"units": []}'
+
+        with patch.object(job_runner.models, "vision", side_effect=fake_vision):
+            parsed = job_runner.vision_call([b"img"], "prompt", parse=lambda raw: raw if raw.startswith("{") else None)
+        self.assertEqual(parsed, '{"units": []}')
+        self.assertEqual(seen, [True, False])
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_calls_are_spaced_per_provider(self):
+        limiter = job_runner.RateLimiter({"groq": 600, "ollama": 0})   # one call per 0.1s
+        t0 = time.monotonic()
+        threads = [threading.Thread(target=limiter.acquire, args=("groq",)) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertGreaterEqual(time.monotonic() - t0, 0.19)
+
+        t0 = time.monotonic()
+        for _ in range(5):
+            limiter.acquire("ollama")
+        self.assertLess(time.monotonic() - t0, 0.05)
+
+
+class TestJobRunner(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.pdf = Path(self._tmp.name) / "paper.pdf"
+        self.pdf.write_bytes(b"%PDF-1.4 test")
+        self.queue = job_runner.JobQueue(os.path.join(self._tmp.name, "jobs.sqlite3"))
+        self.runner = job_runner.JobRunner(self.queue, page_workers=3, file_workers=2)
+
+    def tearDown(self):
+        self.runner.shutdown()
+        self.queue.close()
+        self._tmp.cleanup()
+
+    def test_pages_run_concurrently_in_order(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def task(n):
+            barrier.wait()   # only passes if all three pages are in flight together
+            return f"page {n}"
+
+        results = self.runner.map_pages("pyq", self.pdf, {n: (lambda n=n: task(n)) for n in (2, 0, 1)})
+        self.assertEqual(list(results.items()), [(0, "page 0"), (1, "page 1"), (2, "page 2")])
+
+    def test_resume_only_reruns_failed_pages(self):
+        calls = []
+
+        def task(n, ok):
+            calls.append(n)
+            return {"text": n} if ok else None
+
+        first = self.runner.map_pages("pyq", self.pdf, {0: lambda: task(0, True), 1: lambda: task(1, False)})
+        self.assertEqual(first, {0: {"text": 0}, 1: None})
+        self.assertEqual(self.queue.stats()["failed"], 1)
+
+        calls.clear()
+        again = self.runner.map_pages("pyq", self.pdf, {0: lambda: task(0, True), 1: lambda: task(1, True)})
+        self.assertEqual(again, {0: {"text": 0}, 1: {"text": 1}})
+        self.assertEqual(calls, [1])
+        self.assertEqual(self.runner.stats["resumed"], 1)
+
+    def test_changed_pdf_starts_over(self):
+        self.runner.map_pages("syllabus", self.pdf, {0: lambda: "old"})
+        self.pdf.write_bytes(b"%PDF-1.4 edited paper")
+        self.assertEqual(self.runner.map_pages("syllabus", self.pdf, {0: lambda: "new"}), {0: "new"})
+
+    def test_run_files_isolates_failures(self):
+        done = []
+
+        def process(path):
+            if path.name == "bad.pdf":
+                raise RuntimeError("corrupt")
+            done.append(path.name)
+
+        files = [Path(self._tmp.name) / name for name in ("a.pdf", "bad.pdf", "b.pdf")]
+        self.runner.run_files(files, process)
+        self.assertEqual(sorted(done), ["a.pdf", "b.pdf"])
+        self.assertEqual(self.runner.stats["files"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
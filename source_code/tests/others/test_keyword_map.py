@@ -0,0 +1,152 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code.config import CONFIG
+from source_code.pipeline import generate_keyword_map as gkm
+
+
+class FakeCollection:
+    """collection.get() over in-memory records, honouring where / limit / offset."""
+
+    def __init__(self, records):
+        self.records = records   # [(metadata, document)]
+        self.calls = []
+
+    def get(self, where=None, include=None, limit=None, offset=0):
+        self.calls.append({"where": where, "limit": limit, "offset": offset})
+        rows = self.records
+        if where is not None:
+            subjects = where["subject"]["$in"] if isinstance(where["subject"], dict) else [where["subject"]]
+            rows = [r for r in rows if r[0]["subject"] in subjects]
+        rows = rows[offset:offset + limit]
+        return {
+            "ids": [str(i) for i in range(len(rows))],
+            "metadatas": [m for m, _ in rows],
+            "documents": [d for _, d in rows],
+        }
+
+
+class FakeClient:
+
+    def __init__(self, collections):
+        self.collections = collections
+
+    def get_collection(self, name):
+        return self.collections[name]
+
+
+def _notes(subject, unit, title):
+    return ({"subject": subject, "unit_num": unit, "title": title}, "")
+
+
+class TestKeywordMap(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.notes = FakeCollection([
+            _notes("COA", 1, "Cache memory"), _notes("COA", 1, "Memory hierarchy"),
+            _notes("COA", 2, "Pipelining"), _notes("PYTHON", 1, "Decorators"),
+            _notes("COA", 2, "Hazards"),
+        ])
+        self.client = FakeClient({
+            gkm.COLLECTIONS["notes"]: self.notes,
+            gkm.COLLECTIONS["syllabus"]: FakeCollection([]),
+            gkm.COLLECTIONS["pyq"]: FakeCollection([]),
+        })
+        self.llm_calls = []
+        self._lock = threading.Lock()
+
+        def fake_extract(client, subject, items, unit, max_items):
+            with self._lock:
+                self.llm_calls.append((subject, unit))
+            return [i.lower() for i in sorted(items)], True
+
+        self._patches = [
+            patch.object(gkm, "OUTPUT_FILE", os.path.join(self._tmp.name, "keywords.json")),
+            patch.object(gkm, "UNIT_CACHE_FILE", os.path.join(self._tmp.name, "units.json")),
+            patch.object(gkm.chromadb, "PersistentClient", return_value=self.client),
+            patch.object(gkm.ollama, "Client"),
+            patch.object(gkm, "extract_keywords_for_unit", side_effect=fake_extract),
+            patch.dict(CONFIG["rag"]["keywords"]["generation"], {"page_size": 2, "llm_workers": 2}),
+        ]
+        for p in self._patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self._patches:
+            p.stop()
+        self._tmp.cleanup()
+
+    def _map(self):
+        with open(gkm.OUTPUT_FILE, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_collections_are_paginated(self):
+        grouped = gkm.fetch_grouped(self.client, "notes")
+        self.assertEqual([c["offset"] for c in self.notes.calls], [0, 2, 4])
+        self.assertEqual(grouped["COA"]["2"], {"Pipelining", "Hazards"})
+        self.assertEqual(grouped["PYTHON"]["1"], {"Decorators"})
+
+    def test_subjects_are_fetched_with_where(self):
+        grouped = gkm.fetch_grouped(self.client, "notes", ["COA"])
+        self.assertEqual(self.notes.calls[0]["where"], {"subject": "COA"})
+        self.assertEqual(set(grouped), {"COA"})
+
+    def test_only_changed_units_call_the_llm(self):
+        gkm.generate_keyword_map()
+        self.assertEqual(len(self.llm_calls), 3)
+        self.assertEqual(self._map()["COA"]["notes"]["2"], ["hazards", "pipelining"])
+
+        self.llm_calls.clear()
+        self.notes.records.append(_notes("COA", 2, "Branch prediction"))
+        gkm.generate_keyword_map(subjects=["coa"])
+        self.assertEqual(self.llm_calls, [("COA", "2")])
+        self.assertIn("branch prediction", self._map()["COA"]["notes"]["2"])
+        self.assertIn("PYTHON", self._map())   # other subjects untouched
+
+    def test_checkpointed_subjects_skipped_unless_incremental(self):
+        gkm.generate_keyword_map()
+        self.llm_calls.clear()
+        gkm.generate_keyword_map()
+        gkm.generate_keyword_map(incremental=True)
+        self.assertEqual(self.llm_calls, [])
+
+    def test_failed_units_are_not_cached(self):
+        def flaky_extract(client, subject, items, unit, max_items):
+            self.llm_calls.append((subject, unit))
+            return sorted(items), unit != "2"
+
+        with patch.object(gkm, "extract_keywords_for_unit", side_effect=flaky_extract):
+            gkm.generate_keyword_map(subjects=["COA"])
+        self.assertEqual(self._map()["COA"]["notes"]["2"], ["Hazards", "Pipelining"])   # raw fallback
+        with open(gkm.UNIT_CACHE_FILE, encoding="utf-8") as f:
+            self.assertNotIn("notes:2", json.load(f)["COA"])
+
+        self.llm_calls.clear()
+        gkm.generate_keyword_map(subjects=["COA"])
+        self.assertEqual(self.llm_calls, [("COA", "2")])
+
+    def test_units_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def waiting_extract(client, subject, items, unit, max_items):
+            barrier.wait()   # only passes if both COA units are in flight together
+            return list(items), True
+
+        with patch.object(gkm, "extract_keywords_for_unit", side_effect=waiting_extract):
+            gkm.generate_keyword_map(subjects=["COA"])
+        self.assertEqual(set(self._map()["COA"]["notes"]), {"core", "1", "2"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code.rag.lexical_index import BM25Index, tokenize
+from source_code.rag.metadata_filter import matches_where
+
+
+DOCS = [
+    ("de_1", "Quine McCluskey method minimises boolean functions with prime implicants.",
+     {"subject": "DIGITAL_ELECTRONICS", "unit": "2", "document_type": "notes"}),
+    ("de_2", "A JK flip flop removes the invalid state of the SR flip flop.",
+     {"subject": "DIGITAL_ELECTRONICS", "unit": "3", "document_type": "notes"}),
+    ("de_3", "Syllabus BCS302: flip flops, counters, registers.",
+     {"subject": "DIGITAL_ELECTRONICS", "unit": "3", "document_type": "syllabus"}),
+    ("cs_1", "Buffer overflow attacks overwrite the return address on the stack.",
+     {"subject": "CYBER_SECURITY", "unit": "unit1", "document_type": "notes"}),
+]
+
+
+class TestLexicalIndex(unittest.TestCase):
+
+    def setUp(self):
+        ids, docs, metas = zip(*DOCS)
+        self.index = BM25Index.build(list(ids), list(docs), list(metas))
+
+    def _top_ids(self, query, where=None, k=5):
+        return [self.index.ids[doc_no] for doc_no, _ in self.index.search(query, k, where)]
+
+    def test_tokenize_keeps_course_codes(self):
+        self.assertIn("bcs302", tokenize("What is in BCS302?"))
+        self.assertNotIn("what", tokenize("What is in BCS302?"))
+
+    def test_rare_term_ranks_first(self):
+        self.assertEqual(self._top_ids("quine mccluskey")[0], "de_1")
+        self.assertEqual(self._top_ids("BCS302"), ["de_3"])
+
+    def test_where_filter_is_applied(self):
+        where = {"$and": [
+            {"subject": "DIGITAL_ELECTRONICS"},
+            {"document_type": {"$ne": "syllabus"}},
+        ]}
+        self.assertEqual(self._top_ids("flip flop", where), ["de_2"])
+
+    def test_save_and_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "notes.json")
+            self.index.save(path)
+            loaded = BM25Index.load(path)
+        self.assertEqual(loaded.search("jk flip flop", 3), self.index.search("jk flip flop", 3))
+
+
+class TestMatchesWhere(unittest.TestCase):
+
+    def test_unit_or_clause(self):
+        where = {"$or": [{"unit": "1"}, {"unit": "unit1"}]}
+        self.assertTrue(matches_where({"unit": "unit1"}, where))
+        self.assertFalse(matches_where({"unit": "2"}, where))
+
+    def test_operators(self):
+        meta = {"marks": 5, "year": 2023}
+        self.assertTrue(matches_where(meta, {"marks": {"$in": [2, 5]}}))
+        self.assertTrue(matches_where(meta, {"year": {"$gte": 2022}}))
+        self.assertFalse(matches_where(meta, {"year": {"$lt": 2020}}))
+        self.assertTrue(matches_where(meta, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import random
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import chromadb
+
+from source_code.pipeline.report_duplicates import report
+from source_code.rag import cross_encoder
+from source_code.rag.near_duplicates import (
+    collapse_near_duplicates, duplicate_groups, hamming, simhash, simhash_hex,
+)
+
+_rng = random.Random(5)
+_VOCAB = [f"term{i}" for i in range(2000)]
+
+
+def _text(n=150):
+    return " ".join(_rng.choice(_VOCAB) for _ in range(n))
+
+
+def _variant(text):
+    """Same page with one extra bullet, as in an incremental slide reveal."""
+    return text + " " + _text(6)
+
+
+class TestSimHash(unittest.TestCase):
+
+    def test_near_and_far(self):
+        base = _text()
+        self.assertLessEqual(hamming(simhash(base), simhash(_variant(base))), 8)
+        self.assertGreater(hamming(simhash(base), simhash(_text())), 8)
+        self.assertEqual(simhash(""), 0)
+        self.assertEqual(len(simhash_hex(base)), 16)
+
+    def test_collapse_keeps_first_copy(self):
+        base = _text()
+        chunks = [
+            {"id": "a", "text": base, "metadata": {}},
+            {"id": "b", "text": _text(), "metadata": {}},
+            {"id": "c", "text": _variant(base), "metadata": {}},
+        ]
+        kept, dropped = collapse_near_duplicates(chunks)
+        self.assertEqual([c["id"] for c in kept], ["a", "b"])
+        self.assertEqual(dropped, 1)
+
+    def test_stored_signature_is_used(self):
+        chunk = {"id": "a", "text": "ignored", "metadata": {"simhash": simhash_hex("other text entirely here")}}
+        twin = {"id": "b", "text": "other text entirely here", "metadata": {}}
+        self.assertEqual(len(collapse_near_duplicates([chunk, twin])[0]), 1)
+
+    def test_duplicate_groups(self):
+        base, other = _text(), _text()
+        sigs = {
+            "a": simhash(base), "b": simhash(_variant(base)),
+            "c": simhash(other), "d": simhash(_text()),
+        }
+        self.assertEqual([sorted(g) for g in duplicate_groups(sigs)], [["a", "b"]])
+
+
+class TestQueryTimeCollapse(unittest.TestCase):
+
+    def test_candidates_are_distinct(self):
+        base = _text()
+        chunks = [
+            {"id": f"p{i}", "text": _variant(base) if i else base, "metadata": {}, "similarity": 0.9 - i * 0.01, "collection": "notes"}
+            for i in range(4)
+        ] + [{"id": "x", "text": _text(), "metadata": {}, "similarity": 0.5, "collection": "notes"}]
+        cross_encoder.clear_score_cache()
+        with patch.object(cross_encoder.models, "rerank", side_effect=lambda q, docs, model=None: [0.8] * len(docs)) as rerank:
+            ranked = cross_encoder.rerank_cross_encoder("query", chunks, top_n=4, candidates=2)
+        self.assertEqual(sorted(c["id"] for c in ranked), ["p0", "x"])
+        self.assertEqual(len(rerank.call_args[0][1]), 2)
+        cross_encoder.clear_score_cache()
+
+
+class TestDuplicateReport(unittest.TestCase):
+
+    def test_report_and_backfill(self):
+        base = _text()
+        collection = chromadb.EphemeralClient().get_or_create_collection("dup_report_test")
+        docs = [base, _variant(base), _variant(base), _text()]
+        collection.add(
+            ids=[f"d{i}" for i in range(4)],
+            embeddings=[[float(i), 1.0] for i in range(4)],
+            documents=docs,
+            metadatas=[{"source": "deck.pdf", "page_start": i} for i in range(4)],
+        )
+        result = report(collection, backfill=True)
+        self.assertEqual((result["documents"], result["groups"], result["duplicates"]), (4, 1, 2))
+        self.assertEqual(result["backfilled"], 4)
+        stored = collection.get(ids=["d0"], include=["metadatas"])["metadatas"][0]
+        self.assertEqual(stored["simhash"], simhash_hex(base))
+        self.assertEqual(report(collection, backfill=True)["backfilled"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import json
+import os
+import re
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import fitz
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code.extract import extract_multimodal_notes as notes
+
+_CFG = {"enabled": True, "max_pages": 3, "max_bytes": 1000, "dense_page_bytes": 400}
+
+
+def _pages(*sizes):
+    return [(i, [b"x" * size]) for i, size in enumerate(sizes)]
+
+
+class TestPlanBatches(unittest.TestCase):
+
+    def _plan(self, rendered, cfg=_CFG):
+        return [[s for s, _ in batch] for batch in notes.plan_batches(rendered, cfg)]
+
+    def test_packs_up_to_max_pages(self):
+        self.assertEqual(self._plan(_pages(100, 100, 100, 100)), [[0, 1, 2], [3]])
+
+    def test_dense_page_goes_alone(self):
+        self.assertEqual(self._plan(_pages(100, 500, 100, 100)), [[0], [1], [2, 3]])
+
+    def test_byte_budget(self):
+        self.assertEqual(self._plan(_pages(350, 350, 350)), [[0, 1], [2]])
+
+    def test_only_consecutive_pages(self):
+        rendered = [(0, [b"x"]), (1, [b"x"]), (5, [b"x"])]
+        self.assertEqual(self._plan(rendered), [[0, 1], [5]])
+
+    def test_disabled(self):
+        self.assertEqual(self._plan(_pages(10, 10), {**_CFG, "enabled": False}), [[0], [1]])
+
+
+class TestSplitBatchResponse(unittest.TestCase):
+
+    def test_by_page_number(self):
+        parsed = {"pages": [{"page": 4, "full_text": "four"}, {"page": "3", "full_text": "three"}]}
+        covered = notes.split_batch_response(parsed, [3, 4])
+        self.assertEqual(covered[3], {"full_text": "three"})
+        self.assertEqual(covered[4]["full_text"], "four")
+
+    def test_missing_and_unknown_pages(self):
+        parsed = {"pages": [{"page": 3, "full_text": "three"}, {"page": 9, "full_text": "?"}, {"page": 4}]}
+        self.assertEqual(list(notes.split_batch_response(parsed, [3, 4])), [3])
+        self.assertEqual(notes.split_batch_response(None, [3, 4]), {})
+        self.assertEqual(notes.split_batch_response({"full_text": "merged"}, [3, 4]), {})
+
+    def test_truncated_response_drops_last_page(self):
+        raw = '{"pages": [{"page": 3, "full_text": "three"}, {"page": 4, "full_text": "fo'
+        parsed, repaired = notes.parse_first_json(raw)
+        self.assertTrue(repaired)
+        self.assertEqual(list(notes.split_batch_response(parsed, [3, 4], repaired)), [3])
+
+
+class TestProcessPdf(unittest.TestCase):
+
+    def test_batched_pages_split_into_chunk_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = Path(tmp) / "year_2" / "COA" / "notes" / "unit1" / "scan.pdf"
+            pdf_path.parent.mkdir(parents=True)
+            doc = fitz.open()
+            for _ in range(3):
+                doc.new_page(width=200, height=200)   # no text layer → VLM
+            doc.save(str(pdf_path))
+            doc.close()
+
+            calls = []
+
+            def fake_vision(images, prompt, provider=None, model=None, **kwargs):
+                calls.append(len(images))
+                match = re.search(r"in order they are pages ([\d, ]+)\.", prompt)
+                if match:
+                    pages = [int(n) for n in match.group(1).split(",")]
+                    # Answer for every page except the last one
+                    return json.dumps({"pages": [{"page": n, "full_text": f"page {n}"} for n in pages[:-1]]})
+                return json.dumps({"full_text": "alone"})
+
+            cfg = {"enabled": True, "max_pages": 4, "max_bytes": 10_000_000, "dense_page_bytes": 10_000_000}
+            with patch.object(notes.models, "vision", side_effect=fake_vision), \
+                 patch.dict(notes.CONFIG["extract"]["vision_batch"], cfg):
+                streamed = []
+                notes.process_pdf(pdf_path, on_chunk=streamed.append)
+
+            self.assertEqual(calls, [3, 1])
+            self.assertEqual(sorted(c["page_start"] for c in streamed), [1, 2, 3])
+            out = pdf_path.parent / "scan"
+            texts = {}
+            for n in (1, 2, 3):
+                chunk = json.loads((out / f"chunk_{n}_{n}.json").read_text(encoding="utf-8"))
+                self.assertEqual((chunk["page_start"], chunk["page_end"]), (n, n))
+                texts[n] = chunk["extracted_metadata"]["full_text"]
+            self.assertEqual(texts, {1: "page 1", 2: "page 2", 3: "alone"})
+
+
+if __name__ == '__main__':
+    unittest.main()
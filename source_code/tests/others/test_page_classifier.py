@@ -0,0 +1,80 @@
+import os
+import sys
+import unittest
+
+import fitz
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code.extract.page_classifier import classify_page, text_layer_metadata
+
+_SLIDE = (
+    "Pipelining in the CPU\n"
+    "- Instruction fetch, decode, execute and write-back overlap\n"
+    "- Hazards: structural, data and control\n"
+    "- Forwarding removes most data stalls\n"
+)
+
+
+def _image_page(doc, text=""):
+    page = doc.new_page()
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 64), False)
+    pix.clear_with(200)
+    page.insert_image(page.rect, pixmap=pix)
+    if text:
+        page.insert_text((72, 72), text, fontsize=10)
+    return page
+
+
+class TestClassifyPage(unittest.TestCase):
+
+    def setUp(self):
+        self.doc = fitz.open()
+
+    def tearDown(self):
+        self.doc.close()
+
+    def test_printed_slide_uses_text_layer(self):
+        page = self.doc.new_page()
+        page.insert_text((72, 72), _SLIDE, fontsize=12)
+        decision = classify_page(page)
+        self.assertTrue(decision["use_text_layer"], decision["reason"])
+        self.assertIn("Forwarding removes most data stalls", decision["text"])
+
+    def test_scanned_page_goes_to_vision(self):
+        decision = classify_page(_image_page(self.doc))
+        self.assertFalse(decision["use_text_layer"])
+        self.assertEqual(decision["text"], "")
+
+    def test_full_page_image_with_text_goes_to_vision(self):
+        decision = classify_page(_image_page(self.doc, _SLIDE))
+        self.assertFalse(decision["use_text_layer"])
+        self.assertGreater(decision["image_coverage"], 0.9)
+
+    def test_short_title_page_goes_to_vision(self):
+        page = self.doc.new_page()
+        page.insert_text((72, 72), "Unit 3", fontsize=24)
+        self.assertFalse(classify_page(page)["use_text_layer"])
+
+    def test_disabled(self):
+        page = self.doc.new_page()
+        page.insert_text((72, 72), _SLIDE, fontsize=12)
+        cfg = {"enabled": False, "min_chars": 100, "max_image_coverage": 0.35, "min_printable_ratio": 0.9}
+        self.assertFalse(classify_page(page, cfg)["use_text_layer"])
+
+
+class TestTextLayerMetadata(unittest.TestCase):
+
+    def test_notes_shape(self):
+        meta = text_layer_metadata(_SLIDE)
+        self.assertEqual(meta["title"], "Pipelining in the CPU")
+        self.assertEqual(meta["full_text"], _SLIDE)
+        for key in ("document_type", "topics", "key_concepts", "confidence", "content_quality"):
+            self.assertIn(key, meta)
+
+
+if __name__ == '__main__':
+    unittest.main()
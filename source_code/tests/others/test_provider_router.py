@@ -0,0 +1,170 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code import provider_router
+from source_code.config import CONFIG
+
+
+ROUTING_OVERRIDES = {
+    "enabled": True,
+    "fallback_chain": ["gemini", "groq", "ollama"],
+    "request_timeout_s": 2.0,
+    "workers_per_provider": 4,
+    "window": 10,
+    "min_calls": 3,
+    "error_rate_threshold": 0.5,
+    "consecutive_failures": 2,
+    "cooldown_s": 60.0,
+    "hedge": False,
+    "hedge_min_s": 0.05,
+    "hedge_default_s": 0.1,
+}
+
+
+class TestProviderRouter(unittest.TestCase):
+
+    def setUp(self):
+        provider_router.reset()
+        self._cfg = patch.dict(CONFIG["provider_routing"], ROUTING_OVERRIDES)
+        self._cfg.start()
+        # Pretend every cloud provider has a key so none is filtered out
+        self._configured = patch.object(provider_router, "_is_configured", return_value=True)
+        self._configured.start()
+
+    def tearDown(self):
+        self._configured.stop()
+        self._cfg.stop()
+        provider_router.reset()
+
+    @patch('source_code.models.chat_or_raise')
+    def test_primary_success(self, mock_chat):
+        mock_chat.return_value = "primary answer"
+
+        res = provider_router.chat("Hello", provider="gemini")
+
+        self.assertEqual(res, "primary answer")
+        self.assertEqual(mock_chat.call_args.kwargs["provider"], "gemini")
+
+    @patch('source_code.models.chat_or_raise')
+    def test_falls_back_on_error(self, mock_chat):
+        def fake_chat(provider=None, **kwargs):
+            if provider == "gemini":
+                raise RuntimeError("503 overloaded")
+            return f"{provider} answer"
+        mock_chat.side_effect = fake_chat
+
+        res = provider_router.chat("Hello", provider="gemini")
+
+        self.assertEqual(res, "groq answer")
+
+    @patch('source_code.models.chat_or_raise')
+    def test_circuit_opens_and_skips_provider(self, mock_chat):
+        calls = []
+
+        def fake_chat(provider=None, **kwargs):
+            calls.append(provider)
+            if provider == "gemini":
+                raise RuntimeError("down")
+            return "ok"
+        mock_chat.side_effect = fake_chat
+
+        for _ in range(2):
+            provider_router.chat("Hello", provider="gemini")
+        self.assertEqual(provider_router.get_health("gemini").state, provider_router.OPEN)
+
+        calls.clear()
+        provider_router.chat("Hello", provider="gemini")
+        self.assertNotIn("gemini", calls)
+
+    @patch('source_code.models.chat_or_raise')
+    def test_all_providers_failing_raises(self, mock_chat):
+        mock_chat.side_effect = RuntimeError("down")
+
+        with self.assertRaises(provider_router.ProviderUnavailable):
+            provider_router.chat("Hello", provider="gemini")
+
+    @patch('source_code.models.chat_or_raise')
+    def test_hedged_request_wins(self, mock_chat):
+        def fake_chat(provider=None, **kwargs):
+            if provider == "gemini":
+                time.sleep(1.0)
+                return "slow answer"
+            return "fast answer"
+        mock_chat.side_effect = fake_chat
+
+        with patch.dict(CONFIG["provider_routing"], {"hedge": True}):
+            start = time.monotonic()
+            res = provider_router.chat("Hello", provider="gemini")
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(res, "fast answer")
+        self.assertLess(elapsed, 0.8)
+
+    @patch('source_code.models.chat_or_raise')
+    def test_pool_queue_wait_not_charged_to_provider(self, mock_chat):
+        mock_chat.return_value = "answer"
+        pool = ThreadPoolExecutor(max_workers=1)
+        pool.submit(time.sleep, 0.3)   # every worker busy: the call waits in the queue
+
+        with patch.dict(provider_router._executors, {"gemini": pool}):
+            self.assertEqual(provider_router.chat("Hello", provider="gemini"), "answer")
+        pool.shutdown()
+
+        latency, ok = provider_router.get_health("gemini")._samples[-1]
+        self.assertTrue(ok)
+        self.assertLess(latency, 0.2)
+
+    @patch('source_code.models.chat_or_raise')
+    def test_hung_calls_do_not_block_the_fallback(self, mock_chat):
+        release = threading.Event()
+
+        def fake_chat(provider=None, **kwargs):
+            if provider == "gemini":
+                release.wait(5)   # hangs until the SDK timeout
+                raise TimeoutError("read timeout")
+            return "fallback answer"
+
+        mock_chat.side_effect = fake_chat
+        cfg = {"workers_per_provider": 2, "request_timeout_s": 0.2, "consecutive_failures": 100}
+        try:
+            with patch.dict(CONFIG["provider_routing"], cfg):
+                for _ in range(2):   # abandoned, but still holding gemini's workers
+                    with self.assertRaises(provider_router.ProviderUnavailable):
+                        provider_router.chat("Hello", provider="gemini")
+
+                start = time.monotonic()
+                res = provider_router.chat("Hello", provider="gemini")
+                elapsed = time.monotonic() - start
+        finally:
+            release.set()
+
+        self.assertEqual(res, "fallback answer")
+        self.assertLess(elapsed, 0.15)
+        self.assertEqual(provider_router.get_health("gemini").state, provider_router.CLOSED)
+
+    def test_half_open_allows_single_probe(self):
+        health = provider_router.get_health("groq")
+        health.record(0.1, ok=False)
+        health.record(0.1, ok=False)
+        self.assertFalse(health.allow_request())
+
+        health.opened_at -= CONFIG["provider_routing"]["cooldown_s"]
+        self.assertTrue(health.allow_request())
+        self.assertFalse(health.allow_request())
+
+        health.record(0.1, ok=True)
+        self.assertEqual(health.state, provider_router.CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
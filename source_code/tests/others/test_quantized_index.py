@@ -0,0 +1,147 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import chromadb
+
+from source_code.pipeline.export_snapshot import export_collection
+from source_code.rag.flat_index import FlatIndex
+from source_code.config import CONFIG
+from source_code.rag import quantized_index
+from source_code.rag.quantized_index import QuantizedIndex, codes_path, quantize_snapshot
+from source_code.utils import upsert_with_partition
+
+
+class TestQuantizedIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(11)
+        cls.vectors = rng.normal(size=(300, 32)).astype(np.float32)
+        cls.metas = [{"subject": "COA" if i % 3 else "PYTHON", "unit_num": i % 5 + 1} for i in range(300)]
+        client = chromadb.EphemeralClient()
+        cls.collection = collection = client.get_or_create_collection("quantized_index_test", metadata={"hnsw:space": "cosine"})
+        collection.add(
+            ids=[f"doc{i}" for i in range(300)],
+            embeddings=cls.vectors.tolist(),
+            documents=[f"text {i}" for i in range(300)],
+            metadatas=cls.metas,
+        )
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls._tmp.name, "quantized_index_test")
+        export_collection(collection, cls.path)
+        quantize_snapshot(cls.path, "int8", block_rows=64)
+        quantize_snapshot(cls.path, "binary", block_rows=64)
+        cls.flat = FlatIndex.load(cls.path)
+        cls.queries = [cls.vectors[i] + rng.normal(scale=0.3, size=32).astype(np.float32) for i in range(0, 300, 15)]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def _recall(self, index, k, oversample, where=None):
+        found = total = 0
+        for q in self.queries:
+            exact = {h["id"] for h in self.flat.search(q, k, where)}
+            approx = {h["id"] for h in index.search(q, k, where, oversample=oversample)}
+            found += len(exact & approx)
+            total += len(exact)
+        return found / total
+
+    def test_codes_are_compressed(self):
+        int8 = QuantizedIndex.load(self.path, "int8")
+        binary = QuantizedIndex.load(self.path, "binary")
+        self.assertEqual(int8.codes.dtype, np.int8)
+        self.assertEqual(binary.codes.shape, (300, 4))
+        self.assertLess(binary.nbytes, int8.nbytes)
+        self.assertLess(int8.nbytes, self.flat.embeddings.nbytes)
+
+    def test_int8_recall(self):
+        self.assertGreaterEqual(self._recall(QuantizedIndex.load(self.path, "int8"), k=8, oversample=4), 0.95)
+
+    def test_rescoring_returns_exact_similarities(self):
+        index = QuantizedIndex.load(self.path, "binary")
+        q = self.queries[0]
+        # Oversampling past the collection size makes the first stage irrelevant
+        hits = index.search(q, k=5, oversample=100)
+        exact = self.flat.search(q, k=5)
+        self.assertEqual([h["id"] for h in hits], [h["id"] for h in exact])
+        self.assertEqual([h["similarity"] for h in hits], [h["similarity"] for h in exact])
+        self.assertEqual(len(hits[0]["embedding"]), 32)
+
+    def test_where_filter(self):
+        index = QuantizedIndex.load(self.path, "int8")
+        where = {"$and": [{"subject": "PYTHON"}, {"unit_num": 2}]}
+        hits = index.search(self.queries[3], k=4, where=where)
+        self.assertTrue(hits)
+        for h in hits:
+            self.assertEqual(h["metadata"]["subject"], "PYTHON")
+            self.assertEqual(h["metadata"]["unit_num"], 2)
+
+    def test_truncated_float32_codes(self):
+        path = quantize_snapshot(self.path, "float32", dim=16)
+        self.assertTrue(path.endswith("embeddings.float32.d16.npy"))
+        index = QuantizedIndex.load(self.path, "float32", dim=16)
+        self.assertEqual(index.codes.shape, (300, 16))
+        # First stage compares 16-dim prefixes, the returned scores are full-dimension
+        hits = index.search(self.queries[0], k=5, oversample=100)
+        self.assertEqual([h["id"] for h in hits], [h["id"] for h in self.flat.search(self.queries[0], k=5)])
+
+    def test_query_must_have_full_dimension(self):
+        quantize_snapshot(self.path, "int8", dim=16)
+        index = QuantizedIndex.load(self.path, "int8", dim=16)
+        with self.assertRaises(ValueError):
+            index.search(self.queries[0][:16], k=3)
+
+    def test_float32_needs_a_dimension(self):
+        with self.assertRaises(ValueError):
+            quantize_snapshot(self.path, "float32")
+
+    def test_stale_codes_rejected(self):
+        codes = np.load(codes_path(self.path, "binary"))
+        with self.assertRaises(ValueError):
+            QuantizedIndex(self.flat, "binary", codes[:10])
+
+
+    def test_filter_matching_nothing_returns_none(self):
+        index = QuantizedIndex.load(self.path, "int8")
+        self.assertIsNone(index.search(self.queries[0], k=3, where={"unit_num": 99}))
+
+    def test_get_index_rejects_stale_snapshots(self):
+        with patch.dict(CONFIG["paths"], {"snapshots": self._tmp.name}), \
+             patch.dict(CONFIG["rag"]["quantization"], {"mode": "int8"}), \
+             patch.dict(CONFIG["rag"]["embedding_dims"], {"candidates": None}):
+            self.assertIsNotNone(quantized_index.get_index(self.collection))
+
+            self.collection.add(ids=["extra"], embeddings=[self.vectors[0].tolist()], documents=["new"])
+            try:
+                self.assertIsNone(quantized_index.get_index(self.collection))
+            finally:
+                self.collection.delete(ids=["extra"])
+
+            # Re-ingested in place: same ids, same count, new text and vector
+            upsert_with_partition(self.collection, "COA", ids=["doc0"], embeddings=[self.vectors[1].tolist()],
+                                  documents=["re-extracted"], metadatas=[self.metas[0]])
+            try:
+                self.assertIsNone(quantized_index.get_index(self.collection))
+            finally:
+                self.collection.upsert(ids=["doc0"], embeddings=[self.vectors[0].tolist()],
+                                       documents=["text 0"], metadatas=[self.metas[0]])
+
+            # Unit labels migrated after the export: {"unit_num": n} filters would miss
+            migrated = MagicMock(metadata={"unit_schema_version": 2}, count=lambda: 300)
+            migrated.name = self.collection.name
+            self.assertIsNone(quantized_index.get_index(migrated))
+
+
+if __name__ == '__main__':
+    unittest.main()
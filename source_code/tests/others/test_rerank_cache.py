@@ -0,0 +1,75 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code.config import CONFIG
+from source_code.rag import cross_encoder
+
+
+def _chunk(i, similarity=0.5):
+    return {"id": f"doc{i}", "text": f"text {i}", "metadata": {}, "similarity": similarity, "collection": "notes"}
+
+
+class TestRerankScoreCache(unittest.TestCase):
+
+    def setUp(self):
+        cross_encoder.clear_score_cache()
+        self.calls = []
+
+        def fake_rerank(query, documents, model=None):
+            self.calls.append(list(documents))
+            return [0.9 - 0.1 * int(d.split()[-1]) for d in documents]
+
+        self._patch = patch.object(cross_encoder.models, "rerank", side_effect=fake_rerank)
+        self._patch.start()
+
+    def tearDown(self):
+        self._patch.stop()
+        cross_encoder.clear_score_cache()
+
+    def test_only_misses_are_scored(self):
+        cross_encoder.rerank_cross_encoder("What is a JK flip flop?", [_chunk(0), _chunk(1)], top_n=4, candidates=6)
+        ranked = cross_encoder.rerank_cross_encoder(
+            "what is a  JK flip flop", [_chunk(0), _chunk(1), _chunk(2)], top_n=4, candidates=6,
+        )
+        self.assertEqual(self.calls, [["text 0", "text 1"], ["text 2"]])
+        self.assertEqual([c["id"] for c in ranked], ["doc0", "doc1", "doc2"])
+        self.assertEqual(ranked[0]["final_score"], 0.9)
+
+        stats = cross_encoder.cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 3))
+        self.assertAlmostEqual(stats["hit_rate"], 0.4)
+
+    def test_all_hits_skip_the_model(self):
+        chunks = [_chunk(0), _chunk(1)]
+        cross_encoder.rerank_cross_encoder("query", chunks)
+        cross_encoder.rerank_cross_encoder("query", chunks)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_model_change_misses(self):
+        cross_encoder.rerank_cross_encoder("query", [_chunk(0)])
+        with patch.dict(CONFIG["rag"]["cross_encoder"], {"model": "other-reranker"}):
+            cross_encoder.rerank_cross_encoder("query", [_chunk(0)])
+        self.assertEqual(len(self.calls), 2)
+
+    def test_reextracted_chunk_misses(self):
+        cross_encoder.rerank_cross_encoder("query", [_chunk(0)])
+        reextracted = {**_chunk(0), "text": "revised text 3"}
+        ranked = cross_encoder.rerank_cross_encoder("query", [reextracted])
+        self.assertEqual(self.calls, [["text 0"], ["revised text 3"]])
+        self.assertEqual(ranked[0]["final_score"], 0.6)
+
+    def test_cache_is_bounded(self):
+        with patch.dict(CONFIG["rag"]["cross_encoder"], {"score_cache_size": 2}):
+            cross_encoder.rerank_cross_encoder("query", [_chunk(0), _chunk(1), _chunk(2)])
+        self.assertEqual(cross_encoder.cache_stats()["size"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
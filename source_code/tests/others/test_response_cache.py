@@ -0,0 +1,100 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from PIL import Image
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code import models, response_cache
+from source_code.config import CONFIG
+
+
+def _png(color) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (32, 32), color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class TestVisionResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._paths = patch.dict(CONFIG["paths"], {"vlm_cache": os.path.join(self._tmp.name, "vlm.sqlite3")})
+        self._paths.start()
+        self.client = MagicMock()
+        self.client.generate.return_value = {"response": '{"full_text": "page"}'}
+        self._client = patch("source_code.models.get_ollama_client", return_value=self.client)
+        self._client.start()
+
+    def tearDown(self):
+        self._client.stop()
+        self._paths.stop()
+        if response_cache._cache is not None:
+            response_cache._cache.close()
+            response_cache._cache = None
+        self._tmp.cleanup()
+
+    def _vision(self, images, prompt="transcribe"):
+        return models.vision(images=images, prompt=prompt, provider="ollama", model="vlm-a")
+
+    def test_same_page_is_paid_for_once(self):
+        page = _png("white")
+        self.assertEqual(self._vision([page]), '{"full_text": "page"}')
+        self.assertEqual(self._vision([page]), '{"full_text": "page"}')
+        self.assertEqual(self.client.generate.call_count, 1)
+        self.assertEqual(response_cache.get_cache().stats()["hits"], 1)
+
+    def test_key_covers_image_prompt_and_model(self):
+        self._vision([_png("white")])
+        self._vision([_png("black")])
+        self._vision([_png("white")], prompt="describe")
+        models.vision(images=[_png("white")], prompt="transcribe", provider="ollama", model="vlm-b")
+        self.assertEqual(self.client.generate.call_count, 4)
+
+    def test_same_content_under_another_path(self):
+        page = _png("white")
+        paths = []
+        for folder in ("a", "b"):
+            path = os.path.join(self._tmp.name, f"{folder}.png")
+            with open(path, "wb") as f:
+                f.write(page)
+            paths.append(path)
+        self._vision(paths[0])
+        self._vision(paths[1])
+        self._vision(page)
+        self.assertEqual(self.client.generate.call_count, 1)
+
+    def test_errors_are_not_cached(self):
+        self.client.generate.side_effect = [RuntimeError("524"), {"response": "ok"}]
+        self.assertTrue(self._vision([_png("white")]).startswith("⚠"))
+        self.assertEqual(self._vision([_png("white")]), "ok")
+        self.assertEqual(self.client.generate.call_count, 2)
+
+    def test_disabled(self):
+        with patch.dict(CONFIG["extract"]["vlm_cache"], {"enabled": False}):
+            self._vision([_png("white")])
+            self._vision([_png("white")])
+        self.assertEqual(self.client.generate.call_count, 2)
+
+    def test_json_mode(self):
+        page = _png("white")
+        models.vision(images=[page], prompt="transcribe", provider="ollama", model="vlm-a", json_mode=True)
+        self.assertEqual(self.client.generate.call_args.kwargs["format"], "json")
+        self._vision([page])   # free-form answer is cached separately
+        self.assertNotIn("format", self.client.generate.call_args.kwargs)
+        self.assertEqual(self.client.generate.call_count, 2)
+
+    def test_pil_digest_ignores_encoding(self):
+        img = Image.new("RGB", (8, 8), "red")
+        self.assertEqual(response_cache.image_digest(img), response_cache.image_digest(img.copy()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import json
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code.config import CONFIG
+from source_code.rag import retrieval_cache
+from source_code.rag.retrieval_cache import RetrievalCache, merge_chunks
+
+
+def _chunk(text, embedding, similarity=0.9, collection="notes"):
+    return {
+        "text": text,
+        "metadata": {"source": f"{text}.pdf"},
+        "distance": round(1 - similarity, 6),
+        "similarity": similarity,
+        "collection": collection,
+        "embedding": embedding,
+    }
+
+
+class TestRetrievalCache(unittest.TestCase):
+
+    def setUp(self):
+        self.state = {}
+        self.cache = RetrievalCache(self.state)
+        candidates = [_chunk("flip flops", [1.0, 0.0]), _chunk("latches", [0.0, 1.0])]
+        ranked = [{**candidates[0], "final_score": 0.9}]
+        self.cache.store([1.0, 0.0], "DIGITAL_ELECTRONICS", "3", candidates, ranked)
+
+    def test_ranked_chunks_are_cached_without_embeddings(self):
+        ranked = RetrievalCache(self.state).ranked
+        self.assertEqual([c["text"] for c in ranked], ["flip flops"])
+        self.assertNotIn("embedding", ranked[0])
+
+    def test_same_topic_requires_close_query_and_same_route(self):
+        self.assertTrue(self.cache.is_same_topic([0.99, 0.05], "DIGITAL_ELECTRONICS", "3"))
+        self.assertFalse(self.cache.is_same_topic([0.0, 1.0], "DIGITAL_ELECTRONICS", "3"))
+        self.assertFalse(self.cache.is_same_topic([1.0, 0.0], "DIGITAL_ELECTRONICS", "4"))
+
+    def test_rescore_uses_stored_embeddings(self):
+        rescored = self.cache.rescored_candidates([0.8, 0.6])
+        sims = {c["text"]: c["similarity"] for c in rescored}
+        self.assertAlmostEqual(sims["flip flops"], 0.8, places=3)
+        self.assertAlmostEqual(sims["latches"], 0.6, places=3)
+
+    def test_session_state_holds_no_vectors(self):
+        state = json.dumps(self.state)
+        self.assertNotIn("embedding", state)
+        self.assertNotIn("query_vector", state)
+        rescored = self.cache.rescored_candidates([1.0, 0.0])
+        self.assertEqual(rescored[0]["embedding"], [1.0, 0.0])   # handed back for the next store()
+
+    def test_evicted_vectors_mean_a_full_search(self):
+        with patch.dict(CONFIG["rag"]["retrieval_cache"], {"vector_cache_sessions": 1}):
+            RetrievalCache({}).store([0.0, 1.0], None, None, [_chunk("other", [0.0, 1.0])], [])
+        self.assertFalse(self.cache.is_same_topic([1.0, 0.0], "DIGITAL_ELECTRONICS", "3"))
+        self.assertEqual(self.cache.rescored_candidates([1.0, 0.0]), [])
+
+    def test_merge_keeps_first_copy(self):
+        fresh = [_chunk("flip flops", [1.0, 0.0], similarity=0.95)]
+        merged = merge_chunks(fresh, self.cache.rescored_candidates([1.0, 0.0]))
+        self.assertEqual([c["text"] for c in merged], ["flip flops"])
+        self.assertEqual(merged[0]["similarity"], 0.95)
+
+    def test_no_session_state_means_no_cache(self):
+        cache = RetrievalCache(None)
+        self.assertEqual(cache.ranked, [])
+        self.assertFalse(cache.is_same_topic([1.0, 0.0], None, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code.pipeline import stream_ingest
+
+_CFG = {"queue_size": 2, "batch_size": 3, "max_wait_seconds": 0.2, "lexical_refresh_seconds": 0}
+
+
+def _chunk(page, text="Cache memory maps main memory blocks to lines. " * 5, **meta):
+    return {
+        "subject": "coa",
+        "unit": "unit3",
+        "source_pdf": "memory.pdf",
+        "page_start": page,
+        "page_end": page,
+        "extracted_metadata": {"title": f"Page {page}", "full_text": text, "confidence": 0.9, **meta},
+    }
+
+
+class TestStreamIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.upserts = []
+        self.embed_calls = []
+
+        def fake_embed(texts):
+            self.embed_calls.append(len(texts))
+            return [[0.1, 0.2] for _ in texts]
+
+        def fake_upsert(collection, subject, **records):
+            self.upserts.append((subject, records["ids"], time.monotonic()))
+            return None
+
+        self._patches = [
+            patch.object(stream_ingest.models, "embed", side_effect=fake_embed),
+            patch.object(stream_ingest, "upsert_with_partition", side_effect=fake_upsert),
+            patch.object(stream_ingest, "build_for_collection"),
+        ]
+        for p in self._patches:
+            p.start()
+        self.collection = MagicMock()
+
+    def tearDown(self):
+        for p in self._patches:
+            p.stop()
+
+    def test_chunks_are_batched_and_filtered(self):
+        with stream_ingest.StreamIngest(self.collection, _CFG) as stream:
+            for page in range(1, 5):
+                stream.submit(_chunk(page))
+            stream.submit(_chunk(9, text="Thanks", title="thank you"))   # garbage
+        self.assertEqual(self.embed_calls, [3, 1])
+        ids = [i for _, batch, _ in self.upserts for i in batch]
+        self.assertEqual(ids, [f"COA_memory.pdf_p{n}-{n}" for n in range(1, 5)])
+        self.assertEqual(stream.stats["skipped"], 1)
+        self.assertEqual(stream.stats["ingested"], 4)
+        stream_ingest.build_for_collection.assert_called_once_with(self.collection)
+
+    def test_partial_batch_flushes_while_extraction_continues(self):
+        stream = stream_ingest.StreamIngest(self.collection, _CFG)
+        submitted = time.monotonic()
+        stream.submit(_chunk(1))
+        time.sleep(0.6)   # extractor busy with the next page
+        self.assertEqual(len(self.upserts), 1)
+        self.assertLess(self.upserts[0][2] - submitted, 0.5)
+        stream.close()
+
+    def test_backpressure_blocks_the_producer(self):
+        release = threading.Event()
+
+        def slow_embed(texts):
+            release.wait(5)
+            return [[0.0] for _ in texts]
+
+        stream = stream_ingest.StreamIngest(self.collection, {**_CFG, "batch_size": 1})
+        with patch.object(stream_ingest.models, "embed", side_effect=slow_embed):
+            producer = threading.Thread(target=lambda: [stream.submit(_chunk(n)) for n in range(1, 10)])
+            producer.start()
+            producer.join(0.5)
+            self.assertTrue(producer.is_alive())   # queues full, submit() is waiting
+            release.set()
+            producer.join(5)
+            self.assertFalse(producer.is_alive())
+            stream.close()
+        self.assertEqual(stream.stats["ingested"], 9)
+
+    def test_failed_embedding_is_counted(self):
+        with patch.object(stream_ingest.models, "embed", return_value=[]):
+            with stream_ingest.StreamIngest(self.collection, _CFG) as stream:
+                stream.submit(_chunk(1))
+        self.assertEqual(stream.stats["failed"], 1)
+        self.assertEqual(self.upserts, [])
+
+    def test_failed_lexical_refresh_is_counted(self):
+        stream_ingest.build_for_collection.side_effect = RuntimeError("index locked")
+        with stream_ingest.StreamIngest(self.collection, _CFG) as stream:
+            stream.submit(_chunk(1))
+        self.assertEqual(stream.stats["ingested"], 1)
+        self.assertEqual(stream.stats["lexical_failed"], 1)
+
+    def test_submit_raises_when_workers_died(self):
+        stream = stream_ingest.StreamIngest(self.collection, _CFG)
+        stream.close()
+        with self.assertRaises(RuntimeError):
+            stream.submit(_chunk(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code import models
+from source_code.config import CONFIG
+from source_code.extract import job_runner, unit_classifier
+
+SYLLABUS = (
+    "Unit 1: number systems, boolean algebra, logic gates\n"
+    "Unit 2: memory hierarchy, cache mapping, virtual memory\n"
+    "Unit 3: pipelining, hazards, branch prediction, superscalar"
+)
+_AXES = {"boolean": 0, "cache": 1, "pipelin": 2}
+
+
+def fake_embed(texts):
+    """One axis per unit topic word; 'mixed' questions sit between two units."""
+    vectors = []
+    for text in texts:
+        v = np.full(4, 0.01)
+        for word, axis in _AXES.items():
+            if word in text.lower():
+                v[axis] += 1.0
+        if "mixed" in text.lower():
+            v[:2] += 1.0
+        vectors.append(v.tolist())
+    return vectors
+
+
+class TestClassifyQuestions(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._paths = patch.dict(CONFIG["paths"], {"pyq_unit_cache": os.path.join(self._tmp.name, "units.json")})
+        self._paths.start()
+        self._embed = patch.object(unit_classifier.local_embedding, "embed", side_effect=fake_embed)
+        self._embed.start()
+        unit_classifier._cache = None
+
+    def tearDown(self):
+        self._embed.stop()
+        self._paths.stop()
+        unit_classifier._cache = None
+        self._tmp.cleanup()
+
+    def test_clear_cases_skip_the_llm(self):
+        questions = ["Simplify this boolean expression", "Explain cache associativity", "Define pipelining"]
+        with patch.object(models, "chat_or_raise") as chat:
+            units = unit_classifier.classify_questions(questions, "COA", SYLLABUS)
+        self.assertEqual(units, [1, 2, 3])
+        chat.assert_not_called()
+
+    def test_ambiguous_questions_share_one_llm_call(self):
+        questions = ["Explain cache associativity", "A mixed question", "Another mixed one", "Something unrelated"]
+        with patch.object(models, "chat_or_raise", return_value='{"1": 1, "2": 2, "3": 3}') as chat:
+            units = unit_classifier.classify_questions(questions, "COA", SYLLABUS)
+        self.assertEqual(chat.call_count, 1)
+        self.assertEqual(units, [2, 1, 2, 3])
+        self.assertIn("Another mixed one", chat.call_args.kwargs["prompt"])
+        self.assertNotIn("cache associativity", chat.call_args.kwargs["prompt"])
+
+    def test_cache_answers_reruns(self):
+        questions = ["A mixed question", "Define pipelining"]
+        with patch.object(models, "chat_or_raise", return_value='{"1": 2}'):
+            unit_classifier.classify_questions(questions, "COA", SYLLABUS)
+        with open(CONFIG["paths"]["pyq_unit_cache"], encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)), 2)
+
+        unit_classifier._cache = None   # fresh process
+        with patch.object(models, "chat_or_raise") as chat:
+            units = unit_classifier.classify_questions(["  a MIXED question ", "Define pipelining"], "COA", SYLLABUS)
+        self.assertEqual(units, [2, 3])
+        chat.assert_not_called()
+
+    def test_changed_syllabus_misses_the_cache(self):
+        with patch.object(models, "chat_or_raise", return_value='{"1": 2}'):
+            unit_classifier.classify_questions(["A mixed question"], "COA", SYLLABUS)
+        renumbered = SYLLABUS.replace("Unit 1:", "Unit 4:")
+        with patch.object(models, "chat_or_raise", return_value='{"1": 4}') as chat:
+            units = unit_classifier.classify_questions(["A mixed question"], "COA", renumbered)
+        chat.assert_called_once()
+        self.assertEqual(units, [4])
+
+    def test_failed_llm_falls_back_and_is_not_cached(self):
+        with patch.object(models, "chat_or_raise", side_effect=RuntimeError("down")), \
+             patch.object(job_runner.time, "sleep"):
+            units = unit_classifier.classify_questions(["Something unrelated"], "COA", SYLLABUS)
+        self.assertEqual(units, [1])
+        self.assertFalse(os.path.exists(CONFIG["paths"]["pyq_unit_cache"]))
+
+    def test_parse_batch_response(self):
+        parsed = unit_classifier.parse_batch_response('Sure: {"1": "2", "2": 9, "x": 1, "5": 1}', 3, {1, 2, 3})
+        self.assertEqual(parsed, {0: 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import chromadb
+
+from source_code.config import CONFIG
+from source_code.rag.metadata_filter import matches_where
+from source_code.utils import UNIT_SCHEMA_KEY, unit_number
+from source_code.pipeline.migrate_unit_labels import migrate_collection
+
+
+class TestUnitMigration(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._paths = patch.dict(CONFIG["paths"], {"lexical_index": self._tmp.name})
+        self._paths.start()
+        client = chromadb.EphemeralClient()
+        self.collection = client.get_or_create_collection(
+            f"test_units_{id(self)}", metadata={"hnsw:space": "cosine"},
+        )
+        self.collection.add(
+            ids=["a", "b", "c", "d"],
+            embeddings=[[1.0, 0.0], [0.0, 1.0], [0.5, 0.5], [0.2, 0.8]],
+            documents=["alpha", "beta", "gamma", "delta"],
+            metadatas=[{"unit": "unit3"}, {"unit": "3"}, {"unit": "Unit 04"}, {"unit": ""}],
+        )
+
+    def tearDown(self):
+        self._paths.stop()
+        self._tmp.cleanup()
+
+    def test_unit_number(self):
+        self.assertEqual(unit_number("unit 03"), 3)
+        self.assertEqual(unit_number(5), 5)
+        self.assertEqual(unit_number("unknown"), 0)
+        self.assertEqual(unit_number(None), 0)
+
+    def test_migration_rewrites_units_and_marks_schema(self):
+        updated = migrate_collection(self.collection)
+        self.assertEqual(updated, 4)
+
+        got = self.collection.get(ids=["a", "b", "c", "d"], include=["metadatas"])
+        by_id = dict(zip(got["ids"], got["metadatas"]))
+        self.assertEqual(by_id["a"]["unit_num"], 3)
+        self.assertEqual(by_id["a"]["unit"], "3")
+        self.assertEqual(by_id["c"]["unit_num"], 4)
+        self.assertEqual(by_id["d"]["unit"], "unknown")
+        self.assertEqual(self.collection.metadata[UNIT_SCHEMA_KEY], 2)
+
+        unit3 = [i for i, m in by_id.items() if matches_where(m, {"unit_num": 3})]
+        self.assertEqual(sorted(unit3), ["a", "b"])
+
+    def test_migration_is_idempotent(self):
+        migrate_collection(self.collection)
+        self.assertEqual(migrate_collection(self.collection), 0)
+
+    def test_dry_run_writes_nothing(self):
+        self.assertEqual(migrate_collection(self.collection, dry_run=True), 4)
+        got = self.collection.get(ids=["a"], include=["metadatas"])
+        self.assertNotIn("unit_num", got["metadatas"][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
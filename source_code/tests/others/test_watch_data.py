@@ -0,0 +1,191 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import fitz
+
+# Add project root to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from source_code.config import CONFIG
+from source_code.pipeline import watch_data
+from source_code.extract import extract_multimodal_notes as notes
+from source_code.utils import delete_with_partition, partition_collection_name
+
+_CFG = {"poll_seconds": 0.01, "debounce_seconds": 0.05, "refresh_keywords": True}
+
+
+def _write_pdf(path: Path, pages: list[str]) -> None:
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+
+
+class TestClassify(unittest.TestCase):
+
+    def test_kinds(self):
+        base = Path("/data/year_2/COA")
+        cases = {
+            base / "notes" / "unit1" / "memory.pdf": watch_data.NOTES_PDF,
+            base / "notes" / "unit1" / "memory" / "chunk_1_1.json": watch_data.NOTES_JSON,
+            base / "pyqs" / "2023.pdf": watch_data.PYQ_PDF,
+            base / "pyqs" / "pyqs_processed" / "2023_processed.json": watch_data.PYQ_JSON,
+            base / "syllabus" / "coa.pdf": watch_data.SYLLABUS_PDF,
+            base / "syllabus" / "syllabus_unit_1.json": watch_data.SYLLABUS_JSON,
+            base / "notes" / "unit1" / "memory" / "memory.txt": None,
+        }
+        for path, kind in cases.items():
+            self.assertEqual(watch_data.classify_path(path), kind, path)
+        self.assertEqual(watch_data.path_subject(base / "pyqs" / "2023.pdf"), "COA")
+
+    def test_syllabus_chunk_type(self):
+        self.assertEqual(watch_data._syllabus_chunk_type(Path("syllabus_unit_3.json")), "unit_3")
+        self.assertEqual(watch_data._syllabus_chunk_type(Path("syllabus_co.json")), "course_outcomes")
+
+
+class TestWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.unit_dir = self.root / "year_2" / "COA" / "notes" / "unit1"
+        self.unit_dir.mkdir(parents=True)
+        self.pdf = self.unit_dir / "memory.pdf"
+        _write_pdf(self.pdf, ["Cache memory", "Virtual memory"])
+        self.watcher = watch_data.DataWatcher(str(self.root), _CFG)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_existing_files_are_baseline(self):
+        with patch.object(self.watcher, "handle") as handle:
+            self.assertEqual(self.watcher.poll_once(), set())
+        handle.assert_not_called()
+
+    def test_change_is_debounced_then_handled_once(self):
+        _write_pdf(self.pdf, ["Cache memory", "Paging"])
+        with patch.object(self.watcher, "handle", return_value=({"COA"}, set())) as handle, \
+             patch.object(self.watcher, "refresh_keywords") as refresh:
+            self.assertEqual(self.watcher.poll_once(), {"COA"})
+            self.assertEqual(self.watcher.poll_once(), set())
+        handle.assert_called_once_with([self.pdf], [])
+        refresh.assert_called_once_with({"COA"})
+
+    def test_own_writes_are_not_reported(self):
+        (self.unit_dir / "lecture.pdf").write_bytes(b"%PDF")
+
+        def extract(changed, removed):
+            out = self.unit_dir / "lecture"
+            out.mkdir()
+            (out / "chunk_1_1.json").write_text("{}")
+            return {"COA"}, set()
+
+        with patch.object(self.watcher, "handle", side_effect=extract) as handle, \
+             patch.object(self.watcher, "refresh_keywords"):
+            self.watcher.poll_once()
+            self.watcher.poll_once()
+        self.assertEqual(handle.call_count, 1)
+
+    def test_failed_file_is_retried_next_poll(self):
+        other = self.unit_dir / "lecture.pdf"
+        _write_pdf(other, ["Pipelining"])
+        _write_pdf(self.pdf, ["Cache memory", "Paging"])
+
+        def update(pdf, on_chunk):
+            if pdf == self.pdf:
+                raise RuntimeError("VLM down")
+            return {"COA"}
+
+        with patch.object(watch_data, "StreamIngest"), \
+             patch.object(self.watcher, "update_notes_pdf", side_effect=update) as update_pdf, \
+             patch.object(self.watcher, "refresh_keywords") as refresh:
+            self.assertEqual(self.watcher.poll_once(), {"COA"})
+            self.assertEqual(update_pdf.call_count, 2)   # the failure did not stop the other PDF
+            update_pdf.reset_mock()
+            self.watcher.poll_once()
+        self.assertEqual([c.args[0] for c in update_pdf.call_args_list], [self.pdf])
+        refresh.assert_called_once_with({"COA"})
+
+    def test_removed_pdf_deletes_outputs_and_documents(self):
+        out = self.unit_dir / "memory"
+        out.mkdir()
+        (out / "chunk_1_1.json").write_text("{}")
+        self.pdf.unlink()
+        with patch.object(watch_data, "get_chroma_collection"), \
+             patch.object(watch_data, "delete_with_partition") as delete:
+            subjects, failed = self.watcher.handle([], [self.pdf])
+        self.assertEqual((subjects, failed), ({"COA"}, set()))
+        self.assertFalse(out.exists())
+        self.assertEqual(delete.call_args.args[2], {"subject": "COA", "source": "memory.pdf"})
+
+    def test_changed_notes_pdf_reextracts_only_stale_chunks(self):
+        out = self.unit_dir / "memory"
+        out.mkdir()
+        doc = fitz.open(str(self.pdf))
+        for n in range(2):
+            chunk = {"page_start": n + 1, "page_end": n + 1, "page_hash": notes.chunk_fingerprint(doc, n, n + 1)}
+            (out / f"chunk_{n + 1}_{n + 1}.json").write_text(json.dumps(chunk))
+        doc.close()
+        _write_pdf(self.pdf, ["Cache memory", "Paging"])   # only page 2 changed
+
+        with patch.object(watch_data, "get_chroma_collection"), \
+             patch.object(watch_data, "delete_with_partition") as delete, \
+             patch.object(watch_data, "process_pdf") as process:
+            self.watcher.update_notes_pdf(self.pdf, on_chunk=None)
+
+        self.assertEqual(sorted(p.name for p in out.iterdir()), ["chunk_1_1.json"])
+        self.assertEqual(delete.call_args.args[2]["page_start"], 2)
+        process.assert_called_once_with(self.pdf, on_chunk=None)
+
+
+class TestStaleChunks(unittest.TestCase):
+
+    def test_missing_hash_and_missing_pages_are_stale(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf = Path(tmp) / "notes.pdf"
+            _write_pdf(pdf, ["one"])
+            out = Path(tmp) / "notes"
+            out.mkdir()
+            doc = fitz.open(str(pdf))
+            current = {"page_start": 1, "page_end": 1, "page_hash": notes.chunk_fingerprint(doc, 0, 1)}
+            doc.close()
+            (out / "chunk_1_1.json").write_text(json.dumps(current))
+            (out / "chunk_2_2.json").write_text(json.dumps({**current, "page_start": 2, "page_end": 2}))
+            (out / "chunk_3_3.json").write_text(json.dumps({"page_start": 1, "page_end": 1}))
+            self.assertEqual([p.name for p in notes.stale_chunks(pdf)], ["chunk_2_2.json", "chunk_3_3.json"])
+
+
+class TestDeleteWithPartition(unittest.TestCase):
+
+    def test_where_and_partition(self):
+        collection = MagicMock()
+        collection.name = "multimodal_notes"
+        partition = MagicMock()
+        with patch.dict(CONFIG["rag"]["partitioning"], {"enabled": True}), \
+             patch("source_code.utils.get_chroma_collection", return_value=partition):
+            name = delete_with_partition(collection, "COA", {"subject": "COA", "source": "a.pdf"})
+        where = {"$and": [{"subject": "COA"}, {"source": "a.pdf"}]}
+        collection.delete.assert_called_once_with(where=where)
+        partition.delete.assert_called_once_with(where=where)
+        self.assertTrue(name.startswith("multimodal_notes"))
+
+    def test_partition_names_are_valid_collection_names(self):
+        self.assertEqual(partition_collection_name("multimodal_notes", "CYBER SECURITY"), "multimodal_notes__cyber_security")
+        self.assertEqual(partition_collection_name("multimodal_notes", " C++ / OOP. "), "multimodal_notes__c_oop")
+        long_a = partition_collection_name("multimodal_notes", "DATA STRUCTURES AND ALGORITHMS " * 3 + "I")
+        long_b = partition_collection_name("multimodal_notes", "DATA STRUCTURES AND ALGORITHMS " * 3 + "II")
+        self.assertLessEqual(len(long_a), 63)
+        self.assertNotEqual(long_a, long_b)
+        self.assertRegex(long_a, r"^[a-z0-9][a-z0-9_-]*[a-z0-9]$")
+
+
+if __name__ == '__main__':
+    unittest.main()
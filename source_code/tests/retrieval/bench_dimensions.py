@@ -0,0 +1,114 @@
+"""
+bench_dimensions.py
+───────────────────
+Latency / memory vs. accuracy of Matryoshka-truncated embeddings.
+
+For every dimension it reports, over the benchmark questions
+(see bench_quantization.load_questions):
+
+  router     agreement of the (subject, unit) decision with full-dimension
+             routing, p50 matching time and unit-matrix size
+  candidates recall@k of the truncated first stage + full-precision
+             rescoring against exact float32 search on the notes snapshot,
+             p50 search time and code size
+
+Candidate codes must be exported for each dimension first:
+    python source_code/pipeline/export_snapshot.py notes --quantize float32 --dim 128 --dim 256 --dim 512
+
+Run:
+    python source_code/tests/retrieval/bench_dimensions.py [--dims 128 256 512 1024] [--k 8]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from unittest.mock import patch
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source_code.config import CONFIG
+from source_code.pipeline.embeddings.local_embedding import embed_query
+from source_code.pipeline.export_snapshot import snapshot_dir
+from source_code.rag import embedding_router
+from source_code.rag.flat_index import FlatIndex
+from source_code.rag.quantized_index import QuantizedIndex, codes_path
+from source_code.tests.retrieval.bench_quantization import load_questions
+
+
+def _route_all(questions: list[str], dim: int | None) -> tuple[list[tuple], list[float]]:
+    decisions, times = [], []
+    with patch.dict(CONFIG["rag"]["embedding_dims"], {"router": dim}):
+        embedding_router._unit_matrix(dim)   # build outside the timed loop
+        for q in questions:
+            start = time.perf_counter()
+            subject, unit, _ = embedding_router.route(q)
+            times.append((time.perf_counter() - start) * 1000)
+            decisions.append((subject, unit))
+    return decisions, times
+
+
+def bench_router(questions: list[str], dims: list[int]) -> None:
+    full_dim = embedding_router.stored_dimension()
+    if not full_dim:
+        print("router: no unit embeddings (run pipeline/generate_unit_embeddings.py)")
+        return
+    for q in questions:
+        embed_query(q)   # warm the LRU so only matching is timed
+
+    reference, ref_ms = _route_all(questions, None)
+    print(f"\n{'router dim':<12} {'agreement':>9} {'p50':>9} {'matrix':>10}")
+    print(f"{full_dim:<12} {1.0:>9.3f} {statistics.median(ref_ms):>7.3f}ms "
+          f"{embedding_router._unit_matrix(None).nbytes / 1024:>8.1f}KB")
+    for dim in dims:
+        if dim >= full_dim:
+            continue
+        decisions, times = _route_all(questions, dim)
+        agree = sum(a == b for a, b in zip(decisions, reference)) / len(reference)
+        print(f"{dim:<12} {agree:>9.3f} {statistics.median(times):>7.3f}ms "
+              f"{embedding_router._unit_matrix(dim).nbytes / 1024:>8.1f}KB")
+
+
+def bench_candidates(questions: list[str], dims: list[int], alias: str, k: int, oversample: int) -> None:
+    path = snapshot_dir(CONFIG["paths"]["collections"][alias])
+    flat = FlatIndex.load(path)
+    vectors = [embed_query(q) for q in questions]
+    truth = [{h["id"] for h in flat.search(v, k)} for v in vectors]
+
+    print(f"\n{'candidate dim':<14} {'recall@k':>9} {'p50':>9} {'codes':>10}   ({flat.collection}, k={k}, oversample={oversample})")
+    print(f"{flat.dim:<14} {1.0:>9.3f} {'-':>9} {flat.embeddings.nbytes / 2**20:>8.1f}MB")
+    for dim in dims:
+        if not os.path.exists(codes_path(path, "float32", dim)):
+            print(f"{dim:<14} (no codes — run export_snapshot.py --quantize float32 --dim {dim})")
+            continue
+        index = QuantizedIndex.load(path, "float32", dim)
+        found, total, times = 0, 0, []
+        for v, exact in zip(vectors, truth):
+            start = time.perf_counter()
+            hits = index.search(v, k, oversample=oversample)
+            times.append((time.perf_counter() - start) * 1000)
+            found += len(exact & {h["id"] for h in hits})
+            total += len(exact)
+        print(f"{dim:<14} {found / max(total, 1):>9.3f} {statistics.median(times):>7.1f}ms "
+              f"{index.nbytes / 2**20:>8.1f}MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dims", type=int, nargs="+", default=[128, 256, 512, 1024])
+    parser.add_argument("--alias", default="notes", choices=list(CONFIG["paths"]["collections"]))
+    parser.add_argument("--k", type=int, default=CONFIG["rag"]["notes_k"])
+    parser.add_argument("--oversample", type=int, default=CONFIG["rag"]["quantization"]["oversample"]["float32"])
+    args = parser.parse_args()
+
+    questions = load_questions()
+    print(f"{len(questions)} questions")
+    bench_router(questions, args.dims)
+    bench_candidates(questions, args.dims, args.alias, args.k, args.oversample)
+
+
+if __name__ == "__main__":
+    main()
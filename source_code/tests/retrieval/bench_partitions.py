@@ -0,0 +1,101 @@
+"""
+bench_partitions.py
+───────────────────
+Latency benchmark: filtered global search vs. per-subject partition search.
+
+For every subject that has a notes partition, runs the same queries through
+both layouts (dense only, lexical fusion off, query embeddings pre-computed)
+and reports p50 / p95 latency and the top-k overlap between the two.
+
+Build the partitions first:
+    python source_code/pipeline/build_partitions.py
+
+Run:
+    python source_code/tests/retrieval/bench_partitions.py [--k 8] [--repeats 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from unittest.mock import patch
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source_code.config import CONFIG
+from source_code.rag import search
+from source_code.pipeline.embeddings.local_embedding import embed_query
+
+QUERIES = [
+    "explain the main concepts of this unit",
+    "define the term with an example",
+    "difference between the two approaches",
+    "write short notes on the architecture",
+    "list the advantages and disadvantages",
+]
+
+
+def _p95(values: list[float]) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+
+def _timed(fn, repeats: int) -> tuple[list[float], list]:
+    times, result = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return times, result
+
+
+def _subjects() -> list[str]:
+    metas = search._get("notes").get(include=["metadatas"])["metadatas"]
+    return sorted({m.get("subject") for m in metas if m.get("subject")})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=CONFIG["rag"]["notes_k"])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    vectors = {q: embed_query(q) for q in QUERIES}
+    rows = []
+
+    with patch.dict(CONFIG["rag"]["hybrid_search"], {"enabled": False}):
+        for subject in _subjects():
+            with patch.dict(CONFIG["rag"]["partitioning"], {"enabled": True}):
+                if search._get_partition("notes", subject) is None:
+                    print(f"  skip {subject}: no partition")
+                    continue
+
+            global_ms, part_ms, overlaps = [], [], []
+            for q in QUERIES:
+                with patch.dict(CONFIG["rag"]["partitioning"], {"enabled": False}):
+                    t, g = _timed(lambda: search.retrieve_notes(q, subject=subject, k=args.k, query_vector=vectors[q]), args.repeats)
+                    global_ms += t
+                with patch.dict(CONFIG["rag"]["partitioning"], {"enabled": True}):
+                    t, p = _timed(lambda: search.retrieve_notes(q, subject=subject, k=args.k, query_vector=vectors[q]), args.repeats)
+                    part_ms += t
+                g_ids, p_ids = {c["id"] for c in g}, {c["id"] for c in p}
+                if g_ids or p_ids:
+                    overlaps.append(len(g_ids & p_ids) / max(len(g_ids), len(p_ids)))
+
+            rows.append((
+                subject,
+                statistics.median(global_ms), _p95(global_ms),
+                statistics.median(part_ms), _p95(part_ms),
+                statistics.mean(overlaps) if overlaps else float("nan"),
+            ))
+
+    print(f"\n{'subject':<28} {'global p50':>10} {'global p95':>10} {'part p50':>9} {'part p95':>9} {'overlap':>8}")
+    for subject, gp50, gp95, pp50, pp95, ov in rows:
+        print(f"{subject:<28} {gp50:>8.1f}ms {gp95:>8.1f}ms {pp50:>7.1f}ms {pp95:>7.1f}ms {ov:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+bench_quantization.py
+─────────────────────
+Recall / latency / memory benchmark: quantized first stage + full-precision
+rescoring vs. exact flat search.
+
+Embeds the benchmark questions (tests/complete_system/questions.txt and
+tests/chat/questions.txt), takes exact top-k from the float32 snapshot as
+ground truth, and for every quantization mode and oversample factor reports
+recall@k, p50 latency and the resident size of the first-stage codes.
+
+Export the snapshot with codes first:
+    python source_code/pipeline/export_snapshot.py notes --quantize int8 --quantize binary
+
+Run:
+    python source_code/tests/retrieval/bench_quantization.py [--alias notes] [--k 8]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source_code.config import CONFIG
+from source_code.pipeline.embeddings.local_embedding import embed_query
+from source_code.pipeline.export_snapshot import snapshot_dir
+from source_code.rag.flat_index import FlatIndex
+from source_code.rag.quantized_index import MODES, QuantizedIndex, codes_path
+
+TESTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+QUESTION_FILES = [
+    os.path.join(TESTS_DIR, "complete_system", "questions.txt"),
+    os.path.join(TESTS_DIR, "chat", "questions.txt"),
+]
+_QUESTION_RE = re.compile(r"^\s*(?:Q\d+:|\d+\.)\s+(.+?)\s*$")
+
+
+def load_questions() -> list[str]:
+    questions = []
+    for path in QUESTION_FILES:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                m = _QUESTION_RE.match(line)
+                if m and len(m.group(1).split()) >= 3:
+                    questions.append(m.group(1))
+    return questions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--alias", default="notes", choices=list(CONFIG["paths"]["collections"]))
+    parser.add_argument("--k", type=int, default=CONFIG["rag"]["notes_k"])
+    parser.add_argument("--oversample", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    path = snapshot_dir(CONFIG["paths"]["collections"][args.alias])
+    flat = FlatIndex.load(path)
+    questions = load_questions()
+    vectors = [embed_query(q) for q in questions]
+    print(f"{flat.collection}: {len(flat)} × {flat.dim}, {len(questions)} questions, k={args.k}")
+
+    exact_ms, truth = [], []
+    for v in vectors:
+        start = time.perf_counter()
+        truth.append({h["id"] for h in flat.search(v, args.k)})
+        exact_ms.append((time.perf_counter() - start) * 1000)
+    print(f"\n{'mode':<8} {'oversample':>10} {'recall@k':>9} {'p50':>9} {'codes':>10}")
+    print(f"{'float32':<8} {'-':>10} {1.0:>9.3f} {statistics.median(exact_ms):>7.1f}ms "
+          f"{flat.embeddings.nbytes / 2**20:>8.1f}MB")
+
+    for mode in MODES:
+        if not os.path.exists(codes_path(path, mode)):
+            print(f"{mode:<8} (no codes — run export_snapshot.py --quantize {mode})")
+            continue
+        index = QuantizedIndex.load(path, mode)
+        for oversample in args.oversample:
+            found, total, times = 0, 0, []
+            for v, exact in zip(vectors, truth):
+                start = time.perf_counter()
+                hits = index.search(v, args.k, oversample=oversample)
+                times.append((time.perf_counter() - start) * 1000)
+                found += len(exact & {h["id"] for h in hits})
+                total += len(exact)
+            print(f"{mode:<8} {oversample:>10} {found / max(total, 1):>9.3f} "
+                  f"{statistics.median(times):>7.1f}ms {index.nbytes / 2**20:>8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,15 +5,21 @@ Shared helpers for all source_code scripts.
 
 Centralises:
   • Image encoding   — pil_to_base64, pil_to_bytes
-  • JSON parsing     — extract_first_json
+  • JSON parsing     — extract_first_json, parse_first_json
   • Embedding        — get_embedding (persistent Ollama client, keep_alive)
-  • ChromaDB         — get_chroma_collection
+  • ChromaDB         — get_chroma_collection, partition_collection_name,
+                       upsert_with_partition, delete_with_partition,
+                       collection_metadata, mark_ingested
+  • Unit metadata    — unit_number, UNIT_SCHEMA_VERSION
   • VLM client       — build_vlm_client (Ollama with optional cloud auth)
 """
 
 import base64
+import hashlib
 import io
 import json
+import re
+import time
 
 import chromadb
 from source_code import models
@@ -23,7 +29,8 @@ from source_code.config import CONFIG
 
 # Persistent clients are now managed by models.py
 
-# ── Cached ChromaDB collections (keyed by collection name) ───────────────────
+# ── Cached ChromaDB client and collections (keyed by collection name) ───────
+_chroma_client = None
 _chroma_collections: dict[str, chromadb.Collection] = {}
 
 
@@ -57,28 +64,142 @@ def pil_to_jpeg_bytes(img: Image.Image, quality: int = 85) -> bytes:
 # JSON PARSING
 # ──────────────────────────────────────────────────────────────────────────────
 
-def extract_first_json(text: str) -> dict | None:
-    """
-    Extract the first complete JSON object from a (possibly noisy) VLM response.
-    Uses brace-counting to find the matching closing brace.
-    """
-    start = text.find("{")
-    if start == -1:
-        return None
+_DECODER = json.JSONDecoder()
+# Characters that matter to the scanners; everything else is skipped by regex
+_STRUCTURE = re.compile(r'[{}\[\]",]')
+_STRING_END = re.compile(r'["\\]')
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _skip_string(text: str, i: int) -> int | None:
+    """Index just past the string whose opening quote is at text[i - 1]; None if unterminated."""
+    while True:
+        m = _STRING_END.search(text, i)
+        if m is None:
+            return None
+        if m.group() == '"':
+            return m.end()
+        i = m.end() + 1   # skip the escaped character
+
+
+def _object_end(text: str, start: int) -> int | None:
+    """Index just past the '}' matching the '{' at `start` (ignoring braces in strings); None if truncated."""
     depth = 0
-    for i, ch in enumerate(text[start:], start=start):
-        if ch == "{":
+    i = start
+    while True:
+        m = _STRUCTURE.search(text, i)
+        if m is None:
+            return None
+        ch, i = m.group(), m.end()
+        if ch == '"':
+            i = _skip_string(text, i)
+            if i is None:
+                return None
+        elif ch == "{":
             depth += 1
         elif ch == "}":
             depth -= 1
-        if depth == 0:
-            try:
-                return json.loads(text[start : i + 1])
-            except json.JSONDecodeError:
-                return None
+            if depth == 0:
+                return i
+
+
+def _repair_json(fragment: str) -> dict | None:
+    """
+    Best-effort parse of a damaged or truncated JSON object: drops trailing
+    commas, closes an unterminated string and any open brackets. If that does
+    not parse, cuts back to the last complete member and closes from there.
+    """
+    out: list[str] = []
+    stack: list[str] = []
+    cuts: list[tuple[int, list[str]]] = []   # (len(out), open brackets) after complete members
+    i = 0
+    while True:
+        m = _STRUCTURE.search(fragment, i)
+        if m is None:
+            out.append(fragment[i:])
+            break
+        out.append(fragment[i:m.start()])
+        ch, i = m.group(), m.end()
+        if ch == '"':
+            end = _skip_string(fragment, i)
+            if end is None:
+                out.append(fragment[m.start():] + '"')
+                break
+            out.append(fragment[m.start():end])
+            i = end
+        elif ch in "{[":
+            stack.append(ch)
+            out.append(ch)
+        elif ch in "}]":
+            # Trailing comma before a closer: {"a": 1,}
+            while out and (not out[-1].strip() or out[-1].rstrip().endswith(",")):
+                tail = out.pop().rstrip()
+                if tail.endswith(","):
+                    out.append(tail[:-1])
+                    break
+            if stack:
+                stack.pop()
+            out.append(ch)
+            if not stack:
+                break
+            cuts.append((len(out), list(stack)))
+        else:   # ","
+            cuts.append((len(out), list(stack)))
+            out.append(ch)
+
+    def close(parts: list[str], open_brackets: list[str]):
+        text = "".join(parts).rstrip().rstrip(",")
+        return text + "".join(_CLOSERS[b] for b in reversed(open_brackets))
+
+    candidates = [close(out, stack)] + [close(out[:n], st) for n, st in reversed(cuts[-3:])]
+    for candidate in candidates:
+        try:
+            parsed = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(parsed, dict):
+            return parsed
     return None
 
 
+def parse_first_json(text: str, repair: bool = True) -> tuple[dict | None, bool]:
+    """
+    Extract the first JSON object from a (possibly noisy) VLM response.
+
+    Each '{' is tried with json.JSONDecoder.raw_decode (no slicing, braces
+    inside strings are fine). A '{' that raw_decode rejects is scanned to its
+    matching '}' — string and escape aware — and, with `repair`, parsed
+    leniently; one that is never closed is a truncated response and is
+    repaired (see _repair_json). Otherwise the scan moves on to the next '{'.
+
+    Returns:
+        (object or None, whether it had to be repaired). A repaired object
+        may end in a value that was cut short.
+    """
+    if not text:
+        return None, False
+    start = text.find("{")
+    while start != -1:
+        try:
+            parsed, _ = _DECODER.raw_decode(text, start)
+            if isinstance(parsed, dict):
+                return parsed, False
+        except json.JSONDecodeError:
+            pass
+        if repair:
+            end = _object_end(text, start)
+            fixed = _repair_json(text[start:end] if end else text[start:])
+            if fixed is not None:
+                return fixed, True
+        start = text.find("{", start + 1)
+    return None, False
+
+
+def extract_first_json(text: str, repair: bool = True) -> dict | None:
+    """The object of parse_first_json(), for callers that do not care whether it was repaired."""
+    return parse_first_json(text, repair)[0]
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # EMBEDDING
 # ──────────────────────────────────────────────────────────────────────────────
@@ -105,14 +226,160 @@ def get_chroma_collection(collection_name: str = None) -> chromadb.Collection:
     """
     name = collection_name or CONFIG["paths"]["collections"]["notes"]
     if name not in _chroma_collections:
-        client = chromadb.PersistentClient(path=CONFIG["paths"]["chroma"])
-        _chroma_collections[name] = client.get_or_create_collection(
+        _chroma_collections[name] = get_chroma_client().get_or_create_collection(
             name=name,
             metadata={"hnsw:space": "cosine"},
         )
     return _chroma_collections[name]
 
 
+def get_chroma_client() -> chromadb.ClientAPI:
+    """The process-wide PersistentClient for CONFIG["paths"]["chroma"]."""
+    global _chroma_client
+    if _chroma_client is None:
+        _chroma_client = chromadb.PersistentClient(path=CONFIG["paths"]["chroma"])
+    return _chroma_client
+
+
+def collection_metadata(collection: chromadb.Collection) -> dict:
+    """
+    Current metadata of `collection`, re-read from Chroma: a Collection object
+    keeps the metadata it was opened with, so a long-running process would
+    miss what ingest or a migration wrote since.
+    """
+    try:
+        return get_chroma_client().get_collection(collection.name).metadata or {}
+    except Exception:   # not in the persistent store (e.g. an in-memory client)
+        return collection.metadata or {}
+
+
+def update_collection_metadata(collection: chromadb.Collection, **values) -> None:
+    """Merge `values` into the collection metadata (modify() replaces it whole)."""
+    metadata = {**collection_metadata(collection), **values}
+    try:
+        collection.modify(metadata=metadata)
+    except ValueError:
+        # Newer Chroma keeps the distance function in the collection
+        # configuration and refuses to see hnsw:* keys in modify().
+        collection.modify(metadata={k: v for k, v in metadata.items() if not k.startswith("hnsw:")})
+
+
+def mark_ingested(collection: chromadb.Collection) -> None:
+    """
+    Stamp the collection with a new INGEST_MARKER_KEY. Snapshots record the
+    marker they were exported at, so any later write — including an in-place
+    re-ingest that keeps ids and count — makes them stale.
+    """
+    update_collection_metadata(collection, **{INGEST_MARKER_KEY: str(time.time_ns())})
+
+
+# Chroma accepts [a-zA-Z0-9._-], starting and ending alphanumeric; older
+# releases cap names at 63 characters, so stay within that everywhere.
+_UNSAFE_NAME_CHARS = re.compile(r"[^a-z0-9_-]+")
+_MAX_COLLECTION_NAME = 63
+
+
+def partition_collection_name(collection_name: str, subject: str) -> str:
+    """
+    Name of the per-subject partition of a collection,
+    e.g. ("multimodal_notes", "CYBER SECURITY") → "multimodal_notes__cyber_security".
+
+    Characters Chroma rejects become "_"; a name that would be too long is
+    cut and suffixed with a hash of the subject, so it stays unique.
+    """
+    sep = CONFIG["rag"]["partitioning"]["separator"]
+    raw = subject.strip().lower()
+    slug = _UNSAFE_NAME_CHARS.sub("_", raw).strip("_-") or "subject"
+    name = f"{collection_name}{sep}{slug}"
+    if len(name) > _MAX_COLLECTION_NAME:
+        digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:8]
+        name = f"{name[:_MAX_COLLECTION_NAME - len(digest) - 1].rstrip('_-')}_{digest}"
+    return name
+
+
+def upsert_with_partition(
+    collection: chromadb.Collection,
+    subject: str,
+    **records,
+) -> str | None:
+    """
+    Upsert into `collection` and, when partitioning is enabled, into the
+    subject's partition collection as well.
+
+    Args:
+        collection: The global collection.
+        subject:    Subject of the records (upper-case, as stored in metadata).
+        **records:  ids / embeddings / documents / metadatas, as for upsert().
+
+    Returns:
+        The partition collection name written to, or None.
+    """
+    name = partition = None
+    if CONFIG["rag"]["partitioning"]["enabled"] and subject and subject != "UNKNOWN":
+        # Opened before writing anything, so a failure leaves both layouts untouched
+        name = partition_collection_name(collection.name, subject)
+        partition = get_chroma_collection(name)
+
+    collection.upsert(**records)
+    mark_ingested(collection)
+    if partition is not None:
+        partition.upsert(**records)
+        mark_ingested(partition)
+    return name
+
+
+def delete_with_partition(
+    collection: chromadb.Collection,
+    subject: str,
+    where: dict,
+) -> str | None:
+    """
+    Delete the documents matching `where` (plain field → value equalities)
+    from `collection` and from the subject's partition, if partitioning is on.
+
+    Returns:
+        The partition collection name deleted from, or None.
+    """
+    clauses = [{field: value} for field, value in where.items()]
+    where = clauses[0] if len(clauses) == 1 else {"$and": clauses}
+    collection.delete(where=where)
+    mark_ingested(collection)
+
+    if not CONFIG["rag"]["partitioning"]["enabled"] or not subject or subject == "UNKNOWN":
+        return None
+    name = partition_collection_name(collection.name, subject)
+    partition = get_chroma_collection(name)
+    partition.delete(where=where)
+    mark_ingested(partition)
+    return name
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# UNIT METADATA
+# ──────────────────────────────────────────────────────────────────────────────
+
+# Collections whose metadata says unit_schema_version >= 2 store a canonical
+# integer "unit_num" on every document (see pipeline/migrate_unit_labels.py),
+# so retrieval can filter on plain equality instead of "3" / "unit3" variants.
+UNIT_SCHEMA_VERSION = 2
+UNIT_SCHEMA_KEY = "unit_schema_version"
+
+# Collection metadata key bumped by every write through this module; see mark_ingested()
+INGEST_MARKER_KEY = "ingest_marker"
+
+
+def unit_number(raw) -> int:
+    """
+    Canonical integer unit: "unit 03", "Unit3", 3 → 3. Unknown/empty → 0.
+    """
+    if raw is None or isinstance(raw, bool):
+        return 0
+    if isinstance(raw, int):
+        return raw if raw > 0 else 0
+    match = re.search(r"\d+", str(raw))
+    return int(match.group()) if match else 0
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # VLM CLIENT
 # ──────────────────────────────────────────────────────────────────────────────